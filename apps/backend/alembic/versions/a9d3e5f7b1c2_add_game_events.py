@@ -0,0 +1,95 @@
+"""add append-only game_events log
+
+Revision ID: a9d3e5f7b1c2
+Revises: e7f8a9b0c1d2
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "a9d3e5f7b1c2"
+down_revision: Union[str, None] = "e7f8a9b0c1d2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "game_events",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("game_id", sa.Integer(), nullable=False),
+        sa.Column("seq", sa.Integer(), nullable=False),
+        sa.Column("event", sa.String(), nullable=True),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["game_id"], ["games.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("game_id", "seq", name="uq_game_events_game_id_seq"),
+    )
+    op.add_column("game_status", sa.Column("event_seq", sa.Integer(), nullable=False, server_default="0"))
+
+    # Move the existing inline logs over, numbered in their current order.
+    bind = op.get_bind()
+    game_status = sa.table(
+        "game_status",
+        sa.column("id", sa.Integer()),
+        sa.column("game_id", sa.Integer()),
+        sa.column("replay_log", sa.JSON()),
+        sa.column("event_seq", sa.Integer()),
+    )
+    game_events = sa.table(
+        "game_events",
+        sa.column("game_id", sa.Integer()),
+        sa.column("seq", sa.Integer()),
+        sa.column("event", sa.String()),
+        sa.column("payload", sa.JSON()),
+    )
+    rows = bind.execute(
+        sa.select(game_status.c.id, game_status.c.game_id, game_status.c.replay_log).where(
+            game_status.c.game_id.isnot(None)
+        )
+    ).all()
+    for state_id, game_id, replay_log in rows:
+        entries = [entry for entry in (replay_log or []) if isinstance(entry, dict)]
+        if not entries:
+            continue
+        bind.execute(
+            game_events.insert(),
+            [
+                {"game_id": game_id, "seq": seq, "event": entry.get("event"), "payload": entry}
+                for seq, entry in enumerate(entries, start=1)
+            ],
+        )
+        bind.execute(
+            game_status.update()
+            .where(game_status.c.id == state_id)
+            .values(event_seq=len(entries), replay_log=None)
+        )
+
+
+def downgrade() -> None:
+    # Put the last 500 events of each game back inline, as the old column kept them.
+    bind = op.get_bind()
+    game_status = sa.table("game_status", sa.column("game_id", sa.Integer()), sa.column("replay_log", sa.JSON()))
+    game_events = sa.table(
+        "game_events",
+        sa.column("game_id", sa.Integer()),
+        sa.column("seq", sa.Integer()),
+        sa.column("payload", sa.JSON()),
+    )
+    logs: dict[int, list] = {}
+    for game_id, payload in bind.execute(
+        sa.select(game_events.c.game_id, game_events.c.payload).order_by(game_events.c.game_id, game_events.c.seq)
+    ):
+        logs.setdefault(game_id, []).append(payload)
+    for game_id, payloads in logs.items():
+        bind.execute(
+            game_status.update().where(game_status.c.game_id == game_id).values(replay_log=payloads[-500:])
+        )
+
+    op.drop_column("game_status", "event_seq")
+    op.drop_table("game_events")
@@ -0,0 +1,25 @@
+"""add game_status.version for optimistic concurrency
+
+Revision ID: b4e6f8a0c2d3
+Revises: a9d3e5f7b1c2
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "b4e6f8a0c2d3"
+down_revision: Union[str, None] = "a9d3e5f7b1c2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("game_status", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade() -> None:
+    op.drop_column("game_status", "version")
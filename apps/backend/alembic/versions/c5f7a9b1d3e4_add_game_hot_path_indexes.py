@@ -0,0 +1,35 @@
+"""add composite indexes for game hot paths
+
+Revision ID: c5f7a9b1d3e4
+Revises: b4e6f8a0c2d3
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "c5f7a9b1d3e4"
+down_revision: Union[str, None] = "b4e6f8a0c2d3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = (
+    ("ix_game_units_game_id_user_id", "game_units", ["game_id", "user_id"]),
+    ("ix_game_units_game_id_current_hp", "game_units", ["game_id", "current_hp"]),
+    ("ix_game_units_game_id_position", "game_units", ["game_id", "current_x", "current_y"]),
+    ("ix_game_players_game_id_player_id", "game_players", ["game_id", "player_id"]),
+    ("ix_game_status_status_turn_deadline", "game_status", ["status", "turn_deadline"]),
+)
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,172 @@
+"""Process-local, read-only cache of catalog reference data.
+
+Units, moves, items and abilities only change when ``scripts/seed_catalog.py``
+refreshes them, so each worker snapshots the four tables into frozen records
+indexed by id (and slug/name where lookups use them) and serves the battle
+path from memory. ``refresh_catalogs`` bumps ``CATALOG_VERSION_KEY`` in Redis;
+workers compare it at most every ``VERSION_CHECK_SECONDS`` and rebuild when it
+moves. Rows inserted since the last build are still found through a DB
+fallback; edits to existing rows become visible after the version bump.
+
+Records keep the column names of their models, and list/dict fields are
+read-only ``list``/``dict`` subclasses, so they can be passed to helpers that
+were written against ORM rows. Copy a field before modifying it.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+from app.catalog_records import (
+    AbilityRecord,
+    ItemRecord,
+    MoveRecord,
+    UnitRecord,
+    freeze,
+)
+from app.db.models import Ability, Item, Move, Unit
+from app.instrumentation import InstrumentedRedis
+
+logger = logging.getLogger("catalog")
+
+CATALOG_VERSION_KEY = "catalog:version"
+VERSION_CHECK_SECONDS = 30.0
+
+redis_client = InstrumentedRedis(host="redis", port=6379, decode_responses=True)
+
+
+def _record_from_row(record_type, row):
+    return record_type(**{field: freeze(getattr(row, field)) for field in record_type.__dataclass_fields__})
+
+
+class Catalog:
+    __slots__ = (
+        "version",
+        "units",
+        "moves",
+        "moves_by_name",
+        "items",
+        "items_by_ref",
+        "item_categories",
+        "abilities",
+        "abilities_by_slug",
+    )
+
+    def __init__(
+        self,
+        version: str | None,
+        units: list[UnitRecord],
+        moves: list[MoveRecord],
+        items: list[ItemRecord],
+        abilities: list[AbilityRecord],
+    ):
+        self.version = version
+        self.units = {unit.id: unit for unit in units}
+        self.moves = {move.id: move for move in moves}
+        self.moves_by_name = {move.name: move for move in moves}
+        self.items = {item.id: item for item in items}
+        self.items_by_ref: dict[str, ItemRecord] = {}
+        for item in items:
+            # Same precedence as the old slug-or-name query: slugs first.
+            self.items_by_ref.setdefault(item.slug, item)
+        for item in items:
+            self.items_by_ref.setdefault(item.name, item)
+        self.item_categories = frozenset(item.category for item in items)
+        self.abilities = {ability.id: ability for ability in abilities}
+        self.abilities_by_slug = {ability.slug: ability for ability in abilities}
+
+    @classmethod
+    def load(cls, db: Session, version: str | None) -> "Catalog":
+        return cls(
+            version,
+            [_record_from_row(UnitRecord, row) for row in db.query(Unit).all()],
+            [_record_from_row(MoveRecord, row) for row in db.query(Move).all()],
+            [_record_from_row(ItemRecord, row) for row in db.query(Item).all()],
+            [_record_from_row(AbilityRecord, row) for row in db.query(Ability).all()],
+        )
+
+
+_catalog: Catalog | None = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_catalog(db: Session) -> Catalog:
+    global _catalog, _checked_at
+    catalog = _catalog
+    now = time.monotonic()
+    if catalog is not None and now - _checked_at < VERSION_CHECK_SECONDS:
+        return catalog
+
+    with _lock:
+        if _catalog is not catalog:
+            # Another thread rebuilt while we waited for the lock.
+            return _catalog
+        _checked_at = now
+        if catalog is None:
+            # Build first and learn the version on the next check, so a cold start
+            # never waits on Redis; that check rebuilds once if a version is set.
+            _catalog = Catalog.load(db, None)
+            return _catalog
+        try:
+            version = redis_client.get(CATALOG_VERSION_KEY)
+        except Exception:
+            logger.warning("Could not read %s; keeping the cached catalog", CATALOG_VERSION_KEY)
+            return catalog
+        if version != catalog.version:
+            _catalog = Catalog.load(db, version)
+        return _catalog
+
+
+def clear_catalog_cache() -> None:
+    global _catalog, _checked_at
+    with _lock:
+        _catalog = None
+        _checked_at = 0.0
+
+
+def bump_catalog_version() -> int | None:
+    """Tell every worker to rebuild its catalog. Returns the new version, or None if Redis is down."""
+    clear_catalog_cache()
+    try:
+        return int(redis_client.incr(CATALOG_VERSION_KEY))
+    except Exception:
+        logger.warning("Could not bump %s; workers keep their cached catalog until restart", CATALOG_VERSION_KEY)
+        return None
+
+
+def unit_record(db: Session, unit_id: int | None) -> UnitRecord | Unit | None:
+    if unit_id is None:
+        return None
+    record = get_catalog(db).units.get(unit_id)
+    return record if record is not None else db.get(Unit, unit_id)
+
+
+def move_record(db: Session, move_id: int | None) -> MoveRecord | Move | None:
+    if move_id is None:
+        return None
+    record = get_catalog(db).moves.get(move_id)
+    return record if record is not None else db.get(Move, move_id)
+
+
+def item_record(db: Session, ref: str) -> ItemRecord | Item | None:
+    record = get_catalog(db).items_by_ref.get(ref)
+    if record is not None:
+        return record
+    return db.query(Item).filter((Item.slug == ref) | (Item.name == ref)).first()
+
+
+def ability_record(db: Session, ability_id: int | None) -> AbilityRecord | Ability | None:
+    if ability_id is None:
+        return None
+    record = get_catalog(db).abilities.get(ability_id)
+    return record if record is not None else db.get(Ability, ability_id)
+
+
+def move_record_by_name(db: Session, name: str) -> MoveRecord | Move | None:
+    record = get_catalog(db).moves_by_name.get(name)
+    return record if record is not None else db.query(Move).filter(Move.name == name).first()
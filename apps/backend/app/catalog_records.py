@@ -0,0 +1,115 @@
+"""Frozen records served by ``app.catalog``.
+
+Kept apart from the catalog loader, which needs the ORM and Redis, so code
+that only reads records (``app.move_effects``, ``app.engine``) can import
+the types without pulling in the database layer.
+"""
+
+from __future__ import annotations
+
+import copy
+from dataclasses import dataclass
+
+
+def _read_only(*args, **kwargs):
+    raise TypeError("catalog records are read-only; copy the value before modifying it")
+
+
+class FrozenList(list):
+    __slots__ = ()
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(list(self), memo)
+
+
+class FrozenDict(dict):
+    __slots__ = ()
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    update = pop = popitem = clear = setdefault = _read_only
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(dict(self), memo)
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+
+@dataclass(frozen=True, slots=True)
+class UnitRecord:
+    id: int
+    species_id: int
+    form_id: int | None
+    name: str
+    species: str
+    types: list
+    base_stats: dict
+    level_up_moves: list
+    tm_moves: list
+    egg_moves: list
+    equipped_moves: list
+    ability_ids: list
+    hidden_ability: int | None
+    cost: int | None
+    is_legendary: bool | None
+
+
+@dataclass(frozen=True, slots=True)
+class MoveRecord:
+    id: int
+    name: str
+    description: str | None
+    type: str
+    category: str
+    power: int | None
+    accuracy: int | None
+    pp: int | None
+    makes_contact: bool | None
+    affected_by_protect: bool | None
+    affected_by_magic_coat: bool | None
+    affected_by_snatch: bool | None
+    affected_by_mirror_move: bool | None
+    affected_by_kings_rock: bool | None
+    sound_based: bool | None
+    range: str | None
+    targeting: str | None
+    cooldown: int | None
+    effects: list
+
+
+@dataclass(frozen=True, slots=True)
+class ItemRecord:
+    id: int
+    name: str
+    slug: str
+    category: str
+    cost: int
+    description: str | None
+    effects: list
+    natural_gift_type: str | None
+    natural_gift_power: int | None
+    flavor: str | None
+    boost_type: str | None
+    move_id: int | None
+
+
+@dataclass(frozen=True, slots=True)
+class AbilityRecord:
+    id: int
+    name: str
+    slug: str
+    description: str | None
+    generation: int
+    effect: dict | list | None
@@ -0,0 +1,192 @@
+"""Pre-serialized, pre-compressed responses for the catalog list endpoints.
+
+``/units/summary``, ``/moves/all``, ``/items/all``, ``/abilities/all``,
+``/maps/official`` and ``/maps/{map_id}`` only change when
+``scripts/seed_catalog.py`` runs, so each body is rendered through its schema
+once per catalog build (see ``app.catalog``), compressed once, and tagged with
+a strong ETag. Hits skip the ORM and Pydantic entirely, and clients that send a
+matching ``If-None-Match`` get a 304.
+
+The cache only holds keys a route knows to exist (catalog categories, maps
+that were found) and keeps at most ``MAX_CACHED_RESPONSES`` of them, least
+recently used first out. Each key is built under its own lock, so after a
+catalog bump concurrent requests wait for one render and compression instead
+of each doing their own.
+
+Brotli is used when the client accepts it, gzip otherwise.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Hashable, Iterable
+
+import brotli
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+
+from app.catalog import Catalog, get_catalog
+
+CACHE_CONTROL = "no-cache"
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+MAX_CACHED_RESPONSES = 256
+
+
+@dataclass(frozen=True, slots=True)
+class CachedBody:
+    catalog: Catalog
+    bodies: dict[str, bytes]
+    etags: dict[str, str]
+
+
+_cache: OrderedDict[Hashable, CachedBody] = OrderedDict()
+_build_locks: dict[Hashable, threading.Lock] = {}
+_adapters: dict[type, TypeAdapter] = {}
+_lock = threading.Lock()
+
+
+def render_list(schema: type, rows: Iterable) -> bytes:
+    adapter = _adapters.get(schema)
+    if adapter is None:
+        adapter = _adapters[schema] = TypeAdapter(list[schema])
+    return adapter.dump_json(adapter.validate_python(list(rows), from_attributes=True))
+
+
+def render_one(schema: type, row) -> bytes:
+    return schema.model_validate(row).model_dump_json().encode()
+
+
+def compile_body(catalog: Catalog, body: bytes) -> CachedBody:
+    bodies = {
+        "identity": body,
+        "gzip": gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+        "br": brotli.compress(body, quality=BROTLI_QUALITY),
+    }
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    # One strong validator per representation, as each encoding is different bytes.
+    etags = {
+        encoding: f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+        for encoding in bodies
+    }
+    return CachedBody(catalog, bodies, etags)
+
+
+def accepted_encodings(header: str | None) -> set[str]:
+    accepted = set()
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding)
+    return accepted
+
+
+def choose_encoding(entry: CachedBody, header: str | None) -> str:
+    accepted = accepted_encodings(header)
+    for encoding in ("br", "gzip"):
+        if encoding in entry.bodies and (encoding in accepted or "*" in accepted):
+            return encoding
+    return "identity"
+
+
+def etag_matches(entry: CachedBody, header: str | None) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    known = set(entry.etags.values())
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag in known:
+            return True
+    return False
+
+
+def _cached_entry(catalog: Catalog, key: Hashable) -> CachedBody | None:
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None or entry.catalog is not catalog:
+            return None
+        _cache.move_to_end(key)
+        return entry
+
+
+def _build_entry(catalog: Catalog, key: Hashable, build: Callable[[], bytes]) -> CachedBody:
+    with _lock:
+        build_lock = _build_locks.setdefault(key, threading.Lock())
+    try:
+        with build_lock:
+            # Another request may have built it while this one waited.
+            entry = _cached_entry(catalog, key)
+            if entry is not None:
+                return entry
+            entry = compile_body(catalog, build())
+            with _lock:
+                _cache[key] = entry
+                _cache.move_to_end(key)
+                while len(_cache) > MAX_CACHED_RESPONSES:
+                    evicted, _ = _cache.popitem(last=False)
+                    _build_locks.pop(evicted, None)
+            return entry
+    finally:
+        with _lock:
+            # A build that raised (e.g. a 404) leaves nothing cached to lock.
+            if key not in _cache:
+                _build_locks.pop(key, None)
+
+
+def send_body(request: Request, entry: CachedBody) -> Response:
+    encoding = choose_encoding(entry, request.headers.get("accept-encoding"))
+    headers = {
+        "ETag": entry.etags[encoding],
+        "Cache-Control": CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(entry, request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=entry.bodies[encoding], media_type="application/json", headers=headers)
+
+
+def cached_catalog_response(
+    request: Request,
+    db: Session,
+    key: Hashable,
+    build: Callable[[], bytes],
+) -> Response:
+    """Serve ``key`` from the cache, rendering it with ``build`` once per catalog build.
+
+    ``key`` must name something that exists in the catalog; ``build`` may raise
+    (e.g. a 404), in which case nothing is cached.
+    """
+    catalog = get_catalog(db)
+    entry = _cached_entry(catalog, key) or _build_entry(catalog, key, build)
+    return send_body(request, entry)
+
+
+def uncached_catalog_response(request: Request, db: Session, body: bytes) -> Response:
+    """Serve ``body`` with the same headers as a cached response, without keeping it."""
+    return send_body(request, compile_body(get_catalog(db), body))
+
+
+def clear_catalog_responses() -> None:
+    with _lock:
+        _cache.clear()
+        _build_locks.clear()
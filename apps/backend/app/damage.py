@@ -0,0 +1,214 @@
+"""Type chart and damage formula for the attack path.
+
+``TYPE_EFFECTIVENESS`` is compiled once into ``EFFECTIVENESS``, an 18x18
+matrix indexed by integer type ids (``type_id``), so a type lookup is two list
+indexes instead of lowercasing and scanning the weak/resist/immune lists.
+
+``damage_batch`` and ``raw_damage_batch`` evaluate the per-hit formula of
+``execute_move`` for many rows at once (every target, hit or stat mode of an
+attack). A row carries the move, attacker and defender type ids, the weather
+id, the side screens and the move category as columns; STAB, type
+effectiveness, the weather multiplier and screen halving are resolved from
+those columns in the same NumPy pass. The products are taken in the same order
+as the per-hit formula, so the results are bit-identical to it.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Sequence
+
+import numpy as np
+
+TYPE_EFFECTIVENESS = {
+    "normal": {"weak": [], "resist": ["rock", "steel"], "immune": ["ghost"]},
+    "fire": {"weak": ["grass", "ice", "bug", "steel"], "resist": ["fire", "water", "rock", "dragon"], "immune": []},
+    "water": {"weak": ["fire", "ground", "rock"], "resist": ["water", "grass", "dragon"], "immune": []},
+    "electric": {"weak": ["water", "flying"], "resist": ["electric", "grass", "dragon"], "immune": ["ground"]},
+    "grass": {"weak": ["water", "ground", "rock"], "resist": ["fire", "grass", "poison", "flying", "bug", "dragon", "steel"], "immune": []},
+    "ice": {"weak": ["grass", "ground", "flying", "dragon"], "resist": ["fire", "water", "ice", "steel"], "immune": []},
+    "fighting": {"weak": ["normal", "ice", "rock", "dark", "steel"], "resist": ["poison", "flying", "psychic", "bug", "fairy"], "immune": ["ghost"]},
+    "poison": {"weak": ["grass", "fairy"], "resist": ["poison", "ground", "rock", "ghost"], "immune": ["steel"]},
+    "ground": {"weak": ["fire", "electric", "poison", "rock", "steel"], "resist": ["grass", "bug"], "immune": ["flying"]},
+    "flying": {"weak": ["grass", "fighting", "bug"], "resist": ["electric", "rock", "steel"], "immune": []},
+    "psychic": {"weak": ["fighting", "poison"], "resist": ["psychic", "steel"], "immune": ["dark"]},
+    "bug": {"weak": ["grass", "psychic", "dark"], "resist": ["fire", "fighting", "poison", "flying", "ghost", "steel", "fairy"], "immune": []},
+    "rock": {"weak": ["fire", "ice", "flying", "bug"], "resist": ["fighting", "ground", "steel"], "immune": []},
+    "ghost": {"weak": ["psychic", "ghost"], "resist": ["dark"], "immune": ["normal"]},
+    "dragon": {"weak": ["dragon"], "resist": ["steel"], "immune": ["fairy"]},
+    "dark": {"weak": ["psychic", "ghost"], "resist": ["fighting", "dark", "fairy"], "immune": []},
+    "steel": {"weak": ["ice", "rock", "fairy"], "resist": ["fire", "water", "electric", "steel"], "immune": []},
+    "fairy": {"weak": ["fighting", "dragon", "dark"], "resist": ["fire", "poison", "steel"], "immune": []},
+}
+
+TYPE_NAMES = tuple(TYPE_EFFECTIVENESS)
+TYPE_IDS = {name: index for index, name in enumerate(TYPE_NAMES)}
+# Exact spellings seen in the catalog, so the common case skips str.lower().
+_TYPE_ID_LOOKUP = {**TYPE_IDS, **{name.capitalize(): index for name, index in TYPE_IDS.items()}}
+
+
+def _effectiveness(attacking: str, defending: str) -> float:
+    chart = TYPE_EFFECTIVENESS[attacking]
+    if defending in chart["immune"]:
+        return 0.0
+    if defending in chart["weak"]:
+        return 2.0
+    if defending in chart["resist"]:
+        return 0.5
+    return 1.0
+
+
+EFFECTIVENESS = tuple(
+    tuple(_effectiveness(attacking, defending) for defending in TYPE_NAMES) for attacking in TYPE_NAMES
+)
+
+
+def type_id(name) -> int | None:
+    """Integer id of a type name in any case, or None for unknown types."""
+    if name is None:
+        return None
+    found = _TYPE_ID_LOOKUP.get(name) if isinstance(name, str) else None
+    if found is not None:
+        return found
+    return TYPE_IDS.get(str(name).lower())
+
+
+STAB_MULTIPLIER = 1.5
+# Id of "no type": unknown move types and the padding of short type lists.
+NO_TYPE = len(TYPE_NAMES)
+_FAIRY = TYPE_IDS["fairy"]
+_DRAGON = TYPE_IDS["dragon"]
+# EFFECTIVENESS with a neutral row and column for NO_TYPE.
+_CHART = np.ones((NO_TYPE + 1, NO_TYPE + 1))
+_CHART[:NO_TYPE, :NO_TYPE] = np.asarray(EFFECTIVENESS)
+
+# Weather ids follow WEATHER_TO_ID in app.engine.rules (0 is clear).
+_SUN, _RAIN, _WEATHER_COUNT = 1, 2, 5
+_WEATHER_MOVE = np.ones((_WEATHER_COUNT, NO_TYPE + 1))
+_WEATHER_MOVE[_SUN, TYPE_IDS["fire"]] = 1.5
+_WEATHER_MOVE[_SUN, TYPE_IDS["water"]] = 0.5
+_WEATHER_MOVE[_RAIN, TYPE_IDS["water"]] = 1.5
+_WEATHER_MOVE[_RAIN, TYPE_IDS["fire"]] = 0.5
+
+
+def type_ids(names: Iterable) -> tuple[int, ...]:
+    """Sorted ids of the known types among ``names``; unknown types are dropped."""
+    return tuple(sorted(found for found in map(type_id, names) if found is not None))
+
+
+@dataclass(frozen=True, slots=True)
+class DamageRow:
+    """Inputs of one hit.
+
+    ``stab``, ``type_multiplier`` and ``weather_multiplier`` are multiplied
+    with what the id columns resolve to; a row built from ids leaves them at
+    1, and a row with precomputed multipliers leaves the ids at their defaults.
+    """
+
+    level: float
+    power: float
+    attack: float
+    defense: float
+    targets_multiplier: float = 1
+    random_factor: float = 1
+    stab: float = 1
+    critical: float = 1
+    type_multiplier: float = 1
+    weather_multiplier: float = 1
+    glaive_rush: bool = False
+    move_type_id: int = NO_TYPE
+    attacker_type_ids: tuple[int, ...] = ()
+    defender_type_ids: tuple[int, ...] = ()
+    # Foresight or Mind Reader lets this move hit through type immunities.
+    ignore_immunities: bool = False
+    ignore_fairy_immunity: bool = False
+    # Tar Shot doubles the type multiplier.
+    tar_shot: bool = False
+    weather_id: int = 0
+    is_special: bool = False
+    reflect: bool = False
+    light_screen: bool = False
+    aurora_veil: bool = False
+
+
+def _column(rows: Sequence[DamageRow], field: str, dtype=np.float64):
+    return np.fromiter((getattr(row, field) for row in rows), dtype=dtype, count=len(rows))
+
+
+def _type_id_matrix(rows: Sequence[DamageRow], field: str):
+    """Type id lists as an (rows, widest list) array padded with NO_TYPE."""
+    width = max(1, max(len(getattr(row, field)) for row in rows))
+    ids = np.full((len(rows), width), NO_TYPE, dtype=np.intp)
+    for index, row in enumerate(rows):
+        row_ids = getattr(row, field)
+        ids[index, : len(row_ids)] = row_ids
+    return ids
+
+
+def _raw_damage_array(rows: Sequence[DamageRow]):
+    move_type = _column(rows, "move_type_id", np.intp)
+    attacker_types = _type_id_matrix(rows, "attacker_type_ids")
+    defender_types = _type_id_matrix(rows, "defender_type_ids")
+
+    has_type = move_type != NO_TYPE
+    stab = np.where(has_type & (attacker_types == move_type[:, None]).any(axis=1), STAB_MULTIPLIER, 1.0)
+
+    factors = _CHART[move_type[:, None], defender_types]
+    bypassed = _column(rows, "ignore_immunities", bool)[:, None] | (
+        _column(rows, "ignore_fairy_immunity", bool)[:, None]
+        & (move_type[:, None] == _DRAGON)
+        & (defender_types == _FAIRY)
+    )
+    factors = np.where((factors == 0) & bypassed, 1.0, factors)
+    effectiveness = factors.prod(axis=1)
+    effectiveness = np.where(_column(rows, "tar_shot", bool), effectiveness * 2, effectiveness)
+
+    weather = _column(rows, "weather_id", np.intp)
+    weather = np.where((weather >= 0) & (weather < _WEATHER_COUNT), weather, 0)
+
+    level = _column(rows, "level")
+    defense = _column(rows, "defense")
+    safe_defense = np.where(defense > 0, defense, 1.0)
+    base = (((2 * level) / 5 + 2) * _column(rows, "power") * (_column(rows, "attack") / safe_defense)) / 50 + 2
+    return (
+        base
+        * _column(rows, "targets_multiplier")
+        * _column(rows, "random_factor")
+        * (_column(rows, "stab") * stab)
+        * _column(rows, "critical")
+        * (_column(rows, "type_multiplier") * effectiveness)
+        * (_column(rows, "weather_multiplier") * _WEATHER_MOVE[weather, move_type])
+    )
+
+
+def raw_damage_batch(rows: Iterable[DamageRow]) -> list[float]:
+    """Damage before truncation, Glaive Rush and screens, one value per row."""
+    rows = list(rows)
+    if not rows:
+        return []
+    return _raw_damage_array(rows).tolist()
+
+
+def damage_batch(rows: Iterable[DamageRow]) -> list[int]:
+    rows = list(rows)
+    if not rows:
+        return []
+    damage = np.trunc(_raw_damage_array(rows)).astype(np.int64)
+    damage = np.where(_column(rows, "glaive_rush", bool), damage * 2, damage)
+    is_special = _column(rows, "is_special", bool)
+    # Aurora Veil halves both categories; Reflect and Light Screen halve one each.
+    screened = (
+        _column(rows, "aurora_veil", bool)
+        | (_column(rows, "reflect", bool) & ~is_special)
+        | (_column(rows, "light_screen", bool) & is_special)
+    )
+    damage = np.where(screened, np.maximum(0, damage // 2), damage)
+    return damage.tolist()
+
+
+def raw_damage(row: DamageRow) -> float:
+    return raw_damage_batch([row])[0]
+
+
+def hit_damage(row: DamageRow) -> int:
+    return damage_batch([row])[0]
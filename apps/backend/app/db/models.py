@@ -1,9 +1,11 @@
 from dotenv import load_dotenv
 from fastapi import Request, HTTPException
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Enum, Boolean, Table, create_engine, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Enum, Boolean, Table, UniqueConstraint, Index, create_engine, Float
 from sqlalchemy.ext.mutable import MutableDict, MutableList
 from sqlalchemy.orm import relationship, declarative_base, sessionmaker
 from sqlalchemy.sql import func
+
+from app.db.types import CompactGrid
 import enum
 
 Base = declarative_base()
@@ -129,6 +131,8 @@ class Game(Base):
 # ======================
 class GameState(Base):
     __tablename__ = "game_status"
+    # The lobby lists games by status; the turn scheduler scans in-progress deadlines.
+    __table_args__ = (Index("ix_game_status_status_turn_deadline", "status", "turn_deadline"),)
 
     id = Column(Integer, primary_key=True)
     game_id = Column(Integer, ForeignKey("games.id"), unique=True)
@@ -137,17 +141,39 @@ class GameState(Base):
     players = Column(MutableList.as_mutable(JSON), nullable=False, default=list)
     turn_deadline = Column(DateTime(timezone=True), nullable=True)
     winner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    # Legacy inline log; events are stored in game_events (see app.game_events).
     replay_log = Column(MutableList.as_mutable(JSON), nullable=True, default=list)
+    # Seq of the latest GameEvent for this game.
+    event_seq = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped on every command commit; a commit from a stale read raises StaleDataError.
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     # Relationships
     game = relationship("Game")
     winner = relationship("User")
 
+    __mapper_args__ = {"version_id_col": version}
+
+# ======================
+# GAME EVENTS
+# ======================
+class GameEvent(Base):
+    __tablename__ = "game_events"
+    __table_args__ = (UniqueConstraint("game_id", "seq", name="uq_game_events_game_id_seq"),)
+
+    id = Column(Integer, primary_key=True)
+    game_id = Column(Integer, ForeignKey("games.id"), nullable=False)
+    seq = Column(Integer, nullable=False)
+    event = Column(String, nullable=True)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
 # ======================
 # GAME PLAYER STATE
 # ======================
 class GamePlayer(Base):
     __tablename__ = "game_players"
+    __table_args__ = (Index("ix_game_players_game_id_player_id", "game_id", "player_id"),)
 
     id = Column(Integer, primary_key=True)
     game_id = Column(Integer, ForeignKey("games.id"))
@@ -196,20 +222,20 @@ class GameMapState(Base):
     game_id = Column(Integer, ForeignKey("games.id"), unique=True, nullable=False)
     map_id = Column(Integer, ForeignKey("maps.id"), nullable=False)
 
-    # 2D arrays matching map dimensions.
+    # 2D arrays matching map dimensions, stored compactly (see app.map_grids).
     # Each tile stores a single numeric effect id (0 means no effect).
-    weather_tiles = Column(MutableList.as_mutable(JSON), nullable=False, default=list)
+    weather_tiles = Column(MutableList.as_mutable(CompactGrid()), nullable=False, default=list)
     # Each hazard tile stores a list of [hazard_id, turns_remaining] pairs.
-    hazard_tiles = Column(MutableList.as_mutable(JSON), nullable=False, default=list)
-    room_effect_tiles = Column(MutableList.as_mutable(JSON), nullable=False, default=list)
-    terrain_effect_tiles = Column(MutableList.as_mutable(JSON), nullable=False, default=list)
-    field_effect_tiles = Column(MutableList.as_mutable(JSON), nullable=False, default=list)
+    hazard_tiles = Column(MutableList.as_mutable(CompactGrid(sparse=True)), nullable=False, default=list)
+    room_effect_tiles = Column(MutableList.as_mutable(CompactGrid()), nullable=False, default=list)
+    terrain_effect_tiles = Column(MutableList.as_mutable(CompactGrid()), nullable=False, default=list)
+    field_effect_tiles = Column(MutableList.as_mutable(CompactGrid()), nullable=False, default=list)
 
     # Item identity (item IDs are nullable when no item exists).
-    item_id_tiles = Column(MutableList.as_mutable(JSON), nullable=False, default=list)
+    item_id_tiles = Column(MutableList.as_mutable(CompactGrid()), nullable=False, default=list)
 
     # War mode objective state (pokeball / master_ball ownership and HP).
-    objective_tiles = Column(MutableList.as_mutable(JSON), nullable=False, default=list)
+    objective_tiles = Column(MutableList.as_mutable(CompactGrid(sparse=True)), nullable=False, default=list)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -254,6 +280,12 @@ class Unit(Base):
 # ======================
 class GameUnit(Base):
     __tablename__ = "game_units"
+    # Handlers look units up by owner, by living/fainted state and by tile within a game.
+    __table_args__ = (
+        Index("ix_game_units_game_id_user_id", "game_id", "user_id"),
+        Index("ix_game_units_game_id_current_hp", "game_id", "current_hp"),
+        Index("ix_game_units_game_id_position", "game_id", "current_x", "current_y"),
+    )
 
     id = Column(Integer, primary_key=True)
     game_id = Column(Integer, ForeignKey("games.id"))
@@ -0,0 +1,26 @@
+"""Custom column types for ``app.db.models``."""
+
+from __future__ import annotations
+
+from sqlalchemy.types import JSON, TypeDecorator
+
+from app.map_grids import decode_grid, encode_grid
+
+
+class CompactGrid(TypeDecorator):
+    """JSON column holding an ``encode_grid`` payload; loads as nested lists."""
+
+    impl = JSON
+    cache_ok = True
+
+    def __init__(self, sparse: bool = False):
+        super().__init__()
+        self.sparse = sparse
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return encode_grid(list(value), sparse=self.sparse)
+
+    def process_result_value(self, value, dialect):
+        return decode_grid(value)
@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 
 from app.db.models import User, UserRole, UserRestriction, RestrictionType
 from app.db.database import get_db as _get_db
+from app.user_cache import load_user
 from app.utils.session import decode_session_token
 
 MOD_MUTE_MAX_HOURS = 72
@@ -59,7 +60,7 @@ def get_current_user(session_user: str = Cookie(default=None), db: Session = Dep
     if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid session")
 
-    user = db.query(User).filter(User.id == user_id).first()
+    user = load_user(db, user_id)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
@@ -0,0 +1,15 @@
+"""In-memory battle engine.
+
+The battle rules run on plain ``__slots__`` dataclasses (``app.engine.state``)
+instead of ORM rows and never touch a database session, so the same rules
+serve live games, previews, bots and tests. A ``Battle`` is loaded from the
+database by the route adapters in ``app.routes.games``, changed by the engine
+functions and written back by the same adapters.
+
+Engine functions replace list and dict fields (statuses, states, stat boosts,
+stats, grids) instead of editing them in place, so a ``Battle`` may share them
+with the rows it was loaded from. All randomness comes from ``Battle.rng``.
+
+The engine modules import neither the ORM nor Redis: catalog moves arrive as
+``app.catalog_records`` records and maps as ``CompiledTerrain``.
+"""
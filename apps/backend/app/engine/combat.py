@@ -0,0 +1,390 @@
+"""Accuracy, critical hits and damage for one attack against engine units.
+
+``resolve_attack`` is the accuracy and direct-damage step of ``execute_move``:
+per-target accuracy (Telekinesis, Glaive Rush, stages, grass cover,
+weather-conditional accuracy), hit counts, critical hits (stages, Laser Focus,
+guaranteed crits), the damage formula with STAB, type chart, weather, tile
+defense and side screens, and Destiny Bond. Rolls are drawn from
+``battle.rng`` in the same order as the old per-hit loop, and the damage of the
+rolled hits is computed in as few ``damage_batch`` calls as knockouts allow.
+
+Secondary effects are ``app.engine.effects``; fixed-damage moves stay in the
+route. So do the rules that read columns the engine does not load: the route
+passes the resolved ``move_type`` and ``power_bonus``, and ``power_multiplier``
+(conditional power) and ``special_against`` (Shell Side Arm) callbacks.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Callable
+
+from app.damage import NO_TYPE, DamageRow, damage_batch, hit_damage, type_id, type_ids
+from app.engine.moves import (
+    get_scaling_hit_powers,
+    move_can_critical_hit,
+    move_has_effect_token,
+    move_has_high_crit_ratio,
+    move_has_target_fixed_damage_effect,
+    move_ignores_fairy_immunity,
+    move_ignores_target_stat_changes,
+    move_is_instant_ko,
+    move_uses_separate_hit_accuracy,
+    roll_hit_count,
+    weather_move_override,
+)
+from app.engine.rules import (
+    WEATHER_TO_ID,
+    get_accuracy_stage_multiplier,
+    get_critical_hit_chance,
+    get_stat_multiplier,
+    get_stat_stage,
+    normalize_stat_name,
+    weather_condition_matches,
+)
+from app.engine.state import Battle, EngineUnit
+from app.engine.units import effective_stats
+from app.map_movement import get_grass_incoming_accuracy_multiplier, get_tile_defense_multiplier
+from app.move_effects import move_program
+
+if TYPE_CHECKING:
+    from app.engine.moves import Move
+
+CRITICAL_MULTIPLIER = 1.5
+SPREAD_MULTIPLIER = 0.75
+
+
+@dataclass(slots=True)
+class TargetOutcome:
+    target_id: int
+    hit_damages: list[int] = field(default_factory=list)
+    critical: bool = False
+    fainted: bool = False
+
+    @property
+    def damage(self) -> int:
+        return sum(self.hit_damages)
+
+    @property
+    def hits(self) -> int:
+        return len(self.hit_damages)
+
+
+@dataclass(slots=True)
+class AttackOutcome:
+    missed_target_ids: list[int] = field(default_factory=list)
+    targets: list[TargetOutcome] = field(default_factory=list)
+
+    @property
+    def fainted_ids(self) -> list[int]:
+        return [outcome.target_id for outcome in self.targets if outcome.fainted]
+
+
+def move_accuracy(battle: Battle, move: Move, target: EngineUnit) -> int | None:
+    """Base accuracy after ``conditional_accuracy:weather`` overrides; None never misses."""
+    if move.accuracy is None:
+        return None
+    accuracy = int(move.accuracy)
+    for op in move_program(move).with_head("conditional_accuracy"):
+        parts = op.lower_parts
+        if len(parts) >= 4 and parts[1] == "weather":
+            try:
+                override = int(parts[3])
+            except ValueError:
+                continue
+            if weather_condition_matches(battle.map.weather_at(*target.position), parts[2]):
+                accuracy = override
+    return accuracy
+
+
+def hit_threshold(battle: Battle, move: Move, attacker: EngineUnit, target: EngineUnit) -> float | None:
+    """Percent chance (0-100+) that ``move`` lands on ``target``; None for perfect accuracy."""
+    accuracy = move_accuracy(battle, move, target)
+    if accuracy is None:
+        return None
+    stage_multiplier = get_accuracy_stage_multiplier(
+        get_stat_stage(attacker.stat_boosts, "accuracy"),
+        get_stat_stage(target.stat_boosts, "evasion"),
+    )
+    cover = get_grass_incoming_accuracy_multiplier(
+        battle.map.special_tiles, target.current_x, target.current_y, set(target.types), set(target.ability_names)
+    )
+    return max(0.0, float(accuracy) * cover * stage_multiplier)
+
+
+def roll_to_hit(battle: Battle, move: Move, attacker: EngineUnit, target: EngineUnit) -> bool:
+    if target.has_state("glaive_rush"):
+        return True
+    threshold = hit_threshold(battle, move, attacker, target)
+    if threshold is None:
+        return True
+    if threshold <= 0:
+        return False
+    if threshold >= 100:
+        return True
+    return battle.rng.uniform(0, 100) <= threshold
+
+
+def roll_critical(battle: Battle, attacker: EngineUnit, additional_stage: int = 0) -> bool:
+    chance = get_critical_hit_chance(get_stat_stage(attacker.stat_boosts, "crit") + int(additional_stage or 0))
+    if chance <= 0:
+        return False
+    if chance >= 1.0:
+        return True
+    return battle.rng.random() < chance
+
+
+def weather_defense_multiplier(target: EngineUnit, defense_stat: str, weather_id: int) -> float:
+    # Sandstorm boosts Rock-type special bulk; hail boosts Ice-type physical bulk.
+    if weather_id == WEATHER_TO_ID["sandstorm"] and defense_stat == "sp_defense" and "rock" in target.types:
+        return 1.5
+    if weather_id == WEATHER_TO_ID["hail"] and defense_stat == "defense" and "ice" in target.types:
+        return 1.5
+    return 1.0
+
+
+def unboosted_stat(battle: Battle, unit: EngineUnit, stat: str) -> int:
+    """``stat`` with the unit's stat stages undone, for moves that ignore them."""
+    stat = normalize_stat_name(stat)
+    stats = effective_stats(
+        unit.base_stats,
+        unit.level,
+        unit.stat_boosts,
+        unit.status_effects,
+        tailwind=battle.side(unit.user_id).has_tailwind,
+        fallback=unit.current_stats,
+    )
+    boosted = int(stats.get(stat, 0) or 0)
+    if boosted <= 0:
+        return boosted
+    multiplier = get_stat_multiplier(unit.stat_boosts, stat)
+    if multiplier <= 0:
+        return boosted
+    return max(1, int(boosted / multiplier))
+
+
+def attack_and_defense(
+    battle: Battle,
+    move: Move,
+    attacker: EngineUnit,
+    target: EngineUnit,
+    *,
+    is_special: bool,
+) -> tuple[float, float]:
+    """Attacking and (weather and tile adjusted) defending stat for one target."""
+    attack_stat = "sp_attack" if is_special else "attack"
+    defense_stat = "sp_defense" if is_special else "defense"
+    attack = attacker.current_stats.get(attack_stat, 0) or 0
+    if move_ignores_target_stat_changes(move):
+        defense = unboosted_stat(battle, target, defense_stat)
+    else:
+        defense = target.current_stats.get(defense_stat, 1) or 1
+    for op in move_program(move).ops:
+        parts = op.lower_parts
+        if len(parts) < 3 or parts[1] != "use_stat":
+            continue
+        stat = parts[2]
+        if parts[0] == "self":
+            attack = attacker.current_stats.get(stat, attack) or attack
+        elif parts[0] == "target":
+            if stat in ("attack", "sp_attack"):
+                attack = target.current_stats.get(stat, attack) or attack
+            elif stat in ("defense", "sp_defense"):
+                defense = target.current_stats.get(stat, defense) or defense
+    # Power Trick swaps the attacker's attack for its defense and the defender's defense for its attack.
+    if attacker.has_state("power_trick"):
+        attack = attacker.current_stats.get(defense_stat, attack)
+    if target.has_state("power_trick"):
+        defense = target.current_stats.get(attack_stat, defense)
+
+    defense *= weather_defense_multiplier(target, defense_stat, battle.map.weather_at(*target.position))
+    defense *= get_tile_defense_multiplier(
+        battle.map.special_tiles, target.current_x, target.current_y, set(target.types), set(target.ability_names)
+    )
+    return attack, defense
+
+
+def bypasses_immunities(target: EngineUnit, move_type: str) -> bool:
+    """Foresight lets Normal and Fighting moves, and Mind Reader Psychic moves, hit immune types."""
+    move_type = move_type.lower()
+    if move_type in ("normal", "fighting"):
+        return target.has_state("foresight")
+    return move_type == "psychic" and target.has_state("mind_reader")
+
+
+def damage_row(
+    battle: Battle,
+    move: Move,
+    attacker: EngineUnit,
+    target: EngineUnit,
+    *,
+    power: int,
+    move_type: str | None = None,
+    targets_multiplier: float = 1,
+    random_factor: float = 1,
+    critical: bool = False,
+    is_special: bool | None = None,
+) -> DamageRow:
+    """Every input of the damage formula for one hit; ``random_factor`` is the 0.85-1.0 roll.
+
+    STAB, type effectiveness, weather and screens are left to ``damage_batch``
+    as type ids and flags.
+    """
+    move_type = move_type or str(move.type or "Normal")
+    if is_special is None:
+        is_special = (move.category or "").lower() == "special"
+    attack, defense = attack_and_defense(battle, move, attacker, target, is_special=is_special)
+    move_type_id = type_id(move_type)
+    screens = battle.side(target.user_id).active_states()
+    attacker_weather_id = battle.map.weather_at(*attacker.position)
+    weather_override = weather_move_override(move, attacker_weather_id)
+    return DamageRow(
+        level=attacker.level,
+        power=max(1, power),
+        attack=attack,
+        defense=defense,
+        targets_multiplier=targets_multiplier,
+        random_factor=random_factor,
+        critical=CRITICAL_MULTIPLIER if critical else 1,
+        weather_multiplier=1 if weather_override is None else weather_override,
+        glaive_rush=target.has_state("glaive_rush"),
+        move_type_id=NO_TYPE if move_type_id is None else move_type_id,
+        attacker_type_ids=type_ids(attacker.types),
+        defender_type_ids=type_ids(target.types),
+        ignore_immunities=bypasses_immunities(target, move_type),
+        ignore_fairy_immunity=move_ignores_fairy_immunity(move),
+        # Tar Shot checks the move's own type, not the resolved one.
+        tar_shot=target.has_state("tar_shot") and str(move.type or "").lower() == "fire",
+        # An override replaces the weather multiplier, so the row reads as clear weather.
+        weather_id=attacker_weather_id if weather_override is None else 0,
+        is_special=is_special,
+        reflect="reflect" in screens,
+        light_screen="light_screen" in screens,
+        aurora_veil="aurora_veil" in screens,
+    )
+
+
+def resolve_attack(
+    battle: Battle,
+    attacker: EngineUnit,
+    move: Move,
+    targets: list[EngineUnit],
+    *,
+    move_type: str | None = None,
+    power_bonus: int = 0,
+    power_multiplier: Callable[[EngineUnit], float] | None = None,
+    special_against: Callable[[EngineUnit, float], bool] | None = None,
+) -> AttackOutcome:
+    """Roll accuracy and damage for ``move`` against ``targets`` and apply the HP loss.
+
+    The callbacks are called once per landed target, in order, right before
+    its hits are rolled; ``special_against`` also gets the spread multiplier.
+    """
+    outcome = AttackOutcome()
+    if move_has_target_fixed_damage_effect(move):
+        return outcome
+    landed = targets
+    if targets and move.accuracy is not None:
+        landed = []
+        for target in targets:
+            telekinesis = target.has_state("telekinesis")
+            # Ground moves never hit a Telekinesis target; anything but an OHKO always does.
+            if telekinesis and str(move.type or "").lower() == "ground":
+                outcome.missed_target_ids.append(target.id)
+            elif (telekinesis and not move_is_instant_ko(move)) or roll_to_hit(battle, move, attacker, target):
+                landed.append(target)
+            else:
+                outcome.missed_target_ids.append(target.id)
+    for target in targets:
+        if target.id in outcome.missed_target_ids:
+            battle.log(f"{target.name} dodged the attack")
+
+    if not landed or not move.power or (move.category or "").lower() not in {"physical", "special"}:
+        return outcome
+
+    targets_multiplier = SPREAD_MULTIPLIER if len(landed) >= 2 else 1
+    hit_count = roll_hit_count(move, battle.rng, landed_target_count=max(1, len(landed)))
+    scaling_powers = get_scaling_hit_powers(move)
+    separate_accuracy = move_uses_separate_hit_accuracy(move)
+    can_crit = move_can_critical_hit(move)
+    guaranteed_crit = move_has_effect_token(move, "guaranteed_crit")
+    crit_stage_bonus = 1 if move_has_high_crit_ratio(move) else 0
+    hit_powers = scaling_powers or [int(move.power) + power_bonus]
+    hits_to_apply = len(hit_powers) if scaling_powers else max(1, int(hit_count or 1))
+
+    # Hits are rolled in order and rolling stops at a knockout, as in the per-hit
+    # loop. Their damage is batched: rolled hits wait until their worst case
+    # could knock the target out, then one damage_batch call settles every
+    # waiting hit, so only hits that are actually used get computed.
+    pending: list[tuple[EngineUnit, TargetOutcome, DamageRow, bool]] = []
+
+    def settle() -> None:
+        damages = damage_batch([row for _, _, row, _ in pending])
+        for (target, result, _, critical), damage in zip(pending, damages):
+            target.current_hp = max(0, target.current_hp - damage)
+            result.hit_damages.append(damage)
+            result.critical = result.critical or critical
+        pending.clear()
+
+    results: list[tuple[EngineUnit, TargetOutcome]] = []
+    for target in landed:
+        result = TargetOutcome(target.id)
+        results.append((target, result))
+        is_special = special_against(target, targets_multiplier) if special_against is not None else None
+        multiplier = power_multiplier(target) if power_multiplier is not None else 1.0
+        if target.current_hp <= 0:
+            continue
+        # Only power, the random factor and the critical multiplier change between hits.
+        base_row = damage_row(
+            battle,
+            move,
+            attacker,
+            target,
+            power=1,
+            move_type=move_type,
+            targets_multiplier=targets_multiplier,
+            is_special=is_special,
+        )
+        worst_by_power: dict[int, int] = {}
+        worst_pending = 0
+        for hit_index in range(hits_to_apply):
+            if worst_pending >= target.current_hp:
+                settle()
+                worst_pending = 0
+                if target.current_hp <= 0:
+                    break
+            if separate_accuracy and move.accuracy is not None and not roll_to_hit(battle, move, attacker, target):
+                break
+            power = max(1, int(hit_powers[hit_index if hit_index < len(hit_powers) else 0] * multiplier))
+            random_factor = battle.rng.randint(85, 100) / 100
+            if attacker.has_state("laser_focus"):
+                # Laser Focus makes the next hit critical and is used up by it.
+                critical = True
+                attacker.states = []
+            else:
+                critical = guaranteed_crit or (can_crit and roll_critical(battle, attacker, crit_stage_bonus))
+            row = replace(
+                base_row,
+                power=power,
+                random_factor=random_factor,
+                critical=CRITICAL_MULTIPLIER if critical else 1,
+            )
+            pending.append((target, result, row, critical))
+            if power not in worst_by_power:
+                worst_by_power[power] = hit_damage(replace(row, random_factor=1, critical=CRITICAL_MULTIPLIER))
+            worst_pending += worst_by_power[power]
+    settle()
+
+    for target, result in results:
+        result.fainted = target.current_hp <= 0
+        outcome.targets.append(result)
+        # A unit that faints under Destiny Bond takes the attacker down with it.
+        if result.fainted and target.has_state("destiny_bond") and attacker.current_hp > 0:
+            attacker.current_hp = 0
+            battle.log(f"{attacker.name} was taken down by Destiny Bond!")
+        if result.damage > 0:
+            suffix = " (Critical Hit!)" if result.critical else ""
+            battle.log(f"{target.name} took {result.damage} damage{suffix}")
+            if result.fainted:
+                battle.log(f"{target.name} fainted!")
+    return outcome
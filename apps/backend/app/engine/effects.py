@@ -0,0 +1,655 @@
+"""Move effects: what a used move does besides its direct damage.
+
+``run_move_effects`` walks ``move_program(move).on_use`` in order and calls the
+handler each op names (``app.move_effects.effect_handler_key``) in
+``MOVE_EFFECT_HANDLERS``: stat stages, statuses, states, healing, cures,
+one-hit knockouts, broken screens, removed substitutes and the weather,
+terrain, hazard and gravity grids. Chance rolls come from ``battle.rng`` and
+every message goes to ``battle.log``.
+
+Effects on columns the engine does not load (held items, abilities, cash,
+revival) are handled by the route, which passes them in ``extra_handlers``
+under the same keys, and Encore asks the route's ``last_used_move`` callback
+which move a unit used last.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Iterable
+
+from app.engine.rules import (
+    ALL_STAT_EFFECT_KEYS,
+    FIELD_EFFECT_TO_ID,
+    FIELD_HAZARD_DEFAULT_DURATION,
+    FIELD_HAZARD_TO_ID,
+    SIDE_SCREEN_STATE_NAMES,
+    TERRAIN_TO_ID,
+    WEATHER_TO_ID,
+    default_stat_boosts,
+    format_stat_change_outcome_phrase,
+    format_stat_log_label,
+    format_status_log_label,
+    get_stat_stage,
+    normalize_stat_name,
+    normalize_states,
+    terrain_condition_matches,
+    try_add_hazard_stack,
+    weather_condition_matches,
+)
+from app.engine.state import Battle, BattleMap, EngineUnit
+from app.engine.targeting import Tile, move_effect_tiles
+from app.engine.units import apply_stat_change, apply_state, apply_status, cure_status, is_status_immune, refresh_stats
+from app.map_grids import TERRAIN_DEFAULT_DURATION, normalize_hazard_cell, normalize_timed_tile_cell
+from app.move_effects import move_program
+
+if TYPE_CHECKING:
+    from app.engine.moves import Move
+
+SCREEN_STATES = frozenset({"reflect", "light_screen", "aurora_veil"})
+# Statuses whose type immunity is logged by name ("wasn't burned"); the others log "wasn't affected".
+NAMED_IMMUNITY_LABELS = frozenset({"poisoned", "badly poisoned", "burned", "frozen", "paralyzed"})
+# Handlers that read the names of the units on the targets' sides.
+SIDE_SCREEN_HANDLERS = frozenset({"break_screens", "defog"})
+
+
+@dataclass(slots=True)
+class EffectContext:
+    """The arguments of one ``run_move_effects`` call, shared by its effect handlers."""
+
+    battle: Battle
+    move: Move
+    attacker: EngineUnit
+    targets: list[EngineUnit]
+    affected_tiles_override: list[Tile] | None = None
+    last_used_move: Callable[[EngineUnit], tuple[int, str] | None] | None = None
+    weather_raise_stat_applied: set[tuple[str, str]] = field(default_factory=set)
+    terrain_raise_stat_applied: set[tuple[str, str]] = field(default_factory=set)
+
+
+EffectHandler = Callable[[EffectContext, tuple[str, ...]], None]
+
+
+def _accuracy(parts: tuple[str, ...], index: int) -> int:
+    if len(parts) > index:
+        try:
+            return int(parts[index])
+        except ValueError:
+            pass
+    return 100
+
+
+def _missed(ctx: EffectContext, accuracy: int) -> bool:
+    return ctx.battle.rng.randint(1, 100) > accuracy
+
+
+def _recipients(ctx: EffectContext, recipient: str) -> list[EngineUnit]:
+    if recipient == "self":
+        return [ctx.attacker]
+    if recipient == "target":
+        return ctx.targets
+    return []
+
+
+def _living_recipients(ctx: EffectContext, recipient: str) -> list[EngineUnit]:
+    """The attacker for ``self``; the targets that are still standing for ``target``."""
+    if recipient == "self":
+        return [ctx.attacker]
+    if recipient == "target":
+        return [target for target in ctx.targets if target.current_hp > 0]
+    return []
+
+
+def matches_effect_condition(unit: EngineUnit, condition: str, value: str) -> bool:
+    condition_name = str(condition or "").lower()
+    condition_value = str(value or "").lower()
+    if not condition_value:
+        return False
+
+    if condition_name == "type":
+        return condition_value in unit.types
+    if condition_name == "not_type":
+        return condition_value not in unit.types
+
+    # Gastro Acid suppresses abilities: nothing has one, everything lacks one.
+    if condition_name in {"has_ability", "not_has_ability"}:
+        suppressed = unit.has_state("gastro_acid")
+        if suppressed:
+            return condition_name == "not_has_ability"
+        requested = {token.strip() for token in condition_value.split(",") if token.strip()}
+        if not requested:
+            return False
+        if condition_name == "has_ability":
+            return any(ability in unit.ability_names for ability in requested)
+        return all(ability not in unit.ability_names for ability in requested)
+
+    if condition_name == "stat_boosted":
+        return any(get_stat_stage(unit.stat_boosts, stat) > 0 for stat in ALL_STAT_EFFECT_KEYS)
+
+    if condition_name == "stat_raised_since_turn":
+        snapshot = unit.turn_start_stages
+        if not isinstance(snapshot, dict):
+            return False
+        return any(
+            get_stat_stage(unit.stat_boosts, stat) > int(snapshot.get(stat, 0) or 0) for stat in ALL_STAT_EFFECT_KEYS
+        )
+
+    return False
+
+
+def _state_log_message(unit: EngineUnit, state_name: str) -> str:
+    normalized_state = str(state_name or "").strip().lower()
+    if normalized_state == "flinch":
+        return f"{unit.name} flinched"
+    if normalized_state == "confusion":
+        return f"{unit.name} is confused"
+    return f"{unit.name} gained {normalized_state}"
+
+
+def _give_state(ctx: EffectContext, unit: EngineUnit, state_name: str) -> None:
+    if apply_state(ctx.battle, unit, state_name):
+        ctx.battle.log(_state_log_message(unit, state_name))
+
+
+def _blocked_by_safeguard(ctx: EffectContext, unit: EngineUnit) -> bool:
+    if unit.has_state("safeguard"):
+        ctx.battle.log(f"{unit.name} is protected by Safeguard")
+        return True
+    return False
+
+
+def _break_side_screens(ctx: EffectContext) -> None:
+    for target in ctx.targets:
+        for unit in ctx.battle.side(target.user_id).units:
+            state = normalize_states(unit.states)
+            if state and state[0] in SCREEN_STATES:
+                unit.states = []
+                ctx.battle.log(f"{unit.name} lost {state[0].replace('_', ' ')}")
+
+
+# Field effects: grids are replaced, never edited in place, so ``LoadedBattle.apply`` sees the change.
+def _has_grid(battle_map: BattleMap) -> bool:
+    return battle_map.width > 0 and battle_map.height > 0
+
+
+def _affected_tiles(ctx: EffectContext) -> list[Tile]:
+    """The route's resolved effect tiles that lie on the map (once each), or the move's default tiles."""
+    width, height = ctx.battle.map.width, ctx.battle.map.height
+    if not ctx.affected_tiles_override:
+        return move_effect_tiles(ctx.move, ctx.attacker.position, width, height)
+    tiles: list[Tile] = []
+    for tx, ty in ctx.affected_tiles_override:
+        tile = (int(tx), int(ty))
+        if 0 <= tile[0] < width and 0 <= tile[1] < height and tile not in tiles:
+            tiles.append(tile)
+    return tiles
+
+
+def _normalized_grid(grid, width: int, height: int, blank: Callable[[], object], cell: Callable[[object], object]):
+    """A ``height`` x ``width`` copy of ``grid`` with each cell passed through ``cell``; missing cells are ``blank()``.
+
+    A grid of the wrong height is rebuilt blank.
+    """
+    if not isinstance(grid, list) or len(grid) != height:
+        return [[blank() for _ in range(width)] for _ in range(height)]
+    return [
+        [cell(row[x]) if x < len(row) else blank() for x in range(width)]
+        if isinstance(row, list)
+        else [blank() for _ in range(width)]
+        for row in grid
+    ]
+
+
+def _int_grid(grid, width: int, height: int) -> list[list[int]]:
+    return _normalized_grid(grid, width, height, lambda: 0, lambda cell: int(cell or 0))
+
+
+def _hazard_grid(grid, width: int, height: int) -> list[list[list[list[int]]]]:
+    rows = grid if isinstance(grid, list) else []
+    return [
+        [
+            normalize_hazard_cell(row[x] if isinstance(row, list) and x < len(row) else [])
+            for x in range(width)
+        ]
+        for row in (rows[y] if y < len(rows) else [] for y in range(height))
+    ]
+
+
+def clear_hazards(battle_map: BattleMap, tiles: Iterable[Tile]) -> bool:
+    """Remove every hazard stack on ``tiles``; returns whether any was there."""
+    grid = battle_map.hazard_tiles
+    if not isinstance(grid, list):
+        return False
+
+    cleared = None
+    for tx, ty in tiles:
+        if ty < 0 or tx < 0 or ty >= len(grid):
+            continue
+        row = (cleared or grid)[ty]
+        if not isinstance(row, list) or tx >= len(row):
+            continue
+        if normalize_hazard_cell(row[tx]):
+            if cleared is None:
+                cleared = [list(row) if isinstance(row, list) else row for row in grid]
+            cleared[ty][tx] = []
+    if cleared is None:
+        return False
+    battle_map.hazard_tiles = cleared
+    return True
+
+
+def _add_hazards(battle_map: BattleMap, tiles: Iterable[Tile], hazard_id: int) -> None:
+    grid = _hazard_grid(battle_map.hazard_tiles, battle_map.width, battle_map.height)
+    for tx, ty in tiles:
+        if battle_map.in_bounds(tx, ty):
+            try_add_hazard_stack(grid[ty][tx], hazard_id, FIELD_HAZARD_DEFAULT_DURATION)
+    battle_map.hazard_tiles = grid
+
+
+# Special-case single-token effects
+def _break_screens_effect(ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    _break_side_screens(ctx)
+
+
+# Field weather effect format: weather:sun|rain|sandstorm|hail
+def _weather_effect(ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    weather_id = WEATHER_TO_ID.get(parts[1].lower())
+    battle_map = ctx.battle.map
+    if weather_id is None or not _has_grid(battle_map):
+        return
+    grid = _int_grid(battle_map.weather_tiles, battle_map.width, battle_map.height)
+    for tx, ty in _affected_tiles(ctx):
+        grid[ty][tx] = weather_id
+    battle_map.weather_tiles = grid
+
+
+# Field terrain effect format: terrain:electric|psychic|grassy|misty
+def _terrain_effect(ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    terrain_id = TERRAIN_TO_ID.get(parts[1].lower())
+    battle_map = ctx.battle.map
+    if terrain_id is None or not _has_grid(battle_map):
+        return
+    grid = _normalized_grid(
+        battle_map.terrain_effect_tiles,
+        battle_map.width,
+        battle_map.height,
+        lambda: [0, 0],
+        normalize_timed_tile_cell,
+    )
+    for tx, ty in _affected_tiles(ctx):
+        grid[ty][tx] = [terrain_id, TERRAIN_DEFAULT_DURATION]
+    battle_map.terrain_effect_tiles = grid
+
+
+# Field hazard effect format: field_hazard:spikes|toxic_spikes|stealth_rock|sticky_web
+def _field_hazard_effect(ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    hazard_id = FIELD_HAZARD_TO_ID.get(parts[1].lower())
+    if hazard_id is None or not _has_grid(ctx.battle.map):
+        return
+    _add_hazards(ctx.battle.map, _affected_tiles(ctx), hazard_id)
+
+
+def _field_clear_hazards_effect(ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    if _has_grid(ctx.battle.map) and clear_hazards(ctx.battle.map, _affected_tiles(ctx)):
+        ctx.battle.log("Hazards were cleared from the area")
+
+
+def _field_clear_substitutes_effect(ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    if not _has_grid(ctx.battle.map):
+        return
+    tiles = set(_affected_tiles(ctx))
+    for unit in ctx.battle.units:
+        if unit.position in tiles and unit.has_state("substitute"):
+            unit.states = []
+            ctx.battle.log(f"{unit.name}'s substitute was removed")
+
+
+def _self_clear_hazards_effect(ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    clear_hazards(ctx.battle.map, [ctx.attacker.position])
+
+
+# Field tailwind: apply tailwind to the attacker's side
+def _field_tailwind_effect(ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    # Tailwind on the attacker represents the side-wide effect.
+    _give_state(ctx, ctx.attacker, "tailwind")
+
+
+def _field_gravity_effect(ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    battle_map = ctx.battle.map
+    if not _has_grid(battle_map):
+        return
+    grid = _int_grid(battle_map.field_effect_tiles, battle_map.width, battle_map.height)
+    gravity_id = FIELD_EFFECT_TO_ID.get("gravity", 0)
+    for tx, ty in _affected_tiles(ctx):
+        grid[ty][tx] = gravity_id
+    battle_map.field_effect_tiles = grid
+
+
+def _target_field_hazard_effect(ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    hazard_id = FIELD_HAZARD_TO_ID.get(parts[2].lower())
+    if hazard_id is None or not _has_grid(ctx.battle.map):
+        return
+    _add_hazards(ctx.battle.map, [target.position for target in ctx.targets], hazard_id)
+
+
+def _change_stats(ctx: EffectContext, units: list[EngineUnit], stat_name: str, magnitude: int) -> None:
+    stats = ALL_STAT_EFFECT_KEYS if stat_name == "all" else [stat_name]
+    for unit in units:
+        for stat in stats:
+            before_stage = get_stat_stage(unit.stat_boosts, stat)
+            apply_stat_change(ctx.battle, unit, stat, magnitude)
+            after_stage = get_stat_stage(unit.stat_boosts, stat)
+            outcome_phrase = format_stat_change_outcome_phrase(after_stage - before_stage, 1 if magnitude > 0 else -1)
+            ctx.battle.log(f"{unit.name}'s {format_stat_log_label(stat)} {outcome_phrase}")
+
+
+def _stat_change_effect(ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    """Formats: ``recipient:raise_stat|lower_stat:stat_name:magnitude[:accuracy]`` and
+    ``recipient:raise_stat|lower_stat:condition:weather|terrain|is_type|not_type:value:stat_name:magnitude[:accuracy]``.
+
+    A weather or terrain condition reads the tile of the attacker (``self``) or
+    of the first target, and raises each (recipient, stat) once per move.
+    """
+    recipient = parts[0]  # "self" or "target"
+    sign = 1 if parts[1] == "raise_stat" else -1
+    condition = parts[3].lower() if len(parts) >= 7 and parts[2] == "condition" else None
+
+    if condition is None:
+        if len(parts) < 4:
+            return
+        stat_name = normalize_stat_name(parts[2])
+        magnitude_index, accuracy_index = 3, 4
+    else:
+        stat_name = normalize_stat_name(parts[5])
+        magnitude_index, accuracy_index = 6, 7
+    try:
+        magnitude = int(parts[magnitude_index]) * sign
+    except ValueError:
+        return
+    accuracy = _accuracy(parts, accuracy_index)
+    units = _recipients(ctx, recipient)
+
+    if condition in {"weather", "terrain"}:
+        if not units:
+            return
+        x, y = units[0].position
+        if condition == "weather":
+            applied = ctx.weather_raise_stat_applied
+            matches = weather_condition_matches(ctx.battle.map.weather_at(x, y), parts[4])
+        else:
+            applied = ctx.terrain_raise_stat_applied
+            matches = terrain_condition_matches(ctx.battle.map.terrain_at(x, y), parts[4])
+        key = (recipient, stat_name)
+        if key in applied or not matches:
+            return
+        applied.add(key)
+    elif condition in {"is_type", "not_type"}:
+        condition_type = "type" if condition == "is_type" else "not_type"
+        units = [unit for unit in units if matches_effect_condition(unit, condition_type, parts[4])]
+        if not units:
+            return
+    elif condition is not None:
+        return
+
+    if _missed(ctx, accuracy):
+        return
+    _change_stats(ctx, units, stat_name, magnitude)
+
+
+def _high_crit_ratio_effect(ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    if _missed(ctx, _accuracy(parts, 2)):
+        return
+    _change_stats(ctx, _recipients(ctx, parts[0]), "crit", 1)
+
+
+def _give_status(ctx: EffectContext, unit: EngineUnit, status_name: str) -> None:
+    if is_status_immune(unit, status_name):
+        label = format_status_log_label(status_name)
+        if label in NAMED_IMMUNITY_LABELS:
+            ctx.battle.log(f"{unit.name} wasn't {label}")
+        else:
+            ctx.battle.log(f"{unit.name} wasn't affected")
+    elif apply_status(ctx.battle, unit, status_name):
+        ctx.battle.log(f"{unit.name} was {format_status_log_label(status_name)}")
+
+
+def _status_effect(ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    """Formats: ``recipient:status:name[:accuracy]`` and
+    ``recipient:status:condition:type:value:status:name[:accuracy]``.
+    """
+    recipient = parts[0]  # "self" or "target"
+    condition = None
+    if len(parts) >= 7 and parts[2] == "condition":
+        if parts[5] != "status":
+            return
+        condition = (parts[3], parts[4])
+        status_name = parts[6]
+        accuracy = _accuracy(parts, 7)
+    else:
+        if len(parts) < 3:
+            return
+        status_name = parts[2]
+        accuracy = _accuracy(parts, 3)
+
+    if _missed(ctx, accuracy):
+        return
+
+    if recipient == "self":
+        if condition is None or matches_effect_condition(ctx.attacker, *condition):
+            _give_status(ctx, ctx.attacker, status_name)
+    elif recipient == "target":
+        for target in ctx.targets:
+            if target.current_hp <= 0:
+                continue
+            if condition is not None and not matches_effect_condition(target, *condition):
+                continue
+            if not _blocked_by_safeguard(ctx, target):
+                _give_status(ctx, target, status_name)
+
+
+def _safeguard_effect(ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    if _missed(ctx, _accuracy(parts, 2)):
+        return
+    for unit in _living_recipients(ctx, parts[0]):
+        _give_state(ctx, unit, "safeguard")
+
+
+def _encore_effect(ctx: EffectContext, target: EngineUnit) -> None:
+    """Lock ``target`` into its last used move for 2-6 turns."""
+    last_move = ctx.last_used_move(target) if ctx.last_used_move is not None else None
+    if last_move is not None:
+        move_id, move_name = last_move
+        duration = ctx.battle.rng.randint(2, 6)
+        current_state = normalize_states(target.states)
+        if not (len(current_state) == 2 and int(current_state[1]) > 0):
+            # Store the move id as a third element so we can enforce it on execute
+            target.states = ["encore", duration, move_id]
+            ctx.battle.log(f"{target.name} is locked into {move_name} for {duration} turns")
+            return
+    ctx.battle.log(f"{target.name} was unaffected")
+
+
+def _state_effect(ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    """Formats: ``recipient:state:name[:accuracy]`` and ``recipient:state:condition:type:value:name[:accuracy]``.
+
+    Side screens given to ``target`` only land on the attacker's own units.
+    """
+    recipient = parts[0]  # "self" or "target"
+    if len(parts) < 3:
+        return
+
+    state_name = parts[2]
+    condition = None
+    if state_name == "condition" and len(parts) >= 6:
+        condition = (parts[3], parts[4])
+        state_name = parts[5]
+        accuracy = _accuracy(parts, 6)
+    else:
+        accuracy = _accuracy(parts, 3)
+
+    if _missed(ctx, accuracy):
+        return
+
+    if recipient == "self":
+        if condition is None or matches_effect_condition(ctx.attacker, *condition):
+            _give_state(ctx, ctx.attacker, state_name)
+        return
+    if recipient != "target":
+        return
+
+    normalized_state_name = str(state_name).lower()
+    if normalized_state_name in SIDE_SCREEN_STATE_NAMES:
+        for target in ctx.targets:
+            if target.current_hp > 0 and target.user_id == ctx.attacker.user_id:
+                _give_state(ctx, target, normalized_state_name)
+        return
+
+    for target in ctx.targets:
+        if target.current_hp <= 0:
+            continue
+        if condition is not None and not matches_effect_condition(target, *condition):
+            continue
+        # Prevent confusion from being applied to Safeguard-protected targets
+        if normalized_state_name == "confusion" and _blocked_by_safeguard(ctx, target):
+            continue
+        if normalized_state_name == "encore":
+            _encore_effect(ctx, target)
+            continue
+        _give_state(ctx, target, state_name)
+
+
+def _defog_effect(ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    if parts[0] == "target":
+        _break_side_screens(ctx)
+
+
+def _heal(ctx: EffectContext, unit: EngineUnit, denominator: int, *, heal_block: bool) -> None:
+    if heal_block and unit.has_state("heal_block"):
+        ctx.battle.log(f"{unit.name} can't be healed due to Heal Block")
+        return
+    max_hp = (unit.current_stats or {}).get("hp", 1)
+    old_hp = unit.current_hp
+    unit.current_hp = min(max_hp, old_hp + max(1, max_hp // denominator))
+    restored_hp = max(0, unit.current_hp - old_hp)
+    if restored_hp > 0:
+        ctx.battle.log(f"{unit.name} regained {restored_hp} health")
+
+
+def _heal_effect(ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    """Formats: ``recipient:heal:denominator`` and ``recipient:heal:condition:weather:value:denominator``.
+
+    A weather condition reads the tile of the attacker (``self``) or of the
+    first target, and respects Heal Block.
+    """
+    recipient = parts[0]  # "self" or "target"
+    conditional = len(parts) >= 6 and parts[2] == "condition"
+    if not conditional and len(parts) < 3:
+        return
+    try:
+        denominator = int(parts[5] if conditional else parts[2])
+    except ValueError:
+        return
+    if denominator <= 0:
+        return
+
+    units = _living_recipients(ctx, recipient)
+    if conditional:
+        if parts[3].lower() != "weather":
+            return
+        anchor = ctx.attacker if recipient == "self" else (ctx.targets[0] if ctx.targets else None)
+        if anchor is None or not weather_condition_matches(ctx.battle.map.weather_at(*anchor.position), parts[4]):
+            return
+    for unit in units:
+        _heal(ctx, unit, denominator, heal_block=conditional)
+
+
+def _cure_status_effect(ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    if len(parts) < 3:
+        return
+    for unit in _living_recipients(ctx, parts[0]):
+        cure_status(ctx.battle, unit, parts[2])
+
+
+def _reset_stats_effect(ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    for unit in _recipients(ctx, parts[0]):
+        unit.stat_boosts = default_stat_boosts()
+        refresh_stats(ctx.battle, unit)
+
+
+def _instant_ko_effect(ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    for unit in _recipients(ctx, parts[0]):
+        if unit.current_hp > 0:
+            unit.current_hp = 0
+
+
+# Handlers by ``EffectOp.handler``; see ``app.move_effects.effect_handler_key``.
+# The route handles "consume_berry", "target:remove_held_item", "copy_ability", "give_cash" and "revive".
+MOVE_EFFECT_HANDLERS: dict[str, EffectHandler] = {
+    "break_screens": _break_screens_effect,
+    "weather": _weather_effect,
+    "terrain": _terrain_effect,
+    "field_hazard": _field_hazard_effect,
+    "field:clear_hazards": _field_clear_hazards_effect,
+    "field:clear_substitutes": _field_clear_substitutes_effect,
+    "self:clear_hazards": _self_clear_hazards_effect,
+    "field:tailwind": _field_tailwind_effect,
+    "field:gravity": _field_gravity_effect,
+    "target:field_hazard": _target_field_hazard_effect,
+    "raise_stat": _stat_change_effect,
+    "lower_stat": _stat_change_effect,
+    "high_crit_ratio": _high_crit_ratio_effect,
+    "status": _status_effect,
+    "safeguard": _safeguard_effect,
+    "state": _state_effect,
+    "apply_state": _state_effect,
+    "defog": _defog_effect,
+    "heal": _heal_effect,
+    "cure_status": _cure_status_effect,
+    "reset_stats": _reset_stats_effect,
+    "instant_ko": _instant_ko_effect,
+}
+
+
+def effect_units(battle: Battle, move: Move, attacker: EngineUnit, targets: list[EngineUnit]) -> list[EngineUnit]:
+    """Units whose names, types or abilities the effects of ``move`` can read.
+
+    That is the attacker and the targets, plus every unit on a target's side
+    when the move breaks screens, and the units on the affected tiles when it
+    removes substitutes.
+    """
+    units = [attacker, *targets]
+    handlers = {op.handler for op in move_program(move).on_use}
+    if handlers & SIDE_SCREEN_HANDLERS:
+        for target in targets:
+            units.extend(battle.side(target.user_id).units)
+    if "field:clear_substitutes" in handlers:
+        ctx = EffectContext(battle, move, attacker, targets)
+        tiles = set(_affected_tiles(ctx))
+        units.extend(unit for unit in battle.units if unit.position in tiles)
+    return units
+
+
+def run_move_effects(
+    battle: Battle,
+    move: Move,
+    attacker: EngineUnit,
+    targets: list[EngineUnit],
+    *,
+    affected_tiles: list[Tile] | None = None,
+    last_used_move: Callable[[EngineUnit], tuple[int, str] | None] | None = None,
+    extra_handlers: dict[str, EffectHandler] | None = None,
+) -> None:
+    """Apply every effect of ``move`` used by ``attacker`` on ``targets``, in the order the move lists them.
+
+    ``affected_tiles`` overrides the tiles field effects cover (the tiles the
+    player aimed at); ops with no handler here or in ``extra_handlers`` are skipped.
+    """
+    program = move_program(move)
+    if not program.on_use:
+        return
+    handlers = {**MOVE_EFFECT_HANDLERS, **extra_handlers} if extra_handlers else MOVE_EFFECT_HANDLERS
+    ctx = EffectContext(battle, move, attacker, targets, affected_tiles, last_used_move)
+    for op in program.on_use:
+        handler = handlers.get(op.handler)
+        if handler is not None:
+            handler(ctx, op.parts)
@@ -0,0 +1,256 @@
+"""End-of-turn and end-of-round passes.
+
+After each player's turn their units take status damage. After the last
+player of a round, every unit then takes weather chip damage, the
+per-unit states tick (Aqua Ring, Ingrain, Curse, Nightmare, Salt Cure),
+grounded Grass types heal on stumps, entry hazards hit the units standing on
+them and every hazard stack counts down. Each pass returns the ids of the
+units it changed and logs in the order the passes run.
+"""
+
+from __future__ import annotations
+
+from app.engine.rules import WEATHER_TO_ID, get_type_multiplier, normalize_states, normalize_status_effects
+from app.engine.state import Battle, EngineUnit
+from app.engine.units import apply_stat_change, apply_status, is_status_immune
+from app.map_grids import normalize_hazard_cell
+from app.map_movement import is_stump_tile, target_receives_grass_tile_bonuses
+
+SPIKES, TOXIC_SPIKES, STEALTH_ROCK, STICKY_WEB = 1, 2, 3, 4
+
+STATUS_IMMUNITY_LABELS = {"poison": "poisoned", "badly_poisoned": "badly poisoned"}
+
+
+def _heal_blocked(battle: Battle, unit: EngineUnit) -> bool:
+    if unit.has_state("heal_block"):
+        battle.log(f"{unit.name} can't be healed due to Heal Block")
+        return True
+    return False
+
+
+def apply_status_damage(battle: Battle, user_id: int) -> list[int]:
+    """Burn and poison damage for one player's units; durations tick at turn start."""
+    modified_unit_ids = []
+    for unit in battle.units_for_player(user_id):
+        status_effect = normalize_status_effects(unit.status_effects)
+        max_hp = unit.max_hp
+        hp_after_effects = unit.current_hp
+        modified = False
+
+        if status_effect:
+            status_name = status_effect[0]
+            if status_name in {"burn", "poison"}:
+                damage = max(1, max_hp // 8) if max_hp > 0 else 0
+                hp_after_effects = max(0, hp_after_effects - damage)
+                modified = damage > 0
+                if damage > 0:
+                    battle.log(f"{unit.name} took {damage} damage from {status_name}")
+            elif status_name == "badly_poisoned":
+                # Toxic damage grows by 1/16 of max HP every turn.
+                bad_poison_turn = max(1, int(status_effect[2]) if len(status_effect) >= 3 else 1)
+                damage = max(1, (max_hp * bad_poison_turn) // 16) if max_hp > 0 else 0
+                hp_after_effects = max(0, hp_after_effects - damage)
+                unit.status_effects = [status_name, int(status_effect[1]), bad_poison_turn + 1]
+                modified = True
+                if damage > 0:
+                    battle.log(f"{unit.name} took {damage} from badly poisoned")
+
+        if hp_after_effects != unit.current_hp:
+            unit.current_hp = hp_after_effects
+            modified = True
+        if modified:
+            modified_unit_ids.append(unit.id)
+    return modified_unit_ids
+
+
+def apply_weather_damage(battle: Battle) -> list[int]:
+    """Sandstorm and hail chip damage for every unit standing in them."""
+    modified_unit_ids = []
+    for unit in battle.units:
+        if unit.current_hp <= 0:
+            continue
+        max_hp = unit.max_hp
+        weather_id = battle.map.weather_at(*unit.position)
+        damage = 0
+        if weather_id == WEATHER_TO_ID["sandstorm"] and not unit.types & {"rock", "ground", "steel"}:
+            damage = max(1, max_hp // 16) if max_hp > 0 else 0
+            if damage > 0:
+                battle.log(f"{unit.name} took {damage} damage from the sandstorm")
+        elif weather_id == WEATHER_TO_ID["hail"] and "ice" not in unit.types:
+            damage = max(1, max_hp // 16) if max_hp > 0 else 0
+            if damage > 0:
+                battle.log(f"{unit.name} took {damage} damage from hail")
+        if damage > 0:
+            unit.current_hp = max(0, unit.current_hp - damage)
+            modified_unit_ids.append(unit.id)
+    return modified_unit_ids
+
+
+def apply_state_effects(battle: Battle) -> list[int]:
+    """Healing and damage from states that act once per round."""
+    modified_unit_ids = []
+    for unit in battle.units:
+        if unit.current_hp <= 0:
+            continue
+        state = normalize_states(unit.states)
+        if not state:
+            continue
+        max_hp = unit.max_hp
+        if max_hp <= 0:
+            continue
+        state_name = state[0]
+
+        if state_name in {"aqua_ring", "ingrain"}:
+            if state_name == "aqua_ring":
+                heal, tag = max(1, max_hp // 16), "Aqua Ring"
+            else:
+                heal, tag = max(1, max_hp // 8), "Ingrain"
+            if _heal_blocked(battle, unit):
+                continue
+            unit.current_hp = min(max_hp, unit.current_hp + heal)
+            modified_unit_ids.append(unit.id)
+            battle.log(f"{unit.name} healed {heal} HP from {tag}")
+            continue
+
+        if state_name == "cursed":
+            damage, tag = max(1, max_hp // 4), "Curse"
+        elif state_name == "nightmare":
+            # Nightmare only hurts a sleeping unit.
+            status = normalize_status_effects(unit.status_effects)
+            if not status or status[0] != "sleep" or int(status[1]) <= 0:
+                continue
+            damage, tag = max(1, max_hp // 4), "Nightmare"
+        elif state_name == "salt_cure":
+            # 1/8 for Steel or Water types (no stacking for both), 1/16 otherwise.
+            denominator = 8 if unit.types & {"steel", "water"} else 16
+            damage, tag = max(1, max_hp // denominator), "Salt Cure"
+        else:
+            continue
+        unit.current_hp = max(0, unit.current_hp - damage)
+        modified_unit_ids.append(unit.id)
+        battle.log(f"{unit.name} took {damage} damage from {tag}")
+    return modified_unit_ids
+
+
+def apply_stump_healing(battle: Battle) -> list[int]:
+    """Grass-type units on stump tiles heal 1/8 max HP; Flying and Levitate units don't."""
+    special_tiles = battle.map.special_tiles
+    if not special_tiles:
+        return []
+    modified_unit_ids = []
+    for unit in battle.units:
+        if unit.current_hp <= 0 or "grass" not in unit.types:
+            continue
+        if not target_receives_grass_tile_bonuses(set(unit.types), set(unit.ability_names)):
+            continue
+        if not is_stump_tile(special_tiles, unit.current_x, unit.current_y):
+            continue
+        max_hp = unit.max_hp
+        if max_hp <= 0 or _heal_blocked(battle, unit):
+            continue
+        heal = max(1, max_hp // 8)
+        unit.current_hp = min(max_hp, unit.current_hp + heal)
+        modified_unit_ids.append(unit.id)
+        battle.log(f"{unit.name} healed {heal} HP from the stump")
+    return modified_unit_ids
+
+
+def apply_entry_hazards(battle: Battle) -> list[int]:
+    """Hazard effects on the units standing on hazard tiles.
+
+    - spikes: 1 stack=1/8, 2 stacks=1/6, 3+ stacks=1/4 max HP; no effect on Flying.
+    - toxic spikes: 1 stack=poison, 2+ stacks=badly poisoned; no effect on Flying; no overwrite.
+    - stealth rock: max HP / 8 scaled by Rock-type effectiveness.
+    - sticky web: lowers speed by one stage.
+    """
+    if not isinstance(battle.map.hazard_tiles, list):
+        return []
+    modified_unit_ids = []
+    for unit in battle.units:
+        if unit.current_hp <= 0:
+            continue
+        entries = battle.map.hazards_at(*unit.position)
+        if not entries:
+            continue
+
+        max_hp = unit.max_hp
+        is_flying = "flying" in unit.types
+        hazard_ids = [int(hazard_id) for hazard_id, _ in entries]
+        spikes_layers = hazard_ids.count(SPIKES)
+        toxic_spikes_layers = hazard_ids.count(TOXIC_SPIKES)
+        modified = False
+
+        if spikes_layers > 0 and not is_flying and max_hp > 0:
+            if spikes_layers >= 3:
+                damage = max(1, max_hp // 4)
+            elif spikes_layers == 2:
+                damage = max(1, max_hp // 6)
+            else:
+                damage = max(1, max_hp // 8)
+            unit.current_hp = max(0, unit.current_hp - damage)
+            modified = True
+            battle.log(f"{unit.name} took {damage} damage from spikes")
+
+        if STEALTH_ROCK in hazard_ids and max_hp > 0:
+            type_multiplier = get_type_multiplier("rock", sorted(unit.types))
+            if type_multiplier > 0:
+                damage = max(1, int((max_hp * type_multiplier) // 8))
+                unit.current_hp = max(0, unit.current_hp - damage)
+                modified = True
+                battle.log(f"{unit.name} took {damage} damage from floating rocks")
+
+        if toxic_spikes_layers > 0 and not is_flying:
+            status = "badly_poisoned" if toxic_spikes_layers >= 2 else "poison"
+            if apply_status(battle, unit, status):
+                modified = True
+            elif is_status_immune(unit, status):
+                battle.log(f"{unit.name} wasn't {STATUS_IMMUNITY_LABELS[status]}")
+
+        if STICKY_WEB in hazard_ids:
+            apply_stat_change(battle, unit, "speed", -1)
+            modified = True
+
+        if modified:
+            modified_unit_ids.append(unit.id)
+    return modified_unit_ids
+
+
+def expire_hazards(battle: Battle) -> bool:
+    """Count every hazard stack down by one turn and drop expired ones."""
+    hazard_tiles = battle.map.hazard_tiles
+    if not isinstance(hazard_tiles, list):
+        return False
+
+    changed = False
+    next_grid: list[list[list[list[int]]]] = []
+    for row in hazard_tiles:
+        if not isinstance(row, list):
+            next_grid.append([])
+            changed = True
+            continue
+        next_row = []
+        for cell in row:
+            entries = normalize_hazard_cell(cell)
+            next_entries = [[int(hazard_id), int(turns) - 1] for hazard_id, turns in entries if int(turns) > 1]
+            changed = changed or entries != cell or next_entries != entries
+            next_row.append(next_entries)
+        next_grid.append(next_row)
+
+    if changed:
+        battle.map.hazard_tiles = next_grid
+    return changed
+
+
+def run_end_of_turn(battle: Battle, user_id: int, *, round_complete: bool) -> set[int]:
+    """Run the end of ``user_id``'s turn, plus the end-of-round passes when ``round_complete``.
+
+    Returns the ids of units whose HP, status or stats changed.
+    """
+    modified_unit_ids = set(apply_status_damage(battle, user_id))
+    if round_complete:
+        modified_unit_ids.update(apply_weather_damage(battle))
+        modified_unit_ids.update(apply_state_effects(battle))
+        modified_unit_ids.update(apply_stump_healing(battle))
+        modified_unit_ids.update(apply_entry_hazards(battle))
+        expire_hazards(battle)
+    return modified_unit_ids
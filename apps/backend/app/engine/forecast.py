@@ -0,0 +1,278 @@
+"""Attack forecasts: what each of a player's attacks would do, without rolling.
+
+``forecast_attacks`` lists every (unit, origin tile, move, target) a player
+can attack this turn, from where the unit stands or from any free tile it can
+still move to (``attack_origins``). For each one it gives the chance to land,
+the chance of a critical hit, the lowest and highest total damage, and the
+chance to knock the target out, with the attacker standing on the origin
+tile. The damage comes from the same ``damage_row`` inputs that
+``resolve_attack`` rolls. All 16 damage rolls (85-100%), with and without a
+critical hit, go through a single ``damage_batch`` call for the whole
+player. Each per-hit spread is then combined over the possible hit counts.
+
+Each target is forecast as if it were the only unit struck (no spread
+penalty). Damaging moves whose outcome depends on rules ``execute_move``
+resolves outside the engine (fixed damage, conditional power, power bonuses,
+type changes, Shell Side Arm) are listed with ``forecastable`` false and no
+numbers, so clients can tell them apart from attacks that cannot hurt.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING
+
+from app.damage import DamageRow, damage_batch
+from app.engine.combat import damage_row, hit_threshold
+from app.engine.moves import (
+    get_scaling_hit_powers,
+    hit_count_odds,
+    move_can_critical_hit,
+    move_deals_direct_damage,
+    move_has_effect_token,
+    move_has_high_crit_ratio,
+    move_has_target_fixed_damage_effect,
+    move_is_instant_ko,
+    move_uses_separate_hit_accuracy,
+)
+from app.engine.rules import get_critical_hit_chance, get_stat_stage
+from app.engine.movement import unit_reachable_tiles
+from app.engine.state import Battle, EngineUnit
+from app.engine.targeting import Tile, move_range_tiles
+from app.move_effects import move_program
+
+if TYPE_CHECKING:
+    from app.engine.moves import Move
+
+DAMAGE_ROLLS = tuple(roll / 100 for roll in range(85, 101))
+
+# Effect heads and ``self:`` rules that execute_move resolves from columns the engine does not load.
+ROUTE_POWER_HEADS = ("conditional_power", "power_add")
+ROUTE_SELF_RULES = frozenset({"modify_move_type_by_terrain", "modify_move_type_by_held_item", "use_best_offense"})
+
+
+@dataclass(frozen=True, slots=True)
+class AttackForecast:
+    unit_id: int
+    origin_x: int
+    origin_y: int
+    move_id: int
+    target_id: int
+    hit_chance: float | None
+    crit_chance: float | None
+    damage_min: int | None
+    damage_max: int | None
+    ko_chance: float | None
+    forecastable: bool = True
+
+
+@dataclass(frozen=True, slots=True)
+class _Plan:
+    attacker: EngineUnit
+    move: Move
+    target: EngineUnit
+    hit_chance: float
+    crit_chances: list[float]
+    hit_powers: list[int]
+    hit_counts: list[tuple[int, float]]
+    separate_accuracy: bool
+
+
+def move_forecasts_damage(move: Move) -> bool:
+    """Whether ``move`` deals formula damage the forecast can predict."""
+    if (
+        not move.power
+        or (move.category or "").lower() not in {"physical", "special"}
+        or move_has_target_fixed_damage_effect(move)
+    ):
+        return False
+    program = move_program(move)
+    if any(program.with_head(head) for head in ROUTE_POWER_HEADS):
+        return False
+    return not any(len(op.lower_parts) >= 2 and op.lower_parts[1] in ROUTE_SELF_RULES for op in program.with_head("self"))
+
+
+def attack_origins(battle: Battle, attacker: EngineUnit) -> list[Tile]:
+    """Tiles ``attacker`` can attack from this turn: its own, then every free tile it can still move to."""
+    occupied = battle.occupied_tiles(exclude=attacker)
+    origins = [attacker.position]
+    for x, y in unit_reachable_tiles(battle, attacker):
+        if (x, y) != attacker.position and (x, y) not in occupied:
+            origins.append((x, y))
+    return origins
+
+
+def attack_targets(battle: Battle, attacker: EngineUnit, move: Move, origin: Tile | None = None) -> list[EngineUnit]:
+    """Living units ``move`` can strike from ``origin`` (by default, where ``attacker`` stands)."""
+    targeting = (move.targeting or "").lower()
+    if targeting not in {"enemy", "all"}:
+        return []
+    tiles = move_range_tiles(move, origin or attacker.position, battle.map.width, battle.map.height)
+    return [
+        unit
+        for unit in battle.units
+        if unit.id != attacker.id
+        and unit.current_hp > 0
+        and unit.position in tiles
+        and (targeting == "all" or unit.user_id != attacker.user_id)
+    ]
+
+
+def forecast_hit_chance(battle: Battle, move: Move, attacker: EngineUnit, target: EngineUnit) -> float:
+    """Chance that ``move`` lands on ``target``, with the same rules as ``resolve_attack``."""
+    if target.has_state("telekinesis"):
+        if str(move.type or "").lower() == "ground":
+            return 0.0
+        if not move_is_instant_ko(move):
+            return 1.0
+    if move.accuracy is None or target.has_state("glaive_rush"):
+        return 1.0
+    threshold = hit_threshold(battle, move, attacker, target)
+    if threshold is None:
+        return 1.0
+    return min(1.0, max(0.0, threshold / 100))
+
+
+def _crit_chances(attacker: EngineUnit, move: Move, hits: int) -> list[float]:
+    if move_has_effect_token(move, "guaranteed_crit"):
+        chance = 1.0
+    elif move_can_critical_hit(move):
+        stage = get_stat_stage(attacker.stat_boosts, "crit") + (1 if move_has_high_crit_ratio(move) else 0)
+        chance = min(1.0, max(0.0, get_critical_hit_chance(stage)))
+    else:
+        chance = 0.0
+    chances = [chance] * hits
+    # Laser Focus turns the next hit into a critical hit.
+    if chances and attacker.has_state("laser_focus"):
+        chances[0] = 1.0
+    return chances
+
+
+def _plan(battle: Battle, attacker: EngineUnit, move: Move, target: EngineUnit) -> _Plan:
+    scaling_powers = get_scaling_hit_powers(move)
+    hit_counts = [(len(scaling_powers), 1.0)] if scaling_powers else hit_count_odds(move)
+    most_hits = max(hits for hits, _ in hit_counts)
+    hit_powers = scaling_powers or [int(move.power)] * most_hits
+    return _Plan(
+        attacker=attacker,
+        move=move,
+        target=target,
+        hit_chance=forecast_hit_chance(battle, move, attacker, target),
+        crit_chances=_crit_chances(attacker, move, most_hits),
+        hit_powers=hit_powers,
+        hit_counts=hit_counts,
+        separate_accuracy=bool(scaling_powers) and move_uses_separate_hit_accuracy(move),
+    )
+
+
+def _combine(totals: dict[int, float], hit: dict[int, float]) -> dict[int, float]:
+    combined: dict[int, float] = defaultdict(float)
+    for total, total_odds in totals.items():
+        for damage, odds in hit.items():
+            combined[total + damage] += total_odds * odds
+    return combined
+
+
+def _total_damage_odds(plan: _Plan, hit_spreads: list[dict[int, float]]) -> dict[int, float]:
+    """Total damage once the move has landed, mapped to its probability."""
+    count_odds = dict(plan.hit_counts)
+    outcome: dict[int, float] = defaultdict(float)
+    totals: dict[int, float] = {0: 1.0}
+    for hits, spread in enumerate(hit_spreads, start=1):
+        if plan.separate_accuracy:
+            # Each hit rolls to hit again, and a miss ends the move.
+            for total, odds in totals.items():
+                outcome[total] += odds * (1 - plan.hit_chance)
+            totals = {total: odds * plan.hit_chance for total, odds in totals.items()}
+        totals = _combine(totals, spread)
+        share = count_odds.get(hits, 0.0)
+        for total, odds in totals.items():
+            outcome[total] += odds * share
+    return outcome
+
+
+def forecast_attacks(battle: Battle, user_id: int, moves_by_unit: dict[int, list[Move]]) -> list[AttackForecast]:
+    """Forecast every attack ``user_id``'s units can make with the moves in ``moves_by_unit``.
+
+    Units that are fainted or have already acted (``can_move`` false) are skipped.
+    """
+    # Forecastable attacks become plans; the others are listed without numbers.
+    entries: list[_Plan | AttackForecast] = []
+    for attacker in battle.units_for_player(user_id):
+        if attacker.current_hp <= 0 or not attacker.can_move:
+            continue
+        moves = [move for move in moves_by_unit.get(attacker.id, ()) if move_deals_direct_damage(move)]
+        if not moves:
+            continue
+        for origin in attack_origins(battle, attacker):
+            # The attacker as it would stand on ``origin``; the battle itself is not changed.
+            placed = attacker
+            if origin != attacker.position:
+                placed = replace(attacker, current_x=origin[0], current_y=origin[1])
+            for move in moves:
+                forecastable = move_forecasts_damage(move)
+                for target in attack_targets(battle, attacker, move, origin):
+                    if forecastable:
+                        entries.append(_plan(battle, placed, move, target))
+                    else:
+                        entries.append(
+                            AttackForecast(
+                                unit_id=attacker.id,
+                                origin_x=origin[0],
+                                origin_y=origin[1],
+                                move_id=int(move.id),
+                                target_id=target.id,
+                                hit_chance=None,
+                                crit_chance=None,
+                                damage_min=None,
+                                damage_max=None,
+                                ko_chance=None,
+                                forecastable=False,
+                            )
+                        )
+
+    plans = [entry for entry in entries if isinstance(entry, _Plan)]
+    # One row per plan, hit, critical state and damage roll, evaluated in one batch.
+    rows: list[DamageRow] = []
+    for plan in plans:
+        for power in plan.hit_powers:
+            for critical in (False, True):
+                base = damage_row(battle, plan.move, plan.attacker, plan.target, power=power, critical=critical)
+                rows.extend(replace(base, random_factor=roll) for roll in DAMAGE_ROLLS)
+    damages = iter(damage_batch(rows))
+
+    forecasts = []
+    for entry in entries:
+        if isinstance(entry, AttackForecast):
+            forecasts.append(entry)
+            continue
+        plan = entry
+        hit_spreads = []
+        for crit_chance in plan.crit_chances:
+            spread: dict[int, float] = defaultdict(float)
+            for critical_odds in (1 - crit_chance, crit_chance):
+                for _ in DAMAGE_ROLLS:
+                    spread[next(damages)] += critical_odds / len(DAMAGE_ROLLS)
+            hit_spreads.append({damage: odds for damage, odds in spread.items() if odds > 0})
+
+        crit_chance = plan.crit_chances[0] if plan.crit_chances else 0.0
+        totals = _total_damage_odds(plan, hit_spreads)
+        possible = [damage for damage, odds in totals.items() if odds > 0]
+        hp = plan.target.current_hp
+        ko_odds = sum(odds for damage, odds in totals.items() if damage >= hp)
+        forecasts.append(
+            AttackForecast(
+                unit_id=plan.attacker.id,
+                origin_x=plan.attacker.current_x,
+                origin_y=plan.attacker.current_y,
+                move_id=int(plan.move.id),
+                target_id=plan.target.id,
+                hit_chance=round(plan.hit_chance, 4),
+                crit_chance=round(crit_chance, 4),
+                damage_min=min(possible, default=0),
+                damage_max=max(possible, default=0),
+                ko_chance=round(min(1.0, plan.hit_chance * ko_odds), 4),
+            )
+        )
+    return forecasts
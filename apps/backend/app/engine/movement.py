@@ -0,0 +1,102 @@
+"""Movement ranges and move destinations for engine units."""
+
+from __future__ import annotations
+
+from app.engine.state import Battle, BattleMap, EngineUnit
+from app.map_movement import (
+    movement_range_with_terrain,
+    resolve_movement_destination,
+    unit_can_occupy_tile,
+    unit_can_pass_through_units,
+)
+
+
+class MovementError(ValueError):
+    """A requested move is not allowed; the message is safe to show to players."""
+
+
+def reachable_tiles(
+    battle_map: BattleMap,
+    origin: tuple[int, int],
+    move_range: int,
+    unit_types: set[str],
+    ability_names: set[str],
+    blocked_tiles: set[tuple[int, int]],
+) -> list[list[int]]:
+    """Tiles reachable from ``origin`` within ``move_range`` movement points.
+
+    ``blocked_tiles`` are the enemy positions; pass an empty set for units
+    that pass through others (``unit_can_pass_through_units``).
+    """
+    terrain = battle_map.terrain
+    return movement_range_with_terrain(
+        origin,
+        move_range,
+        terrain.cost_grid(unit_types, ability_names),
+        battle_map.special_tiles,
+        battle_map.width,
+        battle_map.height,
+        unit_types,
+        ability_names,
+        blocked_tiles,
+        graph=terrain.graph,
+    )
+
+
+def unit_reachable_tiles(battle: Battle, unit: EngineUnit) -> list[list[int]]:
+    """Tiles ``unit`` can reach this turn from the tile it started it on."""
+    types, ability_names = set(unit.types), set(unit.ability_names)
+    blocked_tiles = (
+        set()
+        if unit_can_pass_through_units(types)
+        else {other.position for other in battle.units if other.user_id != unit.user_id and other.current_hp > 0}
+    )
+    return reachable_tiles(
+        battle.map,
+        unit.origin,
+        int(unit.current_stats.get("range", 0) or 0),
+        types,
+        ability_names,
+        blocked_tiles,
+    )
+
+
+def move_destination(battle: Battle, unit: EngineUnit, x: int, y: int) -> tuple[int, int, bool]:
+    """Where ``unit`` ends up when sent to ``(x, y)``, and whether it slid there on ice.
+
+    The target tile must already be known to be in the unit's range. Raises
+    ``MovementError`` when the unit cannot stand on the tile it would end on.
+    """
+    battle_map = battle.map
+    types, ability_names = set(unit.types), set(unit.ability_names)
+    if not unit_can_occupy_tile(battle_map.special_tiles, x, y, types, ability_names):
+        raise MovementError("This unit cannot move onto this tile")
+
+    occupied_tiles = battle.occupied_tiles(exclude=unit)
+    final_x, final_y, slid = resolve_movement_destination(
+        unit.current_x,
+        unit.current_y,
+        x,
+        y,
+        battle_map.terrain.cost_grid(types, ability_names),
+        battle_map.special_tiles,
+        battle_map.width,
+        battle_map.height,
+        types,
+        ability_names,
+        blocked_tiles=set() if unit_can_pass_through_units(types) else occupied_tiles,
+        occupied_tiles=occupied_tiles,
+        graph=battle_map.terrain.graph,
+    )
+    if (final_x, final_y) in occupied_tiles:
+        raise MovementError("Tile occupied")
+    if not unit_can_occupy_tile(battle_map.special_tiles, final_x, final_y, types, ability_names):
+        raise MovementError("This unit cannot move onto this tile")
+    return final_x, final_y, slid
+
+
+def move_unit(battle: Battle, unit: EngineUnit, x: int, y: int) -> bool:
+    """Move ``unit`` towards ``(x, y)``; returns True when ice carried it further."""
+    final_x, final_y, slid = move_destination(battle, unit, x, y)
+    unit.current_x, unit.current_y = final_x, final_y
+    return slid
@@ -0,0 +1,189 @@
+"""Questions about a move's definition, answered from its compiled effect program.
+
+These look only at the move (a catalog ``MoveRecord`` or a ``Move`` row) and
+never at units or the session.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from app.engine.rules import get_weather_move_multiplier, weather_condition_matches
+from app.move_effects import move_program
+
+if TYPE_CHECKING:
+    from app.catalog_records import MoveRecord
+    from app.db.models import Move as MoveRow
+
+    Move = MoveRecord | MoveRow
+
+
+def move_has_effect_token(move: Move, token: str) -> bool:
+    return move_program(move).has(str(token or "").strip().lower())
+
+
+def move_has_revive_effect(move: Move) -> bool:
+    return move_program(move).has_revive
+
+
+def move_ignores_target_stat_changes(move: Move) -> bool:
+    return move_has_effect_token(move, "target:ignore_stat_changes")
+
+
+def move_ignores_fairy_immunity(move: Move) -> bool:
+    return move_has_effect_token(move, "self:ignore_fairy_immunity")
+
+
+def move_has_high_crit_ratio(move: Move) -> bool:
+    """Return True when a move includes a high_crit_ratio effect token."""
+    return move_program(move).high_crit_ratio
+
+
+def move_is_instant_ko(move: Move) -> bool:
+    """Return True if the move has an instant KO effect (e.g., Sheer Cold, Fissure)."""
+    return move_program(move).instant_ko
+
+
+def move_has_target_fixed_damage_effect(move: Move) -> bool:
+    """Return True when a move has a target fixed-damage effect token."""
+    return bool(move_program(move).fixed_damage)
+
+
+def move_deals_direct_damage(move: Move) -> bool:
+    if move_has_target_fixed_damage_effect(move):
+        return True
+
+    category = (move.category or "").lower()
+    power = move.power or 0
+    return category in {"physical", "special"} and power > 0
+
+
+def move_can_critical_hit(move: Move) -> bool:
+    """Return whether this move is eligible to roll critical hits."""
+    if move_has_effect_token(move, "guaranteed_crit"):
+        return True
+    if move_has_target_fixed_damage_effect(move):
+        return False
+
+    category = (move.category or "").lower()
+    power = move.power or 0
+    return category in {"physical", "special"} and power > 0
+
+
+def get_scaling_hit_powers(move: Move) -> list[int] | None:
+    if not move or not isinstance(move.effects, list):
+        return None
+    for op in move_program(move).with_head("multi_hit"):
+        parts = op.lower_parts
+        if len(parts) >= 3 and parts[1] == "scaling":
+            powers: list[int] = []
+            for token in parts[2].split(","):
+                try:
+                    powers.append(int(token))
+                except ValueError:
+                    continue
+            return powers or None
+    return None
+
+
+def move_uses_separate_hit_accuracy(move: Move) -> bool:
+    if not move or not isinstance(move.effects, list):
+        return False
+    for op in move_program(move).with_head("multi_hit"):
+        parts = op.lower_parts
+        if len(parts) >= 4 and parts[1] == "scaling" and parts[3] == "separate_accuracy":
+            return True
+    return False
+
+
+# Variable multi-hit moves roll 1-20: 2 hits on 1-7, 3 on 8-14, 4 on 15-17, 5 on 18-20.
+VARIABLE_HIT_COUNT_ROLLS = ((2, 7), (3, 7), (4, 3), (5, 3))
+
+
+def _hit_count_range(move: Move, landed_target_count: int) -> tuple[int, int] | None:
+    """(fewest, most) hits from the multi_hit token, or None for variable hit counts."""
+    if not move or not isinstance(move.effects, list):
+        return 1, 1
+
+    for op in move_program(move).with_head("multi_hit"):
+        parts = op.lower_parts
+        if len(parts) < 2:
+            continue
+
+        hit_mode = parts[1]
+        if hit_mode == "dragon_darts":
+            hits = 2 if landed_target_count == 1 else 1
+            return hits, hits
+        if hit_mode == "scaling":
+            powers = get_scaling_hit_powers(move)
+            hits = len(powers) if powers else 1
+            return hits, hits
+        if hit_mode == "variable":
+            return None
+        if hit_mode == "party":
+            return 1, 1
+
+        try:
+            minimum_hits = max(1, int(hit_mode))
+        except ValueError:
+            return 1, 1
+
+        maximum_hits = minimum_hits
+        if len(parts) >= 3:
+            try:
+                maximum_hits = max(minimum_hits, int(parts[2]))
+            except ValueError:
+                maximum_hits = minimum_hits
+        return minimum_hits, maximum_hits
+
+    return 1, 1
+
+
+def roll_hit_count(move: Move, rng, *, landed_target_count: int = 1) -> int:
+    """Resolve how many times a move should hit from its multi_hit effect token."""
+    hit_range = _hit_count_range(move, landed_target_count)
+    if hit_range is None:
+        roll = rng.randint(1, 20)
+        for hits, faces in VARIABLE_HIT_COUNT_ROLLS:
+            if roll <= faces:
+                return hits
+            roll -= faces
+        return VARIABLE_HIT_COUNT_ROLLS[-1][0]
+
+    minimum_hits, maximum_hits = hit_range
+    if minimum_hits == maximum_hits:
+        return minimum_hits
+    return rng.randint(minimum_hits, maximum_hits)
+
+
+def hit_count_odds(move: Move, *, landed_target_count: int = 1) -> list[tuple[int, float]]:
+    """Every hit count ``roll_hit_count`` can return, with its probability."""
+    hit_range = _hit_count_range(move, landed_target_count)
+    if hit_range is None:
+        return [(hits, faces / 20) for hits, faces in VARIABLE_HIT_COUNT_ROLLS]
+    minimum_hits, maximum_hits = hit_range
+    share = 1 / (maximum_hits - minimum_hits + 1)
+    return [(hits, share) for hits in range(minimum_hits, maximum_hits + 1)]
+
+
+def weather_move_override(move: Move, weather_id: int) -> float | None:
+    """The move's own ``weather_override`` multiplier for this weather, if any."""
+    for op in move_program(move).with_head("weather_override"):
+        parts = op.lower_parts
+        if len(parts) >= 4 and weather_condition_matches(weather_id, parts[1]):
+            try:
+                return float(parts[2])
+            except ValueError:
+                continue
+    return None
+
+
+def resolve_weather_move_multiplier_for_move(
+    move: Move,
+    move_type: str | None,
+    weather_id: int,
+) -> float:
+    override = weather_move_override(move, weather_id)
+    if override is not None:
+        return override
+    return get_weather_move_multiplier(move_type, weather_id)
@@ -0,0 +1,509 @@
+"""Rule tables and stateless helpers shared by the engine and the game routes.
+
+Everything here works on plain values (status lists, state lists, stat boost
+dicts, type names) and never touches the database, so the same rules run for
+live games, previews and simulations.
+"""
+
+from __future__ import annotations
+
+from typing import List
+
+from app.damage import EFFECTIVENESS, type_id
+
+VALID_STATUS_EFFECTS = {
+    "burn",
+    "sleep",
+    "poison",
+    "badly_poisoned",
+    "frozen",
+    "paralysis",
+}
+
+SHORT_DURATION_STATUS_EFFECTS = {"sleep", "frozen"}
+
+STATUS_NAME_ALIASES = {
+    "badly_poison": "badly_poisoned",
+    "badly_poisoned": "badly_poisoned",
+}
+
+STATUS_TYPE_IMMUNITIES = {
+    "paralysis": {"electric"},
+    "poison": {"poison", "steel"},
+    "badly_poisoned": {"poison", "steel"},
+    "burn": {"fire"},
+    "frozen": {"ice"},
+}
+
+VALID_STATE_EFFECTS = {"confusion", "flinch", "reflect", "light_screen", "aurora_veil", "safeguard", "tailwind", "aqua_ring", "destiny_bond", "ingrain", "laser_focus", "encore", "heal_block", "cursed", "nightmare", "immobilized", "salt_cure", "taunt", "torment", "telekinesis", "tar_shot", "gastro_acid", "foresight", "mind_reader", "power_trick", "embargo", "glaive_rush", "substitute"}
+
+SIDE_SCREEN_STATE_NAMES = frozenset(
+    {"reflect", "light_screen", "aurora_veil", "safeguard", "tailwind"}
+)
+
+WEATHER_TO_ID = {
+    "sun": 1,
+    "rain": 2,
+    "sandstorm": 3,
+    "hail": 4,
+}
+
+FIELD_HAZARD_TO_ID = {
+    "spikes": 1,
+    "toxic_spikes": 2,
+    "stealth_rock": 3,
+    "sticky_web": 4,
+}
+
+FIELD_HAZARD_STACK_LIMITS = {
+    1: 3,  # spikes
+    2: 2,  # toxic spikes
+    3: 1,  # stealth rock
+    4: 1,  # sticky web
+}
+
+FIELD_HAZARD_DEFAULT_DURATION = 5
+
+TERRAIN_TO_ID = {
+    "electric": 1,
+    "psychic": 2,
+    "grassy": 3,
+    "misty": 4,
+}
+TERRAIN_ID_TO_NAME = {value: key for key, value in TERRAIN_TO_ID.items()}
+
+FIELD_EFFECT_TO_ID = {
+    "gravity": 1,
+}
+
+# Duration (in turns) for screen-like effects: Reflect, Light Screen, Aurora Veil
+SCREEN_EFFECT_DURATION = 5
+
+# Omniboost/omnidebuff effects (e.g., Ancient Power) affect battle stats only.
+# Range is excluded because it is derived from speed.
+ALL_STAT_EFFECT_KEYS = ["attack", "defense", "sp_attack", "sp_defense", "speed"]
+
+STAT_LOG_LABELS = {
+    "attack": "attack",
+    "defense": "defense",
+    "sp_attack": "special attack",
+    "sp_defense": "special defense",
+    "speed": "speed",
+    "accuracy": "accuracy",
+    "evasion": "evasion",
+    "crit": "critical hit rate",
+}
+
+STATUS_LOG_LABELS = {
+    "burn": "burned",
+    "sleep": "asleep",
+    "poison": "poisoned",
+    "badly_poisoned": "badly poisoned",
+    "frozen": "frozen",
+    "paralysis": "paralyzed",
+}
+
+
+def normalize_stat_name(stat: str) -> str:
+    """Normalize stat names to match model field names."""
+    mapping = {
+        "special_attack": "sp_attack",
+        "special_defense": "sp_defense",
+        "sp attack": "sp_attack",
+        "sp defense": "sp_defense",
+    }
+    return mapping.get(stat.lower(), stat.lower())
+
+
+def default_stat_boosts() -> dict:
+    return {
+        "attack": [],
+        "defense": [],
+        "sp_attack": [],
+        "sp_defense": [],
+        "speed": [],
+        "accuracy": [],
+        "evasion": [],
+        "crit": [],
+    }
+
+
+def normalize_stat_boosts(raw: dict | None) -> dict:
+    normalized = default_stat_boosts()
+    if not isinstance(raw, dict):
+        return normalized
+
+    for raw_stat, value in raw.items():
+        stat = normalize_stat_name(str(raw_stat))
+        if stat not in normalized:
+            continue
+
+        if isinstance(value, list):
+            clean_instances = []
+            for instance in value:
+                if not isinstance(instance, dict):
+                    continue
+                magnitude = instance.get("magnitude")
+                if not isinstance(magnitude, (int, float)):
+                    continue
+                expires_turn = instance.get("expires_turn", 4)
+                if not isinstance(expires_turn, (int, float)):
+                    expires_turn = 4
+                clean_instances.append({
+                    "magnitude": int(magnitude),
+                    "expires_turn": int(expires_turn),
+                })
+            normalized[stat] = clean_instances
+        elif isinstance(value, (int, float)):
+            # Backwards compatibility for old stage-based payloads (e.g. {"attack": 1})
+            stage_value = int(value)
+            if stage_value != 0:
+                normalized[stat] = [{"magnitude": stage_value, "expires_turn": 4}]
+
+    return normalized
+
+
+def get_stat_multiplier(stat_boosts: dict, stat: str) -> float:
+    """
+    Calculate the multiplier for a stat based on its boost/debuff stages.
+    Uses standard Pokémon stat stage formula:
+    - For positive stages: (2 + stage) / 2
+    - For negative stages: 2 / (2 - stage)
+    - Stage is capped at ±6
+    """
+    stat = normalize_stat_name(stat)
+    boosts = normalize_stat_boosts(stat_boosts)
+    
+    if stat not in boosts:
+        return 1.0
+    
+    instances = boosts.get(stat, [])
+    if not instances:
+        return 1.0
+    
+    # Sum all magnitudes from active instances
+    total_stage = sum(inst.get("magnitude", 0) for inst in instances)
+    
+    # Cap at ±6
+    total_stage = max(-6, min(6, total_stage))
+    
+    # Calculate multiplier
+    if total_stage == 0:
+        return 1.0
+    elif total_stage > 0:
+        return (2 + total_stage) / 2
+    else:  # total_stage < 0
+        return 2 / (2 - total_stage)
+
+
+def get_stat_stage(stat_boosts: dict, stat: str) -> int:
+    """Return summed stat stage for the stat, clamped to +/- 6."""
+    stat = normalize_stat_name(stat)
+    boosts = normalize_stat_boosts(stat_boosts)
+    if stat not in boosts:
+        return 0
+
+    instances = boosts.get(stat, [])
+    if not isinstance(instances, list):
+        return 0
+
+    total_stage = 0
+    for inst in instances:
+        if isinstance(inst, dict):
+            magnitude = inst.get("magnitude", 0)
+            if isinstance(magnitude, (int, float)):
+                total_stage += int(magnitude)
+
+    return max(-6, min(6, total_stage))
+
+
+def get_accuracy_stage_multiplier(attacker_accuracy_stage: int, target_evasion_stage: int) -> float:
+    """
+    Gen V+ style accuracy/evasion multiplier.
+    Uses adjusted stage = attacker accuracy stage - target evasion stage (clamped to +/- 6).
+    """
+    adjusted_stage = max(-6, min(6, attacker_accuracy_stage - target_evasion_stage))
+    if adjusted_stage >= 0:
+        return (3 + adjusted_stage) / 3
+    return 3 / (3 - adjusted_stage)
+
+
+def get_critical_hit_chance(crit_stage: int) -> float:
+    """
+    Get the critical hit chance based on crit stage.
+    Uses Pokémon Gen III-V critical hit rates.
+    Stages are clamped to -6 to +4 range.
+    
+    Stage thresholds:
+    - Stage 0: 1/16 (6.25%)
+    - Stage 1: 1/8 (12.5%)
+    - Stage 2: 1/4 (25%)
+    - Stage 3: 1/3 (~33.3%)
+    - Stage 4+: 1/2 (50%)
+    - Negative stages: 0% (impossible to crit)
+    """
+    # Clamp stage to reasonable range
+    stage = max(-6, min(4, crit_stage))
+    
+    if stage < 0:
+        return 0.0
+    elif stage == 0:
+        return 1 / 16  # 6.25%
+    elif stage == 1:
+        return 1 / 8   # 12.5%
+    elif stage == 2:
+        return 1 / 4   # 25%
+    elif stage == 3:
+        return 1 / 3   # ~33.3%
+    else:  # stage >= 4
+        return 1 / 2   # 50%
+
+
+def normalize_status_name(status: str) -> str:
+    normalized = str(status).lower().strip()
+    return STATUS_NAME_ALIASES.get(normalized, normalized)
+
+
+def normalize_status_effects(raw: list | dict | str | None) -> list:
+    def parse_single_status(value) -> list | None:
+        if isinstance(value, dict):
+            status = normalize_status_name(str(value.get("status", "")))
+            if status not in VALID_STATUS_EFFECTS:
+                return None
+            expires_turn = value.get("expires_turn", 1)
+            if not isinstance(expires_turn, (int, float)):
+                expires_turn = 1
+            if status == "badly_poisoned":
+                bad_poison_turn = value.get("bad_poison_turn", 1)
+                if not isinstance(bad_poison_turn, (int, float)):
+                    bad_poison_turn = 1
+                return [status, int(expires_turn), int(bad_poison_turn)]
+            return [status, int(expires_turn)]
+
+        if isinstance(value, list) and len(value) >= 2:
+            status_raw, expires_turn_raw = value[0], value[1]
+            status = normalize_status_name(status_raw)
+            if status not in VALID_STATUS_EFFECTS:
+                return None
+            if not isinstance(expires_turn_raw, (int, float)):
+                return None
+            if status == "badly_poisoned":
+                bad_poison_turn_raw = value[2] if len(value) >= 3 else 1
+                if not isinstance(bad_poison_turn_raw, (int, float)):
+                    bad_poison_turn_raw = 1
+                return [status, int(expires_turn_raw), int(bad_poison_turn_raw)]
+            return [status, int(expires_turn_raw)]
+
+        if isinstance(value, str):
+            status = normalize_status_name(value)
+            if status in VALID_STATUS_EFFECTS:
+                return [status, 1]
+
+        return None
+
+    if raw is None:
+        return []
+
+    # Canonical: [status, turns]
+    parsed = parse_single_status(raw)
+    if parsed:
+        return parsed
+
+    # Backwards compatibility: nested arrays/lists with first valid entry
+    if isinstance(raw, list):
+        for entry in raw:
+            parsed_entry = parse_single_status(entry)
+            if parsed_entry:
+                return parsed_entry
+
+    return []
+
+
+def normalize_states(raw: list | str | None) -> list:
+    if raw is None:
+        return []
+
+    if isinstance(raw, str):
+        state = raw.strip().lower()
+        return [state, 1] if state else []
+
+    if isinstance(raw, list) and len(raw) >= 2:
+        state = str(raw[0]).strip().lower()
+        turns_remaining = raw[1]
+        if not state or not isinstance(turns_remaining, (int, float)):
+            return []
+        return [state, int(turns_remaining)]
+
+    return []
+
+
+def status_duration(status: str, rng) -> int:
+    """Turns a newly applied status lasts; ``rng`` is a ``random.Random`` (or the module)."""
+    if status in SHORT_DURATION_STATUS_EFFECTS:
+        return rng.randint(2, 4)
+    return rng.randint(4, 7)
+
+
+def get_weather_move_multiplier(move_type: str | None, attacker_weather_id: int) -> float:
+    move_type_norm = str(move_type or "").lower()
+    if attacker_weather_id == WEATHER_TO_ID["rain"]:
+        if move_type_norm == "water":
+            return 1.5
+        if move_type_norm == "fire":
+            return 0.5
+    elif attacker_weather_id == WEATHER_TO_ID["sun"]:
+        if move_type_norm == "fire":
+            return 1.5
+        if move_type_norm == "water":
+            return 0.5
+    return 1.0
+
+
+def get_weather_name_from_id(weather_id: int) -> str:
+    """Convert weather ID back to name. ID 0 is 'clear'."""
+    for name, wid in WEATHER_TO_ID.items():
+        if wid == weather_id:
+            return name
+    return "clear"
+
+
+def weather_condition_matches(weather_id: int, condition: str) -> bool:
+    """Check if a weather condition matches the current weather_id.
+    
+    Args:
+        weather_id: Current weather ID (0=clear, 1=sun, 2=rain, 3=sandstorm, 4=hail)
+        condition: Condition string ('sun', 'clear', '*', etc.)
+    
+    Returns:
+        True if condition matches current weather
+    """
+    condition_lower = str(condition or "").lower()
+    
+    # Wildcard always matches
+    if condition_lower == "*":
+        return True
+    
+    # Map condition name to ID and compare
+    if condition_lower == "clear":
+        return weather_id == 0
+    
+    condition_id = WEATHER_TO_ID.get(condition_lower)
+    if condition_id is not None:
+        return weather_id == condition_id
+    
+    return False
+
+
+def terrain_condition_matches(terrain_id: int, condition: str) -> bool:
+    condition_lower = str(condition or "").lower()
+    if condition_lower in {"", "*", "any"}:
+        return terrain_id > 0
+    if condition_lower == "none":
+        return terrain_id == 0
+    expected = TERRAIN_TO_ID.get(condition_lower)
+    return expected is not None and terrain_id == expected
+
+
+def try_add_hazard_stack(hazard_entries: list[list[int]], hazard_id: int, duration_turns: int) -> bool:
+    if hazard_id <= 0 or duration_turns <= 0:
+        return False
+
+    max_stacks = int(FIELD_HAZARD_STACK_LIMITS.get(hazard_id, 1))
+    current_stacks = sum(1 for entry in hazard_entries if int(entry[0]) == hazard_id)
+    if current_stacks >= max_stacks:
+        return False
+
+    hazard_entries.append([hazard_id, duration_turns])
+    return True
+
+
+def format_stat_log_label(stat: str) -> str:
+    normalized_stat = normalize_stat_name(stat)
+    if normalized_stat == "all":
+        return "all stats"
+    return STAT_LOG_LABELS.get(normalized_stat, normalized_stat.replace("_", " "))
+
+
+def format_status_log_label(status: str) -> str:
+    normalized_status = normalize_status_name(status)
+    return STATUS_LOG_LABELS.get(normalized_status, normalized_status.replace("_", " "))
+
+
+def format_stat_change_outcome_phrase(delta_stage: int, attempted_direction: int) -> str:
+    """Format user-facing stat change outcome text from applied stage delta."""
+    if delta_stage > 0:
+        if delta_stage == 1:
+            return "rose."
+        if delta_stage == 2:
+            return "rose sharply."
+        return "rose drastically."
+
+    if delta_stage < 0:
+        if delta_stage == -1:
+            return "fell."
+        if delta_stage == -2:
+            return "harshly fell."
+        return "severely fell."
+
+    if attempted_direction >= 0:
+        return "won't go higher."
+    return "won't go lower."
+
+
+def get_type_multiplier(
+    move_type: str,
+    defender_types: List[str],
+    *,
+    ignore_fairy_immunity: bool = False,
+) -> float:
+    # Backwards-compatible signature: accept optional defender unit by passing as third arg
+    defender_unit = None
+    db = None
+    # If caller passed a GameUnit instead of a list for defender_types, adjust
+    if not move_type:
+        return 1
+    # Allow defender_types to be either a list of types or (types, unit, db)
+    if isinstance(defender_types, tuple) and len(defender_types) >= 2:
+        # Expect (types_list, defender_unit) or (types_list, defender_unit, db)
+        types_list = defender_types[0]
+        defender_unit = defender_types[1] if len(defender_types) >= 2 else None
+        db = defender_types[2] if len(defender_types) >= 3 else None
+        defender_types = types_list
+
+    move_type_id = type_id(move_type)
+    if move_type_id is None:
+        return 1
+    chart_row = EFFECTIVENESS[move_type_id]
+    multiplier = 1.0
+    for dtype in defender_types or []:
+        defender_type_id = type_id(dtype)
+        if defender_type_id is None:
+            continue
+        factor = chart_row[defender_type_id]
+        # Handle immunities; certain states (foresight/mind_reader) can bypass them
+        if factor == 0:
+            if ignore_fairy_immunity and str(dtype).lower() == "fairy" and str(move_type).lower() == "dragon":
+                pass
+            else:
+                try:
+                    # If defender_unit supplied and has foresight/mind_reader, ignore specific immunities
+                    if defender_unit is not None:
+                        s = normalize_states(defender_unit.states)
+                        if s and int(s[1]) > 0:
+                            state_name = s[0]
+                            if state_name == "foresight" and str(move_type).lower() in {"normal", "fighting"}:
+                                # bypass immunity
+                                pass
+                            elif state_name == "mind_reader" and str(move_type).lower() == "psychic":
+                                pass
+                            else:
+                                return 0
+                        else:
+                            return 0
+                    else:
+                        return 0
+                except Exception:
+                    return 0
+        else:
+            multiplier *= factor
+    return multiplier
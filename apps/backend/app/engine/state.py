@@ -0,0 +1,148 @@
+"""Plain battle state the engine functions read and update.
+
+The field names follow the ``GameUnit`` and ``GameMapState`` columns they are
+loaded from, so the stateless rule helpers in ``app.engine.rules`` and
+``app.map_movement`` accept engine objects and ORM rows alike.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+
+from app.engine.rules import normalize_states
+from app.map_grids import hazard_entries_at, timed_effect_id_at, weather_id_at
+from app.terrain_cache import CompiledTerrain
+
+
+@dataclass(slots=True)
+class EngineUnit:
+    id: int
+    user_id: int
+    name: str
+    current_x: int
+    current_y: int
+    current_hp: int
+    current_stats: dict
+    level: int = 50
+    types: frozenset[str] = frozenset()
+    ability_names: frozenset[str] = frozenset()
+    # Species base stats; None keeps current_stats as they are when stats are recomputed.
+    base_stats: dict | None = None
+    stat_boosts: dict = field(default_factory=dict)
+    status_effects: list = field(default_factory=list)
+    states: list = field(default_factory=list)
+    starting_x: int | None = None
+    starting_y: int | None = None
+    can_move: bool = True
+    # Stat stages when the owner's turn started; None until the first snapshot.
+    turn_start_stages: dict | None = None
+
+    @property
+    def max_hp(self) -> int:
+        return int((self.current_stats or {}).get("hp", 0) or 0)
+
+    @property
+    def position(self) -> tuple[int, int]:
+        return self.current_x, self.current_y
+
+    @property
+    def origin(self) -> tuple[int, int]:
+        """Tile the unit started its turn on; movement ranges are measured from here."""
+        if self.starting_x is None or self.starting_y is None:
+            return self.position
+        return self.starting_x, self.starting_y
+
+    def has_state(self, name: str) -> bool:
+        state = normalize_states(self.states)
+        return bool(state and state[0] == name and int(state[1]) > 0)
+
+
+@dataclass(slots=True)
+class SideState:
+    """One player's units; side-wide effects are read from their active states."""
+
+    user_id: int
+    units: list[EngineUnit] = field(default_factory=list)
+
+    def active_states(self) -> set[str]:
+        active = set()
+        for unit in self.units:
+            state = normalize_states(unit.states)
+            if state and int(state[1]) > 0:
+                active.add(state[0])
+        return active
+
+    @property
+    def has_tailwind(self) -> bool:
+        return any(unit.has_state("tailwind") for unit in self.units)
+
+
+@dataclass(slots=True)
+class BattleMap:
+    width: int
+    height: int
+    special_tiles: list | None = None
+    weather_tiles: list | None = None
+    hazard_tiles: list | None = None
+    terrain_effect_tiles: list | None = None
+    field_effect_tiles: list | None = None
+    # Compiled movement graph and cost grids; only movement needs it.
+    terrain: CompiledTerrain | None = None
+
+    def in_bounds(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def weather_at(self, x: int, y: int) -> int:
+        return weather_id_at(self.weather_tiles, x, y)
+
+    def hazards_at(self, x: int, y: int) -> list[list[int]]:
+        return hazard_entries_at(self.hazard_tiles, x, y)
+
+    def terrain_at(self, x: int, y: int) -> int:
+        return timed_effect_id_at(self.terrain_effect_tiles, x, y)
+
+
+@dataclass(slots=True)
+class Battle:
+    """A game's units and map at one point in time, plus the log lines produced since loading.
+
+    ``rng`` is anything with the ``random.Random`` interface; seed it to make
+    every roll (accuracy, damage, critical hits, status durations) repeatable.
+    """
+
+    units: list[EngineUnit]
+    map: BattleMap
+    current_turn: int = 0
+    rng: random.Random = field(default_factory=random.Random)
+    logs: list[str] = field(default_factory=list)
+    sides: dict[int, SideState] = field(init=False)
+    units_by_id: dict[int, EngineUnit] = field(init=False)
+
+    def __post_init__(self):
+        self.units_by_id = {unit.id: unit for unit in self.units}
+        self.sides = {}
+        for unit in self.units:
+            self.sides.setdefault(unit.user_id, SideState(unit.user_id)).units.append(unit)
+
+    def unit(self, unit_id: int) -> EngineUnit | None:
+        return self.units_by_id.get(unit_id)
+
+    def side(self, user_id: int) -> SideState:
+        side = self.sides.get(user_id)
+        if side is None:
+            side = self.sides[user_id] = SideState(user_id)
+        return side
+
+    def units_for_player(self, user_id: int) -> list[EngineUnit]:
+        return list(self.side(user_id).units)
+
+    def occupied_tiles(self, *, exclude: EngineUnit | None = None) -> set[tuple[int, int]]:
+        return {
+            unit.position
+            for unit in self.units
+            if unit is not exclude and unit.current_hp > 0
+        }
+
+    def log(self, message: str) -> None:
+        self.logs.append(message)
@@ -0,0 +1,168 @@
+"""Tiles a move can be aimed at from a unit's tile.
+
+These mirror the attack overlay the client draws (``rebuildAttackOverlay`` in
+``GamePage.tsx``): for directional shapes the tiles of all four directions are
+returned together, since the direction is picked when the move is used. Range
+specs the client draws nothing for (``field``, ``self, ally``, multi-offset
+specs such as ``line:2:1``) have no tiles.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from app.engine.moves import Move
+
+Tile = tuple[int, int]
+Offset = tuple[int, int]
+
+DIRECTIONS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+
+def parse_move_range_spec(move: Move) -> tuple[str, int]:
+    raw = str(getattr(move, "range", "") or getattr(move, "targeting", "") or "").lower().strip()
+    m = re.match(r"^([a-z_]+)(?::(\d+))?$", raw)
+    if not m:
+        return "", 0
+    kind = m.group(1) or ""
+    offset = int(m.group(2)) if m.group(2) else 0
+    return kind, offset
+
+
+def pulse_tiles(origin_x: int, origin_y: int, pulse: int, width: int, height: int) -> list[Tile]:
+    # Must mirror frontend pulse semantics exactly.
+    # pulse:1 -> cardinal neighbors at radius 1 (no diagonals)
+    # pulse:2 -> radius 1 including diagonals, excluding self
+    # pulse:3 -> radius 1 including diagonals and self
+    # pulse:4/5/6 are the above, extended to radius 2
+    is_extended = pulse >= 4
+    radius = 2 if is_extended else 1
+    base_mode = ((pulse - 1) % 3) + 1  # maps 1..6 -> 1..3
+
+    tiles: list[Tile] = []
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            tx = origin_x + dx
+            ty = origin_y + dy
+            if tx < 0 or ty < 0 or tx >= width or ty >= height:
+                continue
+
+            manhattan = abs(dx) + abs(dy)
+            chebyshev = max(abs(dx), abs(dy))
+
+            if base_mode == 1:
+                if manhattan >= 1 and manhattan <= radius and (dx == 0 or dy == 0):
+                    tiles.append((tx, ty))
+            elif base_mode == 2:
+                if chebyshev >= 1 and chebyshev <= radius:
+                    tiles.append((tx, ty))
+            else:
+                if chebyshev <= radius:
+                    tiles.append((tx, ty))
+
+    return tiles
+
+
+def move_effect_tiles(move: Move, origin: Tile, width: int, height: int) -> list[Tile]:
+    """Tiles a field effect of ``move`` (weather, terrain, hazards, ...) covers when used from ``origin``."""
+    x, y = origin
+    kind, offset = parse_move_range_spec(move)
+
+    if kind == "pulse":
+        pulse = offset if offset > 0 else 1
+        return pulse_tiles(x, y, pulse, width, height)
+
+    # Conservative default for field moves that do not yet have backend tile logic:
+    # affect only user's tile instead of entire map.
+    if 0 <= x < width and 0 <= y < height:
+        return [(x, y)]
+    return []
+
+
+def _blast(offset: int) -> list[Offset]:
+    return [(forward, side) for forward in (offset, offset + 1) for side in (-1, 0, 1)]
+
+
+def _sweep(offset: int) -> list[Offset]:
+    return [(offset, side) for side in (-1, 0, 1)]
+
+
+def _ranged(offset: int) -> list[Offset]:
+    return [(offset + 1, 0)]
+
+
+def _line(offset: int) -> list[Offset]:
+    return [(forward, 0) for forward in range(1, offset + 1)]
+
+
+def _bomb(offset: int) -> list[Offset]:
+    # A plus around a point 2 tiles away; bomb:2 also hits the point itself.
+    plus = [(1, 0), (3, 0), (2, -1), (2, 1)]
+    return plus + [(2, 0)] if offset >= 2 else plus
+
+
+def _cone_layers(offset: int, *, inverted: bool) -> list[Offset]:
+    include_middles = offset % 2 == 0
+    deep = offset > 2
+    if inverted:
+        layers = [(1, 0), (2, 1), (3, 2)] if deep else [(1, 0), (2, 1)]
+    else:
+        layers = [(1, 2), (2, 1), (3, 0)] if deep else [(1, 1), (2, 0)]
+    shape = []
+    for index, (forward, half) in enumerate(layers):
+        for side in range(-half, half + 1):
+            # Odd cones leave out the middle of each layer after the first.
+            if half == 0 or (index == 0 and not inverted) or include_middles or abs(side) > half - 1:
+                shape.append((forward, side))
+    return shape
+
+
+def _x_attack(offset: int) -> list[Offset]:
+    return [(offset, 0), (offset - 1, -1), (offset - 1, 1), (offset + 1, -1), (offset + 1, 1)]
+
+
+# kind -> (shape for a given offset as (forward, side) pairs, distance of the
+# tile that must be on the map for that direction to count, if any).
+RANGE_SHAPES: dict[str, tuple[Callable[[int], list[Offset]], Callable[[int], int] | None]] = {
+    "adjacent": (lambda offset: [(1, 0)], None),
+    "blast": (_blast, None),
+    "sweep": (_sweep, None),
+    "ranged": (_ranged, None),
+    "line": (_line, None),
+    "bomb": (_bomb, lambda offset: 2),
+    "cone": (lambda offset: _cone_layers(offset, inverted=False), None),
+    "inverted_cone": (lambda offset: _cone_layers(offset, inverted=True), None),
+    "x_attack": (_x_attack, lambda offset: offset),
+    # Dash and jump attacks strike 2 tiles away, landing on the tile between.
+    "dash_attack": (lambda offset: [(2, 0)], None),
+    "jump_attack": (lambda offset: [(2, 0)], None),
+}
+
+
+def move_range_tiles(move: Move, origin: Tile, width: int, height: int) -> set[Tile]:
+    """Every tile ``move`` can strike from ``origin``, clipped to the map."""
+    kind, offset = parse_move_range_spec(move)
+    x, y = origin
+    if kind == "pulse":
+        return set(pulse_tiles(x, y, offset or 1, width, height))
+    if kind == "self":
+        return {(x, y)} if 0 <= x < width and 0 <= y < height else set()
+    if kind not in RANGE_SHAPES:
+        return set()
+
+    build_shape, anchor = RANGE_SHAPES[kind]
+    shape = build_shape(offset or 1)
+    tiles = set()
+    for dx, dy in DIRECTIONS:
+        if anchor is not None:
+            distance = anchor(offset or 1)
+            if not (0 <= x + dx * distance < width and 0 <= y + dy * distance < height):
+                continue
+        for forward, side in shape:
+            # Rotate (forward, side) so "forward" points along (dx, dy).
+            tx, ty = x + dx * forward - dy * side, y + dy * forward + dx * side
+            if 0 <= tx < width and 0 <= ty < height:
+                tiles.add((tx, ty))
+    return tiles
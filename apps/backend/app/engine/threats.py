@@ -0,0 +1,110 @@
+"""Threat maps: the tiles each unit could strike on its next turn.
+
+A unit's threat is every tile one of its damaging moves covers (the attack
+shapes of ``app.engine.targeting``) from any tile it can move to from where it
+stands now, with enemy units blocking its paths. A player's threat map is the union of the threats of every unit that
+is not theirs.
+
+Threats are kept per unit as bitsets: Python ints with bit ``y * width + x``
+set for each threatened tile, sent as base64 of the little-endian bytes. When
+a unit moves or faints, only the units whose movement it can have changed
+need recomputing (``stale_threat_unit_ids``); everything else is kept.
+"""
+
+from __future__ import annotations
+
+import base64
+from typing import TYPE_CHECKING, Iterable
+
+from app.engine.movement import reachable_tiles
+from app.engine.moves import move_deals_direct_damage
+from app.engine.state import Battle, BattleMap, EngineUnit
+from app.engine.targeting import Tile, move_range_tiles
+from app.map_movement import unit_can_pass_through_units
+
+if TYPE_CHECKING:
+    from app.engine.moves import Move
+
+
+def tiles_to_bits(tiles: Iterable[Tile], width: int) -> int:
+    bits = 0
+    for x, y in tiles:
+        bits |= 1 << (y * width + x)
+    return bits
+
+
+def bits_to_tiles(bits: int, width: int) -> list[Tile]:
+    return [(index % width, index // width) for index in range(bits.bit_length()) if bits >> index & 1]
+
+
+def encode_bits(bits: int, width: int, height: int) -> str:
+    return base64.b64encode(bits.to_bytes((width * height + 7) // 8, "little")).decode("ascii")
+
+
+def decode_bits(value: str) -> int:
+    return int.from_bytes(base64.b64decode(value), "little")
+
+
+def threat_tiles(battle: Battle, unit: EngineUnit, moves: list[Move]) -> set[Tile]:
+    """Tiles ``unit`` could strike next turn with ``moves`` from anywhere it can move to."""
+    battle_map: BattleMap = battle.map
+    moves = [move for move in moves if move_deals_direct_damage(move)]
+    if unit.current_hp <= 0 or not moves or not battle_map.in_bounds(*unit.position):
+        return set()
+    types = set(unit.types)
+    blocked_tiles = (
+        set()
+        if unit_can_pass_through_units(types)
+        else {other.position for other in battle.units if other.user_id != unit.user_id and other.current_hp > 0}
+    )
+    stops = reachable_tiles(
+        battle_map,
+        unit.position,
+        int(unit.current_stats.get("range", 0) or 0),
+        types,
+        set(unit.ability_names),
+        blocked_tiles,
+    )
+    threatened: set[Tile] = set()
+    for x, y in stops:
+        for move in moves:
+            threatened |= move_range_tiles(move, (x, y), battle_map.width, battle_map.height)
+    return threatened
+
+
+def threat_bits(battle: Battle, unit: EngineUnit, moves: list[Move]) -> int:
+    return tiles_to_bits(threat_tiles(battle, unit, moves), battle.map.width)
+
+
+def stale_threat_unit_ids(battle: Battle, changed: dict[int, Tile]) -> set[int]:
+    """Units whose threat may differ after the units in ``changed`` moved or fainted.
+
+    ``changed`` maps each moved or fainted unit to the tile it stood on before.
+    Those units are stale themselves. An enemy of theirs is stale when the old
+    or new tile is within its movement range of it, since only then can the
+    change open or close one of its paths (every step costs at least 1).
+    """
+    stale = set(changed)
+    for unit_id, previous in changed.items():
+        mover = battle.units_by_id.get(unit_id)
+        owner = mover.user_id if mover is not None else None
+        tiles = [previous]
+        if mover is not None and mover.current_hp > 0:
+            tiles.append(mover.position)
+        for unit in battle.units:
+            if unit.current_hp <= 0 or unit.user_id == owner:
+                continue
+            move_range = int(unit.current_stats.get("range", 0) or 0)
+            ux, uy = unit.position
+            if any(abs(ux - tx) + abs(uy - ty) <= move_range for tx, ty in tiles):
+                stale.add(unit.id)
+    return stale
+
+
+def player_threat_bits(unit_bits: dict[int, tuple[int, int]], player_id: int) -> int:
+    """OR of the threats of every unit in ``{unit_id: (owner_id, bits)}`` not owned by ``player_id``."""
+    bits = 0
+    for owner_id, unit_threat in unit_bits.values():
+        if owner_id != player_id:
+            bits |= unit_threat
+    return bits
@@ -0,0 +1,222 @@
+"""Stat, status and stat-stage rules for engine units."""
+
+from __future__ import annotations
+
+from app.engine.rules import (
+    SCREEN_EFFECT_DURATION,
+    SIDE_SCREEN_STATE_NAMES,
+    STATUS_TYPE_IMMUNITIES,
+    VALID_STATE_EFFECTS,
+    VALID_STATUS_EFFECTS,
+    get_stat_multiplier,
+    normalize_stat_boosts,
+    normalize_stat_name,
+    normalize_states,
+    normalize_status_effects,
+    normalize_status_name,
+    status_duration,
+)
+from app.engine.state import Battle, EngineUnit
+
+
+def _base_stat(stat_name: str, base_value, level: int, stat_boosts) -> int:
+    if stat_name.lower() == "hp":
+        # HP formula: floor((2 × Base × Level) / 100) + Level + 10; boosts never apply.
+        return int((2 * base_value * level) / 100) + level + 10
+    # Other stats: floor((2 × Base × Level) / 100 + 5), then the stage multiplier.
+    base_stat = int((2 * base_value * level) / 100 + 5)
+    return int(base_stat * get_stat_multiplier(stat_boosts, stat_name))
+
+
+def effective_stats(
+    base_stats: dict | None,
+    level: int | None,
+    stat_boosts,
+    status_effects,
+    *,
+    tailwind: bool = False,
+    fallback: dict | None = None,
+) -> dict:
+    """Battle stats from species base stats, stat stages, Tailwind and status.
+
+    Returns ``fallback`` (the unit's current stats) when there are no base stats.
+    """
+    if not isinstance(base_stats, dict):
+        return fallback or {}
+
+    level = level or 50
+    stats = {}
+    for stat_name, base_value in base_stats.items():
+        # Range is derived from speed after all modifiers.
+        if stat_name.lower() != "range":
+            stats[stat_name] = _base_stat(stat_name, base_value, level, stat_boosts)
+
+    # Tailwind on the unit's side doubles speed before status modifiers.
+    if tailwind and "speed" in stats:
+        stats["speed"] = int(stats["speed"] * 2)
+
+    status_effect = normalize_status_effects(status_effects)
+    if status_effect:
+        status_name = status_effect[0]
+        if status_name == "burn" and "attack" in stats:
+            stats["attack"] = int(stats["attack"] // 2)
+        elif status_name == "paralysis" and "speed" in stats:
+            stats["speed"] = int(stats["speed"] // 2)
+
+    # Movement range scales with current speed (after boosts/debuffs/status).
+    speed_value = stats.get("speed")
+    if isinstance(speed_value, (int, float)) and speed_value > 0:
+        stats["range"] = max(0, int(2 + (speed_value / 50)))
+    else:
+        stats["range"] = 0
+    return stats
+
+
+def refresh_stats(battle: Battle, unit: EngineUnit) -> None:
+    unit.current_stats = effective_stats(
+        unit.base_stats,
+        unit.level,
+        unit.stat_boosts,
+        unit.status_effects,
+        tailwind=battle.side(unit.user_id).has_tailwind,
+        fallback=unit.current_stats,
+    )
+
+
+def is_status_immune(unit: EngineUnit, status: str) -> bool:
+    immune_types = STATUS_TYPE_IMMUNITIES.get(status)
+    return bool(immune_types) and any(unit_type in immune_types for unit_type in unit.types)
+
+
+def apply_status(battle: Battle, unit: EngineUnit, status: str) -> bool:
+    """Give ``unit`` a major status unless it already has one or its types are immune."""
+    status = normalize_status_name(status)
+    if status not in VALID_STATUS_EFFECTS:
+        return False
+
+    current_status_effects = normalize_status_effects(unit.status_effects)
+    if len(current_status_effects) == 2 and int(current_status_effects[1]) > 0:
+        return False
+    if is_status_immune(unit, status):
+        return False
+
+    duration = status_duration(status, battle.rng)
+    unit.status_effects = [status, duration, 1] if status == "badly_poisoned" else [status, duration]
+    refresh_stats(battle, unit)
+    return True
+
+
+def cure_status(battle: Battle, unit: EngineUnit, status_spec: str) -> bool:
+    """Cure ``unit``'s status when it matches ``status_spec`` ("all", "any" or a comma list)."""
+    current_status_effects = normalize_status_effects(unit.status_effects)
+    if not current_status_effects:
+        return False
+
+    current_status_name = str(current_status_effects[0]).lower()
+    normalized_spec = str(status_spec or "").strip().lower()
+    if normalized_spec not in {"all", "any"}:
+        requested_statuses = {
+            normalize_status_name(token)
+            for token in normalized_spec.split(",")
+            if token and token.strip()
+        }
+        if current_status_name not in requested_statuses:
+            return False
+
+    unit.status_effects = []
+    refresh_stats(battle, unit)
+    return True
+
+
+# Turns a state lasts when applied; confusion rolls 2-5. Valid states missing
+# here (Encore, Foresight, Mind Reader, Power Trick) are accepted but not stored.
+STATE_DURATIONS = {
+    **{name: SCREEN_EFFECT_DURATION for name in SIDE_SCREEN_STATE_NAMES},
+    "aqua_ring": SCREEN_EFFECT_DURATION,
+    "ingrain": SCREEN_EFFECT_DURATION,
+    "laser_focus": 1,
+    "heal_block": SCREEN_EFFECT_DURATION,
+    "cursed": SCREEN_EFFECT_DURATION,
+    # Nightmare persists while the unit is asleep; use a long duration and remove when sleep ends
+    "nightmare": 9999,
+    # Prevents movement for 3 turns but does not prevent using moves
+    "immobilized": 3,
+    "salt_cure": SCREEN_EFFECT_DURATION,
+    "taunt": SCREEN_EFFECT_DURATION,
+    # Torment prevents the unit from using the same move twice in a row
+    "torment": SCREEN_EFFECT_DURATION,
+    # Telekinesis makes moves (except OHKO moves) always hit this unit
+    # and prevents Ground-type moves from hitting it.
+    "telekinesis": SCREEN_EFFECT_DURATION,
+    # Tar Shot increases damage taken from Fire-type moves
+    "tar_shot": SCREEN_EFFECT_DURATION,
+    # Gastro Acid suppresses the unit's ability
+    "gastro_acid": SCREEN_EFFECT_DURATION,
+    # Embargo prevents the unit from using its held item
+    "embargo": SCREEN_EFFECT_DURATION,
+    # Destiny Bond lasts until the unit can move again (tracked as 1 turn)
+    "destiny_bond": 1,
+    "flinch": 1,
+    "glaive_rush": 1,
+    "substitute": 9999,
+}
+
+
+def apply_state(battle: Battle, unit: EngineUnit, state_name: str) -> bool:
+    """Give ``unit`` a state unless it already has an active one; Power Trick toggles off instead."""
+    state_name = str(state_name or "").strip().lower()
+    if state_name not in VALID_STATE_EFFECTS:
+        return False
+
+    current_state = normalize_states(unit.states)
+    has_active_state = len(current_state) == 2 and int(current_state[1]) > 0
+    if state_name == "power_trick" and has_active_state and current_state[0] == "power_trick":
+        unit.states = []
+        return True
+    if has_active_state:
+        return False
+
+    if state_name == "confusion":
+        unit.states = [state_name, battle.rng.randint(2, 5)]
+    elif state_name in STATE_DURATIONS:
+        unit.states = [state_name, STATE_DURATIONS[state_name]]
+    return True
+
+
+def stack_stat_change(stat_boosts, stat: str, magnitude: int) -> dict:
+    """Add a stat change to ``stat_boosts``, cancelling opposite-sign instances first.
+
+    Opposite instances are consumed soonest-expiring first, partially when the
+    magnitudes differ. What is left is added as a new instance lasting 4 turns
+    (including the turn it was applied). Returns the new boosts dict.
+    """
+    stat = normalize_stat_name(stat)
+    boosts = normalize_stat_boosts(stat_boosts)
+    instances = boosts.setdefault(stat, [])
+    remaining = magnitude
+
+    i = 0
+    while i < len(instances) and remaining != 0:
+        existing = instances[i].get("magnitude", 0)
+        if (remaining > 0 and existing < 0) or (remaining < 0 and existing > 0):
+            if abs(remaining) < abs(existing):
+                instances[i]["magnitude"] = existing + abs(remaining) if existing < 0 else existing - abs(remaining)
+                remaining = 0
+                i += 1
+            elif abs(remaining) > abs(existing):
+                remaining = remaining - abs(existing) if remaining > 0 else remaining + abs(existing)
+                instances.pop(i)
+            else:
+                instances.pop(i)
+                remaining = 0
+        else:
+            i += 1
+
+    if remaining != 0:
+        instances.append({"magnitude": remaining, "expires_turn": 4})
+    return boosts
+
+
+def apply_stat_change(battle: Battle, unit: EngineUnit, stat: str, magnitude: int) -> None:
+    unit.stat_boosts = stack_stat_change(unit.stat_boosts, stat, magnitude)
+    refresh_stats(battle, unit)
@@ -0,0 +1,200 @@
+"""Per-game command serialization.
+
+Every command that mutates a game (moves, attacks, placements, turn ends and
+the scheduler's turn advance) runs under a lease keyed by the game link:
+
+* an in-process lock, so requests for the same game on one worker queue up
+  without polling Redis, and
+* a Redis lease (``SET NX PX`` with an owner token) shared by all workers.
+
+Commands for different games never contend; commands for the same game run one
+at a time. Waiting for a busy game is bounded by ``LEASE_WAIT_SECONDS``, after
+which the request fails with 409.
+
+The lease is the fast path, not the only guard. ``GameState`` carries a
+``version_id_col``; while a command is active, any flush that writes the
+game's units, players or map state also bumps the state's version, so a commit
+made from a stale read (an expired lease, Redis being down) fails with
+``StaleDataError`` instead of overwriting the other writer. The app maps that
+error to 409 as well.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator
+
+import redis
+from fastapi import Depends, HTTPException
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified, set_committed_value
+
+from app.db.models import GameMapState, GamePlayer, GameState, GameUnit
+from app.dependencies import get_db
+from app.instrumentation import InstrumentedRedis
+
+logger = logging.getLogger("game_commands")
+
+LEASE_KEY_PREFIX = "game_command:"
+LEASE_MS = 30_000
+LEASE_WAIT_SECONDS = 5.0
+LEASE_POLL_SECONDS = 0.02
+# After a Redis error, run on the in-process lock alone for a while instead of
+# paying a failed round trip on every command.
+REDIS_RETRY_SECONDS = 30.0
+COMMAND_INFO_KEY = "game_commands"
+
+redis_client = InstrumentedRedis(host="redis", port=6379, decode_responses=True)
+
+# Delete the lease only if this command still owns it.
+_RELEASE_LEASE_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_local_locks: dict[str, list] = {}
+_local_locks_guard = threading.Lock()
+_redis_down_until = 0.0
+
+
+class GameBusyError(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=409, detail="Game is busy, try again")
+
+
+@contextmanager
+def _local_lock(key: str, timeout: float) -> Iterator[bool]:
+    # Locks are reference counted so the table only holds games with commands in flight.
+    with _local_locks_guard:
+        entry = _local_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    acquired = entry[0].acquire(timeout=timeout) if timeout > 0 else entry[0].acquire(blocking=False)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            entry[0].release()
+        with _local_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                _local_locks.pop(key, None)
+
+
+def _acquire_lease(key: str, token: str, deadline: float) -> bool | None:
+    """Take the Redis lease, polling until ``deadline``. None means Redis is unavailable."""
+    global _redis_down_until
+
+    if time.monotonic() < _redis_down_until:
+        return None
+    try:
+        while True:
+            if redis_client.set(key, token, nx=True, px=LEASE_MS):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(LEASE_POLL_SECONDS * (0.5 + random.random()))
+    except redis.RedisError:
+        logger.warning("Redis unavailable; serializing game commands in-process only")
+        _redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        return None
+
+
+def _release_lease(key: str, token: str) -> None:
+    try:
+        redis_client.eval(_RELEASE_LEASE_LUA, 1, key, token)
+    except redis.RedisError:
+        # The lease expires on its own.
+        return
+
+
+@contextmanager
+def game_command(link: str, db: Session | None = None, *, wait: bool = True) -> Iterator[bool]:
+    """Hold the command lease for ``link``.
+
+    With ``wait=False`` a busy game is skipped instead: the context yields
+    False and the caller must not touch the game. When ``db`` is given, its
+    flushes bump the version of the game's ``GameState`` while the lease is
+    held.
+    """
+    key = f"{LEASE_KEY_PREFIX}{link}"
+    timeout = LEASE_WAIT_SECONDS if wait else 0
+    deadline = time.monotonic() + timeout
+    with _local_lock(key, timeout) as locked:
+        if not locked:
+            if wait:
+                raise GameBusyError()
+            yield False
+            return
+        token = uuid.uuid4().hex
+        leased = _acquire_lease(key, token, deadline)
+        if leased is False:
+            if wait:
+                raise GameBusyError()
+            yield False
+            return
+        depth = 0
+        if db is not None:
+            depth = db.info.get(COMMAND_INFO_KEY, 0)
+            db.info[COMMAND_INFO_KEY] = depth + 1
+        try:
+            yield True
+        finally:
+            if db is not None:
+                if depth:
+                    db.info[COMMAND_INFO_KEY] = depth
+                else:
+                    db.info.pop(COMMAND_INFO_KEY, None)
+            if leased:
+                _release_lease(key, token)
+
+
+def serialize_game_commands(link: str, db: Session = Depends(get_db)) -> Iterator[None]:
+    """Route dependency: run the request as a command on the game at ``link``.
+
+    This is a sync dependency, so FastAPI runs it in the threadpool like the
+    sync routes it guards. Waiting for a busy game blocks that thread for up to
+    ``LEASE_WAIT_SECONDS``; every request queued on one game holds a thread for
+    that long, so keep the wait short.
+    """
+    with game_command(link, db):
+        yield
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_game_state_versions(session: Session, flush_context, instances) -> None:
+    if not session.info.get(COMMAND_INFO_KEY):
+        return
+    game_ids = {
+        obj.game_id
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(obj, (GameUnit, GamePlayer, GameMapState))
+    }
+    if not game_ids:
+        return
+    for obj in list(session.identity_map.values()):
+        if not isinstance(obj, GameState):
+            continue
+        loaded = obj.__dict__
+        missing = [key for key in ("game_id", "version", "status") if key not in loaded]
+        if missing:
+            # Expired by an earlier commit in the same command. Touching the attributes
+            # would reload the row mid-flush; read just the needed columns instead.
+            row = session.execute(
+                select(GameState.game_id, GameState.version, GameState.status).where(
+                    GameState.id == inspect(obj).identity[0]
+                )
+            ).one_or_none()
+            if row is None:
+                continue
+            for key in missing:
+                set_committed_value(obj, key, getattr(row, key))
+        if loaded["game_id"] in game_ids:
+            flag_modified(obj, "status")
@@ -0,0 +1,145 @@
+"""Request-scoped snapshot of one game for the move-resolution hot path.
+
+``load_game_context`` reads the game state, map, map state, player states and
+every unit (with species and owner) in a handful of eager queries. All rows
+live in the session's identity map, so primary-key lookups through ``db.get``
+are served from memory, and the ``*_for`` accessors below answer the per-game
+lookups that used to re-query by ``game_id``. Catalog rows (species, moves,
+abilities, items) come from ``app.catalog`` instead.
+
+The snapshot holds the session's own instances: changes made through it are
+flushed and committed as usual. It is attached to ``db.info`` and must be
+dropped with ``clear_game_context`` when the request finishes.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy.orm import Session, joinedload
+
+from app.db.models import Game, GameMapState, GamePlayer, GameState, GameUnit, Map, User
+
+CONTEXT_INFO_KEY = "game_context"
+
+
+class GameContext:
+    __slots__ = (
+        "game",
+        "state",
+        "map",
+        "map_state",
+        "units",
+        "units_by_id",
+        "player_states",
+        "users",
+    )
+
+    def __init__(
+        self,
+        game: Game,
+        state: GameState | None,
+        map_obj: Map | None,
+        map_state: GameMapState | None,
+        units: list[GameUnit],
+        player_states: list[GamePlayer],
+        users: list[User],
+    ):
+        self.game = game
+        self.state = state
+        self.map = map_obj
+        self.map_state = map_state
+        self.units = units
+        self.units_by_id = {unit.id: unit for unit in units}
+        self.player_states = {player.player_id: player for player in player_states}
+        # The identity map only holds weak references; keeping the rows here is what
+        # lets db.get() answer from memory for the rest of the request.
+        self.users = users
+
+    def unit(self, unit_id) -> GameUnit | None:
+        try:
+            return self.units_by_id.get(int(unit_id))
+        except (TypeError, ValueError):
+            return None
+
+    def units_for_player(self, user_id: int) -> list[GameUnit]:
+        return [unit for unit in self.units if unit.user_id == user_id]
+
+
+def load_game_context(db: Session, game: Game, state: GameState | None = None) -> GameContext:
+    """Load and attach the snapshot for ``game``, replacing any previous one."""
+    if state is None:
+        state = db.query(GameState).filter(GameState.game_id == game.id).first()
+    map_state = (
+        db.query(GameMapState)
+        .options(joinedload(GameMapState.map))
+        .filter(GameMapState.game_id == game.id)
+        .first()
+    )
+    map_obj = map_state.map if map_state is not None and map_state.map is not None else db.get(Map, game.map_id)
+    units = (
+        db.query(GameUnit)
+        .options(joinedload(GameUnit.unit), joinedload(GameUnit.owner))
+        .filter(GameUnit.game_id == game.id)
+        .order_by(GameUnit.id)
+        .all()
+    )
+    player_states = db.query(GamePlayer).filter(GamePlayer.game_id == game.id).all()
+
+    # Players whose units are all gone still need a name for turn and victory logs.
+    loaded_user_ids = {unit.user_id for unit in units}
+    missing_user_ids = {int(p) for p in (state.players or []) if int(p) not in loaded_user_ids} if state else set()
+    users = db.query(User).filter(User.id.in_(missing_user_ids)).all() if missing_user_ids else []
+
+    context = GameContext(game, state, map_obj, map_state, units, player_states, users)
+    db.info[CONTEXT_INFO_KEY] = context
+    return context
+
+
+def get_game_context(db: Session, game_id: int | None) -> GameContext | None:
+    info = getattr(db, "info", None)
+    if not isinstance(info, dict):
+        return None
+    context = info.get(CONTEXT_INFO_KEY)
+    if context is None or game_id is None or context.game.id != game_id:
+        return None
+    return context
+
+
+def clear_game_context(db: Session) -> None:
+    info = getattr(db, "info", None)
+    if isinstance(info, dict):
+        info.pop(CONTEXT_INFO_KEY, None)
+
+
+def game_state_for(db: Session, game_id: int) -> GameState | None:
+    context = get_game_context(db, game_id)
+    if context is not None and context.state is not None:
+        return context.state
+    return db.query(GameState).filter(GameState.game_id == game_id).first()
+
+
+def map_state_for(db: Session, game_id: int) -> GameMapState | None:
+    context = get_game_context(db, game_id)
+    if context is not None and context.map_state is not None:
+        return context.map_state
+    return db.query(GameMapState).filter(GameMapState.game_id == game_id).first()
+
+
+def game_units_for(db: Session, game_id: int) -> list[GameUnit]:
+    context = get_game_context(db, game_id)
+    if context is not None:
+        return list(context.units)
+    return db.query(GameUnit).filter(GameUnit.game_id == game_id).all()
+
+
+def player_state_for(db: Session, game_id: int, player_id: int) -> GamePlayer | None:
+    context = get_game_context(db, game_id)
+    if context is not None and player_id in context.player_states:
+        return context.player_states[player_id]
+    return db.query(GamePlayer).filter_by(game_id=game_id, player_id=player_id).first()
+
+
+def side_units_for(db: Session, game_id: int, user_id: int) -> list[GameUnit]:
+    context = get_game_context(db, game_id)
+    if context is not None:
+        return context.units_for_player(user_id)
+    return db.query(GameUnit).filter(GameUnit.game_id == game_id, GameUnit.user_id == user_id).all()
@@ -0,0 +1,72 @@
+"""Append-only per-game event log (system logs, chat lines, turn warnings).
+
+Events used to be kept in ``GameState.replay_log``, a JSON list that was
+copied and rewritten in full on every append. Each event is now one
+``GameEvent`` row numbered by a per-game ``seq``; the counter lives on the
+game's ``GameState`` (``event_seq``), so appending writes one small row and one
+integer, and a clash between concurrent writers fails on the
+``(game_id, seq)`` constraint instead of silently dropping entries.
+
+``event_tail`` is the bounded view ``GameResponse.replay_log`` serves, and
+``read_events`` pages through the full history by ``seq`` for replays. Both
+include events added in the current session but not flushed yet, since the
+session does not autoflush.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy.orm import Session
+
+from app.db.models import GameEvent, GameState
+
+REPLAY_TAIL_SIZE = 500
+EVENT_PAGE_SIZE = 200
+MAX_EVENT_PAGE_SIZE = 1000
+
+
+def append_events(db: Session, state: GameState, payloads: list[dict]) -> None:
+    if state.game_id is None:
+        return
+    seq = int(state.event_seq or 0)
+    for payload in payloads:
+        seq += 1
+        db.add(GameEvent(game_id=state.game_id, seq=seq, event=payload.get("event"), payload=payload))
+    state.event_seq = seq
+
+
+def _pending_events(db: Session, game_id: int) -> list[GameEvent]:
+    pending = [obj for obj in db.new if isinstance(obj, GameEvent) and obj.game_id == game_id]
+    pending.sort(key=lambda event: event.seq)
+    return pending
+
+
+def event_tail(db: Session, game_id: int, limit: int = REPLAY_TAIL_SIZE) -> list[dict]:
+    """Payloads of the last ``limit`` events, oldest first."""
+    pending = _pending_events(db, game_id)
+    stored = []
+    if len(pending) < limit:
+        rows = (
+            db.query(GameEvent.seq, GameEvent.payload)
+            .filter(GameEvent.game_id == game_id)
+            .order_by(GameEvent.seq.desc())
+            .limit(limit - len(pending))
+            .all()
+        )
+        stored = [payload for _, payload in reversed(rows)]
+    payloads = stored + [event.payload for event in pending]
+    return payloads[-limit:]
+
+
+def read_events(db: Session, game_id: int, after: int = 0, limit: int = EVENT_PAGE_SIZE) -> list[GameEvent]:
+    """Events with ``seq > after`` in order, at most ``limit`` of them."""
+    rows = (
+        db.query(GameEvent)
+        .filter(GameEvent.game_id == game_id, GameEvent.seq > after)
+        .order_by(GameEvent.seq)
+        .limit(limit)
+        .all()
+    )
+    if len(rows) < limit:
+        seen = {row.seq for row in rows}
+        rows.extend(event for event in _pending_events(db, game_id) if event.seq > after and event.seq not in seen)
+    return rows[:limit]
@@ -0,0 +1,282 @@
+"""Per-request query, Redis and latency accounting.
+
+``RequestMetricsMiddleware`` opens a ``RequestMetrics`` record for each HTTP
+request. SQLAlchemy engine hooks add every statement and its time to it, and
+``InstrumentedRedis`` (the client class the app modules use) adds every command
+or pipeline round trip. When the request finishes, the totals go into
+per-route histograms, which ``render_metrics`` exposes in the Prometheus text
+format on ``GET /metrics``. The histograms are per process, so scrape each
+worker.
+
+Development mode (``REQUEST_BUDGET_LOG=1``) also records where each statement
+came from. Any request over ``REQUEST_QUERY_BUDGET`` queries or
+``REQUEST_LATENCY_BUDGET_MS`` milliseconds is logged with its statements
+grouped by call site, which is how N+1 loops show up. In that mode, or with
+``REQUEST_METRICS_HEADERS=1``, responses also carry ``X-Query-Count`` (read by
+``scripts/load_test.py``).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from pathlib import Path
+
+import redis
+from redis.client import Pipeline
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("instrumentation")
+
+QUERY_COUNT_HEADER = "x-query-count"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_APP_ROOT = str(Path(__file__).resolve().parent)
+_SKIPPED_FILES = {__file__, str(Path(_APP_ROOT, "db", "database.py"))}
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _budget_log_enabled() -> bool:
+    return os.getenv("REQUEST_BUDGET_LOG") == "1"
+
+
+def _query_count_header_enabled() -> bool:
+    return _budget_log_enabled() or os.getenv("REQUEST_METRICS_HEADERS") == "1"
+
+
+def _query_budget() -> int:
+    return int(os.getenv("REQUEST_QUERY_BUDGET", "30"))
+
+
+def _latency_budget_seconds() -> float:
+    return float(os.getenv("REQUEST_LATENCY_BUDGET_MS", "500")) / 1000
+
+
+class RequestMetrics:
+    __slots__ = ("queries", "db_seconds", "redis_calls", "redis_seconds", "statements")
+
+    def __init__(self, trace_statements: bool = False):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.redis_calls = 0
+        self.redis_seconds = 0.0
+        # (call site, statement) -> [count, seconds]; only filled in development mode.
+        self.statements: dict[tuple[str, str], list] | None = defaultdict(lambda: [0, 0.0]) if trace_statements else None
+
+
+_current: ContextVar[RequestMetrics | None] = ContextVar("request_metrics", default=None)
+
+
+def current_request_metrics() -> RequestMetrics | None:
+    return _current.get()
+
+
+def _call_site() -> str:
+    """The innermost app frame outside this module, as ``path:line in function``."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_APP_ROOT) and filename not in _SKIPPED_FILES:
+            relative = os.path.relpath(filename, os.path.dirname(_APP_ROOT))
+            return f"{relative}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "<outside app>"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics = _current.get()
+    if metrics is None:
+        return
+    started = conn.info.get("query_started_at")
+    elapsed = time.perf_counter() - started.pop() if started else 0.0
+    metrics.queries += 1
+    metrics.db_seconds += elapsed
+    if metrics.statements is not None:
+        entry = metrics.statements[(_call_site(), _WHITESPACE.sub(" ", statement).strip())]
+        entry[0] += 1
+        entry[1] += elapsed
+
+
+def _record_redis_call(started: float) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.redis_calls += 1
+        metrics.redis_seconds += time.perf_counter() - started
+
+
+class InstrumentedPipeline(Pipeline):
+    def execute(self, raise_on_error: bool = True):
+        started = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            _record_redis_call(started)
+
+
+class InstrumentedRedis(redis.Redis):
+    """``redis.Redis`` that counts commands and pipeline round trips per request."""
+
+    def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            _record_redis_call(started)
+
+    def pipeline(self, transaction=True, shard_hint=None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+HISTOGRAMS = {
+    "http_request_duration_seconds": ("Request handling time.", LATENCY_BUCKETS),
+    "http_request_db_seconds": ("Time spent in SQL statements per request.", LATENCY_BUCKETS),
+    "http_request_db_queries": ("SQL statements per request.", COUNT_BUCKETS),
+    "http_request_redis_calls": ("Redis commands and pipeline round trips per request.", COUNT_BUCKETS),
+}
+
+_lock = threading.Lock()
+_requests_total: dict[tuple[str, str, str], int] = defaultdict(int)
+_histograms: dict[tuple[str, str, str], Histogram] = {}
+
+
+def observe_request(method: str, route: str, status: int, seconds: float, metrics: RequestMetrics) -> None:
+    values = {
+        "http_request_duration_seconds": seconds,
+        "http_request_db_seconds": metrics.db_seconds,
+        "http_request_db_queries": metrics.queries,
+        "http_request_redis_calls": metrics.redis_calls,
+    }
+    with _lock:
+        _requests_total[(method, route, str(status))] += 1
+        for name, value in values.items():
+            key = (name, method, route)
+            histogram = _histograms.get(key)
+            if histogram is None:
+                histogram = _histograms[key] = Histogram(HISTOGRAMS[name][1])
+            histogram.observe(value)
+
+
+def reset_metrics() -> None:
+    with _lock:
+        _requests_total.clear()
+        _histograms.clear()
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_metrics() -> str:
+    lines = [
+        "# HELP http_requests_total Requests handled.",
+        "# TYPE http_requests_total counter",
+    ]
+    with _lock:
+        for (method, route, status), count in sorted(_requests_total.items()):
+            lines.append(
+                f'http_requests_total{{method="{method}",route="{_label(route)}",status="{status}"}} {count}'
+            )
+        for name, (help_text, buckets) in HISTOGRAMS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, method, route), histogram in sorted(_histograms.items()):
+                if metric != name:
+                    continue
+                labels = f'method="{method}",route="{_label(route)}"'
+                cumulative = 0
+                for bound, count in zip((*buckets, "+Inf"), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram.total}")
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return "\n".join(lines) + "\n"
+
+
+def _log_over_budget(method: str, route: str, seconds: float, metrics: RequestMetrics) -> None:
+    if metrics.queries <= _query_budget() and seconds <= _latency_budget_seconds():
+        return
+    by_site: dict[str, list] = defaultdict(list)
+    for (site, statement), (count, spent) in (metrics.statements or {}).items():
+        by_site[site].append((count, spent, statement))
+    lines = [
+        f"{method} {route} over budget: {seconds * 1000:.0f} ms, {metrics.queries} queries "
+        f"({metrics.db_seconds * 1000:.0f} ms), {metrics.redis_calls} redis calls"
+    ]
+    ranked = sorted(by_site.items(), key=lambda item: -sum(count for count, _, _ in item[1]))
+    for site, statements in ranked:
+        total = sum(count for count, _, _ in statements)
+        lines.append(f"  {total:>4}x {site}")
+        for count, spent, statement in sorted(statements, key=lambda row: -row[0]):
+            lines.append(f"        {count:>4}x {spent * 1000:7.1f} ms  {statement[:200]}")
+    logger.warning("\n".join(lines))
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = _budget_log_enabled()
+        add_header = trace or _query_count_header_enabled()
+        metrics = RequestMetrics(trace_statements=trace)
+        token = _current.set(metrics)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_metrics(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if add_header:
+                    headers = list(message.get("headers") or [])
+                    headers.append((QUERY_COUNT_HEADER.encode(), str(metrics.queries).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            seconds = time.perf_counter() - started
+            _current.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "<unmatched>"
+            method = scope.get("method", "")
+            observe_request(method, route_path, status, seconds, metrics)
+            if trace:
+                _log_over_budget(method, route_path, seconds, metrics)
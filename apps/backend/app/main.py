@@ -1,64 +1,66 @@
 import os
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm.exc import StaleDataError
 from contextlib import asynccontextmanager
 from apscheduler.schedulers.background import BackgroundScheduler
-from sqlalchemy.orm import sessionmaker
-from app.startup import run_startup_tasks
-from app.db.database import get_sessionmaker
-from app.db.models import Game, GameState, GameStatus
+from app.instrumentation import RequestMetricsMiddleware
+from app.startup import run_startup_tasks, should_skip_startup_tasks
+from app.turn_scheduler import release_leadership, run_due_turns
+from app.user_cache import start_invalidation_listener, stop_invalidation_listener
 
-scheduler = BackgroundScheduler()
+scheduler: BackgroundScheduler | None = None
 
 def check_and_advance_turns():
-    """Periodically check all active games and advance turns if deadlines have passed."""
+    """Advance turns whose deadline or warning time has arrived (leader worker only)."""
     try:
-        Session = get_sessionmaker()
-        db = Session()
-        try:
-            # Import here to avoid circular imports
-            from app.routes.games import advance_if_expired
-            
-            games = db.query(Game).join(GameState).filter(
-                GameState.status == GameStatus.in_progress
-            ).all()
-            
-            for game in games:
-                game_state = db.query(GameState).filter_by(game_id=game.id).first()
-                if game_state:
-                    advance_if_expired(game, game_state, db)
-        except Exception as e:
-            print(f"Error in turn advancement: {e}")
-        finally:
-            db.close()
+        run_due_turns()
     except Exception as e:
-        print(f"Error connecting to database in turn check: {e}")
+        print(f"Error in turn advancement: {e}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handle startup and shutdown of background scheduler."""
-    # Startup
-    try:
-        scheduler.add_job(check_and_advance_turns, "interval", seconds=5)
-        scheduler.start()
-        print("Background scheduler started")
-    except Exception as e:
-        print(f"Failed to start scheduler: {e}")
+    global scheduler
+    # Test clients skip startup tasks; they also get no Redis-backed background work.
+    background = not should_skip_startup_tasks()
+    # Startup. A shut-down scheduler cannot be restarted (its thread pool is gone),
+    # so each lifespan gets a fresh one. Only the lease holder does work every
+    # tick; other workers retry the lease every FOLLOWER_RETRY_SECONDS.
+    if background:
+        try:
+            scheduler = BackgroundScheduler()
+            scheduler.add_job(check_and_advance_turns, "interval", seconds=1, max_instances=1, coalesce=True)
+            scheduler.start()
+            print("Background scheduler started")
+        except Exception as e:
+            print(f"Failed to start scheduler: {e}")
 
     run_startup_tasks()
+    if background:
+        start_invalidation_listener()
     
     yield
     
     # Shutdown
+    if not background:
+        return
+    stop_invalidation_listener()
     try:
         scheduler.shutdown()
+        release_leadership()
         print("Background scheduler stopped")
     except Exception:
         pass
 
 app = FastAPI(lifespan=lifespan)
 
+@app.exception_handler(StaleDataError)
+async def stale_game_state_handler(request: Request, exc: StaleDataError):
+    """Another command committed first (see app.game_commands); the client retries."""
+    return JSONResponse(status_code=409, content={"detail": "Game state changed, try again"})
+
 origins = [os.getenv("CORS_ORIGIN", "http://localhost:5173")]
 
 app.add_middleware(
@@ -68,8 +70,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestMetricsMiddleware)
 
-from app.routes import auth, games, maps, moves, user, units, ws, moderation, admin, items, abilities
+from app.routes import auth, games, maps, moves, user, units, ws, moderation, admin, items, abilities, metrics
 
 app.include_router(auth.router)
 app.include_router(games.router)
@@ -81,4 +84,5 @@ app.include_router(user.router)
 app.include_router(units.router)
 app.include_router(ws.router)
 app.include_router(moderation.router)
-app.include_router(admin.router)
\ No newline at end of file
+app.include_router(admin.router)
+app.include_router(metrics.router)
@@ -0,0 +1,274 @@
+"""Compact storage and wire encoding for ``GameMapState`` tile grids.
+
+The effect grids are map-sized 2D lists whose cells are mostly 0, ``None`` or
+``[]``. Stored as nested JSON, every single-tile change rewrote the whole
+grid, and ``GameResponse`` shipped all of them at full size. ``CompactGrid``
+(in ``app.db.types``) stores each grid in one of three encodings and decodes
+it back to the nested lists the game code works with:
+
+* ``sparse``: ``{"enc": "sparse", "w", "h", "empty", "cells": [[x, y, cell], ...]}``
+  for hazards and objectives, whose non-empty cells are lists or dicts;
+* ``rle``: ``{"enc": "rle", "w", "h", "runs": [cell, count, ...]}`` over the
+  row-major cells, used when the runs are at least four times shorter than
+  the grid or the cells are not plain integers;
+* ``packed``: ``{"enc": "packed", "w", "h", "t", "stride", "data"}`` with the
+  cells as a little-endian typed array (``t`` is an ``array`` typecode) in
+  base64. Timed cells (``[effect_id, turns]``) use ``stride`` 2. With
+  ``"nulls": true`` the type's minimum value stands for ``None``.
+
+Rows written before this encoding are plain nested lists and are read as they
+are; they are re-encoded the next time they are written. The same encodings
+are sent to clients that ask for ``GET /games/{link}?grids=compact``.
+
+The ``*_at`` helpers read one cell of a decoded grid and tolerate missing or
+ragged grids.
+"""
+
+from __future__ import annotations
+
+import base64
+import sys
+from array import array
+
+
+TERRAIN_DEFAULT_DURATION = 5
+
+GRID_FIELDS = (
+    "weather_tiles",
+    "hazard_tiles",
+    "room_effect_tiles",
+    "terrain_effect_tiles",
+    "field_effect_tiles",
+    "item_id_tiles",
+    "objective_tiles",
+)
+SPARSE_GRID_FIELDS = frozenset({"hazard_tiles", "objective_tiles"})
+
+# Smallest first; the minimum value of each type is reserved for None.
+_PACKED_TYPES = (("b", -(2**7), 2**7 - 1), ("h", -(2**15), 2**15 - 1), ("i", -(2**31), 2**31 - 1))
+_RLE_MIN_RATIO = 4
+_MISSING = object()
+
+
+def _dimensions(grid) -> tuple[int, int] | None:
+    if not isinstance(grid, list) or not grid or not all(isinstance(row, list) for row in grid):
+        return None
+    width = len(grid[0])
+    if any(len(row) != width for row in grid):
+        return None
+    return len(grid), width
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _flatten_packable(cells: list) -> tuple[list[int | None], int] | None:
+    """Cells as flat integers and their stride, or None if they are not all ints or int pairs."""
+    if all(cell is None or _is_int(cell) for cell in cells):
+        return cells, 1
+    if all(isinstance(cell, list) and len(cell) == 2 and _is_int(cell[0]) and _is_int(cell[1]) for cell in cells):
+        return [value for cell in cells for value in cell], 2
+    return None
+
+
+def _pack(values: list[int | None]) -> dict | None:
+    present = [value for value in values if value is not None]
+    low = min(present, default=0)
+    high = max(present, default=0)
+    for typecode, type_min, type_max in _PACKED_TYPES:
+        if type_min < low and high <= type_max:
+            packed = array(typecode, (type_min if value is None else value for value in values))
+            if sys.byteorder == "big":
+                packed.byteswap()
+            encoded = {"t": typecode, "data": base64.b64encode(packed.tobytes()).decode("ascii")}
+            if len(present) != len(values):
+                encoded["nulls"] = True
+            return encoded
+    return None
+
+
+def _runs(cells: list) -> list:
+    runs: list = []
+    for cell in cells:
+        if runs and runs[-2] == cell:
+            runs[-1] += 1
+        else:
+            runs.extend((cell, 1))
+    return runs
+
+
+def encode_grid(grid, *, sparse: bool = False):
+    """Encode a 2D grid for storage or the wire. Irregular grids are returned unchanged."""
+    dimensions = _dimensions(grid)
+    if dimensions is None:
+        return grid
+    height, width = dimensions
+
+    if sparse:
+        empty = _MISSING
+        cells = []
+        for y, row in enumerate(grid):
+            for x, cell in enumerate(row):
+                if (cell is None or cell == []) and empty is _MISSING:
+                    empty = cell
+                elif cell != empty:
+                    # Includes the other kind of empty cell, so None and [] both survive.
+                    cells.append([x, y, cell])
+        return {"enc": "sparse", "w": width, "h": height, "empty": None if empty is _MISSING else empty, "cells": cells}
+
+    flat = [cell for row in grid for cell in row]
+    runs = _runs(flat)
+    if len(runs) * _RLE_MIN_RATIO > len(flat) * 2:
+        flattened = _flatten_packable(flat)
+        if flattened is not None:
+            values, stride = flattened
+            packed = _pack(values)
+            if packed is not None:
+                return {"enc": "packed", "w": width, "h": height, "stride": stride, **packed}
+    return {"enc": "rle", "w": width, "h": height, "runs": runs}
+
+
+def _fresh(cell):
+    # Game code edits list and dict cells in place, so no two cells may share one.
+    if isinstance(cell, list):
+        return [_fresh(value) for value in cell]
+    if isinstance(cell, dict):
+        return {key: _fresh(value) for key, value in cell.items()}
+    return cell
+
+
+def decode_grid(value):
+    """Inverse of ``encode_grid``; plain nested lists (legacy rows) pass through."""
+    if not isinstance(value, dict) or "enc" not in value:
+        return value
+    width, height = int(value["w"]), int(value["h"])
+    encoding = value["enc"]
+
+    if encoding == "sparse":
+        empty = value.get("empty")
+        grid = [[_fresh(empty) for _ in range(width)] for _ in range(height)]
+        for x, y, cell in value.get("cells", ()):
+            if 0 <= y < height and 0 <= x < width:
+                grid[y][x] = cell
+        return grid
+
+    if encoding == "rle":
+        flat: list = []
+        runs = value.get("runs", [])
+        for index in range(0, len(runs) - 1, 2):
+            cell, count = runs[index], int(runs[index + 1])
+            if isinstance(cell, (list, dict)):
+                flat.extend(_fresh(cell) for _ in range(count))
+            else:
+                flat.extend([cell] * count)
+    elif encoding == "packed":
+        typecode = value["t"]
+        packed = array(typecode)
+        packed.frombytes(base64.b64decode(value["data"]))
+        if sys.byteorder == "big":
+            packed.byteswap()
+        null = next(type_min for code, type_min, _ in _PACKED_TYPES if code == typecode) if value.get("nulls") else None
+        values = [None if null is not None and item == null else item for item in packed]
+        stride = int(value.get("stride", 1))
+        flat = values if stride == 1 else [values[index : index + stride] for index in range(0, len(values), stride)]
+    else:
+        raise ValueError(f"Unknown grid encoding: {encoding!r}")
+
+    return [flat[row * width : (row + 1) * width] for row in range(height)]
+
+
+def encode_map_state_grids(map_state) -> dict:
+    """All grids of a ``GameMapState`` in their compact wire form."""
+    return {field: encode_grid(getattr(map_state, field), sparse=field in SPARSE_GRID_FIELDS) for field in GRID_FIELDS}
+
+
+def normalize_timed_tile_cell(cell) -> list[int]:
+    if isinstance(cell, list):
+        if len(cell) >= 2:
+            try:
+                effect_id = int(cell[0] or 0)
+                turns = int(cell[1] or 0)
+                if effect_id > 0 and turns > 0:
+                    return [effect_id, turns]
+            except (TypeError, ValueError):
+                pass
+        if len(cell) == 1:
+            try:
+                effect_id = int(cell[0] or 0)
+                if effect_id > 0:
+                    return [effect_id, TERRAIN_DEFAULT_DURATION]
+            except (TypeError, ValueError):
+                pass
+    try:
+        effect_id = int(cell or 0)
+        if effect_id > 0:
+            return [effect_id, TERRAIN_DEFAULT_DURATION]
+    except (TypeError, ValueError):
+        pass
+    return [0, 0]
+
+
+def normalize_hazard_cell(cell: list | None) -> list[list[int]]:
+    normalized: list[list[int]] = []
+    if not isinstance(cell, list):
+        return normalized
+
+    for entry in cell:
+        if not isinstance(entry, list) or len(entry) < 2:
+            continue
+        try:
+            hazard_id = int(entry[0])
+            turns_remaining = int(entry[1])
+        except (TypeError, ValueError):
+            continue
+
+        if hazard_id <= 0 or turns_remaining <= 0:
+            continue
+        normalized.append([hazard_id, turns_remaining])
+
+    return normalized
+
+
+def grid_cell(grid: list | None, x: int, y: int, default=None):
+    if not isinstance(grid, list) or y < 0 or x < 0 or y >= len(grid):
+        return default
+    row = grid[y]
+    if not isinstance(row, list) or x >= len(row):
+        return default
+    return row[x]
+
+
+def int_at(grid: list | None, x: int, y: int) -> int:
+    try:
+        return int(grid_cell(grid, x, y, 0) or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def weather_id_at(weather_tiles: list | None, x: int, y: int) -> int:
+    return int_at(weather_tiles, x, y)
+
+
+def field_effect_at(field_effect_tiles: list | None, x: int, y: int) -> int:
+    return int_at(field_effect_tiles, x, y)
+
+
+def timed_effect_id_at(tiles: list | None, x: int, y: int) -> int:
+    cell = grid_cell(tiles, x, y, _MISSING)
+    if cell is _MISSING:
+        return 0
+    return int(normalize_timed_tile_cell(cell)[0] or 0)
+
+
+def hazard_entries_at(hazard_tiles: list | None, x: int, y: int) -> list[list[int]]:
+    return normalize_hazard_cell(grid_cell(hazard_tiles, x, y))
+
+
+def item_id_at(item_id_tiles: list | None, x: int, y: int) -> int | None:
+    """Item id on the tile; None means no item (0 is the random TM)."""
+    cell = grid_cell(item_id_tiles, x, y)
+    try:
+        return None if cell is None else int(cell)
+    except (TypeError, ValueError):
+        return None
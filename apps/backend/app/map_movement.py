@@ -264,49 +264,22 @@ def find_shortest_path(
     unit_types: set[str],
     ability_names: set[str] | None = None,
     blocked_tiles: set[tuple[int, int]] | None = None,
+    graph: MovementGraph | None = None,
 ) -> list[tuple[int, int]] | None:
-    """Return one shortest orthogonal path from start to end, or None if unreachable."""
-    from collections import deque
+    """Return one cheapest orthogonal path from start to end, or None if unreachable.
 
-    sx, sy = start
-    ex, ey = end
-    if (sx, sy) == (ex, ey):
-        return [(sx, sy)]
-
-    blocked_tiles = blocked_tiles or set()
-    parent: dict[tuple[int, int], tuple[int, int]] = {}
-    q = deque([(sx, sy)])
-    seen: set[tuple[int, int]] = {(sx, sy)}
-    dirs = [(1, 0), (-1, 0), (0, 1), (0, -1)]
-
-    while q:
-        x, y = q.popleft()
-        if (x, y) == (ex, ey):
-            path: list[tuple[int, int]] = [(ex, ey)]
-            cur = (ex, ey)
-            while cur in parent:
-                cur = parent[cur]
-                path.append(cur)
-            path.reverse()
-            return path
-
-        for dx, dy in dirs:
-            nx, ny = x + dx, y + dy
-            if not (0 <= nx < width and 0 <= ny < height):
-                continue
-            nxt = (nx, ny)
-            if nxt in blocked_tiles or nxt in seen:
-                continue
-            if not can_enter_tile(special_tiles, x, y, nx, ny, unit_types, ability_names):
-                continue
-            step_cost = movement_costs[ny][nx]
-            if step_cost >= IMPOSSIBLE_MOVEMENT_COST:
-                continue
-            seen.add(nxt)
-            parent[nxt] = (x, y)
-            q.append(nxt)
-
-    return None
+    Pass a prebuilt ``graph`` when the map's graph is already cached.
+    """
+    if graph is None:
+        graph = build_movement_graph(special_tiles, width, height)
+    return shortest_path_on_graph(
+        graph,
+        start,
+        end,
+        movement_costs,
+        can_stand_on_ledge=unit_can_stand_on_ledge(unit_types, ability_names),
+        blocked_tiles=blocked_tiles,
+    )
 
 
 def slide_on_ice_from(
@@ -350,8 +323,12 @@ def resolve_movement_destination(
     ability_names: set[str] | None = None,
     blocked_tiles: set[tuple[int, int]] | None = None,
     occupied_tiles: set[tuple[int, int]] | None = None,
+    graph: MovementGraph | None = None,
 ) -> tuple[int, int, bool]:
-    """Resolve final tile after movement, applying ice slide when entering ice."""
+    """Resolve final tile after movement, applying ice slide when entering ice.
+
+    The unit follows the cheapest path, the one that put the tile in its range.
+    """
     if unit_ignores_ice_slide(unit_types, ability_names):
         return to_x, to_y, False
 
@@ -365,6 +342,7 @@ def resolve_movement_destination(
         unit_types,
         ability_names,
         blocked_tiles,
+        graph=graph,
     )
     if not path:
         return to_x, to_y, False
@@ -453,6 +431,43 @@ def is_valid_movement_destination(
     return True
 
 
+def movement_capabilities(
+    unit_types: set[str],
+    ability_names: set[str] | None = None,
+) -> tuple[bool, bool, bool, bool]:
+    """(can_water, can_rock, can_stand_on_ledge, ignores_sand_slow) for a unit.
+
+    Units with the same capabilities share an effective movement cost grid.
+    """
+    return (
+        unit_can_cross_water(unit_types, ability_names),
+        unit_can_cross_rock(unit_types, ability_names),
+        unit_can_stand_on_ledge(unit_types, ability_names),
+        unit_ignores_sand_slow(unit_types, ability_names),
+    )
+
+
+def effective_tile_cost(
+    tile: str | None,
+    base_cost: int,
+    capabilities: tuple[bool, bool, bool, bool],
+) -> int:
+    can_water, can_rock, can_stand_on_ledge, ignores_sand_slow = capabilities
+    if tile == IMPASSABLE_TILE:
+        return IMPOSSIBLE_MOVEMENT_COST
+    if tile == WATER_TILE and not can_water:
+        return IMPOSSIBLE_MOVEMENT_COST
+    if tile == ROCK_TILE and not can_rock:
+        return IMPOSSIBLE_MOVEMENT_COST
+    if tile in LEDGE_TILES and not can_stand_on_ledge:
+        return 0
+    if tile == STUMP_TILE:
+        return STUMP_MOVEMENT_COST
+    if tile == SAND_TILE and not ignores_sand_slow:
+        return SAND_MOVEMENT_COST
+    return base_cost
+
+
 def build_movement_cost_grid(
     base_costs: list[list[int]],
     special_tiles: list | None,
@@ -462,90 +477,268 @@ def build_movement_cost_grid(
     if not special_tiles:
         return base_costs
 
-    can_water = unit_can_cross_water(unit_types, ability_names)
-    can_rock = unit_can_cross_rock(unit_types, ability_names)
-    can_stand_on_ledge = unit_can_stand_on_ledge(unit_types, ability_names)
-    ignores_sand_slow = unit_ignores_sand_slow(unit_types, ability_names)
-
-    height = len(base_costs)
+    capabilities = movement_capabilities(unit_types, ability_names)
     effective: list[list[int]] = []
-    for y in range(height):
-        row = base_costs[y]
-        width = len(row)
-        new_row: list[int] = []
-        for x in range(width):
-            tile = get_special_tile(special_tiles, x, y)
-            if tile == IMPASSABLE_TILE:
-                new_row.append(IMPOSSIBLE_MOVEMENT_COST)
-            elif tile == WATER_TILE and not can_water:
-                new_row.append(IMPOSSIBLE_MOVEMENT_COST)
-            elif tile == ROCK_TILE and not can_rock:
-                new_row.append(IMPOSSIBLE_MOVEMENT_COST)
-            elif tile in LEDGE_TILES and not can_stand_on_ledge:
-                new_row.append(0)
-            elif tile == STUMP_TILE:
-                new_row.append(STUMP_MOVEMENT_COST)
-            elif tile == SAND_TILE and not ignores_sand_slow:
-                new_row.append(SAND_MOVEMENT_COST)
-            else:
-                new_row.append(row[x])
-        effective.append(new_row)
+    for y, row in enumerate(base_costs):
+        effective.append(
+            [
+                effective_tile_cost(get_special_tile(special_tiles, x, y), cost, capabilities)
+                for x, cost in enumerate(row)
+            ]
+        )
     return effective
 
 
-def movement_range_with_terrain(
-    start: tuple[int, int],
-    rng: int,
-    movement_costs: list[list[int]],
+# Direction codes shared by the movement graph tables: right, left, down, up.
+_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+_ALL_DIRECTIONS_MASK = 0b1111
+_LEDGE_ENTRY_DIRECTION = {
+    LEDGE_RIGHT: 0,
+    LEDGE_LEFT: 1,
+    LEDGE_DOWN: 2,
+    LEDGE_UP: 3,
+}
+
+
+class MovementGraph:
+    """Flat, precomputed adjacency for one map's special tiles.
+
+    Cells are indexed ``y * width + x``. ``neighbors[i]`` lists
+    ``(neighbor_index, direction_code, x, y)`` for in-bounds neighbors, and
+    the two entry masks hold a bit per direction code that may *not* be used
+    to step onto a cell: ``grounded_entry_mask`` for units that must respect
+    ledges, ``hover_entry_mask`` for units that can stand on them.
+    """
+
+    __slots__ = (
+        "width",
+        "height",
+        "tile_kinds",
+        "neighbors",
+        "grounded_entry_mask",
+        "hover_entry_mask",
+        "ledge_cells",
+    )
+
+    def __init__(self, special_tiles: list | None, width: int, height: int):
+        self.width = width
+        self.height = height
+        size = width * height
+        tile_kinds: list[str | None] = [None] * size
+        grounded = [0] * size
+        hover = [0] * size
+        ledge_cells = [False] * size
+
+        for y, row in enumerate((special_tiles or [])[:height]):
+            if not isinstance(row, list):
+                continue
+            for x, cell in enumerate(row[:width]):
+                tile = normalize_special_tile(cell)
+                if tile is None:
+                    continue
+                index = y * width + x
+                tile_kinds[index] = tile
+                if tile == IMPASSABLE_TILE:
+                    grounded[index] = _ALL_DIRECTIONS_MASK
+                    hover[index] = _ALL_DIRECTIONS_MASK
+                elif tile in LEDGE_TILES:
+                    ledge_cells[index] = True
+                    grounded[index] = _ALL_DIRECTIONS_MASK & ~(1 << _LEDGE_ENTRY_DIRECTION[tile])
+
+        neighbors = []
+        for y in range(height):
+            for x in range(width):
+                cell_neighbors = []
+                for code, (dx, dy) in enumerate(_DIRECTIONS):
+                    nx, ny = x + dx, y + dy
+                    if 0 <= nx < width and 0 <= ny < height:
+                        cell_neighbors.append((ny * width + nx, code, nx, ny))
+                neighbors.append(tuple(cell_neighbors))
+
+        self.tile_kinds = tuple(tile_kinds)
+        self.neighbors = tuple(neighbors)
+        self.grounded_entry_mask = tuple(grounded)
+        self.hover_entry_mask = tuple(hover)
+        self.ledge_cells = tuple(ledge_cells)
+
+
+_graph_cache: dict[tuple, MovementGraph] = {}
+_GRAPH_CACHE_SIZE = 64
+
+
+def build_movement_graph(
     special_tiles: list | None,
     width: int,
     height: int,
-    unit_types: set[str],
-    ability_names: set[str] | None = None,
+    cache_key: tuple | None = None,
+) -> MovementGraph:
+    """Build (or reuse) the movement graph for a map.
+
+    Callers that know the map's identity pass ``cache_key`` (e.g. map id and
+    ``updated_at``) so the graph is built once per map instead of per turn.
+    """
+    if cache_key is None:
+        return MovementGraph(special_tiles, width, height)
+    key = (cache_key, width, height)
+    graph = _graph_cache.get(key)
+    if graph is None:
+        if len(_graph_cache) >= _GRAPH_CACHE_SIZE:
+            _graph_cache.pop(next(iter(_graph_cache)))
+        graph = _graph_cache[key] = MovementGraph(special_tiles, width, height)
+    return graph
+
+
+def movement_range_on_graph(
+    graph: MovementGraph,
+    start: tuple[int, int],
+    rng: int,
+    movement_costs: list[list[int]],
+    *,
+    can_stand_on_ledge: bool,
     blocked_tiles: set[tuple[int, int]] | None = None,
 ) -> list[list[int]]:
-    """BFS movement range with water/rock costs and directional ledge pass-through."""
-    from collections import deque
+    """Dijkstra over a precomputed graph; returns reachable stop tiles as ``[x, y]``.
+
+    A tile is settled at its cheapest cost, so a tile first discovered through
+    an expensive path (sand, stumps) is still expanded from the cheaper one.
+    """
+    import heapq
 
+    width = graph.width
     sx, sy = start
+    if not (0 <= sx < width and 0 <= sy < graph.height):
+        return []
+
     blocked_tiles = blocked_tiles or set()
-    seen: set[tuple[int, int]] = set()
+    entry_mask = graph.hover_entry_mask if can_stand_on_ledge else graph.grounded_entry_mask
+    ledge_cells = graph.ledge_cells
+    tile_kinds = graph.tile_kinds
+    neighbors = graph.neighbors
+
+    start_index = sy * width + sx
+    best = {start_index: 0}
+    heap = [(0, start_index)]
     out: list[list[int]] = []
-    q = deque([(sx, sy, 0)])
-    dirs = [(1, 0), (-1, 0), (0, 1), (0, -1)]
 
-    while q:
-        x, y, c = q.popleft()
-        if x < 0 or y < 0 or x >= width or y >= height:
+    while heap:
+        cost, index = heapq.heappop(heap)
+        if cost > best[index]:
             continue
-        key = (x, y)
-        if key in seen:
-            continue
-        seen.add(key)
-
-        if is_valid_movement_destination(special_tiles, x, y, unit_types, ability_names):
-            out.append([x, y])
+        if tile_kinds[index] != IMPASSABLE_TILE and (can_stand_on_ledge or not ledge_cells[index]):
+            out.append([index % width, index // width])
 
-        for dx, dy in dirs:
-            nx, ny = x + dx, y + dy
-            if not (0 <= nx < width and 0 <= ny < height):
+        for neighbor, code, nx, ny in neighbors[index]:
+            if entry_mask[neighbor] & (1 << code):
                 continue
-            if (nx, ny) in blocked_tiles:
+            step_cost = movement_costs[ny][nx]
+            if step_cost >= IMPOSSIBLE_MOVEMENT_COST:
                 continue
-            if (nx, ny) in seen:
+            next_cost = cost + step_cost
+            if next_cost > rng:
                 continue
-            if not can_enter_tile(
-                special_tiles, x, y, nx, ny, unit_types, ability_names
-            ):
+            previous = best.get(neighbor)
+            if previous is not None and previous <= next_cost:
+                continue
+            if (nx, ny) in blocked_tiles:
+                continue
+            best[neighbor] = next_cost
+            heapq.heappush(heap, (next_cost, neighbor))
+
+    return out
+
+
+def shortest_path_on_graph(
+    graph: MovementGraph,
+    start: tuple[int, int],
+    end: tuple[int, int],
+    movement_costs: list[list[int]],
+    *,
+    can_stand_on_ledge: bool,
+    blocked_tiles: set[tuple[int, int]] | None = None,
+) -> list[tuple[int, int]] | None:
+    """Dijkstra from ``start`` to ``end`` over a precomputed graph, with parent tracking.
+
+    Step costs and ledge rules match ``movement_range_on_graph``, so the path
+    returned is one whose cost put ``end`` in the unit's range.
+    """
+    import heapq
+
+    width = graph.width
+    height = graph.height
+    sx, sy = start
+    ex, ey = end
+    if not (0 <= sx < width and 0 <= sy < height and 0 <= ex < width and 0 <= ey < height):
+        return None
+    if (sx, sy) == (ex, ey):
+        return [(sx, sy)]
+
+    blocked_tiles = blocked_tiles or set()
+    entry_mask = graph.hover_entry_mask if can_stand_on_ledge else graph.grounded_entry_mask
+    neighbors = graph.neighbors
+
+    start_index = sy * width + sx
+    end_index = ey * width + ex
+    best = {start_index: 0}
+    parent: dict[int, int] = {}
+    heap = [(0, start_index)]
+
+    while heap:
+        cost, index = heapq.heappop(heap)
+        if cost > best[index]:
+            continue
+        if index == end_index:
+            path = [(ex, ey)]
+            while index in parent:
+                index = parent[index]
+                path.append((index % width, index // width))
+            path.reverse()
+            return path
+
+        for neighbor, code, nx, ny in neighbors[index]:
+            if entry_mask[neighbor] & (1 << code):
                 continue
             step_cost = movement_costs[ny][nx]
             if step_cost >= IMPOSSIBLE_MOVEMENT_COST:
                 continue
-            nc = c + step_cost
-            if nc <= rng:
-                q.append((nx, ny, nc))
+            next_cost = cost + step_cost
+            previous = best.get(neighbor)
+            if previous is not None and previous <= next_cost:
+                continue
+            if (nx, ny) in blocked_tiles:
+                continue
+            best[neighbor] = next_cost
+            parent[neighbor] = index
+            heapq.heappush(heap, (next_cost, neighbor))
 
-    return out
+    return None
+
+
+def movement_range_with_terrain(
+    start: tuple[int, int],
+    rng: int,
+    movement_costs: list[list[int]],
+    special_tiles: list | None,
+    width: int,
+    height: int,
+    unit_types: set[str],
+    ability_names: set[str] | None = None,
+    blocked_tiles: set[tuple[int, int]] | None = None,
+    graph: MovementGraph | None = None,
+) -> list[list[int]]:
+    """Cheapest-path movement range with water/rock costs and directional ledge pass-through.
+
+    Pass a prebuilt ``graph`` when computing ranges for many units on the same map.
+    """
+    if graph is None:
+        graph = build_movement_graph(special_tiles, width, height)
+    return movement_range_on_graph(
+        graph,
+        start,
+        rng,
+        movement_costs,
+        can_stand_on_ledge=unit_can_stand_on_ledge(unit_types, ability_names),
+        blocked_tiles=blocked_tiles,
+    )
 
 
 def unit_can_occupy_tile(
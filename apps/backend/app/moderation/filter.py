@@ -1,9 +1,10 @@
 import json
 import os
 import re
+from collections import deque
 from dataclasses import dataclass
 from functools import lru_cache
-from typing import Iterable
+from typing import Iterable, Sequence
 
 LEET_MAP = str.maketrans({
     "0": "o",
@@ -18,6 +19,13 @@ LEET_MAP = str.maketrans({
 
 WORDLIST_PATH = os.path.join(os.path.dirname(__file__), "wordlist.json")
 
+# Terms at least this long also match inside a longer token ("xbadwordx").
+SUBSTRING_MIN_LENGTH = 4
+# Terms at least this long are also matched when spelled out across separators ("b a d").
+SPACED_MIN_LENGTH = 3
+
+_SPACED_SEPARATORS = re.compile(r"[\W_]+")
+
 
 @dataclass
 class FilterResult:
@@ -41,6 +49,7 @@ def _cached_terms(path: str) -> tuple[str, ...]:
 
 def reload_wordlist() -> None:
     _cached_terms.cache_clear()
+    _cached_matcher.cache_clear()
 
 
 def normalize_token(token: str) -> str:
@@ -63,45 +72,150 @@ def _iter_candidate_spans(message: str) -> Iterable[tuple[int, int, str]]:
         yield match.start(), match.end(), match.group(0)
 
 
-def _match_term_in_token(token: str, term: str) -> bool:
-    normalized_token = normalize_token(token)
-    normalized_term = normalize_token(term)
-    if not normalized_token or not normalized_term:
-        return False
-    if normalized_token == normalized_term:
-        return True
-    if len(normalized_term) >= 4 and normalized_term in normalized_token:
-        return True
-    return False
+def _spaced_pattern(normalized_term: str) -> re.Pattern:
+    return re.compile(
+        r"\b" + r"[\W_]*".join(re.escape(char) for char in normalized_term) + r"\b",
+        flags=re.IGNORECASE,
+    )
 
 
-def _match_spaced_term(message: str, term: str) -> list[tuple[int, int]]:
-    normalized_term = normalize_token(term)
-    if len(normalized_term) < 3:
-        return []
+class TermAutomaton:
+    """Aho-Corasick automaton reporting which patterns occur anywhere in a text."""
+
+    def __init__(self, patterns: Sequence[str]):
+        self._goto: list[dict[str, int]] = [{}]
+        outputs: list[list[int]] = [[]]
+        for pattern_id, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(pattern_id)
+
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                outputs[next_state].extend(outputs[self._fail[next_state]])
+                queue.append(next_state)
+        self._outputs = [tuple(output) for output in outputs]
+
+    def find(self, text: str) -> set[int]:
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found: set[int] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+
+class CompiledWordlist:
+    """A wordlist's normalized terms and matchers, built once per loaded wordlist.
+
+    Matching a token used to normalize and test every blocked term, and every
+    message compiled one spaced-term regex per term. Here the distinct
+    normalized terms go into one ``TermAutomaton``; each keeps the position of
+    the first wordlist term that normalizes to it, so "first term in wordlist
+    order wins" still holds. Spaced-term regexes are compiled up front and only
+    run for terms whose letters occur, separators removed, in the message.
+    """
+
+    def __init__(self, terms: Sequence[str]):
+        self.terms = tuple(terms)
+        normalized_ids: dict[str, int] = {}
+        normalized_terms: list[str] = []
+        first_index: list[int] = []
+        term_ids: list[int | None] = []
+        for index, term in enumerate(self.terms):
+            normalized = normalize_token(term)
+            if not normalized:
+                term_ids.append(None)
+                continue
+            if normalized not in normalized_ids:
+                normalized_ids[normalized] = len(normalized_terms)
+                normalized_terms.append(normalized)
+                first_index.append(index)
+            term_ids.append(normalized_ids[normalized])
+
+        self._normalized_ids = normalized_ids
+        self._first_index = first_index
+        self._substring_ids = frozenset(
+            pattern_id for pattern_id, normalized in enumerate(normalized_terms) if len(normalized) >= SUBSTRING_MIN_LENGTH
+        )
+        self._automaton = TermAutomaton(normalized_terms)
+        patterns = {
+            pattern_id: _spaced_pattern(normalized)
+            for pattern_id, normalized in enumerate(normalized_terms)
+            if len(normalized) >= SPACED_MIN_LENGTH
+        }
+        self._spaced = tuple(
+            (term, pattern_id, patterns[pattern_id])
+            for term, pattern_id in zip(self.terms, term_ids)
+            if pattern_id in patterns
+        )
+
+    def token_match(self, token: str) -> str | None:
+        """First term (in wordlist order) equal to the normalized token, or a long term inside it."""
+        normalized = normalize_token(token)
+        if not normalized:
+            return None
+        indices = [self._first_index[pattern_id] for pattern_id in self._automaton.find(normalized) & self._substring_ids]
+        exact = self._normalized_ids.get(normalized)
+        if exact is not None:
+            indices.append(self._first_index[exact])
+        return self.terms[min(indices)] if indices else None
+
+    def spaced_candidates(self, message: str) -> Iterable[tuple[str, re.Pattern]]:
+        """Spaced-term patterns, in wordlist order, that could match the message."""
+        if not message.isascii():
+            # Case-insensitive matching folds some non-ASCII letters onto a-z; try every pattern.
+            return [(term, pattern) for term, _, pattern in self._spaced]
+        found = self._automaton.find(_SPACED_SEPARATORS.sub("", message).lower())
+        return [(term, pattern) for term, pattern_id, pattern in self._spaced if pattern_id in found]
+
+    def compact_match(self, message: str) -> str | None:
+        """First term whose normalized form occurs in the message with spaces removed."""
+        found = self._automaton.find(normalize_message(message))
+        if not found:
+            return None
+        return self.terms[min(self._first_index[pattern_id] for pattern_id in found)]
 
-    pattern = r"\b" + r"[\W_]*".join(re.escape(char) for char in normalized_term) + r"\b"
-    spans: list[tuple[int, int]] = []
-    for match in re.finditer(pattern, message, flags=re.IGNORECASE):
-        spans.append((match.start(), match.end()))
-    return spans
+
+@lru_cache(maxsize=4)
+def _cached_matcher(path: str) -> CompiledWordlist:
+    return CompiledWordlist(_cached_terms(path))
 
 
 def filter_message(message: str, wordlist_path: str | None = None) -> FilterResult:
     path = wordlist_path or WORDLIST_PATH
-    blocked_terms = _cached_terms(path)
+    matcher = _cached_matcher(path)
     matched_terms: list[str] = []
     replacements: list[tuple[int, int, str]] = []
 
     for start, end, token in _iter_candidate_spans(message):
-        for term in blocked_terms:
-            if _match_term_in_token(token, term):
-                matched_terms.append(term)
-                replacements.append((start, end, _asterisk_replacement(token)))
-                break
-
-    for term in blocked_terms:
-        for start, end in _match_spaced_term(message, term):
+        term = matcher.token_match(token)
+        if term is not None:
+            matched_terms.append(term)
+            replacements.append((start, end, _asterisk_replacement(token)))
+
+    for term, pattern in matcher.spaced_candidates(message):
+        for match in pattern.finditer(message):
+            start, end = match.span()
             if any(not (end <= existing_start or start >= existing_end) for existing_start, existing_end, _ in replacements):
                 continue
             span_text = message[start:end]
@@ -109,13 +223,10 @@ def filter_message(message: str, wordlist_path: str | None = None) -> FilterResu
             replacements.append((start, end, _asterisk_replacement(span_text)))
 
     if not replacements:
-        compact = normalize_message(message)
-        for term in blocked_terms:
-            normalized_term = normalize_token(term)
-            if normalized_term and normalized_term in compact:
-                matched_terms.append(term)
-                replacements.append((0, len(message), _asterisk_replacement(message)))
-                break
+        term = matcher.compact_match(message)
+        if term is not None:
+            matched_terms.append(term)
+            replacements.append((0, len(message), _asterisk_replacement(message)))
 
     if not replacements:
         return FilterResult(censored_message=message, matched_terms=[], had_match=False)
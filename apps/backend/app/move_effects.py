@@ -0,0 +1,170 @@
+"""Compiled move-effect programs.
+
+``Move.effects`` is a list of ``recipient:effect_type:param:...`` strings. The
+battle path used to strip, lowercase and split that list again in every helper
+that asks a question about the move (does it crit, is it multi-hit, which
+conditional power rules apply, ...), a dozen or more times per attack.
+
+``move_program`` compiles the list once into ``EffectOp`` records with the
+split forms precomputed, plus indexes by exact token and by leading segment.
+Programs for catalog moves (``app.catalog.MoveRecord``) are cached by move id
+and rebuilt when the catalog is, since records are replaced on every build.
+ORM ``Move`` rows can be edited in place, so they are compiled per call.
+
+Each op also records which move-effect handler acts on it
+(``effect_handler_key``); ``app.engine.effects.run_move_effects`` looks that
+key up in its handler table instead of re-testing the segments for every op.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+
+from app.catalog_records import MoveRecord
+
+# Field effects dispatched on their leading segment alone.
+FIELD_EFFECT_HEADS = frozenset({"weather", "terrain", "field_hazard"})
+# ``field:<kind>`` effects with a handler of their own.
+FIELD_EFFECT_KINDS = frozenset({"clear_hazards", "clear_substitutes", "tailwind", "gravity"})
+# Effect types handled by the unit-level handlers, whatever the recipient segment.
+UNIT_EFFECT_TYPES = frozenset(
+    {
+        "raise_stat",
+        "lower_stat",
+        "high_crit_ratio",
+        "status",
+        "safeguard",
+        "state",
+        "apply_state",
+        "copy_ability",
+        "defog",
+        "heal",
+        "cure_status",
+        "reset_stats",
+        "give_cash",
+        "revive",
+        "instant_ko",
+    }
+)
+SINGLE_TOKEN_EFFECTS = frozenset({"break_screens"})
+
+
+def effect_handler_key(token: str, parts: tuple[str, ...]) -> str | None:
+    """Key of the move-effect handler for an effect, or None if none acts on it.
+
+    Raw (case-preserved) segments are compared except where the handlers
+    always lowercased them.
+    """
+    if token in SINGLE_TOKEN_EFFECTS:
+        return token
+    if len(parts) < 2:
+        return None
+    head, effect_type = parts[0], parts[1]
+    kind = effect_type.lower()
+    if head in FIELD_EFFECT_HEADS:
+        return head
+    if head == "field" and kind in FIELD_EFFECT_KINDS:
+        return f"field:{kind}"
+    if head == "self" and kind == "clear_hazards":
+        return "self:clear_hazards"
+    if head in {"self", "target"} and effect_type == "consume_berry":
+        return "consume_berry"
+    if head == "target" and effect_type == "remove_held_item":
+        return "target:remove_held_item"
+    if head == "target" and effect_type == "field_hazard" and len(parts) >= 3:
+        return "target:field_hazard"
+    if effect_type in UNIT_EFFECT_TYPES:
+        return effect_type
+    return None
+
+
+@dataclass(frozen=True, slots=True)
+class EffectOp:
+    raw: str
+    token: str
+    parts: tuple[str, ...]
+    lower_parts: tuple[str, ...]
+    handler: str | None = None
+
+    @property
+    def head(self) -> str:
+        return self.lower_parts[0]
+
+    @property
+    def kind(self) -> str | None:
+        return self.lower_parts[1] if len(self.lower_parts) >= 2 else None
+
+
+class MoveProgram:
+    __slots__ = (
+        "ops",
+        "tokens",
+        "by_head",
+        "on_use",
+        "high_crit_ratio",
+        "instant_ko",
+        "fixed_damage",
+        "has_revive",
+    )
+
+    def __init__(self, ops: tuple[EffectOp, ...]):
+        self.ops = ops
+        self.tokens = frozenset(op.token for op in ops)
+        by_head: dict[str, list[EffectOp]] = {}
+        for op in ops:
+            by_head.setdefault(op.head, []).append(op)
+        self.by_head = {head: tuple(head_ops) for head, head_ops in by_head.items()}
+        self.on_use = tuple(op for op in ops if op.handler is not None)
+        self.high_crit_ratio = any(
+            op.token == "high_crit_ratio" or op.token.endswith(":high_crit_ratio") for op in ops
+        )
+        self.instant_ko = any(":instant_ko" in op.token for op in ops)
+        self.fixed_damage = tuple(op for op in ops if op.token.startswith("target:fixed_damage:"))
+        self.has_revive = any(op.lower_parts[:2] == ("target", "revive") for op in ops)
+
+    def has(self, token: str) -> bool:
+        """Exact match against a lowercase, stripped effect token."""
+        return token in self.tokens
+
+    def with_head(self, head: str) -> tuple[EffectOp, ...]:
+        return self.by_head.get(head, ())
+
+
+EMPTY_PROGRAM = MoveProgram(())
+
+
+def compile_effect(effect) -> EffectOp:
+    raw = str(effect or "").strip()
+    token = raw.lower()
+    parts = tuple(raw.split(":"))
+    return EffectOp(raw, token, parts, tuple(token.split(":")), effect_handler_key(token, parts))
+
+
+def compile_move_program(effects) -> MoveProgram:
+    if not isinstance(effects, list) or not effects:
+        return EMPTY_PROGRAM
+    return MoveProgram(tuple(compile_effect(effect) for effect in effects))
+
+
+_programs: dict[int, tuple[MoveRecord, MoveProgram]] = {}
+_lock = threading.Lock()
+
+
+def move_program(move) -> MoveProgram:
+    if move is None:
+        return EMPTY_PROGRAM
+    if not isinstance(move, MoveRecord):
+        return compile_move_program(move.effects)
+    cached = _programs.get(move.id)
+    if cached is not None and cached[0] is move:
+        return cached[1]
+    program = compile_move_program(move.effects)
+    with _lock:
+        _programs[move.id] = (move, program)
+    return program
+
+
+def clear_move_programs() -> None:
+    with _lock:
+        _programs.clear()
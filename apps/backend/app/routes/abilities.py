@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
 from app.db.models import Ability
 from app.schemas.abilities import AbilitySchema
 from app.dependencies import get_db
+from app.catalog_responses import cached_catalog_response, render_list
 
 router = APIRouter(prefix="/abilities", tags=["abilities"])
 
 
 @router.get("/all", response_model=list[AbilitySchema])
-def get_all_abilities(db: Session = Depends(get_db)):
-    return db.query(Ability).order_by(Ability.id).all()
+def get_all_abilities(request: Request, db: Session = Depends(get_db)):
+    return cached_catalog_response(
+        request,
+        db,
+        "abilities",
+        lambda: render_list(AbilitySchema, db.query(Ability).order_by(Ability.id).all()),
+    )
@@ -1,17 +1,31 @@
-from fastapi import APIRouter, Depends, Request, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from typing import List
+from fastapi import APIRouter, Depends, Query, Request, HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, joinedload, object_session
+from typing import Callable, List, Literal
+from dataclasses import asdict
+from functools import partial
 from datetime import datetime, timedelta, timezone
-from collections import deque
+import base64
 import random
 import hashlib
 import json
-import re
-import redis
+import logging
+import time
 
 from app.db.models import Game, User, Map, GameStatus, GameUnit, GameState, GamePlayer, Unit, Move, GameMapState, Ability, Item
-from app.schemas.games import GameResponse, GameCreateRequest, GameStateSchema, PlayerInfo
-from app.schemas.maps import MapDetail, GameMapStateSchema
+from app.schemas.games import (
+    GameCreateRequest,
+    GameEventPage,
+    GameForecast,
+    GameResponse,
+    GameStateSchema,
+    GameSummary,
+    GameSummaryPage,
+    GameThreatMap,
+    LobbyPlayer,
+    PlayerInfo,
+)
+from app.schemas.maps import MapDetail, GameMapStateSchema, CompactGameMapStateSchema
 from app.schemas.units import (
     GameUnitSchema,
     GameUnitCreateRequest,
@@ -40,23 +54,110 @@ from app.war_mode import (
     restore_objectives_for_units,
     restore_unoccupied_damaged_objectives,
 )
+from app.map_grids import (
+    encode_map_state_grids,
+    field_effect_at,
+    timed_effect_id_at,
+    weather_id_at,
+)
 from app.map_movement import (
-    build_movement_cost_grid,
+    build_movement_graph,
     get_displacement_landing_tile,
     get_grass_incoming_accuracy_multiplier,
     get_tile_defense_multiplier,
     is_displacement_move_kind,
-    is_stump_tile,
-    movement_range_with_terrain,
-    resolve_movement_destination,
-    target_receives_grass_tile_bonuses,
+    movement_range_on_graph,
     unit_can_occupy_tile,
     unit_can_pass_through_units,
     IMPOSSIBLE_MOVEMENT_COST,
 )
+from app.catalog import (
+    ItemRecord,
+    MoveRecord,
+    UnitRecord,
+    ability_record,
+    item_record,
+    move_record,
+    move_record_by_name,
+    unit_record,
+)
+from app.game_context import (
+    clear_game_context,
+    game_state_for,
+    game_units_for,
+    load_game_context,
+    map_state_for,
+    player_state_for,
+    side_units_for,
+)
+from app.state_stream import append_patch, build_patch, read_patches, stage_patch
+from app.move_effects import move_program
+from app.game_commands import game_command, serialize_game_commands
+from app.instrumentation import InstrumentedRedis
+from app.game_events import EVENT_PAGE_SIZE, MAX_EVENT_PAGE_SIZE, append_events, event_tail, read_events
+from app.damage import (
+    DamageRow,
+    raw_damage,
+    raw_damage_batch,
+)
+from app.engine.rules import (
+    ALL_STAT_EFFECT_KEYS,
+    FIELD_EFFECT_TO_ID,
+    STATUS_TYPE_IMMUNITIES,
+    TERRAIN_ID_TO_NAME,
+    VALID_STATUS_EFFECTS,
+    WEATHER_TO_ID,
+    format_status_log_label,
+    get_accuracy_stage_multiplier,
+    get_critical_hit_chance,
+    get_stat_multiplier,
+    get_stat_stage,
+    get_type_multiplier,
+    get_weather_move_multiplier,
+    normalize_stat_boosts,
+    normalize_stat_name,
+    normalize_states,
+    normalize_status_effects,
+    normalize_status_name,
+    status_duration,
+    terrain_condition_matches,
+    weather_condition_matches,
+)
+from app.engine.moves import (
+    get_scaling_hit_powers,
+    move_can_critical_hit,
+    move_deals_direct_damage,
+    move_has_effect_token,
+    move_has_high_crit_ratio,
+    move_has_revive_effect,
+    move_has_target_fixed_damage_effect,
+    move_is_instant_ko,
+    resolve_weather_move_multiplier_for_move,
+    roll_hit_count,
+)
+from app.engine.combat import resolve_attack
+from app.engine.effects import EffectContext, effect_units, run_move_effects
+from app.engine.end_of_round import run_end_of_turn
+from app.engine.forecast import forecast_attacks
+from app.engine.movement import MovementError, move_unit as move_engine_unit, reachable_tiles
+from app.engine.state import Battle, BattleMap, EngineUnit
+from app.engine.targeting import move_effect_tiles, parse_move_range_spec, pulse_tiles
+from app.engine.threats import (
+    decode_bits,
+    encode_bits,
+    player_threat_bits,
+    stale_threat_unit_ids,
+    threat_bits,
+)
+from app.engine.units import effective_stats, refresh_stats
+from app.terrain_cache import get_compiled_terrain
+from app.turn_scheduler import as_utc, schedule_turn_deadline, turn_warning_seconds
 
 router = APIRouter(prefix="/games", tags=["games"])
-redis_client = redis.Redis(host="redis", port=6379, decode_responses=True)
+redis_client = InstrumentedRedis(host="redis", port=6379, decode_responses=True)
+logger = logging.getLogger("games")
+
+TURN_LOCK_TTL_PADDING_SECONDS = 3600
 
 
 def movement_locked_key(game_link: str, unit_id: int) -> str:
@@ -83,6 +184,17 @@ def publish_game_ws_event(game_link: str, payload: dict) -> None:
         return
 
 
+def publish_game_ws_events(game_link: str, payloads: list[dict]) -> None:
+    """Publish several events in order with one round trip."""
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for payload in payloads:
+            pipe.publish(f"game_updates:{game_link}", json.dumps(payload))
+        pipe.execute()
+    except Exception:
+        return
+
+
 def publish_player_state_updated(game_link: str) -> None:
     try:
         redis_client.publish(f"game_updates:{game_link}", "player_state_updated")
@@ -111,16 +223,29 @@ def publish_objective_cell_updated(game_link: str, x: int, y: int, cell: dict) -
         return
 
 
+def stage_state_patch(db: Session, game_id: int, *, unit_ids=(), **changes) -> None:
+    """Queue a sequenced state patch for ``game_id``; it is published when ``db`` commits."""
+    units = list(changes.pop("units", ()))
+    units.extend(db.get(GameUnit, unit_id) for unit_id in unit_ids)
+    stage_patch(db, redis_client, game_id, units=units, **changes)
+
+
+def publish_state_patch(game_link: str, **changes) -> int | None:
+    """Publish a sequenced state patch now, for changes that are already committed."""
+    return append_patch(redis_client, game_link, build_patch(**changes))
+
+
 def maybe_restore_war_objectives_at_turn_end(game: Game, db: Session) -> None:
     if not is_war_game(game):
         return
-    map_state = db.query(GameMapState).filter_by(game_id=game.id).first()
+    map_state = map_state_for(db, game.id)
     if not map_state:
         return
     restored = restore_unoccupied_damaged_objectives(map_state, game.id, db)
     if not restored:
         return
     db.add(map_state)
+    stage_state_patch(db, game.id, tiles=restored)
     for x, y, cell in restored:
         publish_objective_cell_updated(game.link, x, y, cell)
 
@@ -138,17 +263,16 @@ def _initialize_war_objective_tiles(game: Game, state: GameState, map_state: Gam
 
 
 def append_replay_log_event(game_state: GameState | None, payload: dict) -> None:
-    if game_state is None:
-        return
+    append_replay_log_events(game_state, [payload])
 
-    replay = list(game_state.replay_log or [])
-    replay.append(payload)
 
-    # Keep replay payload bounded so game responses remain manageable.
-    if len(replay) > 500:
-        replay = replay[-500:]
-
-    game_state.replay_log = replay
+def append_replay_log_events(game_state: GameState | None, payloads: list[dict]) -> None:
+    if game_state is None:
+        return
+    db = object_session(game_state)
+    if db is None:
+        return
+    append_events(db, game_state, payloads)
 
 
 def publish_chat_message_event(
@@ -172,17 +296,21 @@ def publish_chat_message_event(
     publish_game_ws_event(game_link, payload)
 
 
+def system_log_payload(message: str) -> dict:
+    return {
+        "event": "system_log",
+        "message": str(message),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
 def publish_system_log_event(
     game_link: str,
     message: str,
     game_state: GameState | None = None,
     db: Session | None = None,
 ) -> None:
-    payload = {
-        "event": "system_log",
-        "message": str(message),
-        "created_at": datetime.now(timezone.utc).isoformat(),
-    }
+    payload = system_log_payload(message)
     append_replay_log_event(game_state, payload)
     if game_state is not None and db is not None:
         db.add(game_state)
@@ -202,8 +330,8 @@ def publish_turn_remaining_warning_if_needed(
     if not players or state.current_turn is None:
         return False
 
-    warning_seconds = 30 if int(game.turn_seconds or 0) <= 60 else 60
-    remaining_seconds = int((state.turn_deadline - now).total_seconds())
+    warning_seconds = turn_warning_seconds(game.turn_seconds)
+    remaining_seconds = int((as_utc(state.turn_deadline) - now).total_seconds())
     if remaining_seconds > warning_seconds or remaining_seconds <= 0:
         return False
 
@@ -216,7 +344,7 @@ def publish_turn_remaining_warning_if_needed(
         except (TypeError, ValueError):
             return default
 
-    replay = list(state.replay_log or [])
+    replay = event_tail(db, game.id)
     for row in reversed(replay):
         if not isinstance(row, dict):
             continue
@@ -249,7 +377,7 @@ def publish_turn_remaining_warning_if_needed(
 
 
 def get_username_by_id(user_id: int, db: Session) -> str:
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
     if user and user.username:
         return str(user.username)
     return f"Player {user_id}"
@@ -261,7 +389,7 @@ def get_unit_display_name(unit: GameUnit, db: Session) -> str:
     if getattr(unit, "unit", None) is not None and getattr(unit.unit, "name", None):
         return f"{owner_name}'s {str(unit.unit.name)}"
 
-    unit_meta = db.query(Unit).filter(Unit.id == unit.unit_id).first()
+    unit_meta = unit_record(db, unit.unit_id)
     if unit_meta and unit_meta.name:
         return f"{owner_name}'s {str(unit_meta.name)}"
     return f"{owner_name}'s Unit {unit.id}"
@@ -283,10 +411,15 @@ def publish_turn_start_logs(game: Game, state: GameState, db: Session) -> None:
         publish_system_log_event(game.link, f"Turn {round_number}", state, db)
         if is_war_game(game):
             map_state = (
-                db.query(GameMapState).filter(GameMapState.game_id == game.id).first()
+                map_state_for(db, game.id)
             )
             if map_state:
                 apply_war_round_income(game, state, map_state, db)
+                stage_state_patch(
+                    db,
+                    game.id,
+                    players=[player_state_for(db, game.id, int(player_id)) for player_id in players],
+                )
                 publish_player_state_updated(game.link)
 
     current_player_id = players[current_turn_index % players_count]
@@ -294,43 +427,6 @@ def publish_turn_start_logs(game: Game, state: GameState, db: Session) -> None:
     snapshot_turn_stat_stages(int(current_player_id), game.id, db)
     publish_system_log_event(game.link, f"{current_player_name}'s turn", state, db)
 
-TYPE_EFFECTIVENESS = {
-    "normal": {"weak": [], "resist": ["rock", "steel"], "immune": ["ghost"]},
-    "fire": {"weak": ["grass", "ice", "bug", "steel"], "resist": ["fire", "water", "rock", "dragon"], "immune": []},
-    "water": {"weak": ["fire", "ground", "rock"], "resist": ["water", "grass", "dragon"], "immune": []},
-    "electric": {"weak": ["water", "flying"], "resist": ["electric", "grass", "dragon"], "immune": ["ground"]},
-    "grass": {"weak": ["water", "ground", "rock"], "resist": ["fire", "grass", "poison", "flying", "bug", "dragon", "steel"], "immune": []},
-    "ice": {"weak": ["grass", "ground", "flying", "dragon"], "resist": ["fire", "water", "ice", "steel"], "immune": []},
-    "fighting": {"weak": ["normal", "ice", "rock", "dark", "steel"], "resist": ["poison", "flying", "psychic", "bug", "fairy"], "immune": ["ghost"]},
-    "poison": {"weak": ["grass", "fairy"], "resist": ["poison", "ground", "rock", "ghost"], "immune": ["steel"]},
-    "ground": {"weak": ["fire", "electric", "poison", "rock", "steel"], "resist": ["grass", "bug"], "immune": ["flying"]},
-    "flying": {"weak": ["grass", "fighting", "bug"], "resist": ["electric", "rock", "steel"], "immune": []},
-    "psychic": {"weak": ["fighting", "poison"], "resist": ["psychic", "steel"], "immune": ["dark"]},
-    "bug": {"weak": ["grass", "psychic", "dark"], "resist": ["fire", "fighting", "poison", "flying", "ghost", "steel", "fairy"], "immune": []},
-    "rock": {"weak": ["fire", "ice", "flying", "bug"], "resist": ["fighting", "ground", "steel"], "immune": []},
-    "ghost": {"weak": ["psychic", "ghost"], "resist": ["dark"], "immune": ["normal"]},
-    "dragon": {"weak": ["dragon"], "resist": ["steel"], "immune": ["fairy"]},
-    "dark": {"weak": ["psychic", "ghost"], "resist": ["fighting", "dark", "fairy"], "immune": []},
-    "steel": {"weak": ["ice", "rock", "fairy"], "resist": ["fire", "water", "electric", "steel"], "immune": []},
-    "fairy": {"weak": ["fighting", "dragon", "dark"], "resist": ["fire", "poison", "steel"], "immune": []},
-}
-
-VALID_STATUS_EFFECTS = {
-    "burn",
-    "sleep",
-    "poison",
-    "badly_poisoned",
-    "frozen",
-    "paralysis",
-}
-
-SHORT_DURATION_STATUS_EFFECTS = {"sleep", "frozen"}
-# Duration (in turns) for screen-like effects: Reflect, Light Screen, Aurora Veil
-SCREEN_EFFECT_DURATION = 5
-SIDE_SCREEN_STATE_NAMES = frozenset(
-    {"reflect", "light_screen", "aurora_veil", "safeguard", "tailwind"}
-)
-VALID_STATE_EFFECTS = {"confusion", "flinch", "reflect", "light_screen", "aurora_veil", "safeguard", "tailwind", "aqua_ring", "destiny_bond", "ingrain", "laser_focus", "encore", "heal_block", "cursed", "nightmare", "immobilized", "salt_cure", "taunt", "torment", "telekinesis", "tar_shot", "gastro_acid", "foresight", "mind_reader", "power_trick", "embargo", "glaive_rush", "substitute"}
 
 HELD_ITEM_MASK_TYPE_MAP = {
     "hearthflame_mask": "Fire",
@@ -338,74 +434,6 @@ HELD_ITEM_MASK_TYPE_MAP = {
     "cornerstone_mask": "Rock",
 }
 
-STATUS_NAME_ALIASES = {
-    "badly_poison": "badly_poisoned",
-    "badly_poisoned": "badly_poisoned",
-}
-
-STAT_LOG_LABELS = {
-    "attack": "attack",
-    "defense": "defense",
-    "sp_attack": "special attack",
-    "sp_defense": "special defense",
-    "speed": "speed",
-    "accuracy": "accuracy",
-    "evasion": "evasion",
-    "crit": "critical hit rate",
-}
-
-STATUS_LOG_LABELS = {
-    "burn": "burned",
-    "sleep": "asleep",
-    "poison": "poisoned",
-    "badly_poisoned": "badly poisoned",
-    "frozen": "frozen",
-    "paralysis": "paralyzed",
-}
-
-STATUS_TYPE_IMMUNITIES = {
-    "paralysis": {"electric"},
-    "poison": {"poison", "steel"},
-    "badly_poisoned": {"poison", "steel"},
-    "burn": {"fire"},
-    "frozen": {"ice"},
-}
-
-WEATHER_TO_ID = {
-    "sun": 1,
-    "rain": 2,
-    "sandstorm": 3,
-    "hail": 4,
-}
-
-FIELD_HAZARD_TO_ID = {
-    "spikes": 1,
-    "toxic_spikes": 2,
-    "stealth_rock": 3,
-    "sticky_web": 4,
-}
-
-FIELD_HAZARD_STACK_LIMITS = {
-    1: 3,  # spikes
-    2: 2,  # toxic spikes
-    3: 1,  # stealth rock
-    4: 1,  # sticky web
-}
-
-FIELD_HAZARD_DEFAULT_DURATION = 5
-
-TERRAIN_TO_ID = {
-    "electric": 1,
-    "psychic": 2,
-    "grassy": 3,
-    "misty": 4,
-}
-TERRAIN_ID_TO_NAME = {value: key for key, value in TERRAIN_TO_ID.items()}
-TERRAIN_DEFAULT_DURATION = 5
-
-FIELD_EFFECT_TO_ID = {
-    "gravity": 1,
-}
 
 HIDDEN_ABILITY_COST = 250
 
@@ -453,7 +481,7 @@ def set_unit_ability_id(unit: GameUnit, ability_id: int | None, db: Session) ->
 def resolve_ability_name(ability_id: int | None, db: Session) -> str | None:
     if ability_id is None:
         return None
-    ability = db.query(Ability).filter(Ability.id == ability_id).first()
+    ability = ability_record(db, ability_id)
     return ability.name if ability else None
 
 
@@ -490,22 +518,22 @@ def resolve_held_item_name(item_ref: str | None, db: Session) -> str | None:
     ref = str(item_ref).strip()
     if not ref:
         return None
-    item = db.query(Item).filter((Item.slug == ref) | (Item.name == ref)).first()
+    item = item_record(db, ref)
     if item:
         return item.name
     return ref.replace("_", " ").title()
 
 
-def resolve_item_record(item_ref: str | None, db: Session) -> Item | None:
+def resolve_item_record(item_ref: str | None, db: Session) -> ItemRecord | Item | None:
     if not item_ref:
         return None
     ref = str(item_ref).strip()
     if not ref:
         return None
-    return db.query(Item).filter((Item.slug == ref) | (Item.name == ref)).first()
+    return item_record(db, ref)
 
 
-def get_held_tm_item(unit: GameUnit, db: Session) -> Item | None:
+def get_held_tm_item(unit: GameUnit, db: Session) -> ItemRecord | Item | None:
     item = resolve_item_record(get_unit_held_item(unit), db)
     if not item or item.category != "tm" or not item.move_id:
         return None
@@ -575,12 +603,12 @@ def sync_tm_move_pp(unit: GameUnit, unit_info: Unit, db: Session) -> None:
     pp_list = list(unit.move_pp) if isinstance(unit.move_pp, list) else []
 
     while len(pp_list) < len(base_move_ids):
-        move = db.query(Move).filter_by(id=base_move_ids[len(pp_list)]).first()
+        move = move_record(db, base_move_ids[len(pp_list)])
         pp_list.append(move.pp if move and move.pp is not None else 0)
 
     if has_extra_tm:
         if len(pp_list) < expected_len:
-            tm_move = db.query(Move).filter_by(id=tm_move_id).first()
+            tm_move = move_record(db, tm_move_id)
             pp_list.append(tm_move.pp if tm_move and tm_move.pp is not None else 0)
     elif len(pp_list) > len(base_move_ids):
         pp_list = pp_list[: len(base_move_ids)]
@@ -644,13 +672,6 @@ def consume_unit_held_item(unit: GameUnit, db: Session, *, item_type: str | None
     return True
 
 
-def unit_has_positive_stat_stage(unit: GameUnit) -> bool:
-    for stat in ALL_STAT_EFFECT_KEYS:
-        if get_stat_stage(unit.stat_boosts, stat) > 0:
-            return True
-    return False
-
-
 def snapshot_turn_stat_stages(user_id: int, game_id: int, db: Session) -> None:
     units = db.query(GameUnit).filter(GameUnit.game_id == game_id, GameUnit.user_id == user_id).all()
     for unit in units:
@@ -674,18 +695,6 @@ def unit_stats_lowered_since_turn_start(unit: GameUnit) -> bool:
     return False
 
 
-def unit_stats_raised_since_turn_start(unit: GameUnit) -> bool:
-    snapshot = get_unit_flags(unit).get("stat_stages_at_turn_start")
-    if not isinstance(snapshot, dict):
-        return False
-    for stat in ALL_STAT_EFFECT_KEYS:
-        previous = int(snapshot.get(stat, 0) or 0)
-        current = get_stat_stage(unit.stat_boosts, stat)
-        if current > previous:
-            return True
-    return False
-
-
 def record_last_damage_received(target: GameUnit, attacker: GameUnit, damage: int, db: Session) -> None:
     if damage <= 0:
         return
@@ -722,36 +731,6 @@ def unit_has_glaive_rush(unit: GameUnit) -> bool:
     return bool(state and str(state[0]).lower() == "glaive_rush" and int(state[1]) > 0)
 
 
-def move_has_revive_effect(move: Move) -> bool:
-    if not move or not isinstance(move.effects, list):
-        return False
-    for effect in move.effects:
-        parts = str(effect or "").strip().lower().split(":")
-        if len(parts) >= 2 and parts[0] == "target" and parts[1] == "revive":
-            return True
-    return False
-
-
-def move_ignores_target_stat_changes(move: Move) -> bool:
-    return move_has_effect_token(move, "target:ignore_stat_changes")
-
-
-def move_ignores_fairy_immunity(move: Move) -> bool:
-    return move_has_effect_token(move, "self:ignore_fairy_immunity")
-
-
-def get_unboosted_battle_stat(unit: GameUnit, stat: str, db: Session) -> int:
-    stat = normalize_stat_name(stat)
-    effective = compute_effective_stats(unit, db)
-    boosted_value = int(effective.get(stat, 0) or 0)
-    if boosted_value <= 0:
-        return boosted_value
-    stage_multiplier = get_stat_multiplier(unit.stat_boosts, stat)
-    if stage_multiplier <= 0:
-        return boosted_value
-    return max(1, int(boosted_value / stage_multiplier))
-
-
 def resolve_move_type_from_held_item(attacker: GameUnit, item_category: str) -> str | None:
     held_item = str(get_unit_held_item(attacker) or "").lower()
     if not held_item:
@@ -772,9 +751,9 @@ def resolve_power_add(move: Move, attacker: GameUnit) -> int:
     base_power = int(move.power or 0)
     flags = get_unit_flags(attacker)
 
-    for effect in move.effects:
-        parts = str(effect or "").strip().lower().split(":")
-        if len(parts) < 3 or parts[0] != "power_add":
+    for op in move_program(move).with_head("power_add"):
+        parts = op.lower_parts
+        if len(parts) < 3:
             continue
 
         try:
@@ -798,22 +777,6 @@ def resolve_power_add(move: Move, attacker: GameUnit) -> int:
     return max(0, bonus)
 
 
-def resolve_weather_move_multiplier_for_move(
-    move: Move,
-    move_type: str | None,
-    weather_id: int,
-) -> float:
-    if move and isinstance(move.effects, list):
-        for effect in move.effects:
-            parts = str(effect or "").strip().lower().split(":")
-            if len(parts) >= 4 and parts[0] == "weather_override" and weather_condition_matches(weather_id, parts[1]):
-                try:
-                    return float(parts[2])
-                except ValueError:
-                    continue
-    return get_weather_move_multiplier(move_type, weather_id)
-
-
 def faint_unit_in_place(unit: GameUnit, db: Session) -> None:
     unit.is_fainted = True
     unit.current_hp = 0
@@ -822,91 +785,24 @@ def faint_unit_in_place(unit: GameUnit, db: Session) -> None:
     unit.current_y = -1
     increment_allies_defeated_since_turn(unit, db)
     db.add(unit)
+    stage_state_patch(db, unit.game_id, removed_unit_ids=[unit.id])
 
 
-def normalize_timed_tile_cell(cell) -> list[int]:
-    if isinstance(cell, list):
-        if len(cell) >= 2:
-            try:
-                effect_id = int(cell[0] or 0)
-                turns = int(cell[1] or 0)
-                if effect_id > 0 and turns > 0:
-                    return [effect_id, turns]
-            except (TypeError, ValueError):
-                pass
-        if len(cell) == 1:
-            try:
-                effect_id = int(cell[0] or 0)
-                if effect_id > 0:
-                    return [effect_id, TERRAIN_DEFAULT_DURATION]
-            except (TypeError, ValueError):
-                pass
-    try:
-        effect_id = int(cell or 0)
-        if effect_id > 0:
-            return [effect_id, TERRAIN_DEFAULT_DURATION]
-    except (TypeError, ValueError):
-        pass
-    return [0, 0]
-
-
-def get_timed_effect_id_at_position(tiles: list | None, x: int, y: int) -> int:
-    if not isinstance(tiles, list) or y < 0 or x < 0 or y >= len(tiles):
-        return 0
-    row = tiles[y]
-    if not isinstance(row, list) or x >= len(row):
-        return 0
-    cell = normalize_timed_tile_cell(row[x])
-    return int(cell[0] or 0)
-
-
-def get_terrain_id_at_position(terrain_tiles: list | None, x: int, y: int) -> int:
-    return get_timed_effect_id_at_position(terrain_tiles, x, y)
+def get_unit_position(unit: GameUnit) -> tuple[int, int]:
+    """The unit's tile coordinates; units off the map have negative ones."""
+    x = getattr(unit, "current_x", None)
+    y = getattr(unit, "current_y", None)
+    return (-1 if x is None else int(x)), (-1 if y is None else int(y))
 
 
 def get_unit_terrain_id(unit: GameUnit, terrain_tiles: list | None) -> int:
-    x = int(getattr(unit, "current_x", -1) or -1)
-    y = int(getattr(unit, "current_y", -1) or -1)
-    return get_terrain_id_at_position(terrain_tiles, x, y)
-
-
-def terrain_condition_matches(terrain_id: int, condition: str) -> bool:
-    condition_lower = str(condition or "").lower()
-    if condition_lower in {"", "*", "any"}:
-        return terrain_id > 0
-    if condition_lower == "none":
-        return terrain_id == 0
-    expected = TERRAIN_TO_ID.get(condition_lower)
-    return expected is not None and terrain_id == expected
-
-
-def get_field_effect_at_position(field_effect_tiles: list | None, x: int, y: int) -> int:
-    if not isinstance(field_effect_tiles, list) or y < 0 or x < 0 or y >= len(field_effect_tiles):
-        return 0
-    row = field_effect_tiles[y]
-    if not isinstance(row, list) or x >= len(row):
-        return 0
-    try:
-        return int(row[x] or 0)
-    except (TypeError, ValueError):
-        return 0
+    return timed_effect_id_at(terrain_tiles, *get_unit_position(unit))
 
 
 def is_gravity_active_at(unit: GameUnit, field_effect_tiles: list | None) -> bool:
-    x = int(getattr(unit, "current_x", -1) or -1)
-    y = int(getattr(unit, "current_y", -1) or -1)
+    x, y = get_unit_position(unit)
     gravity_id = FIELD_EFFECT_TO_ID.get("gravity", 0)
-    return gravity_id > 0 and get_field_effect_at_position(field_effect_tiles, x, y) == gravity_id
-
-
-def move_has_effect_token(move: Move, token: str) -> bool:
-    if not move or not isinstance(move.effects, list):
-        return False
-    target = str(token or "").strip().lower()
-    for effect in move.effects:
-        if str(effect or "").strip().lower() == target:
-            return True
-    return False
+    return gravity_id > 0 and field_effect_at(field_effect_tiles, x, y) == gravity_id
 
 
 def resolve_move_type_for_execution(
@@ -928,9 +824,9 @@ def resolve_move_type_for_execution(
         if mapped in type_map:
             return type_map[mapped]
 
-    for effect in move.effects or []:
-        parts = str(effect or "").strip().lower().split(":")
-        if len(parts) >= 3 and parts[0] == "self" and parts[1] == "modify_move_type_by_held_item":
+    for op in move_program(move).with_head("self"):
+        parts = op.lower_parts
+        if len(parts) >= 3 and parts[1] == "modify_move_type_by_held_item":
             mapped_type = resolve_move_type_from_held_item(attacker, parts[2])
             if mapped_type:
                 return mapped_type
@@ -955,9 +851,9 @@ def resolve_power_multiplier(
     attacker_terrain = get_unit_terrain_id(attacker, terrain_tiles)
     target_terrain = get_unit_terrain_id(target, terrain_tiles) if target is not None else 0
 
-    for effect in move.effects:
-        parts = str(effect or "").strip().lower().split(":")
-        if len(parts) < 2 or parts[0] != "conditional_power":
+    for op in move_program(move).with_head("conditional_power"):
+        parts = op.lower_parts
+        if len(parts) < 2:
             continue
 
         if len(parts) >= 4 and parts[1] == "terrain":
@@ -1057,9 +953,9 @@ def resolve_move_accuracy(
         return None
 
     accuracy = int(move.accuracy)
-    for effect in move.effects or []:
-        parts = str(effect or "").strip().lower().split(":")
-        if len(parts) >= 4 and parts[0] == "conditional_accuracy" and parts[1] == "weather":
+    for op in move_program(move).with_head("conditional_accuracy"):
+        parts = op.lower_parts
+        if len(parts) >= 4 and parts[1] == "weather":
             weather_name = parts[2]
             try:
                 override = int(parts[3])
@@ -1072,79 +968,8 @@ def resolve_move_accuracy(
     return accuracy
 
 
-def get_scaling_hit_powers(move: Move) -> list[int] | None:
-    if not move or not isinstance(move.effects, list):
-        return None
-    for effect in move.effects:
-        parts = str(effect or "").strip().lower().split(":")
-        if len(parts) >= 3 and parts[0] == "multi_hit" and parts[1] == "scaling":
-            powers: list[int] = []
-            for token in parts[2].split(","):
-                try:
-                    powers.append(int(token))
-                except ValueError:
-                    continue
-            return powers or None
-    return None
-
-
-def move_uses_separate_hit_accuracy(move: Move) -> bool:
-    if not move or not isinstance(move.effects, list):
-        return False
-    for effect in move.effects:
-        parts = str(effect or "").strip().lower().split(":")
-        if len(parts) >= 4 and parts[0] == "multi_hit" and parts[1] == "scaling" and parts[3] == "separate_accuracy":
-            return True
-    return False
-
-
 def get_move_hit_count(move: Move, *, landed_target_count: int = 1) -> int:
-    """Resolve how many times a move should hit from its multi_hit effect token."""
-    if not move or not isinstance(move.effects, list):
-        return 1
-
-    for effect in move.effects:
-        parts = str(effect or "").strip().lower().split(":")
-        if len(parts) < 2 or parts[0] != "multi_hit":
-            continue
-
-        hit_mode = parts[1]
-        if hit_mode == "dragon_darts":
-            return 2 if landed_target_count == 1 else 1
-        if hit_mode == "scaling":
-            powers = get_scaling_hit_powers(move)
-            return len(powers) if powers else 1
-
-        if hit_mode == "variable":
-            roll = random.randint(1, 20)
-            if roll <= 7:
-                return 2
-            if roll <= 14:
-                return 3
-            if roll <= 17:
-                return 4
-            return 5
-
-        if hit_mode == "party":
-            return 1
-
-        try:
-            minimum_hits = max(1, int(hit_mode))
-        except ValueError:
-            return 1
-
-        maximum_hits = minimum_hits
-        if len(parts) >= 3:
-            try:
-                maximum_hits = max(minimum_hits, int(parts[2]))
-            except ValueError:
-                maximum_hits = minimum_hits
-
-        if minimum_hits == maximum_hits:
-            return minimum_hits
-        return random.randint(minimum_hits, maximum_hits)
-
-    return 1
+    return roll_hit_count(move, random, landed_target_count=landed_target_count)
 
 
 def move_requires_target_held_item(move: Move) -> bool:
@@ -1190,13 +1015,13 @@ def validate_move_execution(
             return "But it failed"
 
     attacker_types = get_unit_types(attacker, db)
-    for effect in move.effects or []:
-        parts = str(effect or "").strip().lower().split(":")
+    for op in move_program(move).ops:
+        parts = op.lower_parts
         if len(parts) >= 3 and parts[0] == "requires" and parts[1] == "type":
             required_type = parts[2]
             if required_type not in attacker_types:
                 return "But it failed"
-        if str(effect or "").strip().lower() == "requires:last_damage_attacker":
+        if op.token == "requires:last_damage_attacker":
             flags = get_unit_flags(attacker)
             last_attacker_id = flags.get("last_damage_attacker_id")
             if last_attacker_id is None:
@@ -1248,9 +1073,18 @@ def estimate_damage_for_mode(
     weather_move_multiplier: float,
     targets_multiplier: float,
 ) -> float:
-    safe_defense = defense if defense > 0 else 1
-    base = (((2 * level) / 5 + 2) * power * (attack / safe_defense)) / 50 + 2
-    return base * targets_multiplier * stab * type_multiplier * weather_move_multiplier
+    return raw_damage(
+        DamageRow(
+            level=level,
+            power=power,
+            attack=attack,
+            defense=defense,
+            targets_multiplier=targets_multiplier,
+            stab=stab,
+            type_multiplier=type_multiplier,
+            weather_multiplier=weather_move_multiplier,
+        )
+    )
 
 
 def resolve_shell_side_arm_mode(
@@ -1288,16 +1122,6 @@ def resolve_shell_side_arm_mode(
         target_types,
         target_ability_names,
     )
-    physical_estimate = estimate_damage_for_mode(
-        power=power,
-        level=level,
-        attack=physical_attack,
-        defense=physical_defense,
-        stab=stab,
-        type_multiplier=type_multiplier,
-        weather_move_multiplier=weather_move_multiplier,
-        targets_multiplier=targets_multiplier,
-    )
 
     special_attack = (attacker.current_stats or {}).get("sp_attack", 0) or 0
     special_defense = (target.current_stats or {}).get("sp_defense", 1) or 1
@@ -1309,15 +1133,18 @@ def resolve_shell_side_arm_mode(
         target_types,
         target_ability_names,
     )
-    special_estimate = estimate_damage_for_mode(
-        power=power,
-        level=level,
-        attack=special_attack,
-        defense=special_defense,
-        stab=stab,
-        type_multiplier=type_multiplier,
-        weather_move_multiplier=weather_move_multiplier,
-        targets_multiplier=targets_multiplier,
+    physical_estimate, special_estimate = raw_damage_batch(
+        DamageRow(
+            level=level,
+            power=power,
+            attack=attack,
+            defense=defense,
+            targets_multiplier=targets_multiplier,
+            stab=stab,
+            type_multiplier=type_multiplier,
+            weather_multiplier=weather_move_multiplier,
+        )
+        for attack, defense in ((physical_attack, physical_defense), (special_attack, special_defense))
     )
 
     if physical_estimate >= special_estimate:
@@ -1325,194 +1152,8 @@ def resolve_shell_side_arm_mode(
     return True, False
 
 
-def normalize_hazard_cell(cell: list | None) -> list[list[int]]:
-    normalized: list[list[int]] = []
-    if not isinstance(cell, list):
-        return normalized
-
-    for entry in cell:
-        if not isinstance(entry, list) or len(entry) < 2:
-            continue
-        try:
-            hazard_id = int(entry[0])
-            turns_remaining = int(entry[1])
-        except (TypeError, ValueError):
-            continue
-
-        if hazard_id <= 0 or turns_remaining <= 0:
-            continue
-        normalized.append([hazard_id, turns_remaining])
-
-    return normalized
-
-
-def try_add_hazard_stack(hazard_entries: list[list[int]], hazard_id: int, duration_turns: int) -> bool:
-    if hazard_id <= 0 or duration_turns <= 0:
-        return False
-
-    max_stacks = int(FIELD_HAZARD_STACK_LIMITS.get(hazard_id, 1))
-    current_stacks = sum(1 for entry in hazard_entries if int(entry[0]) == hazard_id)
-    if current_stacks >= max_stacks:
-        return False
-
-    hazard_entries.append([hazard_id, duration_turns])
-    return True
-
-
-def clear_hazards_on_tiles(map_state: "GameMapState", affected_tiles: list[tuple[int, int]], db: Session) -> bool:
-    if map_state is None or not isinstance(map_state.hazard_tiles, list):
-        return False
-
-    changed = False
-    for tx, ty in affected_tiles:
-        if ty < 0 or tx < 0 or ty >= len(map_state.hazard_tiles):
-            continue
-        row = map_state.hazard_tiles[ty]
-        if not isinstance(row, list) or tx >= len(row):
-            continue
-        if normalize_hazard_cell(row[tx]):
-            row[tx] = []
-            changed = True
-
-    if changed:
-        db.add(map_state)
-    return changed
-
-
-def clear_substitutes_on_tiles(
-    game_id: int,
-    affected_tiles: list[tuple[int, int]],
-    db: Session,
-    *,
-    game: "Game | None" = None,
-    game_state: "GameState | None" = None,
-) -> bool:
-    tile_set = set(affected_tiles)
-    if not tile_set:
-        return False
-
-    units = db.query(GameUnit).filter(GameUnit.game_id == game_id).all()
-    changed = False
-    for unit in units:
-        if int(unit.current_x) < 0 or int(unit.current_y) < 0:
-            continue
-        if (int(unit.current_x), int(unit.current_y)) not in tile_set:
-            continue
-        state = normalize_states(unit.states)
-        if state and str(state[0]).lower() == "substitute" and int(state[1]) > 0:
-            unit.states = []
-            db.add(unit)
-            changed = True
-            if game and game_state:
-                publish_system_log_event(
-                    game.link,
-                    f"{get_unit_display_name(unit, db)}'s substitute was removed",
-                    game_state,
-                    db,
-                )
-    return changed
-
-
-def find_revival_placement_tile(attacker: GameUnit, map_obj: Map, db: Session, *, pulse: int = 3) -> tuple[int, int] | None:
-    width = int(getattr(map_obj, "width", 0) or 0)
-    height = int(getattr(map_obj, "height", 0) or 0)
-    if width <= 0 or height <= 0:
-        return None
-
-    origin_x = int(attacker.current_x)
-    origin_y = int(attacker.current_y)
-    affected_tiles = get_pulse_tiles_backend(origin_x, origin_y, pulse, width, height)
-    occupied = {
-        (int(unit.current_x), int(unit.current_y))
-        for unit in db.query(GameUnit).filter(
-            GameUnit.game_id == attacker.game_id,
-            GameUnit.is_fainted == False,
-            GameUnit.current_hp > 0,
-        ).all()
-        if int(unit.current_x) >= 0 and int(unit.current_y) >= 0
-    }
-
-    for tile in affected_tiles:
-        if tile not in occupied:
-            return tile
-    return None
-
-
-def get_weather_id_at_position(weather_tiles: list | None, x: int, y: int) -> int:
-    if not isinstance(weather_tiles, list) or y < 0 or x < 0 or y >= len(weather_tiles):
-        return 0
-    row = weather_tiles[y]
-    if not isinstance(row, list) or x >= len(row):
-        return 0
-    try:
-        return int(row[x] or 0)
-    except (TypeError, ValueError):
-        return 0
-
-
 def get_unit_weather_id(unit: GameUnit, weather_tiles: list | None) -> int:
-    x = int(getattr(unit, "current_x", -1) or -1)
-    y = int(getattr(unit, "current_y", -1) or -1)
-    return get_weather_id_at_position(weather_tiles, x, y)
-
-
-def get_hazard_entries_at_position(hazard_tiles: list | None, x: int, y: int) -> list[list[int]]:
-    if not isinstance(hazard_tiles, list) or y < 0 or x < 0 or y >= len(hazard_tiles):
-        return []
-    row = hazard_tiles[y]
-    if not isinstance(row, list) or x >= len(row):
-        return []
-    return normalize_hazard_cell(row[x])
-
-
-def get_weather_name_from_id(weather_id: int) -> str:
-    """Convert weather ID back to name. ID 0 is 'clear'."""
-    for name, wid in WEATHER_TO_ID.items():
-        if wid == weather_id:
-            return name
-    return "clear"
-
-
-def weather_condition_matches(weather_id: int, condition: str) -> bool:
-    """Check if a weather condition matches the current weather_id.
-    
-    Args:
-        weather_id: Current weather ID (0=clear, 1=sun, 2=rain, 3=sandstorm, 4=hail)
-        condition: Condition string ('sun', 'clear', '*', etc.)
-    
-    Returns:
-        True if condition matches current weather
-    """
-    condition_lower = str(condition or "").lower()
-    
-    # Wildcard always matches
-    if condition_lower == "*":
-        return True
-    
-    # Map condition name to ID and compare
-    if condition_lower == "clear":
-        return weather_id == 0
-    
-    condition_id = WEATHER_TO_ID.get(condition_lower)
-    if condition_id is not None:
-        return weather_id == condition_id
-    
-    return False
-
-
-def get_weather_move_multiplier(move_type: str | None, attacker_weather_id: int) -> float:
-    move_type_norm = str(move_type or "").lower()
-    if attacker_weather_id == WEATHER_TO_ID["rain"]:
-        if move_type_norm == "water":
-            return 1.5
-        if move_type_norm == "fire":
-            return 0.5
-    elif attacker_weather_id == WEATHER_TO_ID["sun"]:
-        if move_type_norm == "fire":
-            return 1.5
-        if move_type_norm == "water":
-            return 0.5
-    return 1.0
+    return weather_id_at(weather_tiles, *get_unit_position(unit))
 
 
 def get_weather_defense_multiplier(target: GameUnit, defense_stat: str, target_weather_id: int, db: Session) -> float:
@@ -1537,270 +1178,10 @@ def get_weather_defense_multiplier(target: GameUnit, defense_stat: str, target_w
     return 1.0
 
 
-def parse_move_range_spec(move: Move) -> tuple[str, int]:
-    raw = str(getattr(move, "range", "") or getattr(move, "targeting", "") or "").lower().strip()
-    m = re.match(r"^([a-z_]+)(?::(\d+))?$", raw)
-    if not m:
-        return "", 0
-    kind = m.group(1) or ""
-    offset = int(m.group(2)) if m.group(2) else 0
-    return kind, offset
-
-
-def get_pulse_tiles_backend(origin_x: int, origin_y: int, pulse: int, width: int, height: int) -> list[tuple[int, int]]:
-    # Must mirror frontend pulse semantics exactly.
-    # pulse:1 -> cardinal neighbors at radius 1 (no diagonals)
-    # pulse:2 -> radius 1 including diagonals, excluding self
-    # pulse:3 -> radius 1 including diagonals and self
-    # pulse:4/5/6 are the above, extended to radius 2
-    is_extended = pulse >= 4
-    radius = 2 if is_extended else 1
-    base_mode = ((pulse - 1) % 3) + 1  # maps 1..6 -> 1..3
-
-    tiles: list[tuple[int, int]] = []
-    for dy in range(-radius, radius + 1):
-        for dx in range(-radius, radius + 1):
-            tx = origin_x + dx
-            ty = origin_y + dy
-            if tx < 0 or ty < 0 or tx >= width or ty >= height:
-                continue
-
-            manhattan = abs(dx) + abs(dy)
-            chebyshev = max(abs(dx), abs(dy))
-
-            if base_mode == 1:
-                if manhattan >= 1 and manhattan <= radius and (dx == 0 or dy == 0):
-                    tiles.append((tx, ty))
-            elif base_mode == 2:
-                if chebyshev >= 1 and chebyshev <= radius:
-                    tiles.append((tx, ty))
-            else:
-                if chebyshev <= radius:
-                    tiles.append((tx, ty))
-
-    return tiles
-
-
 def get_move_affected_tiles(move: Move, attacker: GameUnit, width: int, height: int) -> list[tuple[int, int]]:
     x = int(getattr(attacker, "current_x", 0) or 0)
     y = int(getattr(attacker, "current_y", 0) or 0)
-    kind, offset = parse_move_range_spec(move)
-
-    if kind == "pulse":
-        pulse = offset if offset > 0 else 1
-        return get_pulse_tiles_backend(x, y, pulse, width, height)
-
-    # Conservative default for field moves that do not yet have backend tile logic:
-    # affect only user's tile instead of entire map.
-    if 0 <= x < width and 0 <= y < height:
-        return [(x, y)]
-    return []
-
-
-def get_type_multiplier(
-    move_type: str,
-    defender_types: List[str],
-    *,
-    ignore_fairy_immunity: bool = False,
-) -> float:
-    # Backwards-compatible signature: accept optional defender unit by passing as third arg
-    defender_unit = None
-    db = None
-    # If caller passed a GameUnit instead of a list for defender_types, adjust
-    if not move_type:
-        return 1
-    # Allow defender_types to be either a list of types or (types, unit, db)
-    if isinstance(defender_types, tuple) and len(defender_types) >= 2:
-        # Expect (types_list, defender_unit) or (types_list, defender_unit, db)
-        types_list = defender_types[0]
-        defender_unit = defender_types[1] if len(defender_types) >= 2 else None
-        db = defender_types[2] if len(defender_types) >= 3 else None
-        defender_types = types_list
-
-    chart = TYPE_EFFECTIVENESS.get(str(move_type).lower())
-    if not chart:
-        return 1
-    multiplier = 1.0
-    for dtype in defender_types or []:
-        key = str(dtype).lower()
-        # Handle immunities; certain states (foresight/mind_reader) can bypass them
-        if key in chart.get("immune", []):
-            if ignore_fairy_immunity and key == "fairy" and str(move_type).lower() == "dragon":
-                pass
-            else:
-                try:
-                    # If defender_unit supplied and has foresight/mind_reader, ignore specific immunities
-                    if defender_unit is not None:
-                        s = normalize_states(defender_unit.states)
-                        if s and int(s[1]) > 0:
-                            state_name = s[0]
-                            if state_name == "foresight" and str(move_type).lower() in {"normal", "fighting"}:
-                                # bypass immunity
-                                pass
-                            elif state_name == "mind_reader" and str(move_type).lower() == "psychic":
-                                pass
-                            else:
-                                return 0
-                        else:
-                            return 0
-                    else:
-                        return 0
-                except Exception:
-                    return 0
-        if key in chart.get("weak", []):
-            multiplier *= 2
-        elif key in chart.get("resist", []):
-            multiplier *= 0.5
-    return multiplier
-
-def normalize_stat_name(stat: str) -> str:
-    """Normalize stat names to match model field names."""
-    mapping = {
-        "special_attack": "sp_attack",
-        "special_defense": "sp_defense",
-        "sp attack": "sp_attack",
-        "sp defense": "sp_defense",
-    }
-    return mapping.get(stat.lower(), stat.lower())
-
-
-def default_stat_boosts() -> dict:
-    return {
-        "attack": [],
-        "defense": [],
-        "sp_attack": [],
-        "sp_defense": [],
-        "speed": [],
-        "accuracy": [],
-        "evasion": [],
-        "crit": [],
-    }
-
-
-# Omniboost/omnidebuff effects (e.g., Ancient Power) affect battle stats only.
-# Range is excluded because it is derived from speed.
-ALL_STAT_EFFECT_KEYS = ["attack", "defense", "sp_attack", "sp_defense", "speed"]
-
-
-def normalize_status_name(status: str) -> str:
-    normalized = str(status).lower().strip()
-    return STATUS_NAME_ALIASES.get(normalized, normalized)
-
-
-def format_stat_log_label(stat: str) -> str:
-    normalized_stat = normalize_stat_name(stat)
-    if normalized_stat == "all":
-        return "all stats"
-    return STAT_LOG_LABELS.get(normalized_stat, normalized_stat.replace("_", " "))
-
-
-def format_status_log_label(status: str) -> str:
-    normalized_status = normalize_status_name(status)
-    return STATUS_LOG_LABELS.get(normalized_status, normalized_status.replace("_", " "))
-
-
-def format_state_log_message(unit: GameUnit, state_name: str, db: Session) -> str:
-    display_name = get_unit_display_name(unit, db)
-    normalized_state = str(state_name or "").strip().lower()
-    if normalized_state == "flinch":
-        return f"{display_name} flinched"
-    if normalized_state == "confusion":
-        return f"{display_name} is confused"
-    return f"{display_name} gained {normalized_state}"
-
-
-def format_stat_change_outcome_phrase(delta_stage: int, attempted_direction: int) -> str:
-    """Format user-facing stat change outcome text from applied stage delta."""
-    if delta_stage > 0:
-        if delta_stage == 1:
-            return "rose."
-        if delta_stage == 2:
-            return "rose sharply."
-        return "rose drastically."
-
-    if delta_stage < 0:
-        if delta_stage == -1:
-            return "fell."
-        if delta_stage == -2:
-            return "harshly fell."
-        return "severely fell."
-
-    if attempted_direction >= 0:
-        return "won't go higher."
-    return "won't go lower."
-
-
-def normalize_status_effects(raw: list | dict | str | None) -> list:
-    def parse_single_status(value) -> list | None:
-        if isinstance(value, dict):
-            status = normalize_status_name(str(value.get("status", "")))
-            if status not in VALID_STATUS_EFFECTS:
-                return None
-            expires_turn = value.get("expires_turn", 1)
-            if not isinstance(expires_turn, (int, float)):
-                expires_turn = 1
-            if status == "badly_poisoned":
-                bad_poison_turn = value.get("bad_poison_turn", 1)
-                if not isinstance(bad_poison_turn, (int, float)):
-                    bad_poison_turn = 1
-                return [status, int(expires_turn), int(bad_poison_turn)]
-            return [status, int(expires_turn)]
-
-        if isinstance(value, list) and len(value) >= 2:
-            status_raw, expires_turn_raw = value[0], value[1]
-            status = normalize_status_name(status_raw)
-            if status not in VALID_STATUS_EFFECTS:
-                return None
-            if not isinstance(expires_turn_raw, (int, float)):
-                return None
-            if status == "badly_poisoned":
-                bad_poison_turn_raw = value[2] if len(value) >= 3 else 1
-                if not isinstance(bad_poison_turn_raw, (int, float)):
-                    bad_poison_turn_raw = 1
-                return [status, int(expires_turn_raw), int(bad_poison_turn_raw)]
-            return [status, int(expires_turn_raw)]
-
-        if isinstance(value, str):
-            status = normalize_status_name(value)
-            if status in VALID_STATUS_EFFECTS:
-                return [status, 1]
-
-        return None
-
-    if raw is None:
-        return []
-
-    # Canonical: [status, turns]
-    parsed = parse_single_status(raw)
-    if parsed:
-        return parsed
-
-    # Backwards compatibility: nested arrays/lists with first valid entry
-    if isinstance(raw, list):
-        for entry in raw:
-            parsed_entry = parse_single_status(entry)
-            if parsed_entry:
-                return parsed_entry
-
-    return []
-
-
-def normalize_states(raw: list | str | None) -> list:
-    if raw is None:
-        return []
-
-    if isinstance(raw, str):
-        state = raw.strip().lower()
-        return [state, 1] if state else []
-
-    if isinstance(raw, list) and len(raw) >= 2:
-        state = str(raw[0]).strip().lower()
-        turns_remaining = raw[1]
-        if not state or not isinstance(turns_remaining, (int, float)):
-            return []
-        return [state, int(turns_remaining)]
-
-    return []
+    return move_effect_tiles(move, (x, y), width, height)
 
 
 def unit_has_active_named_state(unit: GameUnit, state_name: str) -> bool:
@@ -1813,97 +1194,6 @@ def unit_has_active_named_state(unit: GameUnit, state_name: str) -> bool:
     )
 
 
-def apply_state_effect(unit: GameUnit, state_name: str, db: Session) -> bool:
-    state_name = str(state_name or "").strip().lower()
-    if state_name not in VALID_STATE_EFFECTS:
-        return False
-
-    current_state = normalize_states(unit.states)
-    has_active_state = len(current_state) == 2 and int(current_state[1]) > 0
-
-    # Special-case Power Trick: if applying while already present, remove it (toggle)
-    try:
-        if state_name == "power_trick" and current_state and current_state[0] == "power_trick" and int(current_state[1]) > 0:
-            unit.states = []
-            db.add(unit)
-            return True
-    except Exception:
-        pass
-
-    # Do not refresh an identical active state on this unit.
-    if unit_has_active_named_state(unit, state_name):
-        return False
-
-    if has_active_state:
-        return False
-
-    if state_name in SIDE_SCREEN_STATE_NAMES:
-        unit.states = [state_name, SCREEN_EFFECT_DURATION]
-    elif state_name == "aqua_ring":
-        unit.states = [state_name, SCREEN_EFFECT_DURATION]
-    elif state_name == "ingrain":
-        unit.states = [state_name, SCREEN_EFFECT_DURATION]
-    elif state_name == "laser_focus":
-        unit.states = [state_name, 1]
-    elif state_name == "heal_block":
-        unit.states = [state_name, SCREEN_EFFECT_DURATION]
-    elif state_name == "cursed":
-        unit.states = [state_name, SCREEN_EFFECT_DURATION]
-    elif state_name == "nightmare":
-        # Nightmare persists while the unit is asleep; use a long duration and remove when sleep ends
-        unit.states = [state_name, 9999]
-    elif state_name == "immobilized":
-        # Prevents movement for 3 turns but does not prevent using moves
-        unit.states = [state_name, 3]
-    elif state_name == "salt_cure":
-        # Salt Cure lasts SCREEN_EFFECT_DURATION turns
-        unit.states = [state_name, SCREEN_EFFECT_DURATION]
-    elif state_name == "taunt":
-        unit.states = [state_name, SCREEN_EFFECT_DURATION]
-    elif state_name == "torment":
-        # Torment prevents the unit from using the same move twice in a row
-        unit.states = [state_name, SCREEN_EFFECT_DURATION]
-    elif state_name == "telekinesis":
-        # Telekinesis makes moves (except OHKO moves) always hit this unit
-        # and prevents Ground-type moves from hitting it.
-        unit.states = [state_name, SCREEN_EFFECT_DURATION]
-    elif state_name == "tar_shot":
-        # Tar Shot increases damage taken from Fire-type moves
-        unit.states = [state_name, SCREEN_EFFECT_DURATION]
-    elif state_name == "gastro_acid":
-        # Gastro Acid suppresses the unit's ability
-        unit.states = [state_name, SCREEN_EFFECT_DURATION]
-    elif state_name == "embargo":
-        # Embargo prevents the unit from using its held item
-        unit.states = [state_name, SCREEN_EFFECT_DURATION]
-    elif state_name == "drowsy":
-        # Drowsy expires after two full rounds (two turns per player)
-        duration = 2
-        try:
-            gs = db.query(GameState).filter(GameState.game_id == unit.game_id).first()
-            if gs and isinstance(gs.players, list) and len(gs.players) > 0:
-                duration = 2 * len(gs.players)
-        except Exception:
-            duration = 2
-        unit.states = [state_name, duration]
-    elif state_name == "torment":
-        # Torment prevents the unit from using the same move twice in a row
-        unit.states = [state_name, SCREEN_EFFECT_DURATION]
-    elif state_name == "destiny_bond":
-        # Destiny Bond lasts until the unit can move again (tracked as 1 turn)
-        unit.states = [state_name, 1]
-    elif state_name == "confusion":
-        unit.states = [state_name, random.randint(2, 5)]
-    elif state_name == "flinch":
-        unit.states = [state_name, 1]
-    elif state_name == "glaive_rush":
-        unit.states = [state_name, 1]
-    elif state_name == "substitute":
-        unit.states = [state_name, 9999]
-    db.add(unit)
-    return True
-
-
 def apply_confusion_self_damage(
     unit: GameUnit,
     db: Session,
@@ -1938,20 +1228,23 @@ def apply_confusion_self_damage(
 
 
 def get_status_duration(status: str) -> int:
-    if status in SHORT_DURATION_STATUS_EFFECTS:
-        return random.randint(2, 4)
-    return random.randint(4, 7)
-
+    return status_duration(status, random)
 
-def get_unit_types(unit: GameUnit, db: Session) -> set[str]:
-    if unit.unit and isinstance(unit.unit.types, list):
-        return {str(unit_type).lower() for unit_type in unit.unit.types}
 
+def get_unit_info(unit: GameUnit, db: Session) -> UnitRecord | Unit | None:
+    """Species data for a unit: the loaded relationship if present, else the catalog."""
+    loaded = getattr(unit, "__dict__", {}).get("unit")
+    if loaded is not None:
+        return loaded
     if unit.unit_id:
-        unit_info = db.query(Unit).filter_by(id=unit.unit_id).first()
-        if unit_info and isinstance(unit_info.types, list):
-            return {str(unit_type).lower() for unit_type in unit_info.types}
+        return unit_record(db, unit.unit_id)
+    return unit.unit
+
 
+def get_unit_types(unit: GameUnit, db: Session) -> set[str]:
+    unit_info = get_unit_info(unit, db)
+    if unit_info and isinstance(unit_info.types, list):
+        return {str(unit_type).lower() for unit_type in unit_info.types}
     return set()
 
 
@@ -1969,7 +1262,7 @@ def get_unit_ability_names(unit: GameUnit, db: Session) -> set[str]:
     if ability_id is None:
         return set()
     try:
-        ability = db.query(Ability).filter(Ability.id == ability_id).first()
+        ability = ability_record(db, ability_id)
         if ability and getattr(ability, "name", None):
             return {str(ability.name).lower()}
     except Exception:
@@ -1977,15 +1270,6 @@ def get_unit_ability_names(unit: GameUnit, db: Session) -> set[str]:
     return set()
 
 
-def is_ability_suppressed(unit: GameUnit) -> bool:
-    """Return True if the unit currently has Gastro Acid (ability suppressed)."""
-    try:
-        s = normalize_states(unit.states)
-        return bool(s and s[0] == 'gastro_acid' and int(s[1]) > 0)
-    except Exception:
-        return False
-
-
 def is_item_suppressed(unit: GameUnit) -> bool:
     """Return True if the unit currently has Embargo (item use suppressed)."""
     try:
@@ -2019,175 +1303,6 @@ def apply_status_effect(unit: GameUnit, status: str, db: Session) -> bool:
     return True
 
 
-def cure_status_effect(unit: GameUnit, status_spec: str, db: Session) -> bool:
-    """Cure a unit's current status when it matches status_spec."""
-    current_status_effects = normalize_status_effects(unit.status_effects)
-    if not current_status_effects:
-        return False
-
-    current_status_name = str(current_status_effects[0]).lower()
-    normalized_spec = str(status_spec or "").strip().lower()
-
-    should_cure = False
-    if normalized_spec in {"all", "any"}:
-        should_cure = True
-    else:
-        requested_statuses = {
-            normalize_status_name(token)
-            for token in normalized_spec.split(",")
-            if token and token.strip()
-        }
-        should_cure = current_status_name in requested_statuses
-
-    if not should_cure:
-        return False
-
-    unit.status_effects = []
-    unit.current_stats = compute_effective_stats(unit, db)
-    db.add(unit)
-    return True
-
-
-def matches_effect_condition(unit: GameUnit, condition: str, value: str, db: Session) -> bool:
-    condition_name = str(condition or "").lower()
-    condition_value = str(value or "").lower()
-    if not condition_value:
-        return False
-
-    unit_types = get_unit_types(unit, db)
-    if condition_name == "type":
-        return condition_value in unit_types
-    if condition_name == "not_type":
-        return condition_value not in unit_types
-
-    # Ability checks: support 'has_ability' and 'not_has_ability'
-    if condition_name == "has_ability":
-        # If Gastro Acid is active, abilities are suppressed
-        if is_ability_suppressed(unit):
-            return False
-        requested = {token.strip().lower() for token in condition_value.split(",") if token.strip()}
-        if not requested:
-            return False
-        unit_abilities = get_unit_ability_names(unit, db)
-        return any(req in unit_abilities for req in requested)
-    if condition_name == "not_has_ability":
-        if is_ability_suppressed(unit):
-            # If abilities suppressed, treat as not having the ability
-            return True
-        requested = {token.strip().lower() for token in condition_value.split(",") if token.strip()}
-        if not requested:
-            return False
-        unit_abilities = get_unit_ability_names(unit, db)
-        return all(req not in unit_abilities for req in requested)
-
-    if condition_name == "stat_boosted":
-        return unit_has_positive_stat_stage(unit)
-
-    if condition_name == "stat_raised_since_turn":
-        return unit_stats_raised_since_turn_start(unit)
-
-    return False
-
-
-def normalize_stat_boosts(raw: dict | None) -> dict:
-    normalized = default_stat_boosts()
-    if not isinstance(raw, dict):
-        return normalized
-
-    for raw_stat, value in raw.items():
-        stat = normalize_stat_name(str(raw_stat))
-        if stat not in normalized:
-            continue
-
-        if isinstance(value, list):
-            clean_instances = []
-            for instance in value:
-                if not isinstance(instance, dict):
-                    continue
-                magnitude = instance.get("magnitude")
-                if not isinstance(magnitude, (int, float)):
-                    continue
-                expires_turn = instance.get("expires_turn", 4)
-                if not isinstance(expires_turn, (int, float)):
-                    expires_turn = 4
-                clean_instances.append({
-                    "magnitude": int(magnitude),
-                    "expires_turn": int(expires_turn),
-                })
-            normalized[stat] = clean_instances
-        elif isinstance(value, (int, float)):
-            # Backwards compatibility for old stage-based payloads (e.g. {"attack": 1})
-            stage_value = int(value)
-            if stage_value != 0:
-                normalized[stat] = [{"magnitude": stage_value, "expires_turn": 4}]
-
-    return normalized
-
-def get_stat_multiplier(stat_boosts: dict, stat: str) -> float:
-    """
-    Calculate the multiplier for a stat based on its boost/debuff stages.
-    Uses standard Pokémon stat stage formula:
-    - For positive stages: (2 + stage) / 2
-    - For negative stages: 2 / (2 - stage)
-    - Stage is capped at ±6
-    """
-    stat = normalize_stat_name(stat)
-    boosts = normalize_stat_boosts(stat_boosts)
-    
-    if stat not in boosts:
-        return 1.0
-    
-    instances = boosts.get(stat, [])
-    if not instances:
-        return 1.0
-    
-    # Sum all magnitudes from active instances
-    total_stage = sum(inst.get("magnitude", 0) for inst in instances)
-    
-    # Cap at ±6
-    total_stage = max(-6, min(6, total_stage))
-    
-    # Calculate multiplier
-    if total_stage == 0:
-        return 1.0
-    elif total_stage > 0:
-        return (2 + total_stage) / 2
-    else:  # total_stage < 0
-        return 2 / (2 - total_stage)
-
-
-def get_stat_stage(stat_boosts: dict, stat: str) -> int:
-    """Return summed stat stage for the stat, clamped to +/- 6."""
-    stat = normalize_stat_name(stat)
-    boosts = normalize_stat_boosts(stat_boosts)
-    if stat not in boosts:
-        return 0
-
-    instances = boosts.get(stat, [])
-    if not isinstance(instances, list):
-        return 0
-
-    total_stage = 0
-    for inst in instances:
-        if isinstance(inst, dict):
-            magnitude = inst.get("magnitude", 0)
-            if isinstance(magnitude, (int, float)):
-                total_stage += int(magnitude)
-
-    return max(-6, min(6, total_stage))
-
-
-def get_accuracy_stage_multiplier(attacker_accuracy_stage: int, target_evasion_stage: int) -> float:
-    """
-    Gen V+ style accuracy/evasion multiplier.
-    Uses adjusted stage = attacker accuracy stage - target evasion stage (clamped to +/- 6).
-    """
-    adjusted_stage = max(-6, min(6, attacker_accuracy_stage - target_evasion_stage))
-    if adjusted_stage >= 0:
-        return (3 + adjusted_stage) / 3
-    return 3 / (3 - adjusted_stage)
-
-
 def get_modified_accuracy_threshold(
     move_accuracy: int | None,
     attacker: GameUnit,
@@ -2263,73 +1378,6 @@ def move_lands_on_target(
     roll = random.uniform(0, 100)
     return roll <= threshold
 
-def get_critical_hit_chance(crit_stage: int) -> float:
-    """
-    Get the critical hit chance based on crit stage.
-    Uses Pokémon Gen III-V critical hit rates.
-    Stages are clamped to -6 to +4 range.
-    
-    Stage thresholds:
-    - Stage 0: 1/16 (6.25%)
-    - Stage 1: 1/8 (12.5%)
-    - Stage 2: 1/4 (25%)
-    - Stage 3: 1/3 (~33.3%)
-    - Stage 4+: 1/2 (50%)
-    - Negative stages: 0% (impossible to crit)
-    """
-    # Clamp stage to reasonable range
-    stage = max(-6, min(4, crit_stage))
-    
-    if stage < 0:
-        return 0.0
-    elif stage == 0:
-        return 1 / 16  # 6.25%
-    elif stage == 1:
-        return 1 / 8   # 12.5%
-    elif stage == 2:
-        return 1 / 4   # 25%
-    elif stage == 3:
-        return 1 / 3   # ~33.3%
-    else:  # stage >= 4
-        return 1 / 2   # 50%
-
-def move_has_high_crit_ratio(move: Move) -> bool:
-    """Return True when a move includes a high_crit_ratio effect token."""
-    if not move or not isinstance(move.effects, list):
-        return False
-
-    for effect in move.effects:
-        token = str(effect or "").strip().lower()
-        if token == "high_crit_ratio":
-            return True
-        if token.endswith(":high_crit_ratio"):
-            return True
-    return False
-
-
-def move_is_instant_ko(move: Move) -> bool:
-    """Return True if the move has an instant KO effect (e.g., Sheer Cold, Fissure)."""
-    if not move or not isinstance(move.effects, list):
-        return False
-
-    for effect in move.effects:
-        token = str(effect or "").strip().lower()
-        if token == "target:instant_ko" or token.endswith(":instant_ko") or ":instant_ko" in token:
-            return True
-    return False
-
-
-def move_has_target_fixed_damage_effect(move: Move) -> bool:
-    """Return True when a move has a target fixed-damage effect token."""
-    if not move or not isinstance(move.effects, list):
-        return False
-
-    for effect in move.effects:
-        token = str(effect or "").strip().lower()
-        if token.startswith("target:fixed_damage:"):
-            return True
-    return False
-
 
 def compute_fixed_damage_effect(effect_str: str, attacker: GameUnit, target: GameUnit) -> int:
     """Resolve fixed-damage amount from an effect string for a specific attacker/target pair."""
@@ -2395,11 +1443,7 @@ def apply_fixed_damage_move_effects(
     if not move or not isinstance(move.effects, list) or not targets:
         return []
 
-    fixed_damage_effects = []
-    for effect in move.effects:
-        token = str(effect or "").strip().lower()
-        if token.startswith("target:fixed_damage:"):
-            fixed_damage_effects.append(effect)
+    fixed_damage_effects = [op.raw for op in move_program(move).fixed_damage]
 
     if not fixed_damage_effects:
         return []
@@ -2454,1698 +1498,244 @@ def compute_effective_stats(unit: GameUnit, db: Session) -> dict:
     Compute the effective stats for a unit, applying stat boost multipliers.
     Returns a dict with all stats including HP, attack, defense, etc.
     """
-    # Get base stats from the unit definition
-    unit_info = db.query(Unit).filter_by(id=unit.unit_id).first()
+    unit_info = unit_record(db, unit.unit_id)
     if not unit_info or not isinstance(unit_info.base_stats, dict):
         return unit.current_stats or {}
-    
-    level = unit.level or 50
-    effective_stats = {}
-    
-    for stat_name, base_value in unit_info.base_stats.items():
-        # Calculate base stat value (without boosts)
-        if stat_name.lower() == "hp":
-            # HP formula: floor((2 × Base × Level) / 100) + Level + 10
-            base_stat = int((2 * base_value * level) / 100) + level + 10
-            # HP is not affected by stat boosts in battle
-            effective_stats[stat_name] = base_stat
-        elif stat_name.lower() == "range":
-            # Range is derived from speed after all modifiers - will be calculated below
-            continue
-        else:
-            # Other stats formula: floor((2 × Base × Level) / 100 + 5)
-            base_stat = int((2 * base_value * level) / 100 + 5)
-            
-            # Apply stat boost multiplier
-            multiplier = get_stat_multiplier(unit.stat_boosts, stat_name)
-            effective_stats[stat_name] = int(base_stat * multiplier)
 
-    # Apply status modifiers after boost/debuff calculations.
-    # Check for Tailwind on the unit's side and apply speed doubling before status modifiers
     try:
-        side_units = (
-            db.query(GameUnit)
-            .filter(GameUnit.game_id == unit.game_id, GameUnit.user_id == unit.user_id)
-            .all()
-        )
+        side_units = side_units_for(db, unit.game_id, unit.user_id)
     except Exception:
         side_units = []
 
-    has_tailwind = False
-    for su in side_units:
-        s = normalize_states(su.states)
-        if s and s[0] == "tailwind" and int(s[1]) > 0:
-            has_tailwind = True
-            break
-
-    if has_tailwind and "speed" in effective_stats:
-        effective_stats["speed"] = int(effective_stats["speed"] * 2)
-
-    status_effect = normalize_status_effects(unit.status_effects)
-    if status_effect:
-        status_name = status_effect[0]
-        if status_name == "burn" and "attack" in effective_stats:
-            effective_stats["attack"] = int(effective_stats["attack"] // 2)
-        elif status_name == "paralysis" and "speed" in effective_stats:
-            effective_stats["speed"] = int(effective_stats["speed"] // 2)
-
-    # Movement range scales with current speed (after boosts/debuffs/status).
-    speed_value = effective_stats.get("speed")
-    if isinstance(speed_value, (int, float)) and speed_value > 0:
-        effective_stats["range"] = max(0, int(2 + (speed_value / 50)))
-    else:
-        effective_stats["range"] = 0
-    
-    # Ensure no stat keys are missing by comparing against base_stats
-    for stat_name in unit_info.base_stats.keys():
-        if stat_name not in effective_stats:
-            # Fallback: if a stat key is missing, recalculate it
-            base_value = unit_info.base_stats[stat_name]
-            if stat_name.lower() == "hp":
-                effective_stats[stat_name] = int((2 * base_value * level) / 100) + level + 10
-            elif stat_name.lower() == "range":
-                # range already calculated above
-                if "range" not in effective_stats:
-                    effective_stats["range"] = 0
-            else:
-                base_stat = int((2 * base_value * level) / 100 + 5)
-                multiplier = get_stat_multiplier(unit.stat_boosts, stat_name)
-                effective_stats[stat_name] = int(base_stat * multiplier)
-    
-    return effective_stats
+    return effective_stats(
+        unit_info.base_stats,
+        unit.level,
+        unit.stat_boosts,
+        unit.status_effects,
+        tailwind=any(unit_has_active_named_state(side_unit, "tailwind") for side_unit in side_units),
+    )
 
-def apply_stat_change(unit: GameUnit, stat: str, magnitude: int, current_turn: int, db: Session):
-    """
-    Apply or cancel a stat change to a unit.
-    - magnitude: positive for boost, negative for debuff
-    - Implements cancellation: opposite effects cancel, prioritizing soonest-expiring
-    - Handles partial cancellation when magnitudes differ
-    - Each instance expires after 4 turns (including application turn)
-    """
-    stat = normalize_stat_name(stat)
-    
-    # Ensure stat_boosts is always in canonical list-of-instances shape
-    unit.stat_boosts = normalize_stat_boosts(unit.stat_boosts)
-    if stat not in unit.stat_boosts:
-        unit.stat_boosts[stat] = []
-    
-    instances = unit.stat_boosts[stat]
-    remaining_magnitude = magnitude
-    
-    # Process cancellation with opposite-sign effects (already in expiry order)
-    i = 0
-    while i < len(instances) and remaining_magnitude != 0:
-        instance_mag = instances[i].get("magnitude", 0)
-        
-        # Check if signs are opposite (cancellation applies)
-        if (remaining_magnitude > 0 and instance_mag < 0) or (remaining_magnitude < 0 and instance_mag > 0):
-            # Calculate how much can be cancelled
-            abs_incoming = abs(remaining_magnitude)
-            abs_existing = abs(instance_mag)
-            
-            if abs_incoming < abs_existing:
-                # Incoming is smaller: reduce existing magnitude
-                if instance_mag < 0:
-                    instances[i]["magnitude"] = instance_mag + abs_incoming  # e.g., -3 + 2 = -1
-                else:
-                    instances[i]["magnitude"] = instance_mag - abs_incoming  # e.g., +3 - 2 = +1
-                remaining_magnitude = 0  # Fully consumed
-                i += 1
-            elif abs_incoming > abs_existing:
-                # Incoming is larger: remove existing, continue with remainder
-                if remaining_magnitude > 0:
-                    remaining_magnitude -= abs_existing  # e.g., +5 - 3 = +2
-                else:
-                    remaining_magnitude += abs_existing  # e.g., -5 + 3 = -2
-                instances.pop(i)
-                # Don't increment i, check next instance at same position
-            else:
-                # Equal: both cancel out completely
-                instances.pop(i)
-                remaining_magnitude = 0
-        else:
-            # Same sign, no cancellation
-            i += 1
-    
-    # If there's remaining magnitude, add it as a new instance
-    if remaining_magnitude != 0:
-        # Set to 4 turns (will be decremented at start of each player turn)
-        instances.append({
-            "magnitude": remaining_magnitude,
-            "expires_turn": 4
-        })
-    
-    # Mark as modified for SQLAlchemy
-    unit.stat_boosts = dict(unit.stat_boosts)
-    
-    # Recalculate current_stats to reflect the new stat boosts
-    unit.current_stats = compute_effective_stats(unit, db)
-    
-    db.add(unit)
 
-def process_move_effects(
-    move: Move,
-    attacker: GameUnit,
-    targets: List[GameUnit],
-    current_turn: int,
-    db: Session,
-    weather_tiles: list | None = None,
-    terrain_tiles: list | None = None,
-    field_effect_tiles: list | None = None,
-    affected_tiles_override: list[tuple[int, int]] | None = None,
-    game: "Game | None" = None,
-    game_state: "GameState | None" = None,
-):
-    """
-    Process all effects from a move (stat changes, status conditions, etc.)
-    Format: recipient:effect_type:param1:param2[:accuracy]
-    For stat changes: recipient:raise_stat/lower_stat:stat_name:magnitude[:accuracy]
-    For conditional effects: recipient:effect_type:condition:condition_type:condition_value:...:value
-    """
-    if not move.effects:
-        return
+# Effects on columns the engine does not load. Each takes the ``LoadedBattle`` the effects run on.
+def _consume_berry_effect(loaded: "LoadedBattle", ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    recipients = [ctx.attacker] if parts[0] == "self" else ctx.targets
+    for unit in recipients:
+        if consume_unit_held_item(loaded.row_for(unit), loaded.db, item_type="berry"):
+            ctx.battle.log(f"{unit.name} ate its Berry")
 
-    weather_raise_stat_applied: set[tuple[str, str]] = set()
-    terrain_raise_stat_applied: set[tuple[str, str]] = set()
-    
-    for effect_str in move.effects:
-        raw_token = str(effect_str or "").strip()
-        token_lower = raw_token.lower()
-
-        # Special-case single-token effects
-        if token_lower == "break_screens":
-            # Remove reflect/light_screen/aurora_veil from each target's side
-            for target in targets:
-                try:
-                    side_units = (
-                        db.query(GameUnit)
-                        .filter(GameUnit.game_id == target.game_id, GameUnit.user_id == target.user_id)
-                        .all()
-                    )
-                except Exception:
-                    side_units = []
-
-                for u in side_units:
-                    s = normalize_states(u.states)
-                    if s and s[0] in {"reflect", "light_screen", "aurora_veil"}:
-                        removed_state = s[0]
-                        u.states = []
-                        db.add(u)
-                        if game and game_state:
-                            publish_system_log_event(
-                                game.link,
-                                f"{get_unit_display_name(u, db)} lost {removed_state.replace('_', ' ')}",
-                                game_state,
-                                db,
-                            )
-            continue
 
-        parts = raw_token.split(":")
-        if len(parts) < 2:
-            continue  # Invalid format
+def _remove_held_item_effect(loaded: "LoadedBattle", ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    for target in ctx.targets:
+        if remove_unit_held_item(loaded.row_for(target), loaded.db):
+            ctx.battle.log(f"{target.name} lost its held item")
 
-            # If this effect depends on a held item and the recipient's item is suppressed by Embargo,
-            # skip applying the effect and publish a system log.
-            try:
-                if parts[0] in {"self", "target"} and any("held_item" == p or p == "held_item" for p in parts):
-                    if parts[0] == "self":
-                        if is_item_suppressed(attacker):
-                            if game and game_state:
-                                publish_system_log_event(game.link, f"{get_unit_display_name(attacker, db)}'s held item is suppressed by Embargo", game_state, db)
-                            continue
-                    elif parts[0] == "target":
-                        # If any target is embargoed, skip applying this token for targets
-                        embargoed = False
-                        for t in targets:
-                            if is_item_suppressed(t):
-                                embargoed = True
-                                if game and game_state:
-                                    publish_system_log_event(game.link, f"{get_unit_display_name(t, db)}'s held item is suppressed by Embargo", game_state, db)
-                        if embargoed:
-                            continue
-            except Exception:
-                pass
 
-        # Field weather effect format: weather:sun|rain|sandstorm|hail
-        if parts[0] == "weather":
-            weather_name = parts[1].lower()
-            weather_id = WEATHER_TO_ID.get(weather_name)
-            if weather_id is None:
-                continue
+def _copy_ability_effect(loaded: "LoadedBattle", ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    db = loaded.db
+    recipient = parts[0]  # "self", "target" or "ally"
+    if len(parts) < 3:
+        return
 
-            game_id = getattr(attacker, "game_id", None)
-            if not isinstance(game_id, int):
-                continue
+    source_ref = parts[2]
+    if source_ref == "target":
+        if not ctx.targets:
+            return
+        source_unit = ctx.targets[0]
+    elif source_ref == "self":
+        source_unit = ctx.attacker
+    else:
+        return
 
-            game = db.query(Game).filter(Game.id == game_id).first()
-            if not game:
-                continue
+    if source_unit.has_state("gastro_acid"):
+        return
 
-            map_state = (
-                db.query(GameMapState)
-                .options(joinedload(GameMapState.map))
-                .filter(GameMapState.game_id == game.id)
-                .first()
-            )
-            if map_state is None:
-                map_obj = db.query(Map).filter_by(id=game.map_id).first()
-                if not map_obj:
-                    continue
-                map_state = _create_default_game_map_state(game, map_obj)
-                db.add(map_state)
-            else:
-                map_obj = map_state.map if map_state.map else db.query(Map).filter_by(id=game.map_id).first()
-            if not map_obj:
-                continue
+    source_ability_id = get_unit_ability_id(loaded.row_for(source_unit))
+    if source_ability_id is None:
+        return
 
-            height = int(getattr(map_obj, "height", 0) or 0)
-            width = int(getattr(map_obj, "width", 0) or 0)
-            if height <= 0 or width <= 0:
-                continue
+    recipients: list[EngineUnit] = []
+    if recipient == "self":
+        recipients = [ctx.attacker]
+    elif recipient == "target":
+        recipients = [target for target in ctx.targets if target.current_hp > 0]
+    elif recipient == "ally":
+        battle_map = ctx.battle.map
+        tile_set = set(move_effect_tiles(ctx.move, ctx.attacker.position, battle_map.width, battle_map.height))
+        recipients = [
+            ally
+            for ally in ctx.battle.side(ctx.attacker.user_id).units
+            if ally.current_hp > 0 and ally.position in tile_set
+        ]
+    loaded.load(recipients)
 
-            if not isinstance(map_state.weather_tiles, list) or len(map_state.weather_tiles) != height:
-                map_state.weather_tiles = _build_2d_matrix(height, width, 0)
-            else:
-                normalized_rows = []
-                for row in map_state.weather_tiles:
-                    if not isinstance(row, list):
-                        normalized_rows.append([0 for _ in range(width)])
-                    elif len(row) != width:
-                        fixed = [0 for _ in range(width)]
-                        for i in range(min(width, len(row))):
-                            fixed[i] = int(row[i] or 0)
-                        normalized_rows.append(fixed)
-                    else:
-                        normalized_rows.append([int(cell or 0) for cell in row])
-                map_state.weather_tiles = normalized_rows
-
-            if affected_tiles_override:
-                seen_tiles: set[tuple[int, int]] = set()
-                affected_tiles = []
-                for tx, ty in affected_tiles_override:
-                    if not (0 <= tx < width and 0 <= ty < height):
-                        continue
-                    tile = (int(tx), int(ty))
-                    if tile in seen_tiles:
-                        continue
-                    seen_tiles.add(tile)
-                    affected_tiles.append(tile)
-            else:
-                affected_tiles = get_move_affected_tiles(move, attacker, width, height)
-            for tx, ty in affected_tiles:
-                map_state.weather_tiles[ty][tx] = weather_id
-            db.add(map_state)
+    ability_name = resolve_ability_name(source_ability_id, db) or "ability"
+    for unit in recipients:
+        row = loaded.row_for(unit)
+        set_unit_ability_id(row, source_ability_id, db)
+        attach_game_unit_loadout_fields(row, db)
+        unit.ability_names = frozenset(get_unit_ability_names(row, db))
+        ctx.battle.log(f"{unit.name} copied {ability_name}")
+
+
+def _give_cash_effect(loaded: "LoadedBattle", ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    db = loaded.db
+    recipient = parts[0]  # "self" or "target"
+    if len(parts) < 3 or recipient != "target":
+        return
+    try:
+        cash_amount = int(parts[2])
+    except ValueError:
+        return
+    if cash_amount <= 0:
+        return
+
+    for target in ctx.targets:
+        row = loaded.row_for(target)
+        player_state = db.query(GamePlayer).filter_by(game_id=row.game_id, player_id=row.user_id).first()
+        if player_state is None:
             continue
+        player_state.cash_remaining = int(player_state.cash_remaining or 0) + cash_amount
+        db.add(player_state)
+        ctx.battle.log(f"{get_username_by_id(row.user_id, db)} received {cash_amount} money")
 
-        # Field terrain effect format: terrain:electric|psychic|grassy|misty
-        if parts[0] == "terrain":
-            terrain_name = parts[1].lower()
-            terrain_id = TERRAIN_TO_ID.get(terrain_name)
-            if terrain_id is None:
-                continue
 
-            game_id = getattr(attacker, "game_id", None)
-            if not isinstance(game_id, int):
-                continue
+def _revive_effect(loaded: "LoadedBattle", ctx: EffectContext, parts: tuple[str, ...]) -> None:
+    db = loaded.db
+    attacker = ctx.attacker
+    recipient = parts[0]  # "self" or "target"
+    if len(parts) < 3 or recipient != "target":
+        return
+    try:
+        hp_denominator = int(parts[2])
+        if hp_denominator <= 0:
+            return
+    except ValueError:
+        return
 
-            game = db.query(Game).filter(Game.id == game_id).first()
-            if not game:
-                continue
+    if attacker.has_state("heal_block"):
+        ctx.battle.log(f"{attacker.name} can't heal due to Heal Block")
+        return
 
-            map_state = (
-                db.query(GameMapState)
-                .options(joinedload(GameMapState.map))
-                .filter(GameMapState.game_id == game.id)
-                .first()
-            )
-            if map_state is None:
-                map_obj = db.query(Map).filter_by(id=game.map_id).first()
-                if not map_obj:
-                    continue
-                map_state = _create_default_game_map_state(game, map_obj)
-                db.add(map_state)
-            else:
-                map_obj = map_state.map if map_state.map else db.query(Map).filter_by(id=game.map_id).first()
-            if not map_obj:
-                continue
+    battle_map = ctx.battle.map
+    if loaded.game is None or battle_map.width <= 0 or battle_map.height <= 0:
+        return
 
-            height = int(getattr(map_obj, "height", 0) or 0)
-            width = int(getattr(map_obj, "width", 0) or 0)
-            if height <= 0 or width <= 0:
-                continue
+    for target in ctx.targets:
+        row = loaded.row_for(target)
+        if not row.is_fainted and target.current_hp > 0:
+            continue
+        if target.user_id != attacker.user_id:
+            continue
 
-            if not isinstance(map_state.terrain_effect_tiles, list) or len(map_state.terrain_effect_tiles) != height:
-                map_state.terrain_effect_tiles = _build_2d_matrix(height, width, [0, 0])
-            else:
-                normalized_rows = []
-                for row in map_state.terrain_effect_tiles:
-                    if not isinstance(row, list):
-                        normalized_rows.append([[0, 0] for _ in range(width)])
-                    elif len(row) != width:
-                        fixed = [[0, 0] for _ in range(width)]
-                        for i in range(min(width, len(row))):
-                            fixed[i] = normalize_timed_tile_cell(row[i])
-                        normalized_rows.append(fixed)
-                    else:
-                        normalized_rows.append([normalize_timed_tile_cell(cell) for cell in row])
-                map_state.terrain_effect_tiles = normalized_rows
-
-            if affected_tiles_override:
-                seen_tiles: set[tuple[int, int]] = set()
-                affected_tiles = []
-                for tx, ty in affected_tiles_override:
-                    if not (0 <= tx < width and 0 <= ty < height):
-                        continue
-                    tile = (int(tx), int(ty))
-                    if tile in seen_tiles:
-                        continue
-                    seen_tiles.add(tile)
-                    affected_tiles.append(tile)
-            else:
-                affected_tiles = get_move_affected_tiles(move, attacker, width, height)
-            for tx, ty in affected_tiles:
-                map_state.terrain_effect_tiles[ty][tx] = [terrain_id, TERRAIN_DEFAULT_DURATION]
-            db.add(map_state)
+        occupied = ctx.battle.occupied_tiles()
+        placement = next(
+            (
+                tile
+                for tile in pulse_tiles(*attacker.position, 3, battle_map.width, battle_map.height)
+                if tile not in occupied
+            ),
+            None,
+        )
+        if placement is None:
+            ctx.battle.log(f"{target.name} couldn't be revived")
             continue
 
-        # Field hazard effect format: field_hazard:spikes|toxic_spikes|stealth_rock|sticky_web
-        if parts[0] == "field_hazard":
-            hazard_name = parts[1].lower()
-            hazard_id = FIELD_HAZARD_TO_ID.get(hazard_name)
-            if hazard_id is None:
-                continue
+        max_hp = int((target.current_stats or {}).get("hp", 1) or 1)
+        restored_hp = max(1, max_hp // hp_denominator)
+        row.is_fainted = False
+        db.add(row)
+        target.current_hp = restored_hp
+        target.can_move = True
+        target.current_x, target.current_y = placement
+        target.starting_x, target.starting_y = placement
+        refresh_stats(ctx.battle, target)
+
+        player_state = db.query(GamePlayer).filter_by(game_id=row.game_id, player_id=row.user_id).first()
+        if player_state is not None and row.id not in (player_state.game_units or []):
+            player_state.game_units = list(player_state.game_units or []) + [row.id]
+            db.add(player_state)
 
-            game_id = getattr(attacker, "game_id", None)
-            if not isinstance(game_id, int):
-                continue
+        ctx.battle.log(f"{target.name} was revived with {restored_hp} HP")
 
-            game = db.query(Game).filter(Game.id == game_id).first()
-            if not game:
-                continue
 
-            map_state = (
-                db.query(GameMapState)
-                .options(joinedload(GameMapState.map))
-                .filter(GameMapState.game_id == game.id)
-                .first()
-            )
-            if map_state is None:
-                map_obj = db.query(Map).filter_by(id=game.map_id).first()
-                if not map_obj:
-                    continue
-                map_state = _create_default_game_map_state(game, map_obj)
-                db.add(map_state)
-            else:
-                map_obj = map_state.map if map_state.map else db.query(Map).filter_by(id=game.map_id).first()
-            if not map_obj:
-                continue
-
-            height = int(getattr(map_obj, "height", 0) or 0)
-            width = int(getattr(map_obj, "width", 0) or 0)
-            if height <= 0 or width <= 0:
-                continue
-
-            normalized_hazards: list[list[list[list[int]]]] = []
-            for y in range(height):
-                row = map_state.hazard_tiles[y] if isinstance(map_state.hazard_tiles, list) and y < len(map_state.hazard_tiles) else []
-                normalized_row: list[list[list[int]]] = []
-                for x in range(width):
-                    cell = row[x] if isinstance(row, list) and x < len(row) else []
-                    normalized_row.append(normalize_hazard_cell(cell))
-                normalized_hazards.append(normalized_row)
-            map_state.hazard_tiles = normalized_hazards
-
-            if affected_tiles_override:
-                seen_tiles: set[tuple[int, int]] = set()
-                affected_tiles = []
-                for tx, ty in affected_tiles_override:
-                    if not (0 <= tx < width and 0 <= ty < height):
-                        continue
-                    tile = (int(tx), int(ty))
-                    if tile in seen_tiles:
-                        continue
-                    seen_tiles.add(tile)
-                    affected_tiles.append(tile)
-            else:
-                affected_tiles = get_move_affected_tiles(move, attacker, width, height)
-            for tx, ty in affected_tiles:
-                try_add_hazard_stack(
-                    map_state.hazard_tiles[ty][tx],
-                    hazard_id,
-                    FIELD_HAZARD_DEFAULT_DURATION,
-                )
-
-            db.add(map_state)
-            continue
-
-        if parts[0] == "field" and parts[1].lower() == "clear_hazards":
-            game_id = getattr(attacker, "game_id", None)
-            if not isinstance(game_id, int):
-                continue
-
-            game = db.query(Game).filter(Game.id == game_id).first()
-            if not game:
-                continue
-
-            map_state = (
-                db.query(GameMapState)
-                .options(joinedload(GameMapState.map))
-                .filter(GameMapState.game_id == game.id)
-                .first()
-            )
-            if map_state is None:
-                continue
-
-            map_obj = map_state.map if map_state.map else db.query(Map).filter_by(id=game.map_id).first()
-            if not map_obj:
-                continue
-
-            height = int(getattr(map_obj, "height", 0) or 0)
-            width = int(getattr(map_obj, "width", 0) or 0)
-            if height <= 0 or width <= 0:
-                continue
-
-            if affected_tiles_override:
-                affected_tiles = list(affected_tiles_override)
-            else:
-                affected_tiles = get_move_affected_tiles(move, attacker, width, height)
-
-            if clear_hazards_on_tiles(map_state, affected_tiles, db) and game and game_state:
-                publish_system_log_event(game.link, "Hazards were cleared from the area", game_state, db)
-            continue
-
-        if parts[0] == "field" and parts[1].lower() == "clear_substitutes":
-            game_id = getattr(attacker, "game_id", None)
-            if not isinstance(game_id, int):
-                continue
-
-            game = db.query(Game).filter(Game.id == game_id).first()
-            if not game:
-                continue
-
-            map_obj = db.query(Map).filter_by(id=game.map_id).first()
-            if not map_obj:
-                continue
-
-            width = int(getattr(map_obj, "width", 0) or 0)
-            height = int(getattr(map_obj, "height", 0) or 0)
-            if width <= 0 or height <= 0:
-                continue
-
-            if affected_tiles_override:
-                affected_tiles = list(affected_tiles_override)
-            else:
-                affected_tiles = get_move_affected_tiles(move, attacker, width, height)
-
-            clear_substitutes_on_tiles(game_id, affected_tiles, db, game=game, game_state=game_state)
-            continue
-
-        if parts[0] == "self" and parts[1].lower() == "clear_hazards":
-            game_id = getattr(attacker, "game_id", None)
-            if not isinstance(game_id, int):
-                continue
-
-            game = db.query(Game).filter(Game.id == game_id).first()
-            if not game:
-                continue
-
-            map_state = db.query(GameMapState).filter(GameMapState.game_id == game.id).first()
-            if map_state is None:
-                continue
-
-            tx = int(attacker.current_x)
-            ty = int(attacker.current_y)
-            clear_hazards_on_tiles(map_state, [(tx, ty)], db)
-            continue
-
-        # Field tailwind: apply tailwind to the attacker's side
-        if parts[0] == "field" and parts[1].lower() == "tailwind":
-            game_id = getattr(attacker, "game_id", None)
-            if not isinstance(game_id, int):
-                continue
-
-            game = db.query(Game).filter(Game.id == game_id).first()
-            if not game:
-                continue
-
-            # Apply tailwind to the attacker (represents side-wide effect)
-            applied = apply_state_effect(attacker, "tailwind", db)
-            if applied and game and game_state:
-                publish_system_log_event(
-                    game.link,
-                    format_state_log_message(attacker, "tailwind", db),
-                    game_state,
-                    db,
-                )
-            continue
-
-        if parts[0] == "field" and parts[1].lower() == "gravity":
-            game_id = getattr(attacker, "game_id", None)
-            if not isinstance(game_id, int):
-                continue
-
-            game = db.query(Game).filter(Game.id == game_id).first()
-            if not game:
-                continue
-
-            map_state = (
-                db.query(GameMapState)
-                .options(joinedload(GameMapState.map))
-                .filter(GameMapState.game_id == game.id)
-                .first()
-            )
-            if map_state is None:
-                map_obj = db.query(Map).filter_by(id=game.map_id).first()
-                if not map_obj:
-                    continue
-                map_state = _create_default_game_map_state(game, map_obj)
-                db.add(map_state)
-            else:
-                map_obj = map_state.map if map_state.map else db.query(Map).filter_by(id=game.map_id).first()
-            if not map_obj:
-                continue
-
-            height = int(getattr(map_obj, "height", 0) or 0)
-            width = int(getattr(map_obj, "width", 0) or 0)
-            if height <= 0 or width <= 0:
-                continue
-
-            if not isinstance(map_state.field_effect_tiles, list) or len(map_state.field_effect_tiles) != height:
-                map_state.field_effect_tiles = _build_2d_matrix(height, width, 0)
-
-            gravity_id = FIELD_EFFECT_TO_ID.get("gravity", 0)
-            if affected_tiles_override:
-                affected_tiles = affected_tiles_override
-            else:
-                affected_tiles = get_move_affected_tiles(move, attacker, width, height)
-            for tx, ty in affected_tiles:
-                if 0 <= tx < width and 0 <= ty < height:
-                    map_state.field_effect_tiles[ty][tx] = gravity_id
-            db.add(map_state)
-            continue
-
-        if parts[0] in {"self", "target"} and parts[1] == "consume_berry":
-            recipients = [attacker] if parts[0] == "self" else targets
-            for unit in recipients:
-                if consume_unit_held_item(unit, db, item_type="berry") and game and game_state:
-                    publish_system_log_event(
-                        game.link,
-                        f"{get_unit_display_name(unit, db)} ate its Berry",
-                        game_state,
-                        db,
-                    )
-            continue
-
-        if parts[0] == "target" and parts[1] == "remove_held_item":
-            for target in targets:
-                if remove_unit_held_item(target, db) and game and game_state:
-                    publish_system_log_event(
-                        game.link,
-                        f"{get_unit_display_name(target, db)} lost its held item",
-                        game_state,
-                        db,
-                    )
-            continue
-
-        if parts[0] == "target" and parts[1] == "field_hazard" and len(parts) >= 3:
-            hazard_name = parts[2].lower()
-            hazard_id = FIELD_HAZARD_TO_ID.get(hazard_name)
-            if hazard_id is None:
-                continue
-
-            game_id = getattr(attacker, "game_id", None)
-            if not isinstance(game_id, int):
-                continue
-
-            game = db.query(Game).filter(Game.id == game_id).first()
-            if not game:
-                continue
-
-            map_state = (
-                db.query(GameMapState)
-                .options(joinedload(GameMapState.map))
-                .filter(GameMapState.game_id == game.id)
-                .first()
-            )
-            if map_state is None:
-                continue
-
-            map_obj = map_state.map if map_state.map else db.query(Map).filter_by(id=game.map_id).first()
-            if not map_obj:
-                continue
+# Route handlers by ``EffectOp.handler``, next to ``app.engine.effects.MOVE_EFFECT_HANDLERS``.
+ROUTE_EFFECT_HANDLERS: dict[str, Callable[["LoadedBattle", EffectContext, tuple[str, ...]], None]] = {
+    "consume_berry": _consume_berry_effect,
+    "target:remove_held_item": _remove_held_item_effect,
+    "copy_ability": _copy_ability_effect,
+    "give_cash": _give_cash_effect,
+    "revive": _revive_effect,
+}
 
-            height = int(getattr(map_obj, "height", 0) or 0)
-            width = int(getattr(map_obj, "width", 0) or 0)
-            if height <= 0 or width <= 0:
-                continue
 
-            normalized_hazards: list[list[list[list[int]]]] = []
-            for y in range(height):
-                row = map_state.hazard_tiles[y] if isinstance(map_state.hazard_tiles, list) and y < len(map_state.hazard_tiles) else []
-                normalized_row: list[list[list[int]]] = []
-                for x in range(width):
-                    cell = row[x] if isinstance(row, list) and x < len(row) else []
-                    normalized_row.append(normalize_hazard_cell(cell))
-                normalized_hazards.append(normalized_row)
-            map_state.hazard_tiles = normalized_hazards
-
-            for target in targets:
-                tx = int(target.current_x)
-                ty = int(target.current_y)
-                if 0 <= tx < width and 0 <= ty < height:
-                    try_add_hazard_stack(
-                        map_state.hazard_tiles[ty][tx],
-                        hazard_id,
-                        FIELD_HAZARD_DEFAULT_DURATION,
-                    )
-            db.add(map_state)
+def last_used_move(loaded: "LoadedBattle", unit: EngineUnit) -> tuple[int, str] | None:
+    """The id and name of the move ``unit`` used last, from the "<name> used <move>" log lines."""
+    if loaded.state is None:
+        return None
+    prefix = f"{unit.name} used "
+    for entry in reversed(event_tail(loaded.db, loaded.state.game_id)):
+        if not isinstance(entry, dict) or entry.get("event") != "system_log":
             continue
-        
-        recipient = parts[0]  # "self" or "target"
-        effect_type = parts[1]  # "raise_stat", "lower_stat", etc.
-
-        if effect_type in ["raise_stat", "lower_stat"]:
-            stat_name = None
-            magnitude_val = None
-            accuracy = 100
-
-            # Format: recipient:raise_stat:condition:weather:condition_value:stat_name:magnitude[:accuracy]
-            if len(parts) >= 7 and parts[2] == "condition" and parts[3].lower() == "weather":
-                condition_value = parts[4]
-                stat_name = normalize_stat_name(parts[5])
-                try:
-                    magnitude_val = int(parts[6])
-                except ValueError:
-                    continue
-
-                weather_key = (recipient, stat_name)
-                if weather_key in weather_raise_stat_applied:
-                    continue
-
-                if recipient == "self":
-                    weather_id = get_unit_weather_id(attacker, weather_tiles)
-                elif recipient == "target":
-                    if not targets:
-                        continue
-                    weather_id = get_unit_weather_id(targets[0], weather_tiles)
-                else:
-                    continue
-
-                if not weather_condition_matches(weather_id, condition_value):
-                    continue
-
-                weather_raise_stat_applied.add(weather_key)
-
-                if len(parts) >= 8:
-                    try:
-                        accuracy = int(parts[7])
-                    except ValueError:
-                        pass
-            elif len(parts) >= 7 and parts[2] == "condition" and parts[3].lower() == "terrain":
-                condition_value = parts[4]
-                stat_name = normalize_stat_name(parts[5])
-                try:
-                    magnitude_val = int(parts[6])
-                except ValueError:
-                    continue
-
-                terrain_key = (recipient, stat_name)
-                if terrain_key in terrain_raise_stat_applied:
-                    continue
-
-                if recipient == "self":
-                    terrain_id = get_unit_terrain_id(attacker, terrain_tiles)
-                elif recipient == "target":
-                    if not targets:
-                        continue
-                    terrain_id = get_unit_terrain_id(targets[0], terrain_tiles)
-                else:
-                    continue
-
-                if not terrain_condition_matches(terrain_id, condition_value):
-                    continue
-
-                terrain_raise_stat_applied.add(terrain_key)
-
-                if len(parts) >= 8:
-                    try:
-                        accuracy = int(parts[7])
-                    except ValueError:
-                        pass
-            elif len(parts) >= 7 and parts[2] == "condition" and parts[3].lower() == "is_type":
-                condition_value = parts[4]
-                stat_name = normalize_stat_name(parts[5])
-                try:
-                    magnitude_val = int(parts[6])
-                except ValueError:
-                    continue
-
-                if len(parts) >= 8:
-                    try:
-                        accuracy = int(parts[7])
-                    except ValueError:
-                        pass
-
-                if recipient == "self":
-                    if not matches_effect_condition(attacker, "type", condition_value, db):
-                        continue
-                elif recipient == "target":
-                    if not targets:
-                        continue
-                    filtered_targets = [
-                        target for target in targets
-                        if matches_effect_condition(target, "type", condition_value, db)
-                    ]
-                    if not filtered_targets:
-                        continue
-                    targets_for_effect = filtered_targets
-                else:
-                    continue
-
-                if random.randint(1, 100) > accuracy:
-                    continue
-
-                magnitude = magnitude_val if effect_type == "raise_stat" else -magnitude_val
-                target_stats = ALL_STAT_EFFECT_KEYS if stat_name == "all" else [stat_name]
-
-                if recipient == "self":
-                    for target_stat in target_stats:
-                        before_stage = get_stat_stage(attacker.stat_boosts, target_stat)
-                        apply_stat_change(attacker, target_stat, magnitude, current_turn, db)
-                        after_stage = get_stat_stage(attacker.stat_boosts, target_stat)
-                        if game and game_state:
-                            outcome_phrase = format_stat_change_outcome_phrase(after_stage - before_stage, 1 if magnitude > 0 else -1)
-                            publish_system_log_event(
-                                game.link,
-                                f"{get_unit_display_name(attacker, db)}'s {format_stat_log_label(target_stat)} {outcome_phrase}",
-                                game_state,
-                                db,
-                            )
-                elif recipient == "target":
-                    for target in targets_for_effect:
-                        for target_stat in target_stats:
-                            before_stage = get_stat_stage(target.stat_boosts, target_stat)
-                            apply_stat_change(target, target_stat, magnitude, current_turn, db)
-                            after_stage = get_stat_stage(target.stat_boosts, target_stat)
-                            if game and game_state:
-                                outcome_phrase = format_stat_change_outcome_phrase(after_stage - before_stage, 1 if magnitude > 0 else -1)
-                                publish_system_log_event(
-                                    game.link,
-                                    f"{get_unit_display_name(target, db)}'s {format_stat_log_label(target_stat)} {outcome_phrase}",
-                                    game_state,
-                                    db,
-                                )
-                continue
-            elif len(parts) >= 7 and parts[2] == "condition" and parts[3].lower() == "not_type":
-                condition_value = parts[4]
-                stat_name = normalize_stat_name(parts[5])
-                try:
-                    magnitude_val = int(parts[6])
-                except ValueError:
-                    continue
-
-                if len(parts) >= 8:
-                    try:
-                        accuracy = int(parts[7])
-                    except ValueError:
-                        pass
-
-                if recipient == "self":
-                    if not matches_effect_condition(attacker, "not_type", condition_value, db):
-                        continue
-                elif recipient == "target":
-                    if not targets:
-                        continue
-                    filtered_targets = [
-                        target for target in targets
-                        if matches_effect_condition(target, "not_type", condition_value, db)
-                    ]
-                    if not filtered_targets:
-                        continue
-                    targets_for_effect = filtered_targets
-                else:
-                    continue
-
-                if random.randint(1, 100) > accuracy:
-                    continue
-
-                magnitude = magnitude_val if effect_type == "raise_stat" else -magnitude_val
-                target_stats = ALL_STAT_EFFECT_KEYS if stat_name == "all" else [stat_name]
-
-                if recipient == "self":
-                    for target_stat in target_stats:
-                        before_stage = get_stat_stage(attacker.stat_boosts, target_stat)
-                        apply_stat_change(attacker, target_stat, magnitude, current_turn, db)
-                        after_stage = get_stat_stage(attacker.stat_boosts, target_stat)
-                        if game and game_state:
-                            outcome_phrase = format_stat_change_outcome_phrase(after_stage - before_stage, 1 if magnitude > 0 else -1)
-                            publish_system_log_event(
-                                game.link,
-                                f"{get_unit_display_name(attacker, db)}'s {format_stat_log_label(target_stat)} {outcome_phrase}",
-                                game_state,
-                                db,
-                            )
-                elif recipient == "target":
-                    for target in targets_for_effect:
-                        for target_stat in target_stats:
-                            before_stage = get_stat_stage(target.stat_boosts, target_stat)
-                            apply_stat_change(target, target_stat, magnitude, current_turn, db)
-                            after_stage = get_stat_stage(target.stat_boosts, target_stat)
-                            if game and game_state:
-                                outcome_phrase = format_stat_change_outcome_phrase(after_stage - before_stage, 1 if magnitude > 0 else -1)
-                                publish_system_log_event(
-                                    game.link,
-                                    f"{get_unit_display_name(target, db)}'s {format_stat_log_label(target_stat)} {outcome_phrase}",
-                                    game_state,
-                                    db,
-                                )
-                continue
-            else:
-                if len(parts) < 4:
-                    continue
-
-                stat_name = normalize_stat_name(parts[2])
-                try:
-                    magnitude_val = int(parts[3])
-                except ValueError:
-                    continue
-
-                if len(parts) >= 5:
-                    try:
-                        accuracy = int(parts[4])
-                    except ValueError:
-                        pass
-
-            if stat_name is None or magnitude_val is None:
-                continue
-
-            if random.randint(1, 100) > accuracy:
-                continue
-
-            magnitude = magnitude_val if effect_type == "raise_stat" else -magnitude_val
-            target_stats = ALL_STAT_EFFECT_KEYS if stat_name == "all" else [stat_name]
-
-            if recipient == "self":
-                for target_stat in target_stats:
-                    before_stage = get_stat_stage(attacker.stat_boosts, target_stat)
-                    apply_stat_change(attacker, target_stat, magnitude, current_turn, db)
-                    after_stage = get_stat_stage(attacker.stat_boosts, target_stat)
-                    if game and game_state:
-                        outcome_phrase = format_stat_change_outcome_phrase(after_stage - before_stage, 1 if magnitude > 0 else -1)
-                        publish_system_log_event(
-                            game.link,
-                            f"{get_unit_display_name(attacker, db)}'s {format_stat_log_label(target_stat)} {outcome_phrase}",
-                            game_state,
-                            db,
-                        )
-            elif recipient == "target":
-                for target in targets:
-                    for target_stat in target_stats:
-                        before_stage = get_stat_stage(target.stat_boosts, target_stat)
-                        apply_stat_change(target, target_stat, magnitude, current_turn, db)
-                        after_stage = get_stat_stage(target.stat_boosts, target_stat)
-                        if game and game_state:
-                            outcome_phrase = format_stat_change_outcome_phrase(after_stage - before_stage, 1 if magnitude > 0 else -1)
-                            publish_system_log_event(
-                                game.link,
-                                f"{get_unit_display_name(target, db)}'s {format_stat_log_label(target_stat)} {outcome_phrase}",
-                                game_state,
-                                db,
-                            )
-
-        elif effect_type == "high_crit_ratio":
-            # Format: recipient:high_crit_ratio[:accuracy]
-            # Applies a +1 boost to the target's crit rate
-            accuracy = 100
-            if len(parts) >= 3:
-                try:
-                    accuracy = int(parts[2])
-                except ValueError:
-                    pass
-
-            if random.randint(1, 100) > accuracy:
-                continue
-
-            if recipient == "self":
-                before_stage = get_stat_stage(attacker.stat_boosts, "crit")
-                apply_stat_change(attacker, "crit", 1, current_turn, db)
-                after_stage = get_stat_stage(attacker.stat_boosts, "crit")
-                if game and game_state:
-                    outcome_phrase = format_stat_change_outcome_phrase(after_stage - before_stage, 1)
-                    publish_system_log_event(
-                        game.link,
-                        f"{get_unit_display_name(attacker, db)}'s {format_stat_log_label('crit')} {outcome_phrase}",
-                        game_state,
-                        db,
-                    )
-            elif recipient == "target":
-                for target in targets:
-                    before_stage = get_stat_stage(target.stat_boosts, "crit")
-                    apply_stat_change(target, "crit", 1, current_turn, db)
-                    after_stage = get_stat_stage(target.stat_boosts, "crit")
-                    if game and game_state:
-                        outcome_phrase = format_stat_change_outcome_phrase(after_stage - before_stage, 1)
-                        publish_system_log_event(
-                            game.link,
-                            f"{get_unit_display_name(target, db)}'s {format_stat_log_label('crit')} {outcome_phrase}",
-                            game_state,
-                            db,
-                        )
-
-        elif effect_type == "status":
-            # Check if this status has a condition
-            # Format: recipient:status:condition:condition_type:condition_value:status:status_name[:accuracy]
-            if len(parts) >= 7 and parts[2] == "condition":
-                condition_type = parts[3]
-                condition_value = parts[4]
-                if parts[5] != "status":
-                    continue
-
-                status_name = parts[6]
-                accuracy = 100
-                if len(parts) >= 8:
-                    try:
-                        accuracy = int(parts[7])
-                    except ValueError:
-                        pass
-
-                if random.randint(1, 100) > accuracy:
-                    continue
-
-                if recipient == "self":
-                    if matches_effect_condition(attacker, condition_type, condition_value, db):
-                        # If unit is immune by type, publish an immunity log instead of attempting to apply
-                        if is_status_immune_by_type(attacker, status_name, db):
-                            if game and game_state:
-                                label = format_status_log_label(status_name)
-                                if label in {"poisoned", "badly poisoned", "burned", "frozen", "paralyzed"}:
-                                    publish_system_log_event(
-                                        game.link,
-                                        f"{get_unit_display_name(attacker, db)} wasn't {label}",
-                                        game_state,
-                                        db,
-                                    )
-                                else:
-                                    publish_system_log_event(
-                                        game.link,
-                                        f"{get_unit_display_name(attacker, db)} wasn't affected",
-                                        game_state,
-                                        db,
-                                    )
-                        else:
-                            applied = apply_status_effect(attacker, status_name, db)
-                            if applied and game and game_state:
-                                publish_system_log_event(
-                                    game.link,
-                                    f"{get_unit_display_name(attacker, db)} was {format_status_log_label(status_name)}",
-                                    game_state,
-                                    db,
-                                )
-                elif recipient == "target":
-                    for target in targets:
-                        if (target.current_hp or 0) <= 0:
-                            continue
-                        if matches_effect_condition(target, condition_type, condition_value, db):
-                            # Check for Safeguard on the target
-                            target_state = normalize_states(target.states)
-                            if target_state and target_state[0] == "safeguard" and int(target_state[1]) > 0:
-                                if game and game_state:
-                                    publish_system_log_event(
-                                        game.link,
-                                        f"{get_unit_display_name(target, db)} is protected by Safeguard",
-                                        game_state,
-                                        db,
-                                    )
-                                continue
-                            # Check for type immunity first
-                            if is_status_immune_by_type(target, status_name, db):
-                                if game and game_state:
-                                    label = format_status_log_label(status_name)
-                                    if label in {"poisoned", "badly poisoned", "burned", "frozen", "paralyzed"}:
-                                        publish_system_log_event(
-                                            game.link,
-                                            f"{get_unit_display_name(target, db)} wasn't {label}",
-                                            game_state,
-                                            db,
-                                        )
-                                    else:
-                                        publish_system_log_event(
-                                            game.link,
-                                            f"{get_unit_display_name(target, db)} wasn't affected",
-                                            game_state,
-                                            db,
-                                        )
-                            else:
-                                applied = apply_status_effect(target, status_name, db)
-                                if applied and game and game_state:
-                                    publish_system_log_event(
-                                        game.link,
-                                        f"{get_unit_display_name(target, db)} was {format_status_log_label(status_name)}",
-                                        game_state,
-                                        db,
-                                    )
-            else:
-                # Plain status effect without condition
-                if len(parts) < 3:
-                    continue
-
-                status_name = parts[2]
-                accuracy = 100
-                if len(parts) >= 4:
-                    try:
-                        accuracy = int(parts[3])
-                    except ValueError:
-                        pass
-
-                if random.randint(1, 100) > accuracy:
-                    continue
-
-                if recipient == "self":
-                    # If attacker is immune by type, log immunity message instead of applying
-                    if is_status_immune_by_type(attacker, status_name, db):
-                        if game and game_state:
-                            label = format_status_log_label(status_name)
-                            if label in {"poisoned", "badly poisoned", "burned", "frozen", "paralyzed"}:
-                                publish_system_log_event(
-                                    game.link,
-                                    f"{get_unit_display_name(attacker, db)} wasn't {label}",
-                                    game_state,
-                                    db,
-                                )
-                            else:
-                                publish_system_log_event(
-                                    game.link,
-                                    f"{get_unit_display_name(attacker, db)} wasn't affected",
-                                    game_state,
-                                    db,
-                                )
-                    else:
-                        applied = apply_status_effect(attacker, status_name, db)
-                        if applied and game and game_state:
-                            publish_system_log_event(
-                                game.link,
-                                f"{get_unit_display_name(attacker, db)} was {format_status_log_label(status_name)}",
-                                game_state,
-                                db,
-                            )
-                elif recipient == "target":
-                    for target in targets:
-                        if (target.current_hp or 0) > 0:
-                            # Check for Safeguard on the target
-                            target_state = normalize_states(target.states)
-                            if target_state and target_state[0] == "safeguard" and int(target_state[1]) > 0:
-                                if game and game_state:
-                                    publish_system_log_event(
-                                        game.link,
-                                        f"{get_unit_display_name(target, db)} is protected by Safeguard",
-                                        game_state,
-                                        db,
-                                    )
-                                continue
-                            # Check for type immunity before attempting to apply
-                            if is_status_immune_by_type(target, status_name, db):
-                                if game and game_state:
-                                    label = format_status_log_label(status_name)
-                                    if label in {"poisoned", "badly poisoned", "burned", "frozen", "paralyzed"}:
-                                        publish_system_log_event(
-                                            game.link,
-                                            f"{get_unit_display_name(target, db)} wasn't {label}",
-                                            game_state,
-                                            db,
-                                        )
-                                    else:
-                                        publish_system_log_event(
-                                            game.link,
-                                            f"{get_unit_display_name(target, db)} wasn't affected",
-                                            game_state,
-                                            db,
-                                        )
-                            else:
-                                applied = apply_status_effect(target, status_name, db)
-                                if applied and game and game_state:
-                                    publish_system_log_event(
-                                        game.link,
-                                        f"{get_unit_display_name(target, db)} was {format_status_log_label(status_name)}",
-                                        game_state,
-                                        db,
-                                    )
-
-        elif effect_type == "safeguard":
-            # Format: recipient:safeguard[:accuracy]
-            accuracy = 100
-            if len(parts) >= 3:
-                try:
-                    accuracy = int(parts[2])
-                except ValueError:
-                    pass
-
-            if random.randint(1, 100) > accuracy:
-                continue
-
-            if recipient == "self":
-                applied = apply_state_effect(attacker, "safeguard", db)
-                if applied and game and game_state:
-                    publish_system_log_event(
-                        game.link,
-                        format_state_log_message(attacker, "safeguard", db),
-                        game_state,
-                        db,
-                    )
-            elif recipient == "target":
-                for target in targets:
-                    if (target.current_hp or 0) <= 0:
-                        continue
-                    applied = apply_state_effect(target, "safeguard", db)
-                    if applied and game and game_state:
-                        publish_system_log_event(
-                            game.link,
-                            format_state_log_message(target, "safeguard", db),
-                            game_state,
-                            db,
-                        )
-
-        elif effect_type in {"state", "apply_state"}:
-            if len(parts) < 3:
-                continue
-
-            state_name = parts[2]
-            accuracy = 100
-            condition_type = None
-            condition_value = None
-
-            if state_name == "condition" and len(parts) >= 6:
-                condition_type = parts[3]
-                condition_value = parts[4]
-                state_name = parts[5]
-                if len(parts) >= 7:
-                    try:
-                        accuracy = int(parts[6])
-                    except ValueError:
-                        pass
-            elif len(parts) >= 4:
-                try:
-                    accuracy = int(parts[3])
-                except ValueError:
-                    pass
-
-            if random.randint(1, 100) > accuracy:
-                continue
-
-            if recipient == "self":
-                if condition_type and not matches_effect_condition(attacker, condition_type, condition_value, db):
-                    continue
-                applied = apply_state_effect(attacker, state_name, db)
-                if applied and game and game_state:
-                    publish_system_log_event(
-                        game.link,
-                        format_state_log_message(attacker, state_name, db),
-                        game_state,
-                        db,
-                    )
-            elif recipient == "target":
-                normalized_state_name = str(state_name).lower()
-
-                if normalized_state_name in SIDE_SCREEN_STATE_NAMES:
-                    attacker_user_id = getattr(attacker, "user_id", None)
-                    for target in targets:
-                        if (target.current_hp or 0) <= 0:
-                            continue
-                        if target.user_id != attacker_user_id:
-                            continue
-
-                        applied = apply_state_effect(target, normalized_state_name, db)
-                        if applied and game and game_state:
-                            publish_system_log_event(
-                                game.link,
-                                format_state_log_message(target, normalized_state_name, db),
-                                game_state,
-                                db,
-                            )
-                    continue
-
-                for target in targets:
-                    if (target.current_hp or 0) <= 0:
-                        continue
-
-                    if condition_type and not matches_effect_condition(target, condition_type, condition_value, db):
-                        continue
-
-                    # Prevent confusion from being applied to Safeguard-protected targets
-                    if normalized_state_name == "confusion":
-                        target_state = normalize_states(target.states)
-                        if target_state and target_state[0] == "safeguard" and int(target_state[1]) > 0:
-                            if game and game_state:
-                                publish_system_log_event(
-                                    game.link,
-                                    f"{get_unit_display_name(target, db)} is protected by Safeguard",
-                                    game_state,
-                                    db,
-                                )
-                            continue
-
-                    # Special handling for Encore: lock target into its last used move for 2-6 turns
-                    if str(state_name).lower() == "encore":
-                        # Determine the target's last used move by scanning the replay log
-                        last_move_id = None
-                        last_move_name = None
-                        if game_state and isinstance(game_state.replay_log, list):
-                            for entry in reversed(game_state.replay_log or []):
-                                if not isinstance(entry, dict):
-                                    continue
-                                if entry.get("event") != "system_log":
-                                    continue
-                                msg = str(entry.get("message") or "")
-                                prefix = f"{get_unit_display_name(target, db)} used "
-                                if msg.startswith(prefix):
-                                    last_move_name = msg[len(prefix) :]
-                                    break
-
-                        if last_move_name:
-                            mv = db.query(Move).filter(Move.name == last_move_name).first()
-                            if mv:
-                                duration = random.randint(2, 6)
-                                # Preserve existing state prevention logic
-                                current_state = normalize_states(target.states)
-                                has_active_state = len(current_state) == 2 and int(current_state[1]) > 0
-                                if not has_active_state:
-                                    # Store the move id as a third element so we can enforce it on execute
-                                    target.states = ["encore", duration, int(mv.id)]
-                                    db.add(target)
-                                    if game and game_state:
-                                        publish_system_log_event(
-                                            game.link,
-                                            f"{get_unit_display_name(target, db)} is locked into {mv.name} for {duration} turns",
-                                            game_state,
-                                            db,
-                                        )
-                                    continue
-
-                        # If we couldn't determine a last move, treat as unsuccessful
-                        if game and game_state:
-                            publish_system_log_event(
-                                game.link,
-                                f"{get_unit_display_name(target, db)} was unaffected",
-                                game_state,
-                                db,
-                            )
-                        continue
-
-                    applied = apply_state_effect(target, state_name, db)
-                    if applied and game and game_state:
-                        publish_system_log_event(
-                            game.link,
-                            format_state_log_message(target, state_name, db),
-                            game_state,
-                            db,
-                        )
-
-        elif effect_type == "copy_ability":
-            if len(parts) < 3:
-                continue
-
-            source_ref = parts[2]
-            if source_ref == "target":
-                if not targets:
-                    continue
-                source_unit = targets[0]
-            elif source_ref == "self":
-                source_unit = attacker
-            else:
-                continue
-
-            if is_ability_suppressed(source_unit):
-                continue
-
-            source_ability_id = get_unit_ability_id(source_unit)
-            if source_ability_id is None:
-                continue
-
-            recipients: list[GameUnit] = []
-            if recipient == "self":
-                recipients = [attacker]
-            elif recipient == "target":
-                recipients = [target for target in targets if (target.current_hp or 0) > 0]
-            elif recipient == "ally":
-                game_id = getattr(attacker, "game_id", None)
-                user_id = getattr(attacker, "user_id", None)
-                if not isinstance(game_id, int) or not isinstance(user_id, int):
-                    continue
-                try:
-                    ally_units = (
-                        db.query(GameUnit)
-                        .filter(GameUnit.game_id == game_id, GameUnit.user_id == user_id)
-                        .all()
-                    )
-                except Exception:
-                    ally_units = []
-                map_obj_local = None
-                if game is not None:
-                    map_obj_local = db.query(Map).filter_by(id=game.map_id).first()
-                if map_obj_local is None:
-                    continue
-                width = int(getattr(map_obj_local, "width", 0) or 0)
-                height = int(getattr(map_obj_local, "height", 0) or 0)
-                tile_set = set(get_move_affected_tiles(move, attacker, width, height))
-                recipients = [
-                    ally
-                    for ally in ally_units
-                    if (ally.current_hp or 0) > 0
-                    and (int(ally.current_x), int(ally.current_y)) in tile_set
-                ]
-
-            for unit in recipients:
-                set_unit_ability_id(unit, source_ability_id, db)
-                attach_game_unit_loadout_fields(unit, db)
-                if game and game_state:
-                    ability_name = resolve_ability_name(source_ability_id, db) or "ability"
-                    publish_system_log_event(
-                        game.link,
-                        f"{get_unit_display_name(unit, db)} copied {ability_name}",
-                        game_state,
-                        db,
-                    )
-
-        elif effect_type == "defog":
-            # Clear reflect/light_screen from target's side (target:defog)
-            if recipient == "target":
-                for target in targets:
-                    try:
-                        side_units = (
-                            db.query(GameUnit)
-                            .filter(GameUnit.game_id == target.game_id, GameUnit.user_id == target.user_id)
-                            .all()
-                        )
-                    except Exception:
-                        side_units = []
-
-                    for u in side_units:
-                        s = normalize_states(u.states)
-                        if s and s[0] in {"reflect", "light_screen", "aurora_veil"}:
-                            removed_state = s[0]
-                            u.states = []
-                            db.add(u)
-                            if game and game_state:
-                                publish_system_log_event(
-                                    game.link,
-                                    f"{get_unit_display_name(u, db)} lost {removed_state.replace('_', ' ')}",
-                                    game_state,
-                                    db,
-                                )
-
-            elif effect_type == "destiny_bond":
-                # Format: recipient:destiny_bond[:accuracy]
-                accuracy = 100
-                if len(parts) >= 3:
-                    try:
-                        accuracy = int(parts[2])
-                    except ValueError:
-                        pass
-
-                if random.randint(1, 100) > accuracy:
-                    continue
-
-                if recipient == "self":
-                    applied = apply_state_effect(attacker, "destiny_bond", db)
-                    if applied and game and game_state:
-                        publish_system_log_event(
-                            game.link,
-                            format_state_log_message(attacker, "destiny_bond", db),
-                            game_state,
-                            db,
-                        )
-                elif recipient == "target":
-                    for target in targets:
-                        if (target.current_hp or 0) <= 0:
-                            continue
-                        applied = apply_state_effect(target, "destiny_bond", db)
-                        if applied and game and game_state:
-                            publish_system_log_event(
-                                game.link,
-                                format_state_log_message(target, "destiny_bond", db),
-                                game_state,
-                                db,
-                            )
-            elif effect_type == "laser_focus":
-                # Format: recipient:laser_focus[:accuracy]
-                accuracy = 100
-                if len(parts) >= 3:
-                    try:
-                        accuracy = int(parts[2])
-                    except ValueError:
-                        pass
-
-                if random.randint(1, 100) > accuracy:
-                    continue
-
-                if recipient == "self":
-                    applied = apply_state_effect(attacker, "laser_focus", db)
-                    if applied and game and game_state:
-                        publish_system_log_event(
-                            game.link,
-                            format_state_log_message(attacker, "laser_focus", db),
-                            game_state,
-                            db,
-                        )
-                elif recipient == "target":
-                    for target in targets:
-                        if (target.current_hp or 0) <= 0:
-                            continue
-                        applied = apply_state_effect(target, "laser_focus", db)
-                        if applied and game and game_state:
-                            publish_system_log_event(
-                                game.link,
-                                format_state_log_message(target, "laser_focus", db),
-                                game_state,
-                                db,
-                            )
-
-        elif effect_type == "heal":
-            # Check if this heal has a condition
-            # Format: recipient:heal:condition:condition_type:condition_value:denominator
-            if len(parts) >= 6 and parts[2] == "condition":
-                condition_type = parts[3]
-                condition_value = parts[4]
-                try:
-                    denominator = int(parts[5])
-                    if denominator <= 0:
-                        continue
-                except ValueError:
-                    continue
-
-                # For conditional healing based on weather
-                if condition_type.lower() == "weather":
-                    # Determine weather_id for attacker or target
-                    if recipient == "self":
-                        weather_id = get_unit_weather_id(attacker, weather_tiles)
-                    else:
-                        # For target healing, use first target's weather
-                        if not targets:
-                            continue
-                        weather_id = get_unit_weather_id(targets[0], weather_tiles)
-
-                    # Check if condition matches
-                    if not weather_condition_matches(weather_id, condition_value):
-                        continue
-
-                    # Apply the conditional heal
-                    if recipient == "self":
-                        max_hp = (attacker.current_stats or {}).get("hp", 1)
-                        heal_amount = max(1, max_hp // denominator)
-                        old_hp = attacker.current_hp or 0
-                        # Check for Heal Block on attacker
-                        att_state = normalize_states(attacker.states)
-                        if att_state and att_state[0] == "heal_block" and int(att_state[1]) > 0:
-                            if game and game_state:
-                                publish_system_log_event(game.link, f"{get_unit_display_name(attacker, db)} can't be healed due to Heal Block", game_state, db)
-                        else:
-                            attacker.current_hp = min(max_hp, old_hp + heal_amount)
-                            restored_hp = max(0, int(attacker.current_hp or 0) - int(old_hp or 0))
-                            db.add(attacker)
-                            if restored_hp > 0 and game and game_state:
-                                publish_system_log_event(game.link, f"{get_unit_display_name(attacker, db)} regained {restored_hp} health", game_state, db)
-                    elif recipient == "target":
-                        for target in targets:
-                            if (target.current_hp or 0) > 0:
-                                # Check for Heal Block on target
-                                t_state = normalize_states(target.states)
-                                if t_state and t_state[0] == "heal_block" and int(t_state[1]) > 0:
-                                    if game and game_state:
-                                        publish_system_log_event(game.link, f"{get_unit_display_name(target, db)} can't be healed due to Heal Block", game_state, db)
-                                    continue
-                                max_hp = (target.current_stats or {}).get("hp", 1)
-                                heal_amount = max(1, max_hp // denominator)
-                                old_hp = target.current_hp or 0
-                                target.current_hp = min(max_hp, old_hp + heal_amount)
-                                restored_hp = max(0, int(target.current_hp or 0) - int(old_hp or 0))
-                                db.add(target)
-                                if restored_hp > 0 and game and game_state:
-                                    publish_system_log_event(game.link, f"{get_unit_display_name(target, db)} regained {restored_hp} health", game_state, db)
-            else:
-                # Plain heal effect without condition
-                if len(parts) < 3:
-                    continue
-
-                try:
-                    denominator = int(parts[2])
-                    if denominator <= 0:
-                        continue
-                except ValueError:
-                    continue
-
-                if recipient == "self":
-                    # Get max HP from attacker's current_stats
-                    max_hp = (attacker.current_stats or {}).get("hp", 1)
-                    heal_amount = max(1, max_hp // denominator)
-                    old_hp = attacker.current_hp or 0
-                    attacker.current_hp = min(max_hp, old_hp + heal_amount)
-                    restored_hp = max(0, int(attacker.current_hp or 0) - int(old_hp or 0))
-                    db.add(attacker)
-                    if restored_hp > 0 and game and game_state:
-                        publish_system_log_event(game.link, f"{get_unit_display_name(attacker, db)} regained {restored_hp} health", game_state, db)
-                elif recipient == "target":
-                    for target in targets:
-                        # Only heal if target is alive
-                        if (target.current_hp or 0) > 0:
-                            max_hp = (target.current_stats or {}).get("hp", 1)
-                            heal_amount = max(1, max_hp // denominator)
-                            old_hp = target.current_hp or 0
-                            target.current_hp = min(max_hp, old_hp + heal_amount)
-                            restored_hp = max(0, int(target.current_hp or 0) - int(old_hp or 0))
-                            db.add(target)
-                            if restored_hp > 0 and game and game_state:
-                                publish_system_log_event(game.link, f"{get_unit_display_name(target, db)} regained {restored_hp} health", game_state, db)
-
-        elif effect_type == "cure_status":
-            if len(parts) < 3:
-                continue
-
-            status_spec = parts[2]
-            if recipient == "self":
-                cure_status_effect(attacker, status_spec, db)
-            elif recipient == "target":
-                for target in targets:
-                    if (target.current_hp or 0) > 0:
-                        cure_status_effect(target, status_spec, db)
-
-        elif effect_type == "reset_stats":
-            if recipient == "self":
-                attacker.stat_boosts = default_stat_boosts()
-                attacker.current_stats = compute_effective_stats(attacker, db)
-                db.add(attacker)
-            elif recipient == "target":
-                for target in targets:
-                    target.stat_boosts = default_stat_boosts()
-                    target.current_stats = compute_effective_stats(target, db)
-                    db.add(target)
-
-        elif effect_type == "give_cash":
-            if len(parts) < 3 or recipient != "target":
-                continue
-            try:
-                cash_amount = int(parts[2])
-            except ValueError:
-                continue
-            if cash_amount <= 0:
-                continue
-
-            for target in targets:
-                player_state = (
-                    db.query(GamePlayer)
-                    .filter_by(game_id=target.game_id, player_id=target.user_id)
-                    .first()
-                )
-                if player_state is None:
-                    continue
-                player_state.cash_remaining = int(player_state.cash_remaining or 0) + cash_amount
-                db.add(player_state)
-                if game and game_state:
-                    username = get_username_by_id(target.user_id, db)
-                    publish_system_log_event(
-                        game.link,
-                        f"{username} received {cash_amount} money",
-                        game_state,
-                        db,
-                    )
-
-        elif effect_type == "revive":
-            if len(parts) < 3 or recipient != "target":
-                continue
-            try:
-                hp_denominator = int(parts[2])
-                if hp_denominator <= 0:
-                    continue
-            except ValueError:
-                continue
-
-            att_state = normalize_states(attacker.states)
-            if att_state and att_state[0] == "heal_block" and int(att_state[1]) > 0:
-                if game and game_state:
-                    publish_system_log_event(
-                        game.link,
-                        f"{get_unit_display_name(attacker, db)} can't heal due to Heal Block",
-                        game_state,
-                        db,
-                    )
-                continue
-
-            map_obj = db.query(Map).filter_by(id=game.map_id).first() if game else None
-            if map_obj is None:
-                continue
-
-            for target in targets:
-                if not target.is_fainted and int(target.current_hp or 0) > 0:
-                    continue
-                if target.user_id != attacker.user_id:
-                    continue
+        message = str(entry.get("message") or "")
+        if message.startswith(prefix):
+            move = move_record_by_name(loaded.db, message[len(prefix) :])
+            return (int(move.id), move.name) if move else None
+    return None
 
-                placement = find_revival_placement_tile(attacker, map_obj, db)
-                if placement is None:
-                    if game and game_state:
-                        publish_system_log_event(
-                            game.link,
-                            f"{get_unit_display_name(target, db)} couldn't be revived",
-                            game_state,
-                            db,
-                        )
-                    continue
 
-                max_hp = int((target.current_stats or {}).get("hp", 1) or 1)
-                restored_hp = max(1, max_hp // hp_denominator)
-                target.is_fainted = False
-                target.current_hp = restored_hp
-                target.can_move = True
-                target.current_x, target.current_y = placement
-                target.starting_x, target.starting_y = placement
-                target.current_stats = compute_effective_stats(target, db)
-                db.add(target)
-
-                player_state = (
-                    db.query(GamePlayer)
-                    .filter_by(game_id=target.game_id, player_id=target.user_id)
-                    .first()
-                )
-                if player_state is not None and target.id not in (player_state.game_units or []):
-                    player_state.game_units = list(player_state.game_units or []) + [target.id]
-                    db.add(player_state)
+def process_move_effects(
+    move: Move,
+    attacker: GameUnit,
+    targets: List[GameUnit],
+    current_turn: int,
+    db: Session,
+    weather_tiles: list | None = None,
+    terrain_tiles: list | None = None,
+    field_effect_tiles: list | None = None,
+    affected_tiles_override: list[tuple[int, int]] | None = None,
+    game: "Game | None" = None,
+    game_state: "GameState | None" = None,
+):
+    """
+    Process all effects from a move (stat changes, status conditions, etc.)
+    Format: recipient:effect_type:param1:param2[:accuracy]
+    For stat changes: recipient:raise_stat/lower_stat:stat_name:magnitude[:accuracy]
+    For conditional effects: recipient:effect_type:condition:condition_type:condition_value:...:value
 
-                if game and game_state:
-                    publish_system_log_event(
-                        game.link,
-                        f"{get_unit_display_name(target, db)} was revived with {restored_hp} HP",
-                        game_state,
-                        db,
-                    )
+    ``app.engine.effects.run_move_effects`` applies them to the attacker, the
+    targets and the units the effects read, loaded into a ``LoadedBattle``;
+    ``ROUTE_EFFECT_HANDLERS`` covers the row-only columns. Log lines are
+    published only with a ``game_state``. Units outside a stored game see the
+    tile arguments as their map.
+    """
+    if not move.effects:
+        return
 
-        elif effect_type == "instant_ko":
-            if recipient == "self":
-                if (attacker.current_hp or 0) > 0:
-                    attacker.current_hp = 0
-                    db.add(attacker)
-            elif recipient == "target":
-                for target in targets:
-                    if (target.current_hp or 0) > 0:
-                        target.current_hp = 0
-                        db.add(target)
+    game_id = getattr(attacker, "game_id", None)
+    if game is None and isinstance(game_id, int):
+        game = db.get(Game, game_id)
+    loaded = LoadedBattle(db, game, game_state, units=[attacker, *targets])
+    battle = loaded.battle
+    if game is None:
+        battle.map.weather_tiles = weather_tiles
+        battle.map.terrain_effect_tiles = terrain_tiles
+        battle.map.field_effect_tiles = field_effect_tiles
+
+    engine_attacker = loaded.unit_for(attacker)
+    engine_targets = [loaded.unit_for(target) for target in targets]
+    loaded.load(effect_units(battle, move, engine_attacker, engine_targets))
+    run_move_effects(
+        battle,
+        move,
+        engine_attacker,
+        engine_targets,
+        affected_tiles=affected_tiles_override,
+        last_used_move=partial(last_used_move, loaded),
+        extra_handlers={key: partial(handler, loaded) for key, handler in ROUTE_EFFECT_HANDLERS.items()},
+    )
+    if game_state is None:
+        battle.logs = []
+    loaded.apply()
 
 
 def apply_damage_based_move_effects(
@@ -4209,8 +1799,8 @@ def apply_damage_based_move_effects(
                         faint_logged_ids.add(unit.id)
             db.add(unit)
 
-    for effect_str in move.effects:
-        parts = effect_str.split(":")
+    for op in move_program(move).ops:
+        parts = op.parts
         if len(parts) < 2:
             continue
         recipient = parts[0]
@@ -4282,35 +1872,12 @@ def apply_damage_based_move_effects(
     return list(fainted_unit_ids)
 
 
-def move_deals_direct_damage(move: Move) -> bool:
-    if move_has_target_fixed_damage_effect(move):
-        return True
-
-    category = (move.category or "").lower()
-    power = move.power or 0
-    return category in {"physical", "special"} and power > 0
-
-
-def move_can_critical_hit(move: Move) -> bool:
-    """Return whether this move is eligible to roll critical hits."""
-    if move_has_effect_token(move, "guaranteed_crit"):
-        return True
-    if move_has_target_fixed_damage_effect(move):
-        return False
-
-    category = (move.category or "").lower()
-    power = move.power or 0
-    return category in {"physical", "special"} and power > 0
-
 def decrement_and_expire_stat_boosts(user_id: int, game_id: int, db: Session) -> list[int]:
     """
     Decrement stat boost timers for a player's units and remove expired ones.
     Returns list of unit IDs that had their stat boosts modified.
     """
-    units = db.query(GameUnit).filter(
-        GameUnit.game_id == game_id,
-        GameUnit.user_id == user_id
-    ).all()
+    units = side_units_for(db, game_id, user_id)
     
     modified_unit_ids = []
     
@@ -4361,10 +1928,7 @@ def decrement_and_expire_status_effects(
     Status checks that affect movement are resolved at turn start.
     Returns list of unit IDs that had their status effects modified.
     """
-    units = db.query(GameUnit).filter(
-        GameUnit.game_id == game_id,
-        GameUnit.user_id == user_id
-    ).all()
+    units = side_units_for(db, game_id, user_id)
 
     modified_unit_ids = []
 
@@ -4473,399 +2037,192 @@ def decrement_and_expire_status_effects(
     return modified_unit_ids
 
 
-def decrement_and_expire_hazards(game_id: int, db: Session) -> bool:
-    """Decrement duration for all active hazard stacks and remove expired stacks."""
-    map_state = db.query(GameMapState).filter(GameMapState.game_id == game_id).first()
-    if not map_state or not isinstance(map_state.hazard_tiles, list):
-        return False
-
-    changed = False
-    next_grid: list[list[list[list[int]]]] = []
-
-    for row in map_state.hazard_tiles:
-        if not isinstance(row, list):
-            next_grid.append([])
-            changed = True
-            continue
-
-        next_row: list[list[list[int]]] = []
-        for cell in row:
-            normalized_entries = normalize_hazard_cell(cell)
-            next_entries: list[list[int]] = []
-
-            if normalized_entries != cell:
-                changed = True
-
-            for hazard_id, turns_remaining in normalized_entries:
-                next_turns = int(turns_remaining) - 1
-                if next_turns > 0:
-                    next_entries.append([int(hazard_id), next_turns])
-                else:
-                    changed = True
-
-            next_row.append(next_entries)
-
-            if next_entries != normalized_entries:
-                changed = True
-
-        next_grid.append(next_row)
-
-    if changed:
-        map_state.hazard_tiles = next_grid
-        db.add(map_state)
-
-    return changed
-
-
-def apply_end_of_turn_status_damage(user_id: int, game_id: int, db: Session) -> list[int]:
-    """
-    Apply end-of-turn status damage for a player's units.
-    Duration decrement is handled at turn start; this function only applies damage.
-    Returns list of unit IDs that had HP/status values modified.
-    """
-    units = db.query(GameUnit).filter(
-        GameUnit.game_id == game_id,
-        GameUnit.user_id == user_id
-    ).all()
-
-    modified_unit_ids = []
-    game = db.query(Game).filter(Game.id == game_id).first()
-    game_state = db.query(GameState).filter(GameState.game_id == game_id).first()
-
-    for unit in units:
-        status_effect = normalize_status_effects(unit.status_effects)
-        max_hp = int((unit.current_stats or {}).get("hp", 0) or 0)
-        current_hp = int(unit.current_hp or 0)
-        hp_after_effects = current_hp
-        modified = False
-
-        if status_effect:
-            status_name = status_effect[0]
-
-            if status_name in {"burn", "poison"}:
-                damage = max(1, max_hp // 8) if max_hp > 0 else 0
-                hp_after_effects = max(0, hp_after_effects - damage)
-                modified = modified or damage > 0
-                if damage > 0 and game:
-                    unit_name = get_unit_display_name(unit, db)
-                    publish_system_log_event(game.link, f"{unit_name} took {damage} damage from {status_name}", game_state, db)
-            elif status_name == "badly_poisoned":
-                bad_poison_turn = int(status_effect[2]) if len(status_effect) >= 3 else 1
-                bad_poison_turn = max(1, bad_poison_turn)
-                damage = max(1, (max_hp * bad_poison_turn) // 16) if max_hp > 0 else 0
-                hp_after_effects = max(0, hp_after_effects - damage)
-                unit.status_effects = [status_name, int(status_effect[1]), bad_poison_turn + 1]
-                modified = True
-                if damage > 0 and game:
-                    unit_name = get_unit_display_name(unit, db)
-                    publish_system_log_event(game.link, f"{unit_name} took {damage} from badly poisoned", game_state, db)
-
-        if hp_after_effects != current_hp:
-            unit.current_hp = hp_after_effects
-            modified = True
-
-        if modified:
-            db.add(unit)
-            modified_unit_ids.append(unit.id)
-
-    return modified_unit_ids
+class LoadedBattle:
+    """A game's units and map state loaded into an engine ``Battle``.
 
+    Every unit row of the game becomes an engine unit, but only the ones in
+    ``units`` (all of them when ``units`` is None) get their catalog fields:
+    display name, types, abilities, base stats and turn-start stages. Call
+    ``load`` before handing other units to engine code that reads those.
 
-def apply_end_of_round_weather_damage(game_id: int, db: Session) -> list[int]:
+    ``apply`` copies what the engine changed back onto the rows (only the
+    fields that changed, so untouched JSON columns are not rewritten), flushes
+    once and publishes the new log lines together.
     """
-    Apply weather chip damage once per full round, after the last player finishes.
-    Returns list of unit IDs whose HP changed.
-    """
-    map_state = db.query(GameMapState).filter(GameMapState.game_id == game_id).first()
-    weather_tiles = map_state.weather_tiles if map_state and isinstance(map_state.weather_tiles, list) else None
 
-    game = db.query(Game).filter(Game.id == game_id).first()
-    game_state = db.query(GameState).filter(GameState.game_id == game_id).first()
-    units = db.query(GameUnit).filter(GameUnit.game_id == game_id).all()
-    modified_unit_ids = []
+    __slots__ = (
+        "db",
+        "game",
+        "state",
+        "map_obj",
+        "map_state",
+        "rows",
+        "battle",
+        "_grids",
+        "_snapshots",
+        "_units_by_row",
+        "_rows_by_unit",
+        "_loaded",
+    )
 
-    for unit in units:
-        max_hp = int((unit.current_stats or {}).get("hp", 0) or 0)
-        current_hp = int(unit.current_hp or 0)
-        if current_hp <= 0:
-            continue
+    # Unit fields the engine can change: plain values, then JSON values it replaces instead of editing.
+    UNIT_FIELDS = ("current_hp", "current_x", "current_y", "starting_x", "starting_y", "can_move")
+    UNIT_JSON_FIELDS = ("current_stats", "stat_boosts", "status_effects", "states")
+    # Map state grids the engine can replace.
+    BATTLE_GRIDS = ("weather_tiles", "hazard_tiles", "terrain_effect_tiles", "field_effect_tiles")
+
+    def __init__(
+        self,
+        db: Session,
+        game: Game | None,
+        state: GameState | None = None,
+        *,
+        units: list[GameUnit] | None = None,
+        rng=random,
+    ):
+        self.db = db
+        self.game = game
+        self.state = state if state is not None or game is None else game_state_for(db, game.id)
+        self.map_state = map_state_for(db, game.id) if game is not None else None
+        # Rows the caller holds come first and are used as given, even when not persisted yet.
+        touched = list({id(unit): unit for unit in units or []}.values())
+        touched_ids = {unit.id for unit in touched if unit.id is not None}
+        others = game_units_for(db, game.id) if game is not None else []
+        self.rows = touched + [unit for unit in others if unit.id not in touched_ids]
+        self.map_obj = None
+        if game is not None:
+            map_id = self.map_state.map_id if self.map_state is not None and self.map_state.map_id else game.map_id
+            self.map_obj = db.get(Map, map_id)
+        engine_units = [self._engine_unit(unit) for unit in self.rows]
+        self._units_by_row = {id(row): unit for row, unit in zip(self.rows, engine_units)}
+        self._rows_by_unit = {id(unit): row for row, unit in zip(self.rows, engine_units)}
+        self._snapshots = {
+            id(unit): {field: getattr(unit, field) for field in self.UNIT_FIELDS + self.UNIT_JSON_FIELDS}
+            for unit in engine_units
+        }
+        self._loaded: set[int] = set()
+        self.battle = Battle(
+            units=engine_units,
+            map=self._battle_map(self.map_obj),
+            current_turn=int(self.state.current_turn or 0) if self.state is not None else 0,
+            rng=rng,
+        )
+        self._grids = {field: getattr(self.battle.map, field) for field in self.BATTLE_GRIDS}
+        self.load(None if units is None else [self._units_by_row[id(unit)] for unit in touched])
 
-        weather_id = get_unit_weather_id(unit, weather_tiles)
-        unit_types = get_unit_types(unit, db)
-        damage = 0
-
-        if weather_id == WEATHER_TO_ID["sandstorm"] and not unit_types.intersection({"rock", "ground", "steel"}):
-            damage = max(1, max_hp // 16) if max_hp > 0 else 0
-            if damage > 0 and game:
-                unit_name = get_unit_display_name(unit, db)
-                publish_system_log_event(game.link, f"{unit_name} took {damage} damage from the sandstorm", game_state, db)
-        elif weather_id == WEATHER_TO_ID["hail"] and "ice" not in unit_types:
-            damage = max(1, max_hp // 16) if max_hp > 0 else 0
-            if damage > 0 and game:
-                unit_name = get_unit_display_name(unit, db)
-                publish_system_log_event(game.link, f"{unit_name} took {damage} damage from hail", game_state, db)
-
-        if damage <= 0:
-            continue
+    def unit_for(self, row: GameUnit) -> EngineUnit:
+        return self._units_by_row[id(row)]
 
-        unit.current_hp = max(0, current_hp - damage)
-        db.add(unit)
-        modified_unit_ids.append(unit.id)
+    def row_for(self, unit: EngineUnit) -> GameUnit:
+        return self._rows_by_unit[id(unit)]
 
-    # Apply Aqua Ring healing at end of round for units that have the state
-    for unit in units:
-        if int(unit.current_hp or 0) <= 0:
-            continue
-        state_effect = normalize_states(unit.states)
-        if not state_effect:
-            continue
-        if state_effect[0] == "aqua_ring" or state_effect[0] == "ingrain":
-            max_hp = int((unit.current_stats or {}).get("hp", 0) or 0)
-            if max_hp <= 0:
-                continue
-            if state_effect[0] == "aqua_ring":
-                heal = max(1, max_hp // 16)
-                tag = "Aqua Ring"
-            else:
-                heal = max(1, max_hp // 8)
-                tag = "Ingrain"
-            # Check for Heal Block before applying end-of-round heals
-            s_check = normalize_states(unit.states)
-            if s_check and s_check[0] == "heal_block" and int(s_check[1]) > 0:
-                if game and game_state:
-                    unit_name = get_unit_display_name(unit, db)
-                    publish_system_log_event(game.link, f"{unit_name} can't be healed due to Heal Block", game_state, db)
-                continue
-            before_hp = int(unit.current_hp or 0)
-            unit.current_hp = min(max_hp, before_hp + heal)
-            db.add(unit)
-            modified_unit_ids.append(unit.id)
-            if game and game_state:
-                unit_name = get_unit_display_name(unit, db)
-                publish_system_log_event(game.link, f"{unit_name} healed {heal} HP from {tag}", game_state, db)
-        elif state_effect[0] == "cursed":
-            # Apply Cursed damage at end of round: lose 1/4 max HP
-            max_hp = int((unit.current_stats or {}).get("hp", 0) or 0)
-            if max_hp <= 0:
-                continue
-            damage = max(1, max_hp // 4)
-            before_hp = int(unit.current_hp or 0)
-            if before_hp <= 0:
-                continue
-            unit.current_hp = max(0, before_hp - damage)
-            db.add(unit)
-            modified_unit_ids.append(unit.id)
-            if game and game_state:
-                unit_name = get_unit_display_name(unit, db)
-                publish_system_log_event(game.link, f"{unit_name} took {damage} damage from Curse", game_state, db)
-        elif state_effect[0] == "nightmare":
-            # Nightmare deals damage only if the unit is asleep
-            status = normalize_status_effects(unit.status_effects)
-            if not status or status[0] != "sleep" or int(status[1]) <= 0:
+    def load(self, units: list[EngineUnit] | None = None) -> None:
+        """Fill in the catalog fields of ``units`` (every unit when None) that are not loaded yet."""
+        for unit in self.battle.units if units is None else units:
+            if id(unit) in self._loaded:
                 continue
-            max_hp = int((unit.current_stats or {}).get("hp", 0) or 0)
-            if max_hp <= 0:
-                continue
-            damage = max(1, max_hp // 4)
-            before_hp = int(unit.current_hp or 0)
-            if before_hp <= 0:
-                continue
-            unit.current_hp = max(0, before_hp - damage)
-            db.add(unit)
-            modified_unit_ids.append(unit.id)
-            if game and game_state:
-                unit_name = get_unit_display_name(unit, db)
-                publish_system_log_event(game.link, f"{unit_name} took {damage} damage from Nightmare", game_state, db)
-        elif state_effect[0] == "salt_cure":
-            # Salt Cure deals 1/16 max HP, or 1/8 if Steel or Water type (no stacking if both)
-            unit_types = get_unit_types(unit, db)
-            if "steel" in unit_types or "water" in unit_types:
-                denom = 8
-            else:
-                denom = 16
-            max_hp = int((unit.current_stats or {}).get("hp", 0) or 0)
-            if max_hp <= 0:
-                continue
-            damage = max(1, max_hp // denom)
-            before_hp = int(unit.current_hp or 0)
-            if before_hp <= 0:
-                continue
-            unit.current_hp = max(0, before_hp - damage)
-            db.add(unit)
-            modified_unit_ids.append(unit.id)
-            if game and game_state:
-                unit_name = get_unit_display_name(unit, db)
-                publish_system_log_event(game.link, f"{unit_name} took {damage} damage from Salt Cure", game_state, db)
-
-    modified_unit_ids.extend(apply_end_of_round_stump_tile_effects(game_id, db))
-
-    return modified_unit_ids
-
-
-def apply_end_of_round_stump_tile_effects(game_id: int, db: Session) -> list[int]:
-    """Grass-type units on stump tiles heal 1/8 max HP at end of round."""
-    map_state = db.query(GameMapState).filter(GameMapState.game_id == game_id).first()
-    if not map_state or not map_state.map_id:
-        return []
-
-    map_obj = db.query(Map).filter(Map.id == map_state.map_id).first()
-    special_tiles = map_obj.tile_data.get("special_tiles") if map_obj and map_obj.tile_data else None
-    if not special_tiles:
-        return []
-
-    game = db.query(Game).filter(Game.id == game_id).first()
-    game_state = db.query(GameState).filter(GameState.game_id == game_id).first()
-    units = db.query(GameUnit).filter(GameUnit.game_id == game_id).all()
-    modified_unit_ids: list[int] = []
-
-    for unit in units:
-        if int(unit.current_hp or 0) <= 0:
-            continue
-        if "grass" not in get_unit_types(unit, db):
-            continue
-        unit_types = get_unit_types(unit, db)
-        ability_names = get_unit_ability_names(unit, db)
-        if not target_receives_grass_tile_bonuses(unit_types, ability_names):
-            continue
-
-        x = int(getattr(unit, "current_x", -1) or -1)
-        y = int(getattr(unit, "current_y", -1) or -1)
-        if not is_stump_tile(special_tiles, x, y):
-            continue
-
-        max_hp = int((unit.current_stats or {}).get("hp", 0) or 0)
-        if max_hp <= 0:
-            continue
-
-        state_effect = normalize_states(unit.states)
-        if state_effect and state_effect[0] == "heal_block" and int(state_effect[1]) > 0:
-            if game and game_state:
-                unit_name = get_unit_display_name(unit, db)
-                publish_system_log_event(
-                    game.link,
-                    f"{unit_name} can't be healed due to Heal Block",
-                    game_state,
-                    db,
-                )
-            continue
-
-        heal = max(1, max_hp // 8)
-        before_hp = int(unit.current_hp or 0)
-        unit.current_hp = min(max_hp, before_hp + heal)
-        db.add(unit)
-        modified_unit_ids.append(unit.id)
-        if game and game_state:
-            unit_name = get_unit_display_name(unit, db)
-            publish_system_log_event(
-                game.link,
-                f"{unit_name} healed {heal} HP from the stump",
-                game_state,
-                db,
-            )
-
-    return modified_unit_ids
+            self._loaded.add(id(unit))
+            row = self.row_for(unit)
+            unit_info = unit_record(self.db, row.unit_id)
+            turn_start_stages = get_unit_flags(row).get("stat_stages_at_turn_start")
+            unit.name = get_unit_display_name(row, self.db)
+            unit.types = frozenset(get_unit_types(row, self.db))
+            unit.ability_names = frozenset(get_unit_ability_names(row, self.db))
+            unit.base_stats = unit_info.base_stats if unit_info and isinstance(unit_info.base_stats, dict) else None
+            unit.turn_start_stages = turn_start_stages if isinstance(turn_start_stages, dict) else None
+
+    def _engine_unit(self, unit: GameUnit) -> EngineUnit:
+        x, y = get_unit_position(unit)
+        return EngineUnit(
+            id=unit.id,
+            user_id=unit.user_id,
+            name="",
+            current_x=x,
+            current_y=y,
+            current_hp=int(unit.current_hp or 0),
+            current_stats=unit.current_stats or {},
+            level=unit.level or 50,
+            stat_boosts=unit.stat_boosts,
+            status_effects=unit.status_effects,
+            states=unit.states,
+            starting_x=unit.starting_x,
+            starting_y=unit.starting_y,
+            can_move=bool(unit.can_move),
+        )
 
+    def _battle_map(self, map_obj: Map | None) -> BattleMap:
+        map_state = self.map_state
+        if map_obj is None:
+            return BattleMap(width=0, height=0)
+        terrain = get_compiled_terrain(map_obj)
+        return BattleMap(
+            width=int(map_obj.width or 0),
+            height=int(map_obj.height or 0),
+            special_tiles=terrain.special_tiles or [],
+            weather_tiles=map_state.weather_tiles if map_state is not None else None,
+            hazard_tiles=map_state.hazard_tiles if map_state is not None else None,
+            terrain_effect_tiles=map_state.terrain_effect_tiles if map_state is not None else None,
+            field_effect_tiles=map_state.field_effect_tiles if map_state is not None else None,
+            terrain=terrain,
+        )
 
-def apply_end_of_round_entry_hazard_effects(game_id: int, current_turn: int, db: Session) -> list[int]:
+    def apply(self) -> list[GameUnit]:
+        """Write the battle back to the rows; returns the rows that changed."""
+        changed = []
+        for row in self.rows:
+            engine_unit = self.unit_for(row)
+            snapshot = self._snapshots[id(engine_unit)]
+            dirty = False
+            for field in self.UNIT_FIELDS + self.UNIT_JSON_FIELDS:
+                value = getattr(engine_unit, field)
+                # Identity tells whether a JSON value was replaced.
+                if value is snapshot[field] or (field in self.UNIT_FIELDS and value == snapshot[field]):
+                    continue
+                setattr(row, field, value)
+                snapshot[field] = value
+                dirty = True
+            if dirty:
+                self.db.add(row)
+                changed.append(row)
+
+        for field in self.BATTLE_GRIDS:
+            value = getattr(self.battle.map, field)
+            if value is self._grids[field]:
+                continue
+            if self.map_state is None:
+                if self.game is None or self.map_obj is None:
+                    continue
+                self.map_state = _create_default_game_map_state(self.game, self.map_obj)
+            setattr(self.map_state, field, value)
+            self._grids[field] = value
+            self.db.add(self.map_state)
+
+        logs = [system_log_payload(message) for message in self.battle.logs]
+        self.battle.logs = []
+        if logs and self.state is not None:
+            append_replay_log_events(self.state, logs)
+            self.db.add(self.state)
+        if self.game is None:
+            # Loose units (``process_move_effects`` outside a stored game) are flushed by the caller.
+            return changed
+        self.db.flush()
+        if logs:
+            publish_game_ws_events(self.game.link, logs)
+        return changed
+
+
+def apply_end_of_turn_effects(game: Game, state: GameState, current_player_id: int, db: Session) -> set[int]:
     """
-    Apply tile entry-hazard effects once per full round, aligned with weather timing.
-    Hazard behavior:
-    - spikes(1): 1 stack=1/8, 2 stacks=1/6, 3+ stacks=1/4 max HP; no effect on flying.
-    - toxic_spikes(2): 1 stack=poison, 2+ stacks=badly_poisoned; no effect on flying; no overwrite.
-    - stealth_rock(3): (max_hp / 8) scaled by rock-type effectiveness.
-    - sticky_web(4): lower speed by one stage.
+    Run the end-of-turn status damage and, after the last player of a round,
+    the weather, state, stump and entry-hazard passes and the hazard countdown.
+    Returns the IDs of units whose HP, status or stats changed.
     """
-    map_state = db.query(GameMapState).filter(GameMapState.game_id == game_id).first()
-    hazard_tiles = map_state.hazard_tiles if map_state and isinstance(map_state.hazard_tiles, list) else None
-    if not isinstance(hazard_tiles, list):
-        return []
-
-    game = db.query(Game).filter(Game.id == game_id).first()
-    game_state = db.query(GameState).filter(GameState.game_id == game_id).first()
-    units = db.query(GameUnit).filter(GameUnit.game_id == game_id).all()
-    modified_unit_ids: list[int] = []
-
-    for unit in units:
-        max_hp = int((unit.current_stats or {}).get("hp", 0) or 0)
-        current_hp = int(unit.current_hp or 0)
-        if current_hp <= 0:
-            continue
-
-        x = int(getattr(unit, "current_x", -1) or -1)
-        y = int(getattr(unit, "current_y", -1) or -1)
-        entries = get_hazard_entries_at_position(hazard_tiles, x, y)
-        if not entries:
-            continue
-
-        unit_types = get_unit_types(unit, db)
-        is_flying = "flying" in unit_types
-
-        spikes_layers = sum(1 for hazard_id, _ in entries if int(hazard_id) == 1)
-        toxic_spikes_layers = sum(1 for hazard_id, _ in entries if int(hazard_id) == 2)
-        has_stealth_rock = any(int(hazard_id) == 3 for hazard_id, _ in entries)
-        has_sticky_web = any(int(hazard_id) == 4 for hazard_id, _ in entries)
-
-        hp_after_effects = current_hp
-        modified = False
-
-        if spikes_layers > 0 and not is_flying and max_hp > 0:
-            if spikes_layers >= 3:
-                damage = max(1, max_hp // 4)
-            elif spikes_layers == 2:
-                damage = max(1, max_hp // 6)
-            else:
-                damage = max(1, max_hp // 8)
-            hp_after_effects = max(0, hp_after_effects - damage)
-            modified = True
-            if game:
-                unit_name = get_unit_display_name(unit, db)
-                publish_system_log_event(game.link, f"{unit_name} took {damage} damage from spikes", game_state, db)
-
-        if has_stealth_rock and max_hp > 0:
-            type_multiplier = get_type_multiplier("rock", list(unit_types))
-            if type_multiplier > 0:
-                rock_damage = max(1, int((max_hp * type_multiplier) // 8))
-                hp_after_effects = max(0, hp_after_effects - rock_damage)
-                modified = True
-                if game:
-                    unit_name = get_unit_display_name(unit, db)
-                    publish_system_log_event(game.link, f"{unit_name} took {rock_damage} damage from floating rocks", game_state, db)
-
-        if toxic_spikes_layers > 0 and not is_flying:
-            status_to_apply = "badly_poisoned" if toxic_spikes_layers >= 2 else "poison"
-            applied = apply_status_effect(unit, status_to_apply, db)
-            if applied:
-                modified = True
-            else:
-                # If the status wasn't applied because of type immunity, publish a system log so chat shows it
-                if is_status_immune_by_type(unit, status_to_apply, db) and game and game_state:
-                    label = format_status_log_label(status_to_apply)
-                    if label in {"poisoned", "badly poisoned", "burned", "frozen", "paralyzed"}:
-                        publish_system_log_event(
-                            game.link,
-                            f"{get_unit_display_name(unit, db)} wasn't {label}",
-                            game_state,
-                            db,
-                        )
-                    else:
-                        publish_system_log_event(
-                            game.link,
-                            f"{get_unit_display_name(unit, db)} wasn't affected",
-                            game_state,
-                            db,
-                        )
-
-        if has_sticky_web:
-            apply_stat_change(unit, "speed", -1, current_turn, db)
-            modified = True
-
-        if hp_after_effects != current_hp:
-            unit.current_hp = hp_after_effects
-            db.add(unit)
-
-        if modified:
-            modified_unit_ids.append(unit.id)
-
+    loaded = LoadedBattle(db, game, state)
+    if loaded.map_state is not None:
+        stage_state_patch(db, game.id, map_state=loaded.map_state)
+    round_complete = ((state.current_turn + 1) % len(state.players)) == 0
+    modified_unit_ids = run_end_of_turn(loaded.battle, current_player_id, round_complete=round_complete)
+    loaded.apply()
     return modified_unit_ids
 
 
@@ -4886,24 +2243,26 @@ def remove_fainted_units_from_play(game_id: int, db: Session) -> list[int]:
     if not fainted_units:
         return []
 
-    game = db.query(Game).filter(Game.id == game_id).first()
-    game_state = db.query(GameState).filter(GameState.game_id == game_id).first()
+    game = db.get(Game, game_id)
+    game_state = game_state_for(db, game_id)
 
     removed_ids: list[int] = []
+    fainted_positions: dict[int, tuple[int, int]] = {}
     for unit in fainted_units:
         if game:
             publish_system_log_event(game.link, f"{get_unit_display_name(unit, db)} fainted!", game_state, db)
 
-        player_state = db.query(GamePlayer).filter_by(game_id=game_id, player_id=unit.user_id).first()
+        player_state = player_state_for(db, game_id, unit.user_id)
         if player_state and unit.id in player_state.game_units:
             player_state.game_units.remove(unit.id)
             db.add(player_state)
 
+        fainted_positions[unit.id] = get_unit_position(unit)
         faint_unit_in_place(unit, db)
         removed_ids.append(unit.id)
 
     if game and is_war_game(game):
-        map_state = db.query(GameMapState).filter(GameMapState.game_id == game_id).first()
+        map_state = map_state_for(db, game_id)
         if map_state and restore_objectives_for_units(map_state, fainted_units):
             db.add(map_state)
             for unit in fainted_units:
@@ -4922,6 +2281,7 @@ def remove_fainted_units_from_play(game_id: int, db: Session) -> list[int]:
 
     active_counts = get_remaining_unit_counts(game_id, db)
     if game:
+        update_threat_map(game, db, fainted_positions)
         affected_users = {unit.user_id for unit in fainted_units}
         for user_id in affected_users:
             if active_counts.get(user_id, 0) == 0:
@@ -4937,7 +2297,7 @@ def remove_fainted_units_from_play(game_id: int, db: Session) -> list[int]:
 
 def get_remaining_unit_counts(game_id: int, db: Session) -> dict:
     counts: dict[int, int] = {}
-    units = db.query(GameUnit).filter(GameUnit.game_id == game_id).all()
+    units = game_units_for(db, game_id)
     for unit in units:
         if unit.is_fainted or int(unit.current_hp or 0) <= 0:
             continue
@@ -4975,7 +2335,7 @@ def reconcile_playable_players(game: Game, state: GameState, db: Session) -> tup
             state.current_turn = 0
         return previous_players, [], False
 
-    map_state = db.query(GameMapState).filter(GameMapState.game_id == game.id).first()
+    map_state = map_state_for(db, game.id)
 
     if is_war_game(game) and map_state:
         playable_players = [
@@ -5059,19 +2419,12 @@ def advance_turn_if_player_has_no_actions(
 
     removed_ids = list(removed_ids or [])
 
-    units_to_sync = db.query(GameUnit).filter(GameUnit.game_id == game.id).all()
+    units_to_sync = game_units_for(db, game.id)
     for unit in units_to_sync:
         unit.starting_x = unit.current_x
         unit.starting_y = unit.current_y
 
-    end_turn_modified_unit_ids = set(apply_end_of_turn_status_damage(current_player_id, game.id, db))
-    should_apply_round_weather = ((state.current_turn + 1) % len(state.players)) == 0
-    if should_apply_round_weather:
-        end_turn_modified_unit_ids.update(apply_end_of_round_weather_damage(game.id, db))
-        end_turn_modified_unit_ids.update(
-            apply_end_of_round_entry_hazard_effects(game.id, state.current_turn, db)
-        )
-        decrement_and_expire_hazards(game.id, db)
+    end_turn_modified_unit_ids = apply_end_of_turn_effects(game, state, current_player_id, db)
 
     end_turn_removed_ids = remove_fainted_units_from_play(game.id, db)
     if end_turn_removed_ids:
@@ -5079,7 +2432,7 @@ def advance_turn_if_player_has_no_actions(
 
     maybe_restore_war_objectives_at_turn_end(game, db)
 
-    remaining_units_after_end_turn_damage = db.query(GameUnit).filter(GameUnit.game_id == game.id).all()
+    remaining_units_after_end_turn_damage = game_units_for(db, game.id)
     remaining_players_after_end_turn_damage = {unit.user_id for unit in remaining_units_after_end_turn_damage}
     if len(remaining_players_after_end_turn_damage) == 1:
         state.status = GameStatus.completed
@@ -5092,11 +2445,7 @@ def advance_turn_if_player_has_no_actions(
         redis_client.publish(f"game_updates:{game.link}", "game_completed")
         return removed_ids, False, True
 
-    current_player_units = (
-        db.query(GameUnit)
-        .filter(GameUnit.game_id == game.id, GameUnit.user_id == current_player_id)
-        .all()
-    )
+    current_player_units = side_units_for(db, game.id, current_player_id)
     for unit in current_player_units:
         unit.can_move = True
 
@@ -5121,6 +2470,7 @@ def advance_turn_if_player_has_no_actions(
     )
     removed_ids.extend(remove_fainted_units_from_play(game.id, db))
 
+    stage_state_patch(db, game.id, unit_ids=modified_unit_ids)
     for unit_id in modified_unit_ids:
         redis_client.publish(f"game_updates:{game.link}", f"unit_stats_updated:{unit_id}")
 
@@ -5134,7 +2484,9 @@ def advance_turn_if_player_has_no_actions(
 
     now = datetime.now(timezone.utc)
     state.turn_deadline = now + timedelta(seconds=game.turn_seconds)
+    schedule_turn_deadline(game, state)
     compute_turn_locks(game, state, db)
+    compute_threat_map(game, state, db)
     publish_turn_start_logs(game, state, db)
     db.commit()
     for unit_id in removed_ids:
@@ -5146,7 +2498,7 @@ def advance_turn_if_player_has_no_actions(
 
 def get_draw_player_ids(game: Game, state: GameState, db: Session) -> List[int]:
     if is_war_game(game):
-        map_state = db.query(GameMapState).filter(GameMapState.game_id == game.id).first()
+        map_state = map_state_for(db, game.id)
         if map_state:
             return get_war_draw_player_ids(game, state, db, map_state)
     counts = get_remaining_unit_counts(game.id, db)
@@ -5222,7 +2574,7 @@ def _resolve_random_tm_tiles(map_state: GameMapState, db: Session) -> bool:
 
 
 def _resolve_random_tm_tiles_for_game(game: Game, db: Session) -> bool:
-    map_state = db.query(GameMapState).filter_by(game_id=game.id).first()
+    map_state = map_state_for(db, game.id)
     if map_state:
         return _resolve_random_tm_tiles(map_state, db)
     return False
@@ -5269,7 +2621,7 @@ def _get_or_create_game_map_state(game: Game, db: Session) -> GameMapState:
         return map_state
 
     # Fallback for legacy rows created before GameMapState existed.
-    map_obj = db.query(Map).filter_by(id=game.map_id).first()
+    map_obj = db.get(Map, game.map_id)
     if not map_obj:
         raise HTTPException(status_code=500, detail="Map missing for game")
 
@@ -5303,50 +2655,204 @@ def _player_info_from_state(ps: GamePlayer, username: str) -> PlayerInfo:
     )
 
 def serialize_game_response(game: Game, db: Session) -> GameResponse:
-    game_state = db.query(GameState).filter_by(game_id=game.id).first()
+    game_state = game_state_for(db, game.id)
     if not game_state:
         raise HTTPException(status_code=500, detail="Game state missing")
 
     player_states = db.query(GamePlayer).filter_by(game_id=game.id).all()
     players = []
     for ps in player_states:
-        u = db.query(User).filter_by(id=ps.player_id).first()
+        u = db.get(User, ps.player_id)
         players.append(_player_info_from_state(ps, u.username))
 
-    map_obj = _get_map_via_game_state(game, db)
-    map_state_obj = _get_or_create_game_map_state(game, db)
+    map_obj = _get_map_via_game_state(game, db)
+    map_state_obj = _get_or_create_game_map_state(game, db)
+
+    draw_player_ids = None
+    if game_state.status == GameStatus.completed and game_state.winner_id is None:
+        draw_player_ids = get_draw_player_ids(game, game_state, db)
+
+    return GameResponse(
+        id=game.id,
+        status=game_state.status,
+        is_private=game.is_private,
+        game_name=game.game_name,
+        map_name=game.map_name,
+        map=MapDetail.model_validate(map_obj),
+        map_state=GameMapStateSchema.model_validate(map_state_obj),
+        max_players=game.max_players,
+        host_id=game.host_id,
+        players=players,
+        player_order=game_state.players,
+        winner_id=game_state.winner_id,
+        draw_player_ids=draw_player_ids,
+        gamemode=game.gamemode,
+        current_turn=game_state.current_turn,
+        starting_cash=game.starting_cash,
+        cash_per_turn=game.cash_per_turn,
+        max_turns=game.max_turns,
+        unit_limit=game.unit_limit,
+        turn_seconds=game.turn_seconds,
+        start_with_tms=game.start_with_tms,
+        turn_deadline=game_state.turn_deadline,
+        replay_log=event_tail(db, game.id),
+        link=game.link,
+        timestamp=game.timestamp
+    )
+
+LOBBY_BUCKET_STATUSES = {
+    "open": (GameStatus.open,),
+    "closed": (GameStatus.closed,),
+    "in_progress": (GameStatus.in_progress, GameStatus.preparation),
+    "completed": (GameStatus.completed,),
+}
+LOBBY_PAGE_SIZE = 50
+LOBBY_MAX_PAGE_SIZE = 200
+
+
+def encode_lobby_cursor(timestamp: datetime, game_id: int) -> str:
+    raw = f"{timestamp.isoformat()}|{game_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_lobby_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        raw_timestamp, raw_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(raw_timestamp), int(raw_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def list_game_summaries(
+    db: Session,
+    statuses: tuple[GameStatus, ...],
+    limit: int,
+    cursor: str | None = None,
+) -> GameSummaryPage:
+    """One page of public games, newest first, read with a single joined query.
+
+    The page of games is selected (and limited) in a subquery, then joined to
+    its players, so no per-game or per-player queries are issued and no map,
+    map state or replay data is loaded.
+    """
+    page_query = (
+        db.query(
+            Game.id.label("id"),
+            Game.link.label("link"),
+            Game.game_name.label("game_name"),
+            Game.map_id.label("map_id"),
+            Game.map_name.label("map_name"),
+            Game.gamemode.label("gamemode"),
+            Game.is_private.label("is_private"),
+            Game.max_players.label("max_players"),
+            Game.host_id.label("host_id"),
+            Game.max_turns.label("max_turns"),
+            Game.turn_seconds.label("turn_seconds"),
+            Game.timestamp.label("timestamp"),
+            GameState.status.label("status"),
+            GameState.current_turn.label("current_turn"),
+            GameState.winner_id.label("winner_id"),
+        )
+        .join(GameState, GameState.game_id == Game.id)
+        .filter(GameState.status.in_(statuses), Game.is_private == False)
+    )
+    if cursor:
+        after_timestamp, after_id = decode_lobby_cursor(cursor)
+        page_query = page_query.filter(
+            or_(
+                Game.timestamp < after_timestamp,
+                and_(Game.timestamp == after_timestamp, Game.id < after_id),
+            )
+        )
+    # One extra row tells us whether another page follows.
+    page = page_query.order_by(Game.timestamp.desc(), Game.id.desc()).limit(limit + 1).subquery()
+
+    rows = (
+        db.query(
+            page,
+            GamePlayer.player_id.label("player_id"),
+            GamePlayer.is_ready.label("player_is_ready"),
+            GamePlayer.game_units.label("player_game_units"),
+            User.username.label("player_username"),
+        )
+        .outerjoin(GamePlayer, GamePlayer.game_id == page.c.id)
+        .outerjoin(User, User.id == GamePlayer.player_id)
+        .order_by(page.c.timestamp.desc(), page.c.id.desc(), GamePlayer.id)
+        .all()
+    )
+
+    summaries: dict[int, GameSummary] = {}
+    timestamps: dict[int, datetime] = {}
+    for row in rows:
+        summary = summaries.get(row.id)
+        if summary is None:
+            summary = summaries[row.id] = GameSummary(
+                id=row.id,
+                link=row.link,
+                game_name=row.game_name,
+                map_id=row.map_id,
+                map_name=row.map_name,
+                gamemode=row.gamemode,
+                status=row.status.value,
+                is_private=row.is_private,
+                max_players=row.max_players,
+                host_id=row.host_id,
+                players=[],
+                current_turn=row.current_turn,
+                max_turns=row.max_turns,
+                turn_seconds=row.turn_seconds,
+                winner_id=row.winner_id,
+                timestamp=row.timestamp,
+            )
+            timestamps[row.id] = row.timestamp
+        if row.player_id is not None:
+            summary.players.append(
+                LobbyPlayer(
+                    player_id=row.player_id,
+                    username=row.player_username or "",
+                    is_ready=bool(row.player_is_ready),
+                    unit_count=len(row.player_game_units or []),
+                )
+            )
+
+    items = list(summaries.values())
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_lobby_cursor(timestamps[last.id], last.id)
+    return GameSummaryPage(items=items, next_cursor=next_cursor)
+
+def game_needs_upkeep(game: Game, state: GameState | None, db: Session) -> bool:
+    """Whether ``game`` has fainted units still in play or a turn whose deadline has passed."""
+    if state is None or state.status != GameStatus.in_progress:
+        return False
+    if state.turn_deadline and datetime.now(timezone.utc) >= as_utc(state.turn_deadline):
+        return True
+    fainted_in_play = (
+        db.query(GameUnit.id)
+        .filter(GameUnit.game_id == game.id, GameUnit.current_hp <= 0, GameUnit.is_fainted == False)
+        .first()
+    )
+    return fainted_in_play is not None
+
+
+def run_game_upkeep(game: Game, state: GameState, db: Session) -> None:
+    """Take fainted units out of play, settle eliminations and advance an expired turn."""
+    removed_ids = remove_fainted_units_from_play(game.id, db)
+    if removed_ids:
+        db.commit()
+        for unit_id in removed_ids:
+            redis_client.publish(f"game_updates:{game.link}", f"unit_removed:{unit_id}")
+
+    _, _, completed_now = reconcile_playable_players(game, state, db)
+    if completed_now:
+        db.commit()
+        redis_client.publish(f"game_updates:{game.link}", "game_completed")
 
-    draw_player_ids = None
-    if game_state.status == GameStatus.completed and game_state.winner_id is None:
-        draw_player_ids = get_draw_player_ids(game, game_state, db)
+    advance_if_expired(game, state, db)
 
-    return GameResponse(
-        id=game.id,
-        status=game_state.status,
-        is_private=game.is_private,
-        game_name=game.game_name,
-        map_name=game.map_name,
-        map=MapDetail.model_validate(map_obj),
-        map_state=GameMapStateSchema.model_validate(map_state_obj),
-        max_players=game.max_players,
-        host_id=game.host_id,
-        players=players,
-        player_order=game_state.players,
-        winner_id=game_state.winner_id,
-        draw_player_ids=draw_player_ids,
-        gamemode=game.gamemode,
-        current_turn=game_state.current_turn,
-        starting_cash=game.starting_cash,
-        cash_per_turn=game.cash_per_turn,
-        max_turns=game.max_turns,
-        unit_limit=game.unit_limit,
-        turn_seconds=game.turn_seconds,
-        start_with_tms=game.start_with_tms,
-        turn_deadline=game_state.turn_deadline,
-        replay_log=game_state.replay_log,
-        link=game.link,
-        timestamp=game.timestamp
-    )
 
 def advance_if_expired(game: Game, state: GameState, db: Session) -> bool:
     """Advance to the next player if the turn timer elapsed. Returns True if advanced."""
@@ -5363,25 +2869,20 @@ def advance_if_expired(game: Game, state: GameState, db: Session) -> bool:
 
     now = datetime.now(timezone.utc)
     warning_published = publish_turn_remaining_warning_if_needed(game, state, db, now)
-    if now < state.turn_deadline:
+    if now < as_utc(state.turn_deadline):
         if warning_published:
             db.commit()
         return False
 
     # Sync all units' starting positions to current positions before advancing turn
-    units_to_sync = db.query(GameUnit).filter(GameUnit.game_id == game.id).all()
+    units_to_sync = game_units_for(db, game.id)
     for unit in units_to_sync:
         unit.starting_x = unit.current_x
         unit.starting_y = unit.current_y
 
     # Resolve end-of-turn status damage for the current player before advancing.
     current_player_id = state.players[state.current_turn % len(state.players)]
-    end_turn_modified_unit_ids = set(apply_end_of_turn_status_damage(current_player_id, game.id, db))
-    should_apply_round_weather = ((state.current_turn + 1) % len(state.players)) == 0
-    if should_apply_round_weather:
-        end_turn_modified_unit_ids.update(apply_end_of_round_weather_damage(game.id, db))
-        end_turn_modified_unit_ids.update(apply_end_of_round_entry_hazard_effects(game.id, state.current_turn, db))
-        decrement_and_expire_hazards(game.id, db)
+    end_turn_modified_unit_ids = apply_end_of_turn_effects(game, state, current_player_id, db)
 
     removed_ids = remove_fainted_units_from_play(game.id, db)
 
@@ -5413,6 +2914,7 @@ def advance_if_expired(game: Game, state: GameState, db: Session) -> bool:
     removed_ids.extend(remove_fainted_units_from_play(game.id, db))
     
     # Broadcast stat updates for units that had boosts expire
+    stage_state_patch(db, game.id, unit_ids=modified_unit_ids)
     for unit_id in modified_unit_ids:
         redis_client.publish(f"game_updates:{game.link}", f"unit_stats_updated:{unit_id}")
 
@@ -5438,8 +2940,10 @@ def advance_if_expired(game: Game, state: GameState, db: Session) -> bool:
         return True
     
     state.turn_deadline = now + timedelta(seconds=game.turn_seconds)
+    schedule_turn_deadline(game, state)
 
     compute_turn_locks(game, state, db)
+    compute_threat_map(game, state, db)
     publish_turn_start_logs(game, state, db)
     db.commit()
     redis_client.publish(f"game_updates:{game.link}", "turn_advanced")
@@ -5447,103 +2951,229 @@ def advance_if_expired(game: Game, state: GameState, db: Session) -> bool:
     return True
 
 def movement_range_backend(start, rng, movement_costs, width, height, blocked_tiles: set[tuple[int, int]] | None = None):
-    sx, sy = start
-    blocked_tiles = blocked_tiles or set()
-    seen = set()
-    out = []
-    q = deque([(sx, sy, 0)])
-    dirs = [(1,0),(-1,0),(0,1),(0,-1)]
-    while q:
-        x, y, c = q.popleft()
-        if x < 0 or y < 0 or x >= width or y >= height: 
-            continue
-        key = (x, y)
-        if key in seen: 
-            continue
-        seen.add(key)
-        out.append([x, y])
-        for dx, dy in dirs:
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < width and 0 <= ny < height:
-                if (nx, ny) in blocked_tiles:
-                    continue
-                step_cost = movement_costs[ny][nx]
-                if step_cost >= IMPOSSIBLE_MOVEMENT_COST:
-                    continue
-                nc = c + step_cost
-                if nc <= rng and (nx, ny) not in seen:
-                    q.append((nx, ny, nc))
-    return out
+    return movement_range_on_graph(
+        build_movement_graph(None, width, height, cache_key=("open",)),
+        start,
+        rng,
+        movement_costs,
+        can_stand_on_ledge=True,
+        blocked_tiles=blocked_tiles,
+    )
 
-def compute_turn_locks(game: Game, state: GameState, db: Session):
-    """Cache {unit_id: {origin:[x,y], tiles:[[...],...]}} for the player whose turn it is."""
-    playable_players, _, completed_now = reconcile_playable_players(game, state, db)
-    if completed_now or state.current_turn is None or not playable_players:
-        return
+def turn_lock_ttl_seconds(turn_seconds: int | None) -> int:
+    """Turn locks only need to outlive the turn they were computed for."""
+    return int(turn_seconds or 300) + TURN_LOCK_TTL_PADDING_SECONDS
 
-    # Derive the current player from the turn counter
-    current_player_id = playable_players[state.current_turn % len(playable_players)]
 
-    map_obj = db.query(Map).filter_by(id=game.map_id).first()
-    costs = map_obj.tile_data["movement_cost"]
-    special_tiles = map_obj.tile_data.get("special_tiles")
-    width, height = map_obj.width, map_obj.height
+def load_turn_lock_units(game_id: int, player_id: int, db: Session) -> list[tuple[GameUnit, set[str], set[str]]]:
+    """Load a player's units with their Unit rows in one query; ability names come from the catalog."""
     units = (
         db.query(GameUnit)
         .join(Unit, Unit.id == GameUnit.unit_id)
-        .filter(GameUnit.game_id == game.id, GameUnit.user_id == current_player_id)
+        .options(joinedload(GameUnit.unit))
+        .filter(GameUnit.game_id == game_id, GameUnit.user_id == player_id)
         .all()
     )
+    return [(gu, get_unit_types(gu, db), get_unit_ability_names(gu, db)) for gu in units]
+
+
+def compute_turn_locks(game: Game, state: GameState, db: Session) -> dict[str, float] | None:
+    """Cache {unit_id: {origin:[x,y], tiles:[[...],...]}} for the player whose turn it is.
+
+    Returns the per-phase timings in milliseconds.
+    """
+    playable_players, _, completed_now = reconcile_playable_players(game, state, db)
+    if completed_now or state.current_turn is None or not playable_players:
+        return None
+
+    # Derive the current player from the turn counter
+    current_player_id = playable_players[state.current_turn % len(playable_players)]
+
+    started = time.perf_counter()
+    map_obj = db.get(Map, game.map_id)
+    terrain = get_compiled_terrain(map_obj)
+    battle_map = BattleMap(map_obj.width, map_obj.height, special_tiles=terrain.special_tiles, terrain=terrain)
+    units = load_turn_lock_units(game.id, current_player_id, db)
 
     enemy_blocked_tiles = {
-        (unit.current_x, unit.current_y)
-        for unit in db.query(GameUnit)
+        (x, y)
+        for x, y in db.query(GameUnit.current_x, GameUnit.current_y)
         .filter(
             GameUnit.game_id == game.id,
             GameUnit.user_id != current_player_id,
             GameUnit.current_hp > 0,
         )
-        .all()
     }
-
-    key = f"turnlock:{game.link}:{current_player_id}"
-    redis_client.delete(key)
+    loaded = time.perf_counter()
 
     # Store as a hash: field=unit_id, value=json
-    for gu in units:
-        clear_movement_locked(game.link, gu.id)
+    locks = {}
+    for gu, unit_types, ability_names in units:
         if (gu.current_hp or 0) <= 0:
             continue
-        current_stats = gu.current_stats or {}
-        rng = int(current_stats.get("range", 0) or 0)
-        unit_types = get_unit_types(gu, db)
-        ability_names = get_unit_ability_names(gu, db)
-        blocked_tiles = (
-            set()
-            if unit_can_pass_through_units(unit_types)
-            else enemy_blocked_tiles
-        )
-        effective_costs = build_movement_cost_grid(
-            costs,
-            special_tiles,
-            unit_types,
-            ability_names,
-        )
-        tiles = movement_range_with_terrain(
+        tiles = reachable_tiles(
+            battle_map,
             (gu.starting_x, gu.starting_y),
-            rng,
-            effective_costs,
-            special_tiles,
-            width,
-            height,
+            int((gu.current_stats or {}).get("range", 0) or 0),
             unit_types,
             ability_names,
-            blocked_tiles,
-        )
-        redis_client.hset(
-            key, str(gu.id),
-            json.dumps({"origin": [gu.starting_x, gu.starting_y], "tiles": tiles})
+            set() if unit_can_pass_through_units(unit_types) else enemy_blocked_tiles,
         )
+        locks[str(gu.id)] = json.dumps({"origin": [gu.starting_x, gu.starting_y], "tiles": tiles})
+    computed = time.perf_counter()
+
+    # One MULTI/EXEC round trip, so readers never see a half-written lock set.
+    key = f"turnlock:{game.link}:{current_player_id}"
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.delete(key, *(movement_locked_key(game.link, gu.id) for gu, _, _ in units))
+    if locks:
+        pipe.hset(key, mapping=locks)
+        pipe.expire(key, turn_lock_ttl_seconds(game.turn_seconds))
+    pipe.execute()
+    written = time.perf_counter()
+
+    timings = {
+        "load_ms": (loaded - started) * 1000,
+        "ranges_ms": (computed - loaded) * 1000,
+        "redis_ms": (written - computed) * 1000,
+    }
+    logger.debug(
+        "Turn locks for game %s player %s: %d units, load %.1fms, ranges %.1fms, redis %.1fms",
+        game.link,
+        current_player_id,
+        len(units),
+        timings["load_ms"],
+        timings["ranges_ms"],
+        timings["redis_ms"],
+    )
+    return timings
+
+def threat_key(game_link: str) -> str:
+    return f"threats:{game_link}"
+
+
+def _threat_fields(loaded: LoadedBattle, unit_ids, db: Session) -> tuple[dict[str, str], list[str]]:
+    """Hash fields ``{unit_id: "owner_id:bitset"}`` for ``unit_ids``, and the fields of units out of play."""
+    battle = loaded.battle
+    fields, removed = {}, []
+    for unit_id in unit_ids:
+        unit = battle.units_by_id.get(unit_id)
+        if unit is None or unit.current_hp <= 0 or not battle.map.in_bounds(*unit.position):
+            removed.append(str(unit_id))
+            continue
+        loaded.load([unit])
+        bits = threat_bits(battle, unit, forecast_moves(loaded.row_for(unit), db))
+        fields[str(unit_id)] = f"{unit.user_id}:{encode_bits(bits, battle.map.width, battle.map.height)}"
+    return fields, removed
+
+
+def compute_threat_map(game: Game, state: GameState, db: Session) -> None:
+    """Store every unit's threat bitset for the turn that is starting, next to the turn locks."""
+    loaded = LoadedBattle(db, game, state, units=[])
+    battle = loaded.battle
+    fields, _ = _threat_fields(loaded, [unit.id for unit in battle.units if unit.current_hp > 0], db)
+    key = threat_key(game.link)
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.delete(key)
+    pipe.hset(key, mapping={"size": f"{battle.map.width},{battle.map.height}", **fields})
+    pipe.expire(key, turn_lock_ttl_seconds(game.turn_seconds))
+    pipe.execute()
+
+
+def update_threat_map(game: Game, db: Session, changed: dict[int, tuple[int, int]], loaded: LoadedBattle | None = None) -> None:
+    """Recompute only the threats that the units in ``changed`` (unit id -> previous tile) can have changed.
+
+    Does nothing before the first turn-start computation; that one covers the change.
+    """
+    key = threat_key(game.link)
+    if not changed or not redis_client.exists(key):
+        return
+    loaded = loaded or LoadedBattle(db, game, units=[])
+    fields, removed = _threat_fields(loaded, stale_threat_unit_ids(loaded.battle, changed), db)
+    pipe = redis_client.pipeline(transaction=True)
+    if fields:
+        pipe.hset(key, mapping=fields)
+    if removed:
+        pipe.hdel(key, *removed)
+    pipe.execute()
+
+
+def read_threat_map(game: Game, state: GameState, player_id: int, db: Session) -> dict:
+    key = threat_key(game.link)
+    raw = redis_client.hgetall(key)
+    if not raw:
+        compute_threat_map(game, state, db)
+        raw = redis_client.hgetall(key)
+    width, height = (int(value) for value in raw.pop("size", "0,0").split(","))
+    unit_bits = {}
+    for unit_id, value in raw.items():
+        owner_id, encoded = value.split(":", 1)
+        unit_bits[int(unit_id)] = (int(owner_id), decode_bits(encoded))
+    return {
+        "player_id": player_id,
+        "width": width,
+        "height": height,
+        "threats": encode_bits(player_threat_bits(unit_bits, player_id), width, height),
+        "units": {
+            unit_id: encode_bits(bits, width, height)
+            for unit_id, (owner_id, bits) in unit_bits.items()
+            if owner_id != player_id
+        },
+    }
+
+
+def forecast_key(game_link: str) -> str:
+    return f"forecast:{game_link}"
+
+
+def forecast_moves(unit: GameUnit, db: Session) -> list[MoveRecord]:
+    """The moves ``unit`` can use right now: equipped moves and its TM move, with PP left."""
+    unit_info = unit_record(db, unit.unit_id)
+    if unit_info is None:
+        return []
+    move_ids = get_unit_equipped_move_ids(unit, unit_info)
+    tm_move_id = get_held_tm_move_id(unit, db)
+    if tm_move_id is not None and tm_move_id not in move_ids and unit_knows_move(unit_info, tm_move_id, unit, db):
+        move_ids = [*move_ids, tm_move_id]
+    move_pp = unit.move_pp if isinstance(unit.move_pp, list) else []
+    moves = []
+    for index, move_id in enumerate(move_ids):
+        if index < len(move_pp) and move_pp[index] <= 0:
+            continue
+        move = move_record(db, move_id)
+        if move is not None:
+            moves.append(move)
+    return moves
+
+
+def compute_forecast(game: Game, state: GameState, player_id: int, db: Session) -> dict:
+    """Forecast ``player_id``'s attacks from one load of the game, cached per state version.
+
+    ``GameState.version`` moves on with every committed mutation of the game's
+    units, players or map state, so a cached forecast for the current version
+    is still exact.
+    """
+    key = forecast_key(game.link)
+    cached = redis_client.get(key)
+    if cached:
+        forecast = json.loads(cached)
+        if forecast.get("version") == state.version and forecast.get("player_id") == player_id:
+            return forecast
+
+    loaded = LoadedBattle(db, game, state)
+    moves_by_unit = {
+        unit.id: forecast_moves(unit, db)
+        for unit in loaded.rows
+        if unit.user_id == player_id and (unit.current_hp or 0) > 0
+    }
+    attacks = forecast_attacks(loaded.battle, player_id, moves_by_unit)
+    forecast = {
+        "player_id": player_id,
+        "version": state.version,
+        "attacks": [asdict(attack) for attack in attacks],
+    }
+    redis_client.set(key, json.dumps(forecast), ex=turn_lock_ttl_seconds(game.turn_seconds))
+    return forecast
 
 @router.get("/open", response_model=List[GameResponse])
 def get_open_games(
@@ -5604,6 +3234,17 @@ def get_completed_games(
     )
     return [serialize_game_response(game, db) for game in games]
 
+@router.get("/lobby/{bucket}", response_model=GameSummaryPage)
+def get_lobby_games(
+    bucket: Literal["open", "closed", "in_progress", "completed"],
+    limit: int = Query(default=LOBBY_PAGE_SIZE, ge=1, le=LOBBY_MAX_PAGE_SIZE),
+    cursor: str | None = Query(default=None),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """Paginated lobby listing; pass ``next_cursor`` back as ``cursor`` for the next page."""
+    return list_game_summaries(db, LOBBY_BUCKET_STATUSES[bucket], limit, cursor)
+
 @router.post("/create", response_model=GameResponse)
 def create_game(
     data: GameCreateRequest,
@@ -5694,7 +3335,7 @@ def create_game(
         unit_limit=new_game.unit_limit,
         turn_seconds=new_game.turn_seconds,
         start_with_tms=new_game.start_with_tms,
-        replay_log=game_state.replay_log,
+        replay_log=event_tail(db, new_game.id),
         link=new_game.link,
         timestamp=new_game.timestamp
     )
@@ -5705,11 +3346,11 @@ def join_game(
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
-    game = db.query(Game).filter(Game.id == game_id).first()
+    game = db.get(Game, game_id)
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
 
-    game_state = db.query(GameState).filter_by(game_id=game.id).first()
+    game_state = game_state_for(db, game.id)
     if not game_state:
         raise HTTPException(status_code=404, detail="Game state not found")
 
@@ -5733,8 +3374,8 @@ def join_game(
     db.add(player_state)
 
     if is_war_game(game):
-        map_obj = db.query(Map).filter_by(id=game.map_id).first()
-        map_state = db.query(GameMapState).filter_by(game_id=game.id).first()
+        map_obj = db.get(Map, game.map_id)
+        map_state = map_state_for(db, game.id)
         if map_obj and map_state:
             _initialize_war_objective_tiles(game, game_state, map_state, map_obj)
 
@@ -5750,7 +3391,7 @@ def join_game(
     player_states = db.query(GamePlayer).filter_by(game_id=game.id).all()
     players = []
     for ps in player_states:
-        user_obj = db.query(User).filter_by(id=ps.player_id).first()
+        user_obj = db.get(User, ps.player_id)
         players.append(_player_info_from_state(ps, user_obj.username))
 
     return GameResponse(
@@ -5775,7 +3416,7 @@ def join_game(
         unit_limit=game.unit_limit,
         turn_seconds=game.turn_seconds,
         start_with_tms=game.start_with_tms,
-        replay_log=game_state.replay_log,
+        replay_log=event_tail(db, game.id),
         link=game.link,
         timestamp=game.timestamp
     )
@@ -5786,14 +3427,14 @@ def start_game(
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
-    game = db.query(Game).filter(Game.id == game_id).first()
+    game = db.get(Game, game_id)
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
 
     if user.id != game.host_id:
         raise HTTPException(status_code=403, detail="Only the host can start the game")
 
-    game_state = db.query(GameState).filter_by(game_id=game.id).first()
+    game_state = game_state_for(db, game.id)
     if not game_state:
         raise HTTPException(status_code=404, detail="Game state not found")
 
@@ -5806,8 +3447,8 @@ def start_game(
             game_state.status = GameStatus.preparation
             had_random_tms = _resolve_random_tm_tiles_for_game(game, db)
             if is_war_game(game):
-                map_obj = db.query(Map).filter_by(id=game.map_id).first()
-                map_state = db.query(GameMapState).filter_by(game_id=game.id).first()
+                map_obj = db.get(Map, game.map_id)
+                map_state = map_state_for(db, game.id)
                 if map_obj and map_state:
                     _initialize_war_objective_tiles(game, game_state, map_state, map_obj)
             publish_system_log_event(
@@ -5828,16 +3469,18 @@ def start_game(
             game_state.status = GameStatus.in_progress
             _resolve_random_tm_tiles_for_game(game, db)
             if is_war_game(game):
-                map_obj = db.query(Map).filter_by(id=game.map_id).first()
-                map_state = db.query(GameMapState).filter_by(game_id=game.id).first()
+                map_obj = db.get(Map, game.map_id)
+                map_state = map_state_for(db, game.id)
                 if map_obj and map_state:
                     _initialize_war_objective_tiles(game, game_state, map_state, map_obj)
 
             if game_state.players:
                 game_state.current_turn = 0
                 game_state.turn_deadline = datetime.now(timezone.utc) + timedelta(seconds=game.turn_seconds)
+                schedule_turn_deadline(game, game_state)
 
             compute_turn_locks(game, game_state, db)
+            compute_threat_map(game, game_state, db)
             db.commit()
             redis_client.publish(f"game_updates:{game.link}", "game_started")        
             redis_client.publish(f"game_updates:{game.link}", "turn_started")
@@ -5859,12 +3502,13 @@ def send_chat_message(
     payload: dict,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    _command: None = Depends(serialize_game_commands),
 ):
     game = db.query(Game).filter(Game.link == link).first()
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
 
-    state = db.query(GameState).filter(GameState.game_id == game.id).first()
+    state = game_state_for(db, game.id)
     if not state or user.id not in (state.players or []):
         raise HTTPException(status_code=403, detail="You are not in this game")
 
@@ -5889,7 +3533,8 @@ def send_chat_message(
 @router.get("/{link}", response_model=GameResponse)
 def get_game_by_link(
     link: str,
-    db: Session = Depends(get_db)
+    grids: Literal["full", "compact"] = "full",
+    db: Session = Depends(get_db),
 ):
     game = (
         db.query(Game)
@@ -5900,27 +3545,34 @@ def get_game_by_link(
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
 
-    removed_ids = remove_fainted_units_from_play(game.id, db)
-    if removed_ids:
-        db.commit()
-        for unit_id in removed_ids:
-            redis_client.publish(f"game_updates:{game.link}", f"unit_removed:{unit_id}")
-
-    game_state = db.query(GameState).filter_by(game_id=game.id).first()
-    _, _, completed_now = reconcile_playable_players(game, game_state, db)
-    if completed_now:
-        db.commit()
-        redis_client.publish(f"game_updates:{game.link}", "game_completed")
-
-    advance_if_expired(game, game_state, db)
-
-    game_state = db.query(GameState).filter_by(game_id=game.id).first()
+    # Reads stay off the command lease. Only when there is upkeep to do does the
+    # read try the lease, without waiting: a busy game is being written by a
+    # command or the scheduler, which do the same upkeep.
+    game_state = game_state_for(db, game.id)
+    if game_needs_upkeep(game, game_state, db):
+        with game_command(game.link, db, wait=False) as acquired:
+            if acquired:
+                db.refresh(game_state)
+                run_game_upkeep(game, game_state, db)
+
+    game_state = game_state_for(db, game.id)
     player_states = db.query(GamePlayer).filter_by(game_id=game.id).all()
     players = []
     for ps in player_states:
-        user_obj = db.query(User).filter_by(id=ps.player_id).first()
+        user_obj = db.get(User, ps.player_id)
         players.append(_player_info_from_state(ps, user_obj.username))
 
+    map_state = _get_or_create_game_map_state(game, db)
+    if grids == "compact":
+        map_state_payload = CompactGameMapStateSchema(
+            id=map_state.id,
+            game_id=map_state.game_id,
+            map_id=map_state.map_id,
+            **encode_map_state_grids(map_state),
+        )
+    else:
+        map_state_payload = GameMapStateSchema.model_validate(map_state)
+
     return GameResponse(
         id=game.id,
         status=game_state.status,
@@ -5928,7 +3580,7 @@ def get_game_by_link(
         game_name=game.game_name,
         map_name=game.map_name,
         map=MapDetail.model_validate(_get_map_via_game_state(game, db)),
-        map_state=GameMapStateSchema.model_validate(_get_or_create_game_map_state(game, db)),
+        map_state=map_state_payload,
         max_players=game.max_players,
         host_id=game.host_id,
         players=players,
@@ -5943,7 +3595,7 @@ def get_game_by_link(
         unit_limit=game.unit_limit,
         turn_seconds=game.turn_seconds,
         start_with_tms=game.start_with_tms,
-        replay_log=game_state.replay_log,
+        replay_log=event_tail(db, game.id),
         link=game.link,
         timestamp=game.timestamp
     )
@@ -5957,7 +3609,7 @@ def get_player_state(
     game = db.query(Game).filter(Game.link == link).first()
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
-    state = db.query(GamePlayer).filter_by(game_id=game.id, player_id=user.id).first()
+    state = player_state_for(db, game.id, user.id)
     if not state:
         raise HTTPException(status_code=404, detail="Player state not found")
 
@@ -5972,6 +3624,7 @@ def toggle_ready_state(
     link: str,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    _command: None = Depends(serialize_game_commands),
 ):
     game = db.query(Game).filter_by(link=link).first()
     if not game:
@@ -5980,11 +3633,11 @@ def toggle_ready_state(
     if game.gamemode not in ["Conquest", "Capture The Flag", "War"]:
         raise HTTPException(status_code=400, detail="This game mode does not support readiness toggling")
 
-    game_state = db.query(GameState).filter_by(game_id=game.id).first()
+    game_state = game_state_for(db, game.id)
     if game_state.status != GameStatus.preparation:
         raise HTTPException(status_code=400, detail="You may only toggle readiness during the preparation phase")
 
-    player_state = db.query(GamePlayer).filter_by(game_id=game.id, player_id=user.id).first()
+    player_state = player_state_for(db, game.id, user.id)
     if not player_state:
         raise HTTPException(status_code=404, detail="Player not found")
 
@@ -6016,7 +3669,7 @@ def get_game_units(
         for unit_id in removed_ids:
             redis_client.publish(f"game_updates:{game.link}", f"unit_removed:{unit_id}")
 
-    state = db.query(GameState).filter_by(game_id=game.id).first()
+    state = game_state_for(db, game.id)
     if state and state.status == GameStatus.in_progress:
         _, _, completed_now = reconcile_playable_players(game, state, db)
         if completed_now:
@@ -6052,7 +3705,7 @@ def get_game_units(
             unit.current_stats = compute_effective_stats(unit, db)
         else:
             # Check if all expected stat keys are present
-            unit_info = db.query(Unit).filter_by(id=unit.unit_id).first()
+            unit_info = db.get(Unit, unit.unit_id)
             if unit_info and isinstance(unit_info.base_stats, dict):
                 expected_keys = set(unit_info.base_stats.keys())
                 actual_keys = set(unit.current_stats.keys())
@@ -6071,21 +3724,22 @@ def place_unit(
     link: str,
     unit_data: GameUnitCreateRequest,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: User = Depends(get_current_user),
+    _command: None = Depends(serialize_game_commands),
 ):
     game = db.query(Game).filter_by(link=link).first()
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
 
-    player_state = db.query(GamePlayer).filter_by(game_id=game.id, player_id=user.id).first()
+    player_state = player_state_for(db, game.id, user.id)
     if not player_state:
         raise HTTPException(status_code=404, detail="Player state not found")
 
-    unit_info = db.query(Unit).filter_by(id=unit_data.unit_id).first()
+    unit_info = db.get(Unit, unit_data.unit_id)
     if not unit_info:
         raise HTTPException(status_code=404, detail="Unit not found")
 
-    map_obj = db.query(Map).filter_by(id=game.map_id).first()
+    map_obj = db.get(Map, game.map_id)
     special_tiles = map_obj.tile_data.get("special_tiles") if map_obj else None
     unit_types = {str(t).lower() for t in (unit_info.types or [])}
     if map_obj and not unit_can_occupy_tile(special_tiles, unit_data.x, unit_data.y, unit_types):
@@ -6094,7 +3748,7 @@ def place_unit(
     if unit_info.cost > player_state.cash_remaining:
         raise HTTPException(status_code=400, detail="Not enough cash")
 
-    state = db.query(GameState).filter_by(game_id=game.id).first()
+    state = game_state_for(db, game.id)
     war_summon = False
     map_state = None
     objective_cell = None
@@ -6102,7 +3756,7 @@ def place_unit(
         if not state:
             raise HTTPException(status_code=400, detail="Invalid game state")
 
-        map_state = db.query(GameMapState).filter_by(game_id=game.id).first()
+        map_state = map_state_for(db, game.id)
         if not map_state:
             raise HTTPException(status_code=500, detail="Map state missing")
 
@@ -6182,7 +3836,7 @@ def place_unit(
     equipped_move_ids = get_default_equipped_move_ids(unit_info, level)
     move_pp = []
     for move_id in equipped_move_ids:
-        move = db.query(Move).filter_by(id=move_id).first()
+        move = db.get(Move, move_id)
         if move and move.pp is not None:
             move_pp.append(move.pp)
         else:
@@ -6221,7 +3875,7 @@ def place_unit(
     # Recalculate current_stats to apply any initial stat boosts
     new_unit.current_stats = compute_effective_stats(new_unit, db)
     # Ensure current_stats has all expected keys
-    unit_info_for_stats = db.query(Unit).filter_by(id=new_unit.unit_id).first()
+    unit_info_for_stats = db.get(Unit, new_unit.unit_id)
     if unit_info_for_stats and isinstance(unit_info_for_stats.base_stats, dict):
         for stat_name in unit_info_for_stats.base_stats.keys():
             if stat_name.lower() != "range" and stat_name not in new_unit.current_stats:
@@ -6253,6 +3907,7 @@ def place_unit(
     db.refresh(new_unit)
 
     attach_game_unit_loadout_fields(new_unit, db)
+    publish_state_patch(game.link, units=[new_unit], players=[player_state])
     publish_player_state_updated(game.link)
     redis_client.publish(f"game_updates:{game.link}", f"unit_placed:{new_unit.id}")
     if war_summon:
@@ -6275,12 +3930,13 @@ def change_unit_item(
     payload: GameUnitChangeItemRequest,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    _command: None = Depends(serialize_game_commands),
 ):
     game = db.query(Game).filter_by(link=link).first()
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
 
-    state = db.query(GameState).filter_by(game_id=game.id).first()
+    state = game_state_for(db, game.id)
     if not state or state.status != GameStatus.preparation:
         raise HTTPException(status_code=400, detail="Items can only be changed during the preparation phase")
 
@@ -6293,7 +3949,7 @@ def change_unit_item(
     if not unit:
         raise HTTPException(status_code=404, detail="Unit not found")
 
-    player_state = db.query(GamePlayer).filter_by(game_id=game.id, player_id=user.id).first()
+    player_state = player_state_for(db, game.id, user.id)
     if not player_state:
         raise HTTPException(status_code=404, detail="Player state not found")
 
@@ -6323,6 +3979,7 @@ def change_unit_item(
     db.commit()
     db.refresh(unit)
     attach_game_unit_loadout_fields(unit, db)
+    publish_state_patch(game.link, units=[unit], players=[player_state])
     publish_player_state_updated(game.link)
     return GameUnitChangeItemResponse(unit=unit, cash_remaining=player_state.cash_remaining)
 
@@ -6332,12 +3989,13 @@ def remove_unit_item(
     unit_id: int,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    _command: None = Depends(serialize_game_commands),
 ):
     game = db.query(Game).filter_by(link=link).first()
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
 
-    state = db.query(GameState).filter_by(game_id=game.id).first()
+    state = game_state_for(db, game.id)
     if not state or state.status != GameStatus.preparation:
         raise HTTPException(status_code=400, detail="Items can only be changed during the preparation phase")
 
@@ -6350,7 +4008,7 @@ def remove_unit_item(
     if not unit:
         raise HTTPException(status_code=404, detail="Unit not found")
 
-    player_state = db.query(GamePlayer).filter_by(game_id=game.id, player_id=user.id).first()
+    player_state = player_state_for(db, game.id, user.id)
     if not player_state:
         raise HTTPException(status_code=404, detail="Player state not found")
 
@@ -6370,6 +4028,7 @@ def remove_unit_item(
     db.commit()
     db.refresh(unit)
     attach_game_unit_loadout_fields(unit, db)
+    publish_state_patch(game.link, units=[unit], players=[player_state])
     publish_player_state_updated(game.link)
     return GameUnitChangeItemResponse(unit=unit, cash_remaining=player_state.cash_remaining)
 
@@ -6380,12 +4039,13 @@ def change_unit_ability(
     payload: GameUnitChangeAbilityRequest,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    _command: None = Depends(serialize_game_commands),
 ):
     game = db.query(Game).filter_by(link=link).first()
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
 
-    state = db.query(GameState).filter_by(game_id=game.id).first()
+    state = game_state_for(db, game.id)
     if not state or state.status != GameStatus.preparation:
         raise HTTPException(status_code=400, detail="Abilities can only be changed during the preparation phase")
 
@@ -6398,7 +4058,7 @@ def change_unit_ability(
     if not unit or not unit.unit:
         raise HTTPException(status_code=404, detail="Unit not found")
 
-    player_state = db.query(GamePlayer).filter_by(game_id=game.id, player_id=user.id).first()
+    player_state = player_state_for(db, game.id, user.id)
     if not player_state:
         raise HTTPException(status_code=404, detail="Player state not found")
 
@@ -6423,6 +4083,7 @@ def change_unit_ability(
     db.commit()
     db.refresh(unit)
     attach_game_unit_loadout_fields(unit, db)
+    publish_state_patch(game.link, units=[unit], players=[player_state])
     publish_player_state_updated(game.link)
     return GameUnitChangeAbilityResponse(unit=unit, cash_remaining=player_state.cash_remaining)
 
@@ -6431,7 +4092,8 @@ def remove_unit(
     link: str,
     unit_id: int,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: User = Depends(get_current_user),
+    _command: None = Depends(serialize_game_commands),
 ):
     game = db.query(Game).filter_by(link=link).first()
     if not game:
@@ -6441,11 +4103,11 @@ def remove_unit(
     if not unit:
         raise HTTPException(status_code=404, detail="Unit not found")
 
-    unit_info = db.query(Unit).filter_by(id=unit.unit_id).first()
+    unit_info = db.get(Unit, unit.unit_id)
     if not unit_info:
         raise HTTPException(status_code=404, detail="Unit metadata not found")
 
-    player_state = db.query(GamePlayer).filter_by(game_id=game.id, player_id=user.id).first()
+    player_state = player_state_for(db, game.id, user.id)
     if not player_state:
         raise HTTPException(status_code=404, detail="Player state not found")
 
@@ -6461,6 +4123,7 @@ def remove_unit(
     db.add(player_state)
 
     db.delete(unit)
+    stage_state_patch(db, game.id, removed_unit_ids=[unit_id], players=[player_state])
     db.commit()
     publish_player_state_updated(game.link)
     return {"detail": "Unit removed and cash refunded"}
@@ -6475,7 +4138,7 @@ def get_turnlock(
     game = db.query(Game).filter(Game.link == link).first()
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
-    state = db.query(GameState).filter_by(game_id=game.id).first()
+    state = game_state_for(db, game.id)
     if not state:
         return {}
 
@@ -6493,17 +4156,96 @@ def get_turnlock(
     raw = redis_client.hgetall(key)
     return {int(k): json.loads(v) for k, v in raw.items()}
 
+@router.get("/{link}/forecast", response_model=GameForecast)
+def get_forecast(
+    link: str,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Damage range, hit chance and KO chance of every attack the current player can make."""
+    game = db.query(Game).filter(Game.link == link).first()
+    if not game:
+        raise HTTPException(status_code=404, detail="Game not found")
+    state = game_state_for(db, game.id)
+    if not state or state.status != GameStatus.in_progress:
+        raise HTTPException(status_code=400, detail="Game not in progress")
+
+    playable_players, _, completed_now = reconcile_playable_players(game, state, db)
+    if completed_now:
+        db.commit()
+        redis_client.publish(f"game_updates:{game.link}", "game_completed")
+        raise HTTPException(status_code=400, detail="Game completed")
+    if not playable_players or state.current_turn is None:
+        raise HTTPException(status_code=400, detail="Invalid game state")
+
+    current_player_id = playable_players[state.current_turn % len(playable_players)]
+    if current_player_id != user.id:
+        raise HTTPException(status_code=403, detail="Not your turn")
+    return compute_forecast(game, state, current_player_id, db)
+
+@router.get("/{link}/threats", response_model=GameThreatMap)
+def get_threats(
+    link: str,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Tiles the caller's enemies could strike on their next turn, per unit and combined."""
+    game = db.query(Game).filter(Game.link == link).first()
+    if not game:
+        raise HTTPException(status_code=404, detail="Game not found")
+    if player_state_for(db, game.id, user.id) is None:
+        raise HTTPException(status_code=403, detail="Not a participant in this game")
+    state = game_state_for(db, game.id)
+    if not state or state.status != GameStatus.in_progress:
+        raise HTTPException(status_code=400, detail="Game not in progress")
+    return read_threat_map(game, state, user.id, db)
+
+@router.get("/{link}/patches")
+def get_state_patches(
+    link: str,
+    since: int | None = Query(default=None, ge=0),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """State patches after ``since``; with ``complete`` false the client must refetch the game."""
+    game = db.query(Game).filter(Game.link == link).first()
+    if not game:
+        raise HTTPException(status_code=404, detail="Game not found")
+    if player_state_for(db, game.id, user.id) is None:
+        raise HTTPException(status_code=403, detail="Not a participant in this game")
+    try:
+        return read_patches(redis_client, game.link, since)
+    except Exception:
+        raise HTTPException(status_code=503, detail="State stream unavailable")
+
+
+@router.get("/{link}/events", response_model=GameEventPage)
+def get_game_events(
+    link: str,
+    after: int = Query(default=0, ge=0),
+    limit: int = Query(default=EVENT_PAGE_SIZE, ge=1, le=MAX_EVENT_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    """Full event history in ``seq`` order, for replays; ``replay_log`` only carries the tail."""
+    game = db.query(Game).filter(Game.link == link).first()
+    if not game:
+        raise HTTPException(status_code=404, detail="Game not found")
+    events = read_events(db, game.id, after, limit)
+    return GameEventPage(events=events, last_seq=events[-1].seq if events else after)
+
+
 @router.post("/{link}/end_turn")
 def end_turn(
     link: str,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    _command: None = Depends(serialize_game_commands),
 ):
     game = db.query(Game).filter(Game.link == link).first()
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
 
-    state = db.query(GameState).filter_by(game_id=game.id).first()
+    state = game_state_for(db, game.id)
     if not state or state.status != GameStatus.in_progress:
         raise HTTPException(status_code=400, detail="Game not in progress")
     playable_players, _, completed_now = reconcile_playable_players(game, state, db)
@@ -6519,18 +4261,13 @@ def end_turn(
     if current_player_id != user.id:
         raise HTTPException(status_code=403, detail="Not your turn")
 
-    units_to_sync = db.query(GameUnit).filter(GameUnit.game_id == game.id).all()
+    units_to_sync = game_units_for(db, game.id)
     for unit in units_to_sync:
         unit.starting_x = unit.current_x
         unit.starting_y = unit.current_y
 
     # Resolve end-of-turn status damage for the current player before advancing.
-    end_turn_modified_unit_ids = set(apply_end_of_turn_status_damage(current_player_id, game.id, db))
-    should_apply_round_weather = ((state.current_turn + 1) % len(state.players)) == 0
-    if should_apply_round_weather:
-        end_turn_modified_unit_ids.update(apply_end_of_round_weather_damage(game.id, db))
-        end_turn_modified_unit_ids.update(apply_end_of_round_entry_hazard_effects(game.id, state.current_turn, db))
-        decrement_and_expire_hazards(game.id, db)
+    end_turn_modified_unit_ids = apply_end_of_turn_effects(game, state, current_player_id, db)
 
     removed_ids = remove_fainted_units_from_play(game.id, db)
 
@@ -6560,6 +4297,7 @@ def end_turn(
     )
     removed_ids.extend(remove_fainted_units_from_play(game.id, db))
 
+    stage_state_patch(db, game.id, unit_ids=modified_unit_ids)
     for unit_id in modified_unit_ids:
         redis_client.publish(f"game_updates:{game.link}", f"unit_stats_updated:{unit_id}")
 
@@ -6586,8 +4324,10 @@ def end_turn(
 
     now = datetime.now(timezone.utc)
     state.turn_deadline = now + timedelta(seconds=game.turn_seconds)
+    schedule_turn_deadline(game, state)
 
     compute_turn_locks(game, state, db)
+    compute_threat_map(game, state, db)
     publish_turn_start_logs(game, state, db)
     db.commit()
     redis_client.publish(f"game_updates:{game.link}", "turn_advanced")
@@ -6600,7 +4340,15 @@ def execute_move(
     payload: dict,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    _command: None = Depends(serialize_game_commands),
 ):
+    try:
+        return resolve_move_request(link, payload, db, user)
+    finally:
+        clear_game_context(db)
+
+
+def resolve_move_request(link: str, payload: dict, db: Session, user: User):
     try:
         unit_id = int(payload.get("unit_id"))
         move_id = int(payload.get("move_id"))
@@ -6625,7 +4373,7 @@ def execute_move(
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
 
-    state = db.query(GameState).filter_by(game_id=game.id).first()
+    state = game_state_for(db, game.id)
     if not state or state.status != GameStatus.in_progress:
         raise HTTPException(status_code=400, detail="Game not in progress")
     playable_players, _, completed_now = reconcile_playable_players(game, state, db)
@@ -6641,7 +4389,12 @@ def execute_move(
     if current_player_id != user.id:
         raise HTTPException(status_code=403, detail="Not your turn")
 
-    gu = db.query(GameUnit).filter(GameUnit.id == unit_id, GameUnit.game_id == game.id).first()
+    # Everything below reads the game through this snapshot instead of re-querying it.
+    context = load_game_context(db, game, state)
+    if context.map_state is not None:
+        # Move effects edit weather, terrain, hazard and field cells in place.
+        stage_state_patch(db, game.id, map_state=context.map_state)
+    gu = context.unit(unit_id)
     if not gu:
         raise HTTPException(status_code=404, detail="Unit not found")
     if gu.user_id != user.id:
@@ -6658,7 +4411,7 @@ def execute_move(
             except Exception:
                 required_move_id = None
             if required_move_id and required_move_id != move_id:
-                mv = db.query(Move).filter(Move.id == required_move_id).first()
+                mv = move_record(db, required_move_id)
                 mv_name = mv.name if mv else "the encored move"
                 raise HTTPException(status_code=400, detail=f"Encore prevents that move; must use {mv_name}")
     except HTTPException:
@@ -6667,7 +4420,7 @@ def execute_move(
         pass
 
     # Load move early so we can enforce torment (requires move.name)
-    move = db.query(Move).filter(Move.id == move_id).first()
+    move = move_record(db, move_id)
     if not move:
         raise HTTPException(status_code=404, detail="Move not found")
 
@@ -6680,11 +4433,11 @@ def execute_move(
                 raise HTTPException(status_code=400, detail="Taunted and cannot use status moves")
 
         if gu_state_tmp and gu_state_tmp[0] == "torment" and int(gu_state_tmp[1]) > 0:
-            # Find the last move used by this unit from the replay_log
+            # Find the last move used by this unit from the event log
             last_move_name = None
-            if state and isinstance(state.replay_log, list):
+            if state:
                 prefix = f"{get_unit_display_name(gu, db)} used "
-                for entry in reversed(state.replay_log or []):
+                for entry in reversed(event_tail(db, state.game_id)):
                     if not isinstance(entry, dict):
                         continue
                     if entry.get("event") != "system_log":
@@ -6703,8 +4456,8 @@ def execute_move(
 
     publish_system_log_event(game.link, f"{get_unit_display_name(gu, db)} used {move.name}", state, db)
 
-    map_obj = db.query(Map).filter_by(id=game.map_id).first()
-    map_state = db.query(GameMapState).filter(GameMapState.game_id == game.id).first()
+    map_obj = context.map
+    map_state = context.map_state
     terrain_tiles = map_state.terrain_effect_tiles if map_state and isinstance(map_state.terrain_effect_tiles, list) else None
     field_effect_tiles = map_state.field_effect_tiles if map_state and isinstance(map_state.field_effect_tiles, list) else None
     weather_tiles = map_state.weather_tiles if map_state and isinstance(map_state.weather_tiles, list) else None
@@ -6740,18 +4493,17 @@ def execute_move(
             raise HTTPException(status_code=400, detail="This cannot work.")
         occupied_tiles = {
             (int(unit.current_x), int(unit.current_y))
-            for unit in db.query(GameUnit).filter(
-                GameUnit.game_id == game.id,
-                GameUnit.id != gu.id,
-                GameUnit.current_hp > 0,
-            ).all()
-            if int(unit.current_x) >= 0 and int(unit.current_y) >= 0
+            for unit in context.units
+            if unit.id != gu.id
+            and (unit.current_hp or 0) > 0
+            and int(unit.current_x) >= 0
+            and int(unit.current_y) >= 0
         }
         if (lx, ly) in occupied_tiles:
             raise HTTPException(status_code=400, detail="This cannot work.")
 
     # Check and decrement PP
-    unit_info = db.query(Unit).filter_by(id=gu.unit_id).first()
+    unit_info = gu.unit
     if not unit_info:
         raise HTTPException(status_code=400, detail="Unit has no moves")
     equipped_move_ids = get_unit_equipped_move_ids(gu, unit_info)
@@ -6783,25 +4535,14 @@ def execute_move(
 
     targets: List[GameUnit] = []
     if target_ids:
-        targets = (
-            db.query(GameUnit)
-            .filter(GameUnit.game_id == game.id, GameUnit.id.in_(target_ids))
-            .all()
-        )
+        requested_ids = {unit.id for unit in map(context.unit, target_ids) if unit is not None}
+        targets = [unit for unit in context.units if unit.id in requested_ids]
 
     move_targeting = (move.targeting or "").lower()
     if effect_tiles and move_targeting == "ally":
         tile_set = set(effect_tiles)
         known_target_ids = {target.id for target in targets}
-        try:
-            ally_units = (
-                db.query(GameUnit)
-                .filter(GameUnit.game_id == game.id, GameUnit.user_id == gu.user_id)
-                .all()
-            )
-        except Exception:
-            ally_units = []
-        for ally in ally_units:
+        for ally in context.units_for_player(gu.user_id):
             if ally.id in known_target_ids:
                 continue
             if move_has_revive_effect(move):
@@ -6826,7 +4567,7 @@ def execute_move(
             )
         if tile_set:
             known_target_ids = {target.id for target in targets}
-            all_units = db.query(GameUnit).filter(GameUnit.game_id == game.id).all()
+            all_units = context.units
             targets = []
             for unit in all_units:
                 if (unit.current_hp or 0) <= 0:
@@ -6844,14 +4585,7 @@ def execute_move(
         flags = get_unit_flags(gu)
         last_attacker_id = flags.get("last_damage_attacker_id")
         if last_attacker_id is not None:
-            try:
-                last_attacker = (
-                    db.query(GameUnit)
-                    .filter(GameUnit.game_id == game.id, GameUnit.id == int(last_attacker_id))
-                    .first()
-                )
-            except (TypeError, ValueError):
-                last_attacker = None
+            last_attacker = context.unit(last_attacker_id)
             if last_attacker is not None and int(last_attacker.current_hp or 0) > 0:
                 targets = [last_attacker]
 
@@ -6871,73 +4605,14 @@ def execute_move(
 
     has_target_fixed_damage = move_has_target_fixed_damage_effect(move)
 
-    # Build a mapping of player sides to any active screen states (reflect/light_screen)
-    side_screen_states: dict[int, set[str]] = {}
-    try:
-        all_units = db.query(GameUnit).filter(GameUnit.game_id == game.id).all()
-    except Exception:
-        all_units = []
-    for u in all_units:
-        s = normalize_states(u.states)
-        if s and isinstance(u.user_id, int):
-            if int(s[1]) > 0:
-                side_screen_states.setdefault(u.user_id, set()).add(s[0])
-
     landed_targets = targets
     missed_target_ids: List[int] = []
-    if not is_field_targeting and targets and move.accuracy is not None and not has_target_fixed_damage:
-        landed_targets = []
-        for target in targets:
-            try:
-                t_state = normalize_states(target.states)
-            except Exception:
-                t_state = []
-
-            tele_active = bool(t_state and t_state[0] == "telekinesis" and int(t_state[1]) > 0)
-
-            # Telekinesis: Ground-type moves cannot hit the affected unit
-            if tele_active and str((move.type or "")).lower() == "ground":
-                missed_target_ids.append(target.id)
-                continue
-
-            # Telekinesis forces non-OHKO moves to hit
-            if tele_active and not move_is_instant_ko(move):
-                landed_targets.append(target)
-                continue
-
-            if move_lands_on_target(
-                move,
-                gu,
-                target,
-                special_tiles=special_tiles,
-                weather_tiles=weather_tiles,
-                attacker_types=attacker_types,
-                target_types=get_unit_types(target, db),
-                target_ability_names=get_unit_ability_names(target, db),
-            ):
-                landed_targets.append(target)
-            else:
-                missed_target_ids.append(target.id)
-
-    if missed_target_ids:
-        missed_targets = [target for target in targets if target.id in missed_target_ids]
-        for missed_target in missed_targets:
-            publish_system_log_event(
-                game.link,
-                f"{get_unit_display_name(missed_target, db)} dodged the attack",
-                state,
-                db,
-            )
-
-    targets_multiplier = 0.75 if len(landed_targets) >= 2 else 1
-    hit_count = get_move_hit_count(move, landed_target_count=max(1, len(landed_targets)))
-    scaling_hit_powers = get_scaling_hit_powers(move)
-    separate_hit_accuracy = move_uses_separate_hit_accuracy(move)
     damage_results = []
     removed_ids: List[int] = []
     faint_logged_ids: set[int] = set()
 
     if landed_targets and has_target_fixed_damage:
+        hit_count = get_move_hit_count(move, landed_target_count=max(1, len(landed_targets)))
         damage_results = apply_fixed_damage_move_effects(move, gu, landed_targets, db, hit_count=hit_count)
         for result in damage_results:
             dealt_damage = int(result.get("damage", 0) or 0)
@@ -6947,11 +4622,7 @@ def execute_move(
             if int(result.get("current_hp", 0) or 0) <= 0:
                 # Target fainted; check for Destiny Bond on the fainted unit
                 removed_ids.append(result["id"])
-                try:
-                    # find the unit object for the fainted unit in the DB to read states
-                    fainted_unit = db.query(GameUnit).filter(GameUnit.game_id == game.id, GameUnit.id == int(result.get("id", -1))).first()
-                except Exception:
-                    fainted_unit = target_unit
+                fainted_unit = context.unit(result.get("id", -1))
                 if fainted_unit:
                     s = normalize_states(fainted_unit.states)
                     if s and s[0] == "destiny_bond" and int(s[1]) > 0:
@@ -6965,210 +4636,62 @@ def execute_move(
                 if target_unit is not None and target_unit.id not in faint_logged_ids:
                     publish_system_log_event(game.link, f"{get_unit_display_name(target_unit, db)} fainted!", state, db)
                     faint_logged_ids.add(target_unit.id)
-    elif landed_targets and move_deals_direct_damage(move):
-        can_critical_hit = move_can_critical_hit(move)
-        guaranteed_crit = move_has_effect_token(move, "guaranteed_crit")
-        effective_move_type = resolve_move_type_for_execution(move, gu, terrain_tiles, db)
-        category = (move.category or "").lower()
-        is_special = category == "special"
-        attack_stat = "sp_attack" if is_special else "attack"
-        defense_stat = "sp_defense" if is_special else "defense"
-        move_crit_stage_bonus = 1 if move_has_high_crit_ratio(move) else 0
-        base_power = (move.power or 0) + resolve_power_add(move, gu)
-        attacker_types = gu.unit.types or []
-        stab = 1.5 if effective_move_type in attacker_types else 1
-        attacker_weather_id = get_unit_weather_id(gu, weather_tiles)
-        weather_move_multiplier = resolve_weather_move_multiplier_for_move(move, effective_move_type, attacker_weather_id)
-        ignore_target_stats = move_ignores_target_stat_changes(move)
-        ignore_fairy = move_ignores_fairy_immunity(move)
-
-        for target in landed_targets:
-            total_damage = 0
-            critical_hit_landed = False
-            target_is_special = is_special
-            target_makes_contact = bool(move.makes_contact)
-            if move_uses_best_offense(move):
-                target_is_special, target_makes_contact = resolve_shell_side_arm_mode(
-                    move,
-                    gu,
-                    target,
-                    terrain_tiles=terrain_tiles,
-                    weather_tiles=weather_tiles,
-                    special_tiles=special_tiles,
-                    db=db,
-                    targets_multiplier=targets_multiplier,
-                )
-                attack_stat = "sp_attack" if target_is_special else "attack"
-                defense_stat = "sp_defense" if target_is_special else "defense"
+    elif targets and (move.accuracy is not None or move_deals_direct_damage(move)):
+        # Accuracy, hits, critical hits, damage and Destiny Bond run in the engine.
+        loaded = LoadedBattle(db, game, state, units=[gu, *targets])
+        rows = {target.id: target for target in targets}
 
-            power_multiplier = resolve_power_multiplier(
+        def power_multiplier(target: EngineUnit) -> float:
+            return resolve_power_multiplier(
                 move,
                 gu,
-                target,
+                rows[target.id],
                 terrain_tiles,
                 field_effect_tiles,
                 db,
                 weather_tiles=weather_tiles,
             )
-            hit_powers = scaling_hit_powers or [base_power]
-            hits_to_apply = len(hit_powers) if scaling_hit_powers else max(1, int(hit_count or 1))
-            # Check if attacker has Laser Focus active; it should make the first hit a guaranteed critical
-            try:
-                attacker_state = normalize_states(gu.states)
-            except Exception:
-                attacker_state = []
-            laser_focus_active = bool(attacker_state and attacker_state[0] == "laser_focus" and int(attacker_state[1]) > 0)
-            first_hit = True
-            for hit_index in range(hits_to_apply):
-                if (target.current_hp or 0) <= 0:
-                    break
-
-                if separate_hit_accuracy and move.accuracy is not None:
-                    if not move_lands_on_target(
-                        move,
-                        gu,
-                        target,
-                        special_tiles=special_tiles,
-                        weather_tiles=weather_tiles,
-                        attacker_types=attacker_types,
-                        target_types=get_unit_types(target, db),
-                        target_ability_names=get_unit_ability_names(target, db),
-                    ):
-                        break
-
-                power = int((hit_powers[hit_index] if hit_index < len(hit_powers) else base_power) * power_multiplier)
-                power = max(1, power)
-                attack = (gu.current_stats or {}).get(attack_stat, 0) or 0
-                if ignore_target_stats:
-                    defense = get_unboosted_battle_stat(target, defense_stat, db)
-                else:
-                    defense = (target.current_stats or {}).get(defense_stat, 1) or 1
-                for effect in move.effects or []:
-                    parts = str(effect or "").strip().lower().split(":")
-                    if len(parts) < 3 or parts[1] != "use_stat":
-                        continue
-                    stat = parts[2]
-                    if parts[0] == "self":
-                        attack = (gu.current_stats or {}).get(stat, attack) or attack
-                    elif parts[0] == "target":
-                        if stat in ("attack", "sp_attack"):
-                            attack = (target.current_stats or {}).get(stat, attack) or attack
-                        elif stat in ("defense", "sp_defense"):
-                            defense = (target.current_stats or {}).get(stat, defense) or defense
-                # Power Trick: swap attack/defense usage for attacker/defender when active
-                try:
-                    gu_state_tmp = normalize_states(gu.states)
-                except Exception:
-                    gu_state_tmp = []
-                try:
-                    target_state_tmp = normalize_states(target.states)
-                except Exception:
-                    target_state_tmp = []
-
-                # If attacker has power_trick, use its defense stat as its attack value
-                if gu_state_tmp and gu_state_tmp[0] == "power_trick" and int(gu_state_tmp[1]) > 0:
-                    attack = (gu.current_stats or {}).get(defense_stat, attack)
-
-                # If defender has power_trick, use its attack stat as its defense value
-                if target_state_tmp and target_state_tmp[0] == "power_trick" and int(target_state_tmp[1]) > 0:
-                    defense = (target.current_stats or {}).get(attack_stat, defense)
-                target_weather_id = get_unit_weather_id(target, weather_tiles)
-                weather_defense_multiplier = get_weather_defense_multiplier(target, defense_stat, target_weather_id, db)
-                grass_defense_multiplier = get_tile_defense_multiplier(
-                    special_tiles,
-                    int(target.current_x),
-                    int(target.current_y),
-                    get_unit_types(target, db),
-                    get_unit_ability_names(target, db),
-                )
-                effective_defense = defense * weather_defense_multiplier * grass_defense_multiplier
-                safe_defense = effective_defense if effective_defense > 0 else 1
-                random_factor = random.randint(85, 100) / 100
-                # Apply Laser Focus: force first hit to be a critical and consume the state
-                if laser_focus_active and first_hit:
-                    critical = 1.5
-                    critical_hit_landed = True
-                    # consume laser_focus so subsequent hits are not critical
-                    try:
-                        gu.states = []
-                        db.add(gu)
-                    except Exception:
-                        pass
-                    laser_focus_active = False
-                elif guaranteed_crit:
-                    critical = 1.5
-                    critical_hit_landed = True
-                else:
-                    critical = 1.5 if can_critical_hit and attempt_critical_hit(gu, move_crit_stage_bonus) else 1
-                    if critical > 1:
-                        critical_hit_landed = True
-                # Pass the target unit so state effects like Foresight/Mind Reader
-                # can bypass type immunities when appropriate.
-                type_multiplier = get_type_multiplier(
-                    effective_move_type,
-                    (getattr(target.unit, "types", None) or [], target, db),
-                    ignore_fairy_immunity=ignore_fairy,
-                )
-                # Tar Shot: doubles effectiveness of Fire-type moves against affected target
-                try:
-                    target_state_tmp = normalize_states(target.states)
-                except Exception:
-                    target_state_tmp = []
-                if target_state_tmp and target_state_tmp[0] == "tar_shot" and int(target_state_tmp[1]) > 0 and str((move.type or "")).lower() == "fire":
-                    type_multiplier = type_multiplier * 2
-                base = (((2 * gu.level) / 5 + 2) * power * (attack / safe_defense)) / 50 + 2
-                damage = int(base * targets_multiplier * random_factor * stab * critical * type_multiplier * weather_move_multiplier)
-                if unit_has_glaive_rush(target):
-                    damage *= 2
-                # Apply side-wide screen reductions: Reflect halves physical damage,
-                # Light Screen halves special damage for affected player's side.
-                try:
-                    states_on_side = side_screen_states.get(target.user_id, set())
-                except Exception:
-                    states_on_side = set()
 
-                # Aurora Veil provides both effects; check it first
-                if "aurora_veil" in states_on_side:
-                    damage = max(0, int(damage // 2))
-                else:
-                    if "reflect" in states_on_side and not target_is_special:
-                        damage = max(0, int(damage // 2))
-                    if "light_screen" in states_on_side and target_is_special:
-                        damage = max(0, int(damage // 2))
+        def special_against(target: EngineUnit, targets_multiplier: float) -> bool:
+            is_special, _ = resolve_shell_side_arm_mode(
+                move,
+                gu,
+                rows[target.id],
+                terrain_tiles=terrain_tiles,
+                weather_tiles=weather_tiles,
+                special_tiles=special_tiles,
+                db=db,
+                targets_multiplier=targets_multiplier,
+            )
+            return is_special
+
+        outcome = resolve_attack(
+            loaded.battle,
+            loaded.unit_for(gu),
+            move,
+            [loaded.unit_for(target) for target in targets],
+            move_type=resolve_move_type_for_execution(move, gu, terrain_tiles, db),
+            power_bonus=resolve_power_add(move, gu),
+            power_multiplier=power_multiplier,
+            special_against=special_against if move_uses_best_offense(move) else None,
+        )
+        loaded.apply()
+        missed_target_ids = outcome.missed_target_ids
+        landed_targets = [target for target in targets if target.id not in missed_target_ids]
 
-                target.current_hp = max(0, (target.current_hp or 0) - damage)
-                total_damage += damage
+        for result in outcome.targets:
+            target = rows[result.target_id]
+            for damage in result.hit_damages:
                 record_last_damage_received(target, gu, damage, db)
-                first_hit = False
-
             if move_has_effect_token(move, "destroy_terrain:target") and map_state is not None:
                 clear_terrain_at_position(map_state, int(target.current_x), int(target.current_y), db)
-
-            db.add(target)
-            if target.current_hp <= 0:
-                # Check if the fainted target had Destiny Bond active
-                s = normalize_states(target.states)
-                if s and s[0] == "destiny_bond" and int(s[1]) > 0:
-                    # Knock out the attacker (gu) if still alive
-                    if (gu.current_hp or 0) > 0:
-                        gu.current_hp = 0
-                        db.add(gu)
-                        removed_ids.append(gu.id)
-                        if game:
-                            publish_system_log_event(game.link, f"{get_unit_display_name(gu, db)} was taken down by Destiny Bond!", state, db)
+            if result.fainted:
                 removed_ids.append(target.id)
-            damage_results.append({"id": target.id, "damage": total_damage, "current_hp": target.current_hp})
-            if total_damage > 0:
-                damage_suffix = " (Critical Hit!)" if critical_hit_landed else ""
-                publish_system_log_event(
-                    game.link,
-                    f"{get_unit_display_name(target, db)} took {total_damage} damage{damage_suffix}",
-                    state,
-                    db,
-                )
-                if target.current_hp <= 0 and target.id not in faint_logged_ids:
-                    publish_system_log_event(game.link, f"{get_unit_display_name(target, db)} fainted!", state, db)
+                if result.damage > 0:
                     faint_logged_ids.add(target.id)
+            damage_results.append({"id": target.id, "damage": result.damage, "current_hp": target.current_hp})
+        if (gu.current_hp or 0) <= 0:
+            removed_ids.append(gu.id)
 
     # Process move effects (stat changes, status conditions, etc.)
     # Use targets list for target effects, even if empty
@@ -7210,15 +4733,14 @@ def execute_move(
     # Broadcast stat updates for units that may have been affected
     # This includes the attacker (self-buffs) and all targets (debuffs/buffs)
     affected_unit_ids = [gu.id] + [t.id for t in targets]
+    stage_state_patch(db, game.id, units=[gu, *targets])
     for unit_id in affected_unit_ids:
         redis_client.publish(f"game_updates:{game.link}", f"unit_stats_updated:{unit_id}")
 
+    fainted_positions: dict[int, tuple[int, int]] = {}
     if removed_ids:
-        removed_units = (
-            db.query(GameUnit)
-            .filter(GameUnit.game_id == game.id, GameUnit.id.in_(removed_ids))
-            .all()
-        )
+        removed_id_set = set(removed_ids)
+        removed_units = [unit for unit in context.units if unit.id in removed_id_set]
 
         removed_ids = [unit.id for unit in removed_units]
         for unit in removed_units:
@@ -7229,11 +4751,12 @@ def execute_move(
             if unit.id not in faint_logged_ids:
                 publish_system_log_event(game.link, f"{get_unit_display_name(unit, db)} fainted!", state, db)
 
-            player_state = db.query(GamePlayer).filter_by(game_id=game.id, player_id=unit.user_id).first()
+            player_state = player_state_for(db, game.id, unit.user_id)
             if player_state and unit.id in player_state.game_units:
                 player_state.game_units.remove(unit.id)
                 db.add(player_state)
 
+            fainted_positions[unit.id] = get_unit_position(unit)
             faint_unit_in_place(unit, db)
 
         active_counts = get_remaining_unit_counts(game.id, db)
@@ -7282,40 +4805,34 @@ def execute_move(
             effect_tiles,
             range_kind,
         )
+    threat_changes = dict(fainted_positions)
     if not attacker_removed and displacement_landing is not None:
         gu.current_x, gu.current_y = displacement_landing
         db.add(gu)
+        threat_changes[gu.id] = (attacker_from_x, attacker_from_y)
+    update_threat_map(game, db, threat_changes)
 
     if not attacker_removed:
         gu.can_move = False
         db.flush()
-    remaining_units = db.query(GameUnit).filter(
-        GameUnit.game_id == game.id,
-        GameUnit.user_id == current_player_id,
-        GameUnit.can_move == True
-    ).count()
+    remaining_units = sum(1 for unit in context.units_for_player(current_player_id) if unit.can_move)
 
     end_turn_removed_ids: List[int] = []
 
     if remaining_units == 0 and not is_war_game(game):
-        units_to_sync = db.query(GameUnit).filter(GameUnit.game_id == game.id).all()
+        units_to_sync = game_units_for(db, game.id)
         for unit in units_to_sync:
             unit.starting_x = unit.current_x
             unit.starting_y = unit.current_y
 
         # Resolve end-of-turn status damage for the current player before advancing.
-        end_turn_modified_unit_ids = set(apply_end_of_turn_status_damage(current_player_id, game.id, db))
-        should_apply_round_weather = ((state.current_turn + 1) % len(state.players)) == 0
-        if should_apply_round_weather:
-            end_turn_modified_unit_ids.update(apply_end_of_round_weather_damage(game.id, db))
-            end_turn_modified_unit_ids.update(apply_end_of_round_entry_hazard_effects(game.id, state.current_turn, db))
-            decrement_and_expire_hazards(game.id, db)
+        end_turn_modified_unit_ids = apply_end_of_turn_effects(game, state, current_player_id, db)
 
         end_turn_removed_ids = remove_fainted_units_from_play(game.id, db)
         if end_turn_removed_ids:
             removed_ids = list(set(removed_ids + end_turn_removed_ids))
 
-        remaining_units_after_end_turn_damage = db.query(GameUnit).filter(GameUnit.game_id == game.id).all()
+        remaining_units_after_end_turn_damage = game_units_for(db, game.id)
         remaining_players_after_end_turn_damage = {unit.user_id for unit in remaining_units_after_end_turn_damage}
         if len(remaining_players_after_end_turn_damage) == 1:
             state.status = GameStatus.completed
@@ -7336,11 +4853,7 @@ def execute_move(
                 "removed_ids": removed_ids,
             }
 
-        current_player_units = db.query(GameUnit).filter(
-            GameUnit.game_id == game.id,
-            GameUnit.user_id == current_player_id
-        ).all()
-        for unit in current_player_units:
+        for unit in context.units_for_player(current_player_id):
             unit.can_move = True
 
         playable_players, _, completed_now = set_next_playable_turn_after_current(game, state, current_player_id, db)
@@ -7369,6 +4882,7 @@ def execute_move(
         removed_ids.extend(remove_fainted_units_from_play(game.id, db))
         
         # Broadcast stat updates for units that had boosts expire
+        stage_state_patch(db, game.id, unit_ids=modified_unit_ids)
         for unit_id in modified_unit_ids:
             redis_client.publish(f"game_updates:{game.link}", f"unit_stats_updated:{unit_id}")
 
@@ -7379,7 +4893,9 @@ def execute_move(
         else:
             now = datetime.now(timezone.utc)
             state.turn_deadline = now + timedelta(seconds=game.turn_seconds)
+            schedule_turn_deadline(game, state)
             compute_turn_locks(game, state, db)
+            compute_threat_map(game, state, db)
             publish_turn_start_logs(game, state, db)
             db.commit()
             redis_client.publish(f"game_updates:{game.link}", "turn_advanced")
@@ -7415,6 +4931,7 @@ def capture_objective(
     payload: dict,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    _command: None = Depends(serialize_game_commands),
 ):
     try:
         unit_id = int(payload.get("unit_id"))
@@ -7427,7 +4944,7 @@ def capture_objective(
     if not is_war_game(game):
         raise HTTPException(status_code=400, detail="Capture is only available in War mode")
 
-    state = db.query(GameState).filter_by(game_id=game.id).first()
+    state = game_state_for(db, game.id)
     if not state or state.status != GameStatus.in_progress:
         raise HTTPException(status_code=400, detail="Game not in progress")
 
@@ -7452,7 +4969,7 @@ def capture_objective(
     if not gu.can_move:
         raise HTTPException(status_code=400, detail="Unit is locked")
 
-    map_state = db.query(GameMapState).filter_by(game_id=game.id).first()
+    map_state = map_state_for(db, game.id)
     if not map_state:
         raise HTTPException(status_code=500, detail="Map state missing")
 
@@ -7482,6 +4999,7 @@ def capture_objective(
 
     objective_x = int(gu.current_x)
     objective_y = int(gu.current_y)
+    stage_state_patch(db, game.id, units=[gu], tiles=[(objective_x, objective_y, objective_cell)])
     objective_kind_label = format_objective_kind_label(objective_cell.get("kind"))
     unit_label = get_unit_display_name(gu, db)
     if captured:
@@ -7541,6 +5059,7 @@ def wait_unit(
     payload: dict,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    _command: None = Depends(serialize_game_commands),
 ):
     try:
         unit_id = int(payload.get("unit_id"))
@@ -7551,7 +5070,7 @@ def wait_unit(
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
 
-    state = db.query(GameState).filter_by(game_id=game.id).first()
+    state = game_state_for(db, game.id)
     if not state or state.status != GameStatus.in_progress:
         raise HTTPException(status_code=400, detail="Game not in progress")
 
@@ -7578,6 +5097,7 @@ def wait_unit(
 
     gu.can_move = False
     db.flush()
+    stage_state_patch(db, game.id, units=[gu])
 
     removed_ids, turn_advanced, game_completed = advance_turn_if_player_has_no_actions(
         game, state, current_player_id, db
@@ -7604,6 +5124,7 @@ def pick_up_map_item(
     payload: dict,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    _command: None = Depends(serialize_game_commands),
 ):
     try:
         unit_id = int(payload.get("unit_id"))
@@ -7614,7 +5135,7 @@ def pick_up_map_item(
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
 
-    state = db.query(GameState).filter_by(game_id=game.id).first()
+    state = game_state_for(db, game.id)
     if not state or state.status != GameStatus.in_progress:
         raise HTTPException(status_code=400, detail="Game not in progress")
 
@@ -7666,19 +5187,21 @@ def pick_up_map_item(
             raise HTTPException(status_code=400, detail="Held item is invalid")
         dropped_item_id = old_item.id
 
+    stage_state_patch(db, game.id, map_state=map_state)
     new_tiles = [list(r) if isinstance(r, list) else [] for r in tiles]
     new_tiles[y][x] = dropped_item_id
     map_state.item_id_tiles = new_tiles
     db.add(map_state)
 
     set_unit_held_item(gu, item.slug, db)
-    unit_info = db.query(Unit).filter_by(id=gu.unit_id).first()
+    unit_info = db.get(Unit, gu.unit_id)
     if unit_info:
         sync_tm_move_pp(gu, unit_info, db)
 
     clear_movement_locked(game.link, gu.id)
     gu.can_move = False
     db.flush()
+    stage_state_patch(db, game.id, units=[gu])
 
     if swapped and old_held_slug:
         old_item_name = resolve_held_item_name(old_held_slug, db) or old_held_slug
@@ -7746,6 +5269,7 @@ def revert_unit_position(
     payload: dict,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    _command: None = Depends(serialize_game_commands),
 ):
     try:
         unit_id = int(payload.get("unit_id"))
@@ -7756,7 +5280,7 @@ def revert_unit_position(
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
 
-    state = db.query(GameState).filter_by(game_id=game.id).first()
+    state = game_state_for(db, game.id)
     if not state or state.status != GameStatus.in_progress:
         raise HTTPException(status_code=400, detail="Game not in progress")
 
@@ -7791,9 +5315,12 @@ def revert_unit_position(
             "reverted": False,
         }
 
+    previous_position = get_unit_position(gu)
     gu.current_x = gu.starting_x
     gu.current_y = gu.starting_y
     clear_movement_locked(game.link, gu.id)
+    update_threat_map(game, db, {gu.id: previous_position})
+    stage_state_patch(db, game.id, units=[gu])
     db.commit()
 
     redis_client.publish(
@@ -7816,6 +5343,7 @@ def move_unit(
     payload: dict,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    _command: None = Depends(serialize_game_commands),
 ):
     # Expect: {"unit_id": int, "x": int, "y": int}
     try:
@@ -7829,7 +5357,7 @@ def move_unit(
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
 
-    state = db.query(GameState).filter_by(game_id=game.id).first()
+    state = game_state_for(db, game.id)
     if not state or state.status != GameStatus.in_progress:
         raise HTTPException(status_code=400, detail="Game not in progress")
 
@@ -7867,7 +5395,7 @@ def move_unit(
     except Exception:
         pass
 
-    map_obj = db.query(Map).filter_by(id=game.map_id).first()
+    map_obj = db.get(Map, game.map_id)
     if x < 0 or y < 0 or x >= map_obj.width or y >= map_obj.height:
         raise HTTPException(status_code=400, detail="Out of bounds")
 
@@ -7880,52 +5408,20 @@ def move_unit(
     if (x, y) not in allowed:
         raise HTTPException(status_code=400, detail="Illegal move for this turn")
 
-    special_tiles = map_obj.tile_data.get("special_tiles")
-    unit_types = get_unit_types(gu, db)
-    ability_names = get_unit_ability_names(gu, db)
-    if not unit_can_occupy_tile(special_tiles, x, y, unit_types, ability_names):
-        raise HTTPException(status_code=400, detail="This unit cannot move onto this tile")
-
-    occupied_tiles = {
-        (unit.current_x, unit.current_y)
-        for unit in db.query(GameUnit)
-        .filter(GameUnit.game_id == game.id, GameUnit.id != gu.id, GameUnit.current_hp > 0)
-        .all()
-    }
-    enemy_blocked_tiles = occupied_tiles if not unit_can_pass_through_units(unit_types) else set()
-
-    base_costs = map_obj.tile_data["movement_cost"]
-    effective_costs = build_movement_cost_grid(
-        base_costs,
-        special_tiles,
-        unit_types,
-        ability_names,
-    )
-    final_x, final_y, slid = resolve_movement_destination(
-        gu.current_x,
-        gu.current_y,
-        x,
-        y,
-        effective_costs,
-        special_tiles,
-        map_obj.width,
-        map_obj.height,
-        unit_types,
-        ability_names,
-        blocked_tiles=enemy_blocked_tiles,
-        occupied_tiles=occupied_tiles,
-    )
-
-    if (final_x, final_y) in occupied_tiles:
-        raise HTTPException(status_code=400, detail="Tile occupied")
-    if not unit_can_occupy_tile(special_tiles, final_x, final_y, unit_types, ability_names):
-        raise HTTPException(status_code=400, detail="This unit cannot move onto this tile")
-
-    gu.current_x = final_x
-    gu.current_y = final_y
+    loaded = LoadedBattle(db, game, state, units=[gu])
+    unit = loaded.unit_for(gu)
+    previous_position = unit.position
+    try:
+        slid = move_engine_unit(loaded.battle, unit, x, y)
+    except MovementError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    loaded.apply()
+    update_threat_map(game, db, {gu.id: previous_position}, loaded)
+    final_x, final_y = unit.position
     movement_locked = slid
     if movement_locked:
         set_movement_locked(game.link, gu.id)
+    stage_state_patch(db, game.id, units=[gu])
     db.commit()
 
     redis_client.publish(
@@ -7963,7 +5459,8 @@ def update_game_state(
     link: str,
     patch: dict,
     db: Session = Depends(get_db),
-    user=Depends(get_current_user)
+    user=Depends(get_current_user),
+    _command: None = Depends(serialize_game_commands),
 ):
     game = db.query(Game).filter(Game.link == link).first()
     if not game:
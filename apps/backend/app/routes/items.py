@@ -1,18 +1,28 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
 from app.db.models import Item
 from app.schemas.items import ItemSchema
 from app.dependencies import get_db
+from app.catalog import get_catalog
+from app.catalog_responses import cached_catalog_response, render_list, uncached_catalog_response
 
 router = APIRouter(prefix="/items", tags=["items"])
 
 
 @router.get("/all", response_model=list[ItemSchema])
 def get_all_items(
+    request: Request,
     category: str | None = Query(default=None),
     db: Session = Depends(get_db),
 ):
-    query = db.query(Item)
-    if category:
-        query = query.filter(Item.category == category)
-    return query.all()
+    # Only categories the catalog knows are cached; any other string matches no items.
+    if category and category not in get_catalog(db).item_categories:
+        return uncached_catalog_response(request, db, b"[]")
+
+    def build() -> bytes:
+        query = db.query(Item)
+        if category:
+            query = query.filter(Item.category == category)
+        return render_list(ItemSchema, query.all())
+
+    return cached_catalog_response(request, db, ("items", category or None), build)
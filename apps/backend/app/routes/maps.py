@@ -1,11 +1,28 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from app.db.models import Map
 from app.schemas.maps import MapDetail
 from app.dependencies import get_db
+from app.catalog_responses import cached_catalog_response, render_list, render_one
 
 router = APIRouter(prefix="/maps", tags=["maps"])
 
 @router.get("/official", response_model=list[MapDetail])
-def get_official_maps(db: Session = Depends(get_db)):
-    return db.query(Map).filter(Map.is_official == True).all()
+def get_official_maps(request: Request, db: Session = Depends(get_db)):
+    return cached_catalog_response(
+        request,
+        db,
+        "maps:official",
+        lambda: render_list(MapDetail, db.query(Map).filter(Map.is_official == True).all()),
+    )
+
+
+@router.get("/{map_id}", response_model=MapDetail)
+def get_map(map_id: int, request: Request, db: Session = Depends(get_db)):
+    def build() -> bytes:
+        map_obj = db.get(Map, map_id)
+        if map_obj is None:
+            raise HTTPException(status_code=404, detail="Map not found")
+        return render_one(MapDetail, map_obj)
+
+    return cached_catalog_response(request, db, ("maps", map_id), build)
@@ -0,0 +1,18 @@
+import os
+import secrets
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.instrumentation import render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics(authorization: str | None = Header(default=None)):
+    # Set METRICS_TOKEN to keep the endpoint private to the scraper.
+    token = os.getenv("METRICS_TOKEN")
+    if token and not secrets.compare_digest(authorization or "", f"Bearer {token}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
 from app.db.models import Move
 from app.schemas.moves import MoveSchema
 from app.dependencies import get_db
+from app.catalog_responses import cached_catalog_response, render_list
 
 router = APIRouter(prefix="/moves", tags=["moves"])
 
 @router.get("/all", response_model=list[MoveSchema])
-def get_all_moves(db: Session = Depends(get_db)):
-    return db.query(Move).all()
+def get_all_moves(request: Request, db: Session = Depends(get_db)):
+    return cached_catalog_response(request, db, "moves", lambda: render_list(MoveSchema, db.query(Move).all()))
@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
 from typing import List
 from app.db.models import Unit
 from app.schemas.units import UnitSummary
 from app.dependencies import get_db
+from app.catalog_responses import cached_catalog_response, render_list
 
 router = APIRouter(prefix="/units", tags=["units"])
 
 @router.get("/summary", response_model=List[UnitSummary])
-def get_units(db: Session = Depends(get_db)):
-    return db.query(Unit).all()
+def get_units(request: Request, db: Session = Depends(get_db)):
+    return cached_catalog_response(request, db, "units:summary", lambda: render_list(UnitSummary, db.query(Unit).all()))
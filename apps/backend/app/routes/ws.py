@@ -1,81 +1,108 @@
 import asyncio
 import logging
 
-import redis
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
 from app.db.database import get_sessionmaker
-from app.db.models import Game, GamePlayer, User
+from app.db.models import User
 from app.dependencies import ban_is_active
+from app.user_cache import cached_membership, cached_user, load_user_detached, user_is_game_participant
 from app.utils.session import decode_session_token
+from app.ws_hub import Subscription, game_update_hub
 
 router = APIRouter()
 logger = logging.getLogger("ws")
 
-r = redis.Redis(host="redis", port=6379, decode_responses=True)
-
 
 def _resolve_authenticated_user(session_token: str | None) -> User | None:
     user_id = decode_session_token(session_token or "")
     if user_id is None:
         return None
 
-    Session = get_sessionmaker()
-    db = Session()
-    try:
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user or ban_is_active(user):
-            return None
-        return user
-    finally:
-        db.close()
+    user = load_user_detached(user_id)
+    if not user or ban_is_active(user):
+        return None
+    return user
 
 
 def _user_is_game_participant(user_id: int, link: str) -> bool:
+    cached = cached_membership(user_id, link)
+    if cached is not None:
+        return cached
     Session = get_sessionmaker()
     db = Session()
     try:
-        game = db.query(Game).filter(Game.link == link).first()
-        if not game:
-            return False
-        participant = (
-            db.query(GamePlayer)
-            .filter_by(game_id=game.id, player_id=user_id)
-            .first()
-        )
-        return participant is not None
+        return user_is_game_participant(db, user_id, link)
     finally:
         db.close()
 
 
+def _authorize(session_token: str | None, link: str | None) -> User | None:
+    user = _resolve_authenticated_user(session_token)
+    if user is None or (link is not None and not _user_is_game_participant(user.id, link)):
+        return None
+    return user
+
+
+async def _authorize_socket(websocket: WebSocket, link: str | None = None) -> User | None:
+    """Authorize a connecting socket without blocking the event loop.
+
+    Cache hits are answered inline; anything that needs the database runs in a
+    worker thread, so a reconnect storm does not stall the other sockets.
+    """
+    session_token = websocket.cookies.get("session_user")
+    user_id = decode_session_token(session_token or "")
+    if user_id is None:
+        return None
+    if cached_user(user_id) is not None and (link is None or cached_membership(user_id, link) is not None):
+        return _authorize(session_token, link)
+    return await asyncio.to_thread(_authorize, session_token, link)
+
+
+async def _forward_game_updates(websocket: WebSocket, subscription: Subscription) -> None:
+    while True:
+        message = await subscription.get()
+        if message is None:
+            # Evicted as a slow consumer; the client should reconnect and refetch.
+            await websocket.close(code=1013, reason="Subscriber too slow")
+            return
+        await websocket.send_text(message)
+
+
+async def _wait_for_disconnect(websocket: WebSocket) -> None:
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
 @router.websocket("/api/ws/game/{link}")
 async def websocket_endpoint(websocket: WebSocket, link: str):
-    user = _resolve_authenticated_user(websocket.cookies.get("session_user"))
-    if user is None or not _user_is_game_participant(user.id, link):
+    user = await _authorize_socket(websocket, link)
+    if user is None:
         await websocket.close(code=4401, reason="Authentication required")
         return
 
     await websocket.accept()
-    pubsub = r.pubsub()
-    pubsub.subscribe(f"game_updates:{link}")
-
-    async def read_redis_messages():
-        loop = asyncio.get_event_loop()
-        while True:
-            message = await loop.run_in_executor(None, pubsub.get_message, True, 1.0)
-            if message and message["type"] == "message":
-                await websocket.send_text(message["data"])
-
+    subscription = await game_update_hub.subscribe(link)
+    tasks = [
+        asyncio.create_task(_forward_game_updates(websocket, subscription)),
+        asyncio.create_task(_wait_for_disconnect(websocket)),
+    ]
     try:
-        await read_redis_messages()
-    except WebSocketDisconnect:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Send failures after a disconnect are expected; collect them so they are not logged as unhandled.
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await game_update_hub.unsubscribe(subscription)
         logger.info("Client disconnected from game %s", link)
-        pubsub.close()
 
 
 @router.websocket("/api/ws/global")
 async def global_ws(websocket: WebSocket):
-    user = _resolve_authenticated_user(websocket.cookies.get("session_user"))
+    user = await _authorize_socket(websocket)
     if user is None:
         await websocket.close(code=4401, reason="Authentication required")
         return
@@ -1,7 +1,7 @@
-from app.schemas.maps import MapDetail, GameMapStateSchema
+from app.schemas.maps import MapDetail, GameMapStateSchema, CompactGameMapStateSchema
 from pydantic import BaseModel, ConfigDict, field_validator
 from datetime import datetime
-from typing import List, Optional, Any
+from typing import Dict, List, Optional, Any, Union
 from app.db.models import GameMode, GameStatus
 
 class GameCreateRequest(BaseModel):
@@ -48,7 +48,7 @@ class GameResponse(BaseModel):
     game_name: str
     map_name: str
     map: MapDetail
-    map_state: Optional[GameMapStateSchema] = None
+    map_state: Optional[Union[GameMapStateSchema, CompactGameMapStateSchema]] = None
     max_players: int
     host_id: int
     players: List[PlayerInfo]
@@ -71,6 +71,76 @@ class GameResponse(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class LobbyPlayer(BaseModel):
+    player_id: int
+    username: str
+    is_ready: bool
+    unit_count: int = 0
+
+class GameSummary(BaseModel):
+    """Lobby listing entry; the map is referenced by id and fetched from /maps/{map_id}."""
+    id: int
+    link: str
+    game_name: str
+    map_id: int
+    map_name: str
+    gamemode: GameMode
+    status: str
+    is_private: bool
+    max_players: int
+    host_id: int
+    players: List[LobbyPlayer]
+    current_turn: Optional[int]
+    max_turns: Optional[int]
+    turn_seconds: Optional[int] = 300
+    winner_id: Optional[int]
+    timestamp: datetime
+
+class GameSummaryPage(BaseModel):
+    items: List[GameSummary]
+    next_cursor: Optional[str] = None
+
+class GameEventEntry(BaseModel):
+    seq: int
+    payload: Any
+
+    model_config = ConfigDict(from_attributes=True)
+
+class GameEventPage(BaseModel):
+    """A page of a game's event log; pass ``last_seq`` back as ``after`` for the next one."""
+    events: List[GameEventEntry]
+    last_seq: int
+
+class AttackForecastEntry(BaseModel):
+    """One attack's odds from the ``origin_x``/``origin_y`` tile; ``forecastable`` is false (and the numbers null) for moves the forecast cannot predict."""
+    unit_id: int
+    origin_x: int
+    origin_y: int
+    move_id: int
+    target_id: int
+    hit_chance: Optional[float]
+    crit_chance: Optional[float]
+    damage_min: Optional[int]
+    damage_max: Optional[int]
+    ko_chance: Optional[float]
+    forecastable: bool = True
+
+    model_config = ConfigDict(from_attributes=True)
+
+class GameForecast(BaseModel):
+    """Outcomes of every attack the current player can make; ``version`` is the game state it was computed for."""
+    player_id: int
+    version: int
+    attacks: List[AttackForecastEntry]
+
+class GameThreatMap(BaseModel):
+    """Tiles enemy units could strike next turn, as base64 little-endian bitsets with bit ``y * width + x`` per tile."""
+    player_id: int
+    width: int
+    height: int
+    threats: str
+    units: Dict[int, str]
+
 class GameStateSchema(BaseModel):
     id: int
     game_id: int
@@ -1,7 +1,9 @@
 from pydantic import BaseModel, ConfigDict
-from typing import List, Optional, Tuple
+from typing import List, Literal, Optional, Tuple, Union
 
 TimedTileEffect = Tuple[int, int]
+# An app.map_grids encoding, or a plain 2D list for grids that cannot be encoded.
+EncodedGrid = Union[dict, list]
 
 class MapDetail(BaseModel):
     id: int
@@ -33,3 +35,20 @@ class GameMapStateSchema(BaseModel):
     objective_tiles: List[List[Optional[dict]]] = []
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class CompactGameMapStateSchema(BaseModel):
+    """Map state with its grids in the compact encodings; the map itself is sent once, on the game."""
+
+    id: int
+    game_id: int
+    map_id: int
+    grid_encoding: Literal["compact"] = "compact"
+
+    weather_tiles: EncodedGrid
+    hazard_tiles: EncodedGrid
+    room_effect_tiles: EncodedGrid
+    terrain_effect_tiles: EncodedGrid
+    field_effect_tiles: EncodedGrid
+    item_id_tiles: EncodedGrid
+    objective_tiles: EncodedGrid
@@ -0,0 +1,304 @@
+"""Sequenced state patches for game WebSockets.
+
+Alongside the legacy string signals (``unit_moved:...``, ``unit_removed:...``,
+``map_state_updated`` and friends), every committed game mutation publishes a
+JSON patch on ``game_updates:{link}``::
+
+    {"seq": 42, "type": "state_patch", "units": [...], "removed_unit_ids": [...],
+     "tiles": [...], "players": [...]}
+
+``seq`` comes from a per-game Redis counter, and the counter bump, the append
+to a bounded patch log and the publish happen in one Lua script, so patches
+reach subscribers in sequence order. ``units`` carry the full mutable state of
+each changed unit, ``tiles`` the changed map cells, and ``players`` the
+changed cash balances; a client replaces those entries in its local copy.
+
+A tile entry has ``x``, ``y`` and one key per layer that changed on that cell:
+``objective`` (war mode), ``weather``, ``hazards``, ``room_effect``,
+``terrain_effect``, ``field_effect`` and ``item_id``, each holding the cell's
+new value in that ``GameMapState`` grid. Objective cells are staged by the
+routes that change them. The other layers are found by staging the
+``GameMapState`` before a command edits it: its grids are copied then and
+compared with the final grids at commit, so every in-place edit is caught.
+
+A client that sees a gap (``seq`` is not its last seq + 1) or reconnects asks
+``GET /games/{link}/patches?since=<last seq>``. If the log no longer covers
+that range the response has ``complete: false`` and the client refetches the
+full game as before.
+
+Routes stage changes on the session with ``stage_patch``; the patch is
+serialized just before the session commits (with final values and without
+extra loads) and published once the commit succeeds. Rolled-back changes are
+never published. Changes made after a commit, such as newly created units,
+are sent with ``append_patch`` directly. Turn changes still go out only as the
+``turn_advanced``/``turn_started`` signals.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from typing import Iterable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.db.models import Game, GameMapState, GamePlayer, GameUnit
+from app.ws_hub import game_updates_channel
+
+logger = logging.getLogger("state_stream")
+
+PATCH_INFO_KEY = "state_patches"
+PATCH_LOG_SIZE = 200
+PATCH_LOG_TTL_SECONDS = 24 * 60 * 60
+
+UNIT_PATCH_FIELDS = (
+    "id",
+    "user_id",
+    "unit_id",
+    "starting_x",
+    "starting_y",
+    "current_x",
+    "current_y",
+    "level",
+    "current_hp",
+    "current_stats",
+    "stat_boosts",
+    "status_effects",
+    "states",
+    "is_fainted",
+    "can_move",
+    "move_pp",
+)
+# Set on the instance by attach_game_unit_loadout_fields when it has run.
+UNIT_LOADOUT_FIELDS = (
+    "held_item",
+    "held_item_slug",
+    "held_tm_move_id",
+    "equipped_move_ids",
+    "ability",
+    "ability_id",
+)
+
+# GameMapState grid -> key of its value in a tile patch.
+TILE_PATCH_LAYERS = {
+    "weather_tiles": "weather",
+    "hazard_tiles": "hazards",
+    "room_effect_tiles": "room_effect",
+    "terrain_effect_tiles": "terrain_effect",
+    "field_effect_tiles": "field_effect",
+    "item_id_tiles": "item_id",
+}
+
+# KEYS: seq counter, patch log. ARGV: patch JSON without "seq", log size, ttl, channel.
+APPEND_PATCH_SCRIPT = """
+local seq = redis.call('INCR', KEYS[1])
+local message = '{"seq":' .. seq .. ',' .. string.sub(ARGV[1], 2)
+redis.call('RPUSH', KEYS[2], message)
+redis.call('LTRIM', KEYS[2], -tonumber(ARGV[2]), -1)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('PUBLISH', ARGV[4], message)
+return seq
+"""
+
+
+def state_seq_key(game_link: str) -> str:
+    return f"game_seq:{game_link}"
+
+
+def patch_log_key(game_link: str) -> str:
+    return f"game_patches:{game_link}"
+
+
+def unit_patch(unit: GameUnit) -> dict:
+    patch = {field: getattr(unit, field) for field in UNIT_PATCH_FIELDS}
+    for field in UNIT_LOADOUT_FIELDS:
+        if field in unit.__dict__:
+            patch[field] = unit.__dict__[field]
+    return patch
+
+
+def player_patch(player: GamePlayer) -> dict:
+    return {"player_id": player.player_id, "cash_remaining": player.cash_remaining}
+
+
+def tile_patch(x: int, y: int, cell: dict) -> dict:
+    return {"x": int(x), "y": int(y), "objective": dict(cell)}
+
+
+def snapshot_map_grids(map_state: GameMapState) -> dict[str, list]:
+    """Plain copies of ``map_state``'s tile grids, for ``changed_tiles``."""
+    return {layer: json.loads(json.dumps(getattr(map_state, layer) or [])) for layer in TILE_PATCH_LAYERS}
+
+
+def changed_tiles(before: dict[str, list], map_state: GameMapState) -> dict[tuple[int, int], dict]:
+    """Tile patches for every cell whose value in a grid differs from ``before``."""
+    tiles: dict[tuple[int, int], dict] = {}
+    for layer, key in TILE_PATCH_LAYERS.items():
+        old_grid = before.get(layer) or []
+        new_grid = getattr(map_state, layer) or []
+        for y in range(max(len(old_grid), len(new_grid))):
+            old_row = old_grid[y] if y < len(old_grid) and isinstance(old_grid[y], list) else []
+            new_row = new_grid[y] if y < len(new_grid) and isinstance(new_grid[y], list) else []
+            if old_row == new_row:
+                continue
+            for x in range(max(len(old_row), len(new_row))):
+                old_cell = old_row[x] if x < len(old_row) else None
+                new_cell = new_row[x] if x < len(new_row) else None
+                if old_cell != new_cell:
+                    tiles.setdefault((x, y), {"x": x, "y": y})[key] = json.loads(json.dumps(new_cell))
+    return tiles
+
+
+def build_patch(
+    units: Iterable[GameUnit] = (),
+    removed_unit_ids: Iterable[int] = (),
+    tiles: Iterable[dict] = (),
+    players: Iterable[GamePlayer] = (),
+) -> dict:
+    removed = sorted({int(unit_id) for unit_id in removed_unit_ids})
+    removed_set = set(removed)
+    unit_patches = {}
+    for unit in units:
+        if unit.id not in removed_set:
+            unit_patches[unit.id] = unit_patch(unit)
+    return {
+        "type": "state_patch",
+        "units": list(unit_patches.values()),
+        "removed_unit_ids": removed,
+        "tiles": list(tiles),
+        "players": [player_patch(player) for player in {p.player_id: p for p in players}.values()],
+    }
+
+
+def append_patch(client, game_link: str, patch: dict) -> int | None:
+    """Sequence, log and publish ``patch``. Returns its seq, or None if Redis failed."""
+    body = json.dumps(patch, default=str)
+    try:
+        return int(
+            client.eval(
+                APPEND_PATCH_SCRIPT,
+                2,
+                state_seq_key(game_link),
+                patch_log_key(game_link),
+                body,
+                PATCH_LOG_SIZE,
+                PATCH_LOG_TTL_SECONDS,
+                game_updates_channel(game_link),
+            )
+        )
+    except Exception:
+        # Clients still get the legacy signals; a missing seq shows up as a gap.
+        logger.warning("Could not publish state patch for game %s", game_link)
+        return None
+
+
+def read_patches(client, game_link: str, since: int | None) -> dict:
+    """Patches after ``since`` from the log; ``complete`` is False if some were evicted."""
+    pipe = client.pipeline(transaction=True)
+    pipe.get(state_seq_key(game_link))
+    pipe.lrange(patch_log_key(game_link), 0, -1)
+    raw_seq, raw_patches = pipe.execute()
+    seq = int(raw_seq or 0)
+    if since is None:
+        return {"seq": seq, "complete": True, "patches": []}
+
+    patches = [json.loads(raw) for raw in raw_patches or []]
+    newer = [patch for patch in patches if patch["seq"] > since]
+    if since > seq:
+        # The counter was reset (keys expired or Redis flushed); the client is ahead of us.
+        complete = False
+    elif since == seq:
+        complete = True
+    else:
+        complete = bool(newer) and newer[0]["seq"] == since + 1
+    return {"seq": seq, "complete": complete, "patches": newer if complete else []}
+
+
+class StagedPatch:
+    __slots__ = ("client", "units", "removed_unit_ids", "tiles", "players", "map_state", "map_grids", "body")
+
+    def __init__(self, client):
+        self.client = client
+        self.units: dict[int, GameUnit] = {}
+        self.removed_unit_ids: set[int] = set()
+        self.tiles: dict[tuple[int, int], dict] = {}
+        self.players: dict[int, GamePlayer] = {}
+        self.map_state: GameMapState | None = None
+        self.map_grids: dict[str, list] = {}
+        self.body: tuple[str, dict] | None = None
+
+
+def stage_patch(
+    db: Session,
+    client,
+    game_id: int,
+    *,
+    units: Iterable[GameUnit] = (),
+    removed_unit_ids: Iterable[int] = (),
+    tiles: Iterable[tuple[int, int, dict]] = (),
+    players: Iterable[GamePlayer] = (),
+    map_state: GameMapState | None = None,
+) -> None:
+    """Record changes to publish for ``game_id`` when ``db`` next commits.
+
+    ``map_state`` must be staged before it is edited; the cells that differ at
+    commit are added to ``tiles``.
+    """
+    info = getattr(db, "info", None)
+    if not isinstance(info, dict) or game_id is None:
+        return
+    staged_by_game = info.setdefault(PATCH_INFO_KEY, {})
+    staged = staged_by_game.get(game_id)
+    if staged is None:
+        staged = staged_by_game[game_id] = StagedPatch(client)
+    for unit in units:
+        if unit is not None and unit.id is not None:
+            staged.units[unit.id] = unit
+    staged.removed_unit_ids.update(int(unit_id) for unit_id in removed_unit_ids)
+    for x, y, cell in tiles:
+        staged.tiles.setdefault((int(x), int(y)), {}).update(tile_patch(x, y, cell))
+    if map_state is not None and staged.map_state is None:
+        staged.map_state = map_state
+        staged.map_grids = snapshot_map_grids(map_state)
+    for player in players:
+        if player is not None:
+            staged.players[player.player_id] = player
+
+
+@event.listens_for(Session, "before_commit")
+def _serialize_staged_patches(session: Session) -> None:
+    for game_id, staged in session.info.get(PATCH_INFO_KEY, {}).items():
+        game = session.get(Game, game_id)
+        if game is None:
+            continue
+        if staged.map_state is not None:
+            for position, tile in changed_tiles(staged.map_grids, staged.map_state).items():
+                staged.tiles.setdefault(position, {}).update(tile)
+        if not (staged.units or staged.removed_unit_ids or staged.tiles or staged.players):
+            # Only a map state was staged, and nothing on it changed.
+            continue
+        staged.body = (
+            game.link,
+            build_patch(
+                staged.units.values(),
+                staged.removed_unit_ids,
+                staged.tiles.values(),
+                staged.players.values(),
+            ),
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_staged_patches(session: Session) -> None:
+    staged_by_game = session.info.pop(PATCH_INFO_KEY, None)
+    for staged in (staged_by_game or {}).values():
+        if staged.body is not None:
+            game_link, patch = staged.body
+            append_patch(staged.client, game_link, patch)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_staged_patches(session: Session, previous_transaction) -> None:
+    session.info.pop(PATCH_INFO_KEY, None)
@@ -0,0 +1,153 @@
+"""Process-wide cache of compiled map terrain.
+
+``Map.tile_data`` is static between catalog refreshes, so each map's special
+tiles are parsed once into integer tile-kind codes and a movement graph, and
+effective movement cost grids are memoized per movement capability signature
+(see ``map_movement.movement_capabilities``). Entries are keyed by map id and
+timestamps, so a refreshed map is recompiled on next use.
+
+Returned cost grids are shared between callers and must not be mutated.
+"""
+
+from __future__ import annotations
+
+import threading
+from array import array
+from typing import TYPE_CHECKING
+
+from app.map_movement import (
+    GRASS_TILE,
+    ICE_TILE,
+    IMPASSABLE_TILE,
+    LEDGE_DOWN,
+    LEDGE_LEFT,
+    LEDGE_RIGHT,
+    LEDGE_UP,
+    ROCK_TILE,
+    SAND_TILE,
+    STUMP_TILE,
+    WATER_TILE,
+    MovementGraph,
+    effective_tile_cost,
+    movement_capabilities,
+    normalize_special_tile,
+)
+
+if TYPE_CHECKING:
+    from app.db.models import Map
+
+TERRAIN_CACHE_SIZE = 128
+
+# Code 0 is a plain tile; unknown special tiles (objectives, decorations) map to OTHER.
+TILE_KIND_CODES = {
+    None: 0,
+    WATER_TILE: 1,
+    ROCK_TILE: 2,
+    GRASS_TILE: 3,
+    SAND_TILE: 4,
+    STUMP_TILE: 5,
+    ICE_TILE: 6,
+    IMPASSABLE_TILE: 7,
+    LEDGE_UP: 8,
+    LEDGE_DOWN: 9,
+    LEDGE_LEFT: 10,
+    LEDGE_RIGHT: 11,
+}
+OTHER_TILE_CODE = 255
+TILE_KINDS_BY_CODE = {code: kind for kind, code in TILE_KIND_CODES.items()}
+
+
+class CompiledTerrain:
+    __slots__ = (
+        "width",
+        "height",
+        "special_tiles",
+        "base_costs",
+        "tile_codes",
+        "graph",
+        "_cost_grids",
+    )
+
+    def __init__(self, width: int, height: int, base_costs: list[list[int]], special_tiles: list | None):
+        self.width = width
+        self.height = height
+        self.base_costs = base_costs
+        self.special_tiles = special_tiles
+        codes = array("B", bytes(width * height))
+        for y, row in enumerate((special_tiles or [])[:height]):
+            if not isinstance(row, list):
+                continue
+            for x, cell in enumerate(row[:width]):
+                tile = normalize_special_tile(cell)
+                if tile is not None:
+                    codes[y * width + x] = TILE_KIND_CODES.get(tile, OTHER_TILE_CODE)
+        self.tile_codes = codes
+        self.graph = MovementGraph(special_tiles, width, height)
+        self._cost_grids: dict[tuple[bool, bool, bool, bool], list[list[int]]] = {}
+
+    def tile_kind(self, x: int, y: int) -> str | None:
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        code = self.tile_codes[y * self.width + x]
+        if code == OTHER_TILE_CODE:
+            return normalize_special_tile(self.special_tiles[y][x])
+        return TILE_KINDS_BY_CODE[code]
+
+    def cost_grid(self, unit_types: set[str], ability_names: set[str] | None = None) -> list[list[int]]:
+        """Effective movement costs for a unit; same result as ``build_movement_cost_grid``."""
+        signature = movement_capabilities(unit_types, ability_names)
+        grid = self._cost_grids.get(signature)
+        if grid is None:
+            grid = self._cost_grids[signature] = self._compile_cost_grid(signature)
+        return grid
+
+    def _compile_cost_grid(self, signature: tuple[bool, bool, bool, bool]) -> list[list[int]]:
+        if not self.special_tiles:
+            return self.base_costs
+        width = self.width
+        codes = self.tile_codes
+        grid: list[list[int]] = []
+        for y, row in enumerate(self.base_costs):
+            new_row = []
+            for x, cost in enumerate(row):
+                code = codes[y * width + x] if x < width and y < self.height else 0
+                tile = TILE_KINDS_BY_CODE.get(code) if code != OTHER_TILE_CODE else None
+                new_row.append(effective_tile_cost(tile, cost, signature))
+            grid.append(new_row)
+        return grid
+
+
+_cache: dict[tuple, CompiledTerrain] = {}
+_lock = threading.Lock()
+
+
+def terrain_cache_key(map_obj: Map) -> tuple:
+    return (map_obj.id, map_obj.created_at, map_obj.updated_at)
+
+
+def get_compiled_terrain(map_obj: Map) -> CompiledTerrain:
+    key = terrain_cache_key(map_obj)
+    compiled = _cache.get(key)
+    if compiled is not None:
+        return compiled
+
+    tile_data = map_obj.tile_data or {}
+    compiled = CompiledTerrain(
+        int(map_obj.width),
+        int(map_obj.height),
+        tile_data.get("movement_cost") or [],
+        tile_data.get("special_tiles"),
+    )
+    with _lock:
+        # Drop stale versions of this map and keep the cache bounded.
+        for stale in [k for k in _cache if k[0] == map_obj.id]:
+            del _cache[stale]
+        while len(_cache) >= TERRAIN_CACHE_SIZE:
+            del _cache[next(iter(_cache))]
+        _cache[key] = compiled
+    return compiled
+
+
+def clear_terrain_cache() -> None:
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,220 @@
+"""Deadline-ordered turn scheduler backed by a Redis sorted set.
+
+Every in-progress game is a member of ``TURN_DEADLINES_KEY`` scored by the
+epoch second at which the scheduler next needs to look at it (the turn
+warning time, then the turn deadline). A single elected leader pops due
+members and hands them to ``advance_if_expired``, under the game's command
+lease (``app.game_commands``); a game busy with a player command is retried
+after ``RETRY_DELAY_SECONDS``.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy.orm import Session
+
+from app.db.database import get_sessionmaker
+from app.db.models import Game, GameState, GameStatus
+from app.game_commands import game_command
+from app.instrumentation import InstrumentedRedis
+
+logger = logging.getLogger("turn_scheduler")
+
+TURN_DEADLINES_KEY = "turn_scheduler:deadlines"
+LEADER_KEY = "turn_scheduler:leader"
+LEADER_LEASE_MS = 15_000
+RETRY_DELAY_SECONDS = 5
+# Workers that do not hold the lease only try to take it this often.
+FOLLOWER_RETRY_SECONDS = 5
+RECONCILE_INTERVAL_SECONDS = 300
+DUE_BATCH_SIZE = 200
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+redis_client = InstrumentedRedis(host="redis", port=6379, decode_responses=True)
+
+# Extend the lease only if this worker still owns it.
+_RENEW_LEADER_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Delete the lease only if this worker still owns it.
+_RELEASE_LEADER_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_last_reconcile_at: float | None = None
+_next_lease_attempt_at = 0.0
+
+
+def turn_warning_seconds(turn_seconds: int | None) -> int:
+    return 30 if int(turn_seconds or 0) <= 60 else 60
+
+
+def as_utc(value: datetime) -> datetime:
+    """Treat naive datetimes (SQLite drops the offset) as UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _as_epoch(value: datetime) -> float:
+    return as_utc(value).timestamp()
+
+
+def next_wake_at(
+    turn_seconds: int | None,
+    turn_deadline: datetime,
+    now: float,
+    *,
+    overdue_delay: float = 0,
+) -> float:
+    """Return the epoch second at which a game's turn timer next needs attention.
+
+    Overdue games are due at ``now + overdue_delay``; the scheduler passes a
+    retry delay after an advance attempt so a failing game is not retried on
+    every tick.
+    """
+    deadline = _as_epoch(turn_deadline)
+    warning_at = deadline - turn_warning_seconds(turn_seconds)
+    if now < warning_at:
+        return warning_at
+    if now < deadline:
+        return deadline
+    return now + overdue_delay
+
+
+def schedule_turn_deadline(
+    game: Game,
+    state: GameState,
+    now: float | None = None,
+    *,
+    overdue_delay: float = 0,
+) -> None:
+    """Index (or drop) a game in the deadline set according to its current state."""
+    try:
+        if state.status != GameStatus.in_progress or not state.turn_deadline:
+            redis_client.zrem(TURN_DEADLINES_KEY, str(game.id))
+            return
+        wake_at = next_wake_at(
+            game.turn_seconds,
+            state.turn_deadline,
+            time.time() if now is None else now,
+            overdue_delay=overdue_delay,
+        )
+        redis_client.zadd(TURN_DEADLINES_KEY, {str(game.id): wake_at})
+    except Exception:
+        # Scheduling failures must not block game actions; reconciliation repairs the index.
+        logger.exception("Failed to schedule turn deadline for game %s", game.id)
+
+
+def reconcile_turn_deadlines(db: Session, now: float | None = None) -> int:
+    """Rebuild the deadline index from the database. Returns the number of games indexed."""
+    now = time.time() if now is None else now
+    rows = (
+        db.query(Game.id, Game.turn_seconds, GameState.turn_deadline)
+        .join(GameState, GameState.game_id == Game.id)
+        .filter(GameState.status == GameStatus.in_progress, GameState.turn_deadline.isnot(None))
+        .all()
+    )
+    mapping = {
+        str(game_id): next_wake_at(turn_seconds, turn_deadline, now)
+        for game_id, turn_seconds, turn_deadline in rows
+    }
+    pipe = redis_client.pipeline()
+    pipe.delete(TURN_DEADLINES_KEY)
+    if mapping:
+        pipe.zadd(TURN_DEADLINES_KEY, mapping)
+    pipe.execute()
+    return len(mapping)
+
+
+def acquire_leadership() -> bool:
+    """Take or renew the scheduler lease so only one worker advances turns."""
+    global _last_reconcile_at
+
+    if redis_client.set(LEADER_KEY, WORKER_ID, nx=True, px=LEADER_LEASE_MS):
+        # A new leader cannot trust an index the previous leader may have left stale.
+        _last_reconcile_at = None
+        return True
+    renewed = redis_client.eval(_RENEW_LEADER_LUA, 1, LEADER_KEY, WORKER_ID, LEADER_LEASE_MS)
+    return bool(renewed)
+
+
+def release_leadership() -> None:
+    try:
+        redis_client.eval(_RELEASE_LEADER_LUA, 1, LEADER_KEY, WORKER_ID)
+    except Exception:
+        return
+
+
+def run_due_turns(now: float | None = None) -> int:
+    """Advance every game whose warning time or deadline has arrived.
+
+    Returns the number of games examined. Non-leaders return 0 without
+    touching the database, and skip Redis too until ``FOLLOWER_RETRY_SECONDS``
+    have passed since their last attempt.
+    """
+    global _last_reconcile_at, _next_lease_attempt_at
+
+    if time.monotonic() < _next_lease_attempt_at:
+        return 0
+    # Set before the attempt so a Redis outage is also retried at the follower pace.
+    _next_lease_attempt_at = time.monotonic() + FOLLOWER_RETRY_SECONDS
+    if not acquire_leadership():
+        return 0
+    _next_lease_attempt_at = 0.0
+
+    now = time.time() if now is None else now
+    Session = get_sessionmaker()
+    db = Session()
+    try:
+        if _last_reconcile_at is None or now - _last_reconcile_at >= RECONCILE_INTERVAL_SECONDS:
+            reconcile_turn_deadlines(db, now)
+            _last_reconcile_at = now
+
+        due_ids = redis_client.zrangebyscore(TURN_DEADLINES_KEY, "-inf", now, start=0, num=DUE_BATCH_SIZE)
+        if not due_ids:
+            return 0
+
+        # Import here to avoid circular imports
+        from app.routes.games import advance_if_expired
+
+        rows = (
+            db.query(Game, GameState)
+            .join(GameState, GameState.game_id == Game.id)
+            .filter(Game.id.in_([int(game_id) for game_id in due_ids]))
+            .all()
+        )
+        found_ids = set()
+        for game, state in rows:
+            found_ids.add(str(game.id))
+            try:
+                with game_command(game.link, db, wait=False) as acquired:
+                    if acquired:
+                        # The row was read before the lease; a command may have just committed.
+                        db.refresh(state)
+                        advance_if_expired(game, state, db)
+            except Exception:
+                logger.exception("Error advancing turn for game %s", game.id)
+                db.rollback()
+            schedule_turn_deadline(game, state, overdue_delay=RETRY_DELAY_SECONDS)
+
+        stale_ids = [game_id for game_id in due_ids if game_id not in found_ids]
+        if stale_ids:
+            redis_client.zrem(TURN_DEADLINES_KEY, *stale_ids)
+        return len(rows)
+    finally:
+        db.close()
@@ -0,0 +1,231 @@
+"""Short-lived, process-wide cache of session users and game membership.
+
+Every HTTP request resolves its session cookie to a ``User`` and every
+WebSocket connect also checks game membership. Both used to cost a query each
+time. Entries here are kept for ``USER_CACHE_TTL_SECONDS``:
+
+* users are stored as detached copies and merged into the caller's session
+  without a query (``load_user``), so handlers still get an attached ``User``;
+* a commit that changes a ``User`` row (bans, unbans, role changes, expired
+  bans being cleared) or adds/removes a ``GamePlayer`` drops the affected
+  entries in this process right away, and publishes the user ids on
+  ``INVALIDATION_CHANNEL`` so every other worker drops them too.
+
+Each worker listens on that channel from a background thread
+(``start_invalidation_listener``, run from the app lifespan). If the listener
+loses its Redis connection it clears the whole cache, since invalidations may
+have been missed. While Redis is unreachable the TTL is the bound on how long a
+ban or role change can take to apply everywhere.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+import redis
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.db.database import get_sessionmaker
+from app.db.models import Game, GamePlayer, User
+from app.instrumentation import InstrumentedRedis
+
+logger = logging.getLogger("user_cache")
+
+USER_CACHE_TTL_SECONDS = 15.0
+USER_CACHE_SIZE = 4096
+INVALIDATION_CHANNEL = "user_cache:invalidate"
+LISTENER_POLL_SECONDS = 1.0
+# After a Redis error, skip publishing for a while instead of paying a failed
+# round trip on every commit; the TTL covers the gap.
+REDIS_RETRY_SECONDS = 30.0
+_PENDING_KEY = "user_cache_invalidations"
+
+redis_client = InstrumentedRedis(host="redis", port=6379, decode_responses=True)
+
+_lock = threading.Lock()
+_users: dict[int, tuple[float, User]] = {}
+_memberships: dict[int, dict[str, tuple[float, bool]]] = {}
+# Bumped by every invalidation; a load that raced one is not stored.
+_generation = 0
+_listener = None
+_redis_down_until = 0.0
+
+
+def clear_user_cache() -> None:
+    global _generation
+    with _lock:
+        _users.clear()
+        _memberships.clear()
+        _generation += 1
+
+
+def invalidate_user(user_id: int) -> None:
+    global _generation
+    with _lock:
+        _users.pop(user_id, None)
+        _memberships.pop(user_id, None)
+        _generation += 1
+
+
+def cached_user(user_id: int) -> User | None:
+    """The cached detached copy of the user, if fresh. Treat it as read-only."""
+    with _lock:
+        entry = _users.get(user_id)
+    if entry is None or entry[0] < time.monotonic():
+        return None
+    return entry[1]
+
+
+def _detached_copy(user: User) -> User:
+    copy = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+    make_transient_to_detached(copy)
+    return copy
+
+
+def _store_user(user: User, generation: int) -> None:
+    copy = _detached_copy(user)
+    with _lock:
+        if generation != _generation:
+            return
+        if len(_users) >= USER_CACHE_SIZE:
+            _users.clear()
+        _users[user.id] = (time.monotonic() + USER_CACHE_TTL_SECONDS, copy)
+
+
+def load_user(db: Session, user_id: int) -> User | None:
+    """``db.get(User, user_id)``, answered from the cache when it is fresh."""
+    if db.identity_map.get(db.identity_key(User, user_id)) is None:
+        cached = cached_user(user_id)
+        if cached is not None:
+            return db.merge(cached, load=False)
+    generation = _generation
+    user = db.get(User, user_id)
+    if user is not None:
+        _store_user(user, generation)
+    return user
+
+
+def load_user_detached(user_id: int) -> User | None:
+    """The user as a read-only detached copy, for callers without a session (WebSockets)."""
+    user = cached_user(user_id)
+    if user is not None:
+        return user
+    db = get_sessionmaker()()
+    try:
+        generation = _generation
+        user = db.get(User, user_id)
+        if user is None:
+            return None
+        _store_user(user, generation)
+        return _detached_copy(user)
+    finally:
+        db.close()
+
+
+def cached_membership(user_id: int, link: str) -> bool | None:
+    with _lock:
+        entry = _memberships.get(user_id, {}).get(link)
+    if entry is None or entry[0] < time.monotonic():
+        return None
+    return entry[1]
+
+
+def user_is_game_participant(db: Session, user_id: int, link: str) -> bool:
+    cached = cached_membership(user_id, link)
+    if cached is not None:
+        return cached
+    generation = _generation
+    is_participant = (
+        db.query(GamePlayer.id)
+        .join(Game, Game.id == GamePlayer.game_id)
+        .filter(Game.link == link, GamePlayer.player_id == user_id)
+        .first()
+        is not None
+    )
+    with _lock:
+        if generation == _generation:
+            if len(_memberships) >= USER_CACHE_SIZE:
+                _memberships.clear()
+            _memberships.setdefault(user_id, {})[link] = (
+                time.monotonic() + USER_CACHE_TTL_SECONDS,
+                is_participant,
+            )
+    return is_participant
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_invalidations(session: Session, flush_context) -> None:
+    user_ids = session.info.setdefault(_PENDING_KEY, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            user_ids.add(obj.id)
+        elif isinstance(obj, GamePlayer) and obj.player_id is not None:
+            user_ids.add(obj.player_id)
+
+
+def publish_invalidations(user_ids) -> None:
+    """Tell the other workers to drop ``user_ids``."""
+    global _redis_down_until
+
+    if not user_ids or time.monotonic() < _redis_down_until:
+        return
+    try:
+        redis_client.publish(INVALIDATION_CHANNEL, ",".join(str(user_id) for user_id in sorted(user_ids)))
+    except redis.RedisError:
+        logger.warning("Redis unavailable; user cache invalidations stay local until the TTL")
+        _redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+
+def _on_invalidation(message) -> None:
+    for user_id in str(message["data"]).split(","):
+        if user_id.isdigit():
+            invalidate_user(int(user_id))
+
+
+def _on_listener_error(error, pubsub, thread) -> None:
+    logger.warning("User cache invalidation listener lost Redis: %s", error)
+    # Invalidations published while disconnected are gone; start from scratch.
+    clear_user_cache()
+    time.sleep(LISTENER_POLL_SECONDS)
+
+
+def start_invalidation_listener() -> None:
+    """Drop users invalidated by other workers as their commits land."""
+    global _listener
+    if _listener is not None:
+        return
+    pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+    try:
+        pubsub.subscribe(**{INVALIDATION_CHANNEL: _on_invalidation})
+    except redis.RedisError:
+        logger.warning("Redis unavailable; user cache entries expire by TTL only")
+        pubsub.close()
+        return
+    _listener = pubsub.run_in_thread(
+        sleep_time=LISTENER_POLL_SECONDS,
+        daemon=True,
+        exception_handler=_on_listener_error,
+    )
+
+
+def stop_invalidation_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session: Session) -> None:
+    user_ids = session.info.pop(_PENDING_KEY, set())
+    for user_id in user_ids:
+        invalidate_user(user_id)
+    publish_invalidations(user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,184 @@
+"""Process-wide Redis pub/sub fan-out for game WebSockets.
+
+One asyncio Redis connection per worker subscribes to the
+``game_updates:{link}`` channels that have at least one local socket and
+copies each message into the bounded queue of every local subscriber. A
+socket that falls ``SUBSCRIBER_QUEUE_SIZE`` messages behind is evicted
+instead of stalling the reader for everyone else.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Callable
+
+import redis.asyncio as aioredis
+
+logger = logging.getLogger("ws_hub")
+
+SUBSCRIBER_QUEUE_SIZE = 256
+READ_TIMEOUT_SECONDS = 1.0
+RECONNECT_DELAY_SECONDS = 1.0
+
+
+def game_updates_channel(link: str) -> str:
+    return f"game_updates:{link}"
+
+
+def _default_client_factory() -> aioredis.Redis:
+    return aioredis.Redis(host="redis", port=6379, decode_responses=True)
+
+
+class Subscription:
+    """A single socket's view of one game channel."""
+
+    __slots__ = ("channel", "queue", "evicted")
+
+    def __init__(self, channel: str, queue_size: int):
+        self.channel = channel
+        self.queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=queue_size)
+        self.evicted = False
+
+    def offer(self, data: str) -> bool:
+        """Queue a message without blocking. Returns False when the subscriber is evicted."""
+        if self.evicted:
+            return False
+        try:
+            self.queue.put_nowait(data)
+            return True
+        except asyncio.QueueFull:
+            self.evict()
+            return False
+
+    def evict(self) -> None:
+        if self.evicted:
+            return
+        self.evicted = True
+        # Drop the backlog so the sentinel wakes the consumer immediately.
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def get(self) -> str | None:
+        """Next message for this socket, or None once it has been evicted."""
+        if self.evicted and self.queue.empty():
+            return None
+        return await self.queue.get()
+
+
+class GameUpdateHub:
+    def __init__(
+        self,
+        client_factory: Callable[[], Any] = _default_client_factory,
+        queue_size: int = SUBSCRIBER_QUEUE_SIZE,
+    ):
+        self._client_factory = client_factory
+        self._queue_size = queue_size
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._client = None
+        self._pubsub = None
+        self._reader: asyncio.Task | None = None
+        self._lock: asyncio.Lock | None = None
+        self._subscribers: dict[str, set[Subscription]] = {}
+
+    def _bind_to_running_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # A new event loop (worker restart, test client) cannot reuse the old loop's objects.
+        self._loop = loop
+        self._client = None
+        self._pubsub = None
+        self._reader = None
+        self._lock = asyncio.Lock()
+        self._subscribers = {}
+
+    def subscriber_count(self, link: str) -> int:
+        return len(self._subscribers.get(game_updates_channel(link), ()))
+
+    async def _ensure_pubsub(self):
+        if self._pubsub is None:
+            self._client = self._client_factory()
+            self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        return self._pubsub
+
+    async def subscribe(self, link: str) -> Subscription:
+        self._bind_to_running_loop()
+        channel = game_updates_channel(link)
+        subscription = Subscription(channel, self._queue_size)
+        async with self._lock:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is None:
+                pubsub = await self._ensure_pubsub()
+                await pubsub.subscribe(channel)
+                subscribers = self._subscribers[channel] = set()
+            subscribers.add(subscription)
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read_loop())
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        self._bind_to_running_loop()
+        async with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if subscribers:
+                return
+            del self._subscribers[subscription.channel]
+            if self._pubsub is not None:
+                try:
+                    await self._pubsub.unsubscribe(subscription.channel)
+                except Exception:
+                    logger.exception("Failed to unsubscribe from %s", subscription.channel)
+
+    def dispatch(self, channel: str, data: str) -> int:
+        """Fan a message out to local subscribers. Returns the number of sockets reached."""
+        delivered = 0
+        for subscription in list(self._subscribers.get(channel, ())):
+            if subscription.offer(data):
+                delivered += 1
+            else:
+                logger.warning("Evicting slow WebSocket subscriber on %s", channel)
+        return delivered
+
+    async def _resubscribe(self) -> None:
+        old_pubsub, old_client = self._pubsub, self._client
+        self._pubsub = self._client = None
+        # Close the dead connection first, or every reconnect leaks one.
+        for resource in (old_pubsub, old_client):
+            if resource is None:
+                continue
+            try:
+                await resource.aclose()
+            except Exception:
+                logger.warning("Failed to close the old game update connection", exc_info=True)
+        pubsub = await self._ensure_pubsub()
+        channels = list(self._subscribers)
+        if channels:
+            await pubsub.subscribe(*channels)
+
+    async def _read_loop(self) -> None:
+        while self._subscribers:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=READ_TIMEOUT_SECONDS
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Game update reader lost its Redis connection; reconnecting")
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+                try:
+                    async with self._lock:
+                        await self._resubscribe()
+                except Exception:
+                    logger.exception("Game update reader failed to resubscribe")
+                continue
+            if message and message.get("type") == "message":
+                self.dispatch(message["channel"], message["data"])
+
+
+game_update_hub = GameUpdateHub()
@@ -0,0 +1,160 @@
+"""Benchmark chat moderation on large wordlists and long messages.
+
+Compares the previous per-term matcher (kept here as a reference) with the
+precompiled wordlist in app.moderation.filter, and checks that both censor
+every generated message identically.
+
+    PYTHONPATH=. python scripts/benchmark_moderation_filter.py --terms 1000 --words 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import re
+import string
+import tempfile
+import time
+
+from app.moderation.filter import (
+    FilterResult,
+    _asterisk_replacement,
+    _iter_candidate_spans,
+    filter_message,
+    normalize_message,
+    normalize_token,
+    reload_wordlist,
+)
+
+LEET_SWAPS = {"a": "4", "e": "3", "i": "1", "o": "0", "s": "$", "t": "7"}
+SEPARATORS = (" ", ".", "-", "_", "*")
+
+
+def _legacy_match_term_in_token(token: str, term: str) -> bool:
+    normalized_token = normalize_token(token)
+    normalized_term = normalize_token(term)
+    if not normalized_token or not normalized_term:
+        return False
+    if normalized_token == normalized_term:
+        return True
+    return len(normalized_term) >= 4 and normalized_term in normalized_token
+
+
+def _legacy_match_spaced_term(message: str, term: str) -> list[tuple[int, int]]:
+    normalized_term = normalize_token(term)
+    if len(normalized_term) < 3:
+        return []
+    pattern = r"\b" + r"[\W_]*".join(re.escape(char) for char in normalized_term) + r"\b"
+    return [(match.start(), match.end()) for match in re.finditer(pattern, message, flags=re.IGNORECASE)]
+
+
+def legacy_filter_message(message: str, blocked_terms: list[str]) -> FilterResult:
+    matched_terms: list[str] = []
+    replacements: list[tuple[int, int, str]] = []
+
+    for start, end, token in _iter_candidate_spans(message):
+        for term in blocked_terms:
+            if _legacy_match_term_in_token(token, term):
+                matched_terms.append(term)
+                replacements.append((start, end, _asterisk_replacement(token)))
+                break
+
+    for term in blocked_terms:
+        for start, end in _legacy_match_spaced_term(message, term):
+            if any(not (end <= existing_start or start >= existing_end) for existing_start, existing_end, _ in replacements):
+                continue
+            matched_terms.append(term)
+            replacements.append((start, end, _asterisk_replacement(message[start:end])))
+
+    if not replacements:
+        compact = normalize_message(message)
+        for term in blocked_terms:
+            normalized_term = normalize_token(term)
+            if normalized_term and normalized_term in compact:
+                matched_terms.append(term)
+                replacements.append((0, len(message), _asterisk_replacement(message)))
+                break
+
+    if not replacements:
+        return FilterResult(censored_message=message, matched_terms=[], had_match=False)
+
+    censored = message
+    for start, end, masked in sorted(replacements, key=lambda item: item[0], reverse=True):
+        censored = censored[:start] + masked + censored[end:]
+    return FilterResult(censored_message=censored, matched_terms=sorted(set(matched_terms)), had_match=True)
+
+
+def build_wordlist(count: int, rng: random.Random) -> list[str]:
+    return ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(count)]
+
+
+def _obfuscate(term: str, rng: random.Random) -> str:
+    style = rng.randrange(4)
+    if style == 0:
+        return "".join(LEET_SWAPS.get(char, char) if rng.random() < 0.5 else char for char in term)
+    if style == 1:
+        return rng.choice(SEPARATORS).join(term)
+    if style == 2:
+        return term.upper()
+    return rng.choice(("x", "my", "")) + term + rng.choice(("s", "er", ""))
+
+
+def build_message(terms: list[str], words: int, hit_rate: float, rng: random.Random) -> str:
+    parts = []
+    for _ in range(words):
+        if terms and rng.random() < hit_rate:
+            parts.append(_obfuscate(rng.choice(terms), rng))
+        else:
+            parts.append("".join(rng.choices(string.ascii_lowercase + "0123456789!?.,", k=rng.randint(1, 8))))
+    return " ".join(parts)
+
+
+def run(term_count: int, words: int, messages: int, hit_rate: float, seed: int) -> None:
+    rng = random.Random(seed)
+    terms = build_wordlist(term_count, rng)
+    samples = [build_message(terms, words, hit_rate, rng) for _ in range(messages)]
+
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as handle:
+        json.dump({"blocked_terms": terms}, handle)
+        path = handle.name
+
+    try:
+        reload_wordlist()
+        started = time.perf_counter()
+        filter_message("", wordlist_path=path)
+        print(f"{'compile wordlist (once)':<30} {(time.perf_counter() - started) * 1000:9.2f} ms")
+
+        started = time.perf_counter()
+        legacy = [legacy_filter_message(message, terms) for message in samples]
+        legacy_time = (time.perf_counter() - started) / messages
+        print(f"{'legacy per-term matcher':<30} {legacy_time * 1000:9.2f} ms / message")
+
+        started = time.perf_counter()
+        compiled = [filter_message(message, wordlist_path=path) for message in samples]
+        compiled_time = (time.perf_counter() - started) / messages
+        print(f"{'precompiled automaton':<30} {compiled_time * 1000:9.2f} ms / message")
+    finally:
+        os.unlink(path)
+        reload_wordlist()
+
+    mismatches = sum(old != new for old, new in zip(legacy, compiled))
+    print(f"speedup: {legacy_time / compiled_time:.2f}x")
+    print(f"messages censored differently: {mismatches} of {messages}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--terms", type=int, default=1000, help="blocked terms in the wordlist")
+    parser.add_argument("--words", type=int, default=200, help="words per message")
+    parser.add_argument("--messages", type=int, default=10, help="messages to average over")
+    parser.add_argument("--hit-rate", type=float, default=0.05, help="share of words that are obfuscated terms")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(f"{args.terms} terms, {args.messages} messages of {args.words} words")
+    run(args.terms, args.words, args.messages, args.hit_rate, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Benchmark per-attack move-effect lookups against the seeded move catalog.
+
+Compares the previous effect-list scanning (kept here as a reference) with the
+compiled programs from app.move_effects, asking the questions one attack asks
+about its move: the effect-token checks, crit/OHKO/fixed-damage/multi-hit
+lookups, and the effect list process_move_effects walks.
+
+    PYTHONPATH=. python scripts/benchmark_move_effects.py --attacks 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import random
+import time
+
+from app.catalog_records import MoveRecord, freeze
+from app.engine.moves import (
+    get_scaling_hit_powers,
+    move_has_effect_token,
+    move_has_high_crit_ratio,
+    move_has_revive_effect,
+    move_has_target_fixed_damage_effect,
+    move_is_instant_ko,
+    move_uses_separate_hit_accuracy,
+)
+from app.move_effects import clear_move_programs, move_program
+
+MOVES_DIR = os.path.join(os.path.dirname(__file__), "../seed/moves")
+
+# Tokens the attack path checks with move_has_effect_token.
+ATTACK_TOKENS = (
+    "guaranteed_crit",
+    "guaranteed_crit",
+    "target:ignore_stat_changes",
+    "target:fixed_damage:last_damage_received",
+    "self:use_best_offense",
+    "self:modify_move_type_by_terrain",
+    "self:ignore_fairy_immunity",
+    "requires:target_terrain:active",
+    "requires:target:held_item",
+    "requires:held_item:berry",
+    "ignore_redirect",
+    "destroy_terrain:target",
+)
+
+
+def legacy_has_effect_token(move, token):
+    if not move or not isinstance(move.effects, list):
+        return False
+    target = str(token or "").strip().lower()
+    for effect in move.effects:
+        if str(effect or "").strip().lower() == target:
+            return True
+    return False
+
+
+def legacy_has_high_crit_ratio(move):
+    if not move or not isinstance(move.effects, list):
+        return False
+    for effect in move.effects:
+        token = str(effect or "").strip().lower()
+        if token == "high_crit_ratio" or token.endswith(":high_crit_ratio"):
+            return True
+    return False
+
+
+def legacy_is_instant_ko(move):
+    if not move or not isinstance(move.effects, list):
+        return False
+    for effect in move.effects:
+        if ":instant_ko" in str(effect or "").strip().lower():
+            return True
+    return False
+
+
+def legacy_has_fixed_damage(move):
+    if not move or not isinstance(move.effects, list):
+        return False
+    for effect in move.effects:
+        if str(effect or "").strip().lower().startswith("target:fixed_damage:"):
+            return True
+    return False
+
+
+def legacy_has_revive(move):
+    if not move or not isinstance(move.effects, list):
+        return False
+    for effect in move.effects:
+        parts = str(effect or "").strip().lower().split(":")
+        if len(parts) >= 2 and parts[0] == "target" and parts[1] == "revive":
+            return True
+    return False
+
+
+def legacy_scaling_hit_powers(move):
+    if not move or not isinstance(move.effects, list):
+        return None
+    for effect in move.effects:
+        parts = str(effect or "").strip().lower().split(":")
+        if len(parts) >= 3 and parts[0] == "multi_hit" and parts[1] == "scaling":
+            powers = []
+            for token in parts[2].split(","):
+                try:
+                    powers.append(int(token))
+                except ValueError:
+                    continue
+            return powers or None
+    return None
+
+
+def legacy_separate_hit_accuracy(move):
+    if not move or not isinstance(move.effects, list):
+        return False
+    for effect in move.effects:
+        parts = str(effect or "").strip().lower().split(":")
+        if len(parts) >= 4 and parts[0] == "multi_hit" and parts[1] == "scaling" and parts[3] == "separate_accuracy":
+            return True
+    return False
+
+
+def legacy_effect_walk(move):
+    walked = []
+    for effect_str in move.effects or []:
+        raw_token = str(effect_str or "").strip()
+        token_lower = raw_token.lower()
+        parts = raw_token.split(":")
+        walked.append((raw_token, token_lower, parts))
+    return len(walked)
+
+
+def legacy_attack(move):
+    answers = [legacy_has_effect_token(move, token) for token in ATTACK_TOKENS]
+    answers.append(legacy_has_high_crit_ratio(move))
+    answers.append(legacy_is_instant_ko(move))
+    answers.append(legacy_has_fixed_damage(move))
+    answers.append(legacy_has_revive(move))
+    answers.append(legacy_separate_hit_accuracy(move))
+    answers.append(legacy_scaling_hit_powers(move))
+    answers.append(legacy_effect_walk(move))
+    return answers
+
+
+def program_attack(move):
+    answers = [move_has_effect_token(move, token) for token in ATTACK_TOKENS]
+    answers.append(move_has_high_crit_ratio(move))
+    answers.append(move_is_instant_ko(move))
+    answers.append(move_has_target_fixed_damage_effect(move))
+    answers.append(move_has_revive_effect(move))
+    answers.append(move_uses_separate_hit_accuracy(move))
+    answers.append(get_scaling_hit_powers(move))
+    answers.append(len(move_program(move).on_use))
+    return answers
+
+
+def load_moves() -> list[MoveRecord]:
+    moves = []
+    for path in sorted(glob.glob(os.path.join(MOVES_DIR, "*.json"))):
+        with open(path, encoding="utf-8") as handle:
+            data = json.load(handle)
+        moves.append(MoveRecord(**{field: freeze(data.get(field)) for field in MoveRecord.__dataclass_fields__}))
+    return moves
+
+
+def run(attack_count: int, seed: int) -> None:
+    moves = load_moves()
+    rng = random.Random(seed)
+    attacks = [rng.choice(moves) for _ in range(attack_count)]
+    print(f"{len(moves)} moves, {attack_count} attacks")
+
+    def time_it(label, fn):
+        started = time.perf_counter()
+        results = [fn(move) for move in attacks]
+        elapsed = time.perf_counter() - started
+        print(f"{label:<34} {elapsed / attack_count * 1e6:9.2f} us / attack")
+        return results, elapsed
+
+    legacy, legacy_time = time_it("legacy effect scanning", legacy_attack)
+
+    clear_move_programs()
+    started = time.perf_counter()
+    for move in moves:
+        move_program(move)
+    compile_time = time.perf_counter() - started
+    print(f"{'compile (once per catalog build)':<34} {compile_time * 1000:9.2f} ms")
+
+    compiled, compiled_time = time_it("compiled programs", program_attack)
+
+    # The walk counts differ by design: programs skip ops no branch handles.
+    mismatches = sum(1 for old, new in zip(legacy, compiled) if old[:-1] != new[:-1])
+    walked_before = sum(old[-1] for old in legacy)
+    walked_after = sum(new[-1] for new in compiled)
+    print(f"speedup: {legacy_time / compiled_time:.2f}x")
+    print(f"effects walked by process_move_effects: {walked_before} -> {walked_after}")
+    print(f"attacks with differing answers: {mismatches}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attacks", type=int, default=20000, help="attacks to simulate")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    run(args.attacks, args.seed)
+
+
+if __name__ == "__main__":
+    main()
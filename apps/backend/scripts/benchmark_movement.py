@@ -0,0 +1,150 @@
+"""Benchmark turn-start movement range computation on large synthetic maps.
+
+Compares the previous FIFO search (kept here as a reference) with the
+cheapest-path engine in app.map_movement running on a map graph built once
+and reused for every unit, which is how compute_turn_locks uses it.
+
+    PYTHONPATH=. python scripts/benchmark_movement.py --size 64 --units 40
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from collections import deque
+
+from app.map_movement import (
+    IMPOSSIBLE_MOVEMENT_COST,
+    build_movement_cost_grid,
+    build_movement_graph,
+    can_enter_tile,
+    is_valid_movement_destination,
+    movement_range_with_terrain,
+)
+
+SPECIAL_TILE_WEIGHTS = (
+    (None, 70),
+    ("grass", 10),
+    ("sand", 6),
+    ("stump", 3),
+    ("water", 5),
+    ("rock", 3),
+    ("ledge_down", 1),
+    ("ledge_right", 1),
+    ("impassable", 1),
+)
+
+UNIT_TYPE_CHOICES = ({"normal"}, {"fire"}, {"water"}, {"flying"}, {"ground"}, {"rock"})
+
+
+def legacy_fifo_range(start, rng, movement_costs, special_tiles, width, height, unit_types, blocked_tiles):
+    sx, sy = start
+    seen = set()
+    out = []
+    q = deque([(sx, sy, 0)])
+    while q:
+        x, y, c = q.popleft()
+        if (x, y) in seen:
+            continue
+        seen.add((x, y))
+        if is_valid_movement_destination(special_tiles, x, y, unit_types):
+            out.append([x, y])
+        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < width and 0 <= ny < height):
+                continue
+            if (nx, ny) in blocked_tiles or (nx, ny) in seen:
+                continue
+            if not can_enter_tile(special_tiles, x, y, nx, ny, unit_types):
+                continue
+            step_cost = movement_costs[ny][nx]
+            if step_cost >= IMPOSSIBLE_MOVEMENT_COST:
+                continue
+            if c + step_cost <= rng:
+                q.append((nx, ny, c + step_cost))
+    return out
+
+
+def build_map(size: int, rng: random.Random):
+    tiles, weights = zip(*SPECIAL_TILE_WEIGHTS)
+    special = [[rng.choices(tiles, weights)[0] for _ in range(size)] for _ in range(size)]
+    base = [[1] * size for _ in range(size)]
+    return base, special
+
+
+def build_units(count: int, size: int, rng: random.Random):
+    units = []
+    for _ in range(count):
+        units.append(
+            {
+                "start": (rng.randrange(size), rng.randrange(size)),
+                "range": rng.randint(3, 8),
+                "types": rng.choice(UNIT_TYPE_CHOICES),
+            }
+        )
+    return units
+
+
+def run(size: int, unit_count: int, rounds: int, seed: int) -> None:
+    rng = random.Random(seed)
+    base, special = build_map(size, rng)
+    units = build_units(unit_count, size, rng)
+    blocked = {unit["start"] for unit in units}
+    cost_grids = [build_movement_cost_grid(base, special, unit["types"]) for unit in units]
+
+    def time_it(label, fn):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            results = fn()
+        elapsed = (time.perf_counter() - started) / rounds
+        print(f"{label:<34} {elapsed * 1000:9.2f} ms / turn start")
+        return results, elapsed
+
+    legacy, legacy_time = time_it(
+        "legacy FIFO search",
+        lambda: [
+            legacy_fifo_range(u["start"], u["range"], costs, special, size, size, u["types"], blocked - {u["start"]})
+            for u, costs in zip(units, cost_grids)
+        ],
+    )
+
+    started = time.perf_counter()
+    graph = build_movement_graph(special, size, size)
+    build_time = time.perf_counter() - started
+    print(f"{'graph build (once per map)':<34} {build_time * 1000:9.2f} ms")
+
+    dijkstra, dijkstra_time = time_it(
+        "dijkstra on cached map graph",
+        lambda: [
+            movement_range_with_terrain(
+                u["start"], u["range"], costs, special, size, size, u["types"], None, blocked - {u["start"]},
+                graph=graph,
+            )
+            for u, costs in zip(units, cost_grids)
+        ],
+    )
+
+    gained = sum(
+        len({tuple(t) for t in new} - {tuple(t) for t in old}) for new, old in zip(dijkstra, legacy)
+    )
+    lost = sum(
+        len({tuple(t) for t in old} - {tuple(t) for t in new}) for new, old in zip(dijkstra, legacy)
+    )
+    print(f"speedup: {legacy_time / dijkstra_time:.2f}x")
+    print(f"tiles the FIFO search wrongly rejected: {gained}; tiles only FIFO allowed: {lost}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=64, help="map width and height")
+    parser.add_argument("--units", type=int, default=40, help="units per turn start")
+    parser.add_argument("--rounds", type=int, default=20, help="turn starts to average over")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(f"{args.size}x{args.size} map, {args.units} units, {args.rounds} rounds")
+    run(args.size, args.units, args.rounds, args.seed)
+
+
+if __name__ == "__main__":
+    main()
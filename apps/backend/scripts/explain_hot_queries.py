@@ -0,0 +1,236 @@
+"""Print query plans for the hot game queries on a seeded large dataset.
+
+Seeds a scratch database with many games, players and units, then EXPLAINs
+the lookups the game handlers and the turn scheduler run on every request
+(see ``HOT_QUERIES``) and flags any that scan a whole hot table instead of
+using an index. ``docs/query_plans.md`` is the checked-in output.
+
+    PYTHONPATH=. python scripts/explain_hot_queries.py
+    PYTHONPATH=. python scripts/explain_hot_queries.py --database-url postgresql://.../scratch
+
+The database must be empty: the seed adds tens of thousands of rows. The
+default is an in-memory SQLite database; on PostgreSQL the tables are
+ANALYZEd after seeding so the planner sees the real row counts.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from sqlalchemy import Engine, create_engine, func, insert, select, text
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.sql import Select
+
+from app.db.models import Base, Game, GamePlayer, GameState, GameStatus, GameUnit, Map, Unit, User
+
+HOT_TABLES = ("game_units", "game_players", "game_status")
+
+# Each query gets (game_id, user_id, x, y) of one seeded game.
+HOT_QUERIES: dict[str, Callable[[int, int, int, int], Select]] = {
+    "units of a player": lambda game_id, user_id, x, y: select(GameUnit).where(
+        GameUnit.game_id == game_id, GameUnit.user_id == user_id
+    ),
+    "movable units of a player": lambda game_id, user_id, x, y: select(GameUnit).where(
+        GameUnit.game_id == game_id,
+        GameUnit.user_id == user_id,
+        GameUnit.can_move == True,  # noqa: E712
+    ),
+    "living units": lambda game_id, user_id, x, y: select(GameUnit).where(
+        GameUnit.game_id == game_id,
+        GameUnit.is_fainted == False,  # noqa: E712
+        GameUnit.current_hp > 0,
+    ),
+    "units left to faint": lambda game_id, user_id, x, y: select(GameUnit).where(
+        GameUnit.game_id == game_id,
+        GameUnit.current_hp <= 0,
+        GameUnit.is_fainted == False,  # noqa: E712
+    ),
+    "unit on a tile": lambda game_id, user_id, x, y: select(GameUnit).where(
+        GameUnit.game_id == game_id, GameUnit.current_x == x, GameUnit.current_y == y
+    ),
+    "players of a game": lambda game_id, user_id, x, y: select(GamePlayer).where(GamePlayer.game_id == game_id),
+    "player in a game": lambda game_id, user_id, x, y: select(GamePlayer).where(
+        GamePlayer.game_id == game_id, GamePlayer.player_id == user_id
+    ),
+    "state of a game": lambda game_id, user_id, x, y: select(GameState).where(GameState.game_id == game_id),
+    "due turn deadlines": lambda game_id, user_id, x, y: select(
+        Game.id, Game.turn_seconds, GameState.turn_deadline
+    )
+    .join(GameState, GameState.game_id == Game.id)
+    .where(GameState.status == GameStatus.in_progress, GameState.turn_deadline.isnot(None)),
+    "open lobby games": lambda game_id, user_id, x, y: select(Game.id, Game.link, GameState.status)
+    .join(GameState, GameState.game_id == Game.id)
+    .where(GameState.status == GameStatus.open, Game.is_private == False)  # noqa: E712
+    .order_by(Game.timestamp.desc(), Game.id.desc())
+    .limit(25),
+}
+
+
+def seed(engine: Engine, games: int = 2000, players: int = 2, units_per_player: int = 6, seed: int = 0) -> tuple:
+    """Fill the game tables; returns (game_id, user_id, x, y) of a game in progress."""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    # Most games are finished, as in production, so a status filter is selective.
+    statuses = [GameStatus.completed] * 8 + [GameStatus.in_progress, GameStatus.open]
+
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [
+                {"id": user_id, "username": f"player{user_id}", "email": f"player{user_id}@example.com", "hashed_password": "x"}
+                for user_id in range(1, games * players + 1)
+            ],
+        )
+        conn.execute(insert(Map).values(id=1, name="plan map", width=32, height=32, tile_data={}))
+        conn.execute(
+            insert(Unit).values(
+                id=1, species_id=1, name="unit", species="unit", asset_folder="unit", types=[], base_stats={}
+            )
+        )
+        game_rows, state_rows, player_rows, unit_rows = [], [], [], []
+        for game_id in range(1, games + 1):
+            user_ids = [(game_id - 1) * players + offset for offset in range(1, players + 1)]
+            status = rng.choice(statuses)
+            game_rows.append(
+                {
+                    "id": game_id,
+                    "game_name": f"game {game_id}",
+                    "map_id": 1,
+                    "map_name": "plan map",
+                    "host_id": user_ids[0],
+                    "link": f"plan-{game_id}",
+                    "is_private": rng.random() < 0.5,
+                    "timestamp": now - timedelta(minutes=game_id),
+                }
+            )
+            state_rows.append(
+                {
+                    "game_id": game_id,
+                    "current_turn": rng.randint(1, 40),
+                    "status": status,
+                    "players": user_ids,
+                    "turn_deadline": now + timedelta(seconds=300) if status == GameStatus.in_progress else None,
+                }
+            )
+            for user_id in user_ids:
+                player_rows.append({"game_id": game_id, "player_id": user_id, "cash_remaining": 0, "game_units": []})
+                for _ in range(units_per_player):
+                    x, y = rng.randrange(32), rng.randrange(32)
+                    unit_rows.append(
+                        {
+                            "game_id": game_id,
+                            "unit_id": 1,
+                            "user_id": user_id,
+                            "starting_x": x,
+                            "starting_y": y,
+                            "current_x": x,
+                            "current_y": y,
+                            "current_hp": rng.choice((0, rng.randint(1, 200))),
+                            "current_stats": {},
+                        }
+                    )
+        conn.execute(insert(Game), game_rows)
+        conn.execute(insert(GameState), state_rows)
+        conn.execute(insert(GamePlayer), player_rows)
+        conn.execute(insert(GameUnit), unit_rows)
+
+        if engine.dialect.name == "postgresql":
+            for table in ("games", *HOT_TABLES):
+                conn.execute(text(f"ANALYZE {table}"))
+        elif engine.dialect.name == "sqlite":
+            conn.execute(text("ANALYZE"))
+
+        game_id = conn.execute(
+            select(GameState.game_id).where(GameState.status == GameStatus.in_progress).limit(1)
+        ).scalar_one()
+        unit = conn.execute(select(GameUnit).where(GameUnit.game_id == game_id).limit(1)).one()
+        return game_id, unit.user_id, unit.current_x, unit.current_y
+
+
+def explain(engine: Engine, statement: Select) -> list[str]:
+    compiled = str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            return [row[3] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))]
+        return [row[0] for row in conn.execute(text(f"EXPLAIN {compiled}"))]
+
+
+def sequential_scans(plan: list[str], tables=HOT_TABLES) -> list[str]:
+    """Plan lines that read a whole hot table."""
+    scans = []
+    for line in plan:
+        step = line.strip().removeprefix("->").strip()
+        for table in tables:
+            # SQLite: "SCAN game_units" (an index scan reads "... USING INDEX");
+            # PostgreSQL: "Seq Scan on game_units  (cost=...)".
+            if step == f"SCAN {table}" or step.split("  ")[0] == f"Seq Scan on {table}":
+                scans.append(step)
+    return scans
+
+
+def explain_hot_queries(engine: Engine, params: tuple) -> dict[str, list[str]]:
+    return {name: explain(engine, build(*params)) for name, build in HOT_QUERIES.items()}
+
+
+def format_report(engine: Engine, plans: dict[str, list[str]], row_counts: dict[str, int]) -> str:
+    lines = [
+        "# Query plans for the hot game queries",
+        "",
+        f"Generated by `scripts/explain_hot_queries.py` on {engine.dialect.name}.",
+        "Rows: " + ", ".join(f"{table} {count}" for table, count in row_counts.items()) + ".",
+        "",
+    ]
+    for name, plan in plans.items():
+        scans = sequential_scans(plan)
+        lines.append(f"## {name}" + (" (SEQUENTIAL SCAN)" if scans else ""))
+        lines.append("")
+        lines.append("```")
+        lines.extend(plan)
+        lines.append("```")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite://", help="scratch database (default: in-memory SQLite)")
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--output", help="write the report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    if args.database_url.startswith("sqlite"):
+        engine = create_engine(args.database_url, poolclass=StaticPool, connect_args={"check_same_thread": False})
+    else:
+        engine = create_engine(args.database_url)
+    Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        if conn.execute(select(func.count()).select_from(Game)).scalar_one():
+            print("Refusing to seed a database that already has games; use a scratch database.", file=sys.stderr)
+            return 2
+
+    params = seed(engine, games=args.games)
+    plans = explain_hot_queries(engine, params)
+    with engine.connect() as conn:
+        row_counts = {
+            table: conn.execute(text(f"SELECT count(*) FROM {table}")).scalar_one() for table in HOT_TABLES
+        }
+    report = format_report(engine, plans, row_counts)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(report)
+    else:
+        print(report)
+
+    slow = [name for name, plan in plans.items() if sequential_scans(plan)]
+    if slow:
+        print("Sequential scans in: " + ", ".join(slow), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
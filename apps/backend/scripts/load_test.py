@@ -0,0 +1,565 @@
+"""Load-test the games API by playing full matches with concurrent clients.
+
+Each simulated match registers two players, creates a Conquest game on an
+official map, joins and starts it, places rosters on the players' spawn
+points, readies up and then plays turns through ``/move``, ``/execute_move``,
+``/wait`` and ``/end_turn`` until the game completes or ``--max-turns`` is
+reached. Every player also keeps ``--sockets`` game WebSockets open for the
+whole match.
+
+Turns are played by one of two policies:
+
+* ``scripted``: walk each unit to the legal tile nearest an enemy and use an
+  adjacent attack when one is in reach, otherwise wait;
+* ``random``: a random legal tile and a random adjacent attack.
+
+The report gives p50/p95/p99 latency and the error count per endpoint, SQL
+queries per request (from the ``X-Query-Count`` response header, sent when the
+server runs with ``REQUEST_METRICS_HEADERS=1``, see ``app.instrumentation``)
+and completed matches per minute.
+
+    # Against a running server, with its own database and Redis:
+    PYTHONPATH=. python scripts/load_test.py --base-url http://localhost:8000 --matches 20 --concurrency 10
+
+    # Serve the app in this process on a local database and Redis:
+    PYTHONPATH=. python scripts/load_test.py --serve --database-url sqlite:///./loadtest.db \\
+        --redis-url redis://localhost:6379/1 --matches 20 --concurrency 10
+
+    # ... or on an in-memory Redis stand-in (pip install "fakeredis[lua]"):
+    PYTHONPATH=. python scripts/load_test.py --serve --redis-url fake:// --matches 5
+
+``--serve`` creates the schema and seeds the catalogs and official maps from
+``seed/`` when they are missing.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import secrets
+import socket
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+
+import httpx
+
+SESSION_COOKIE = "session_user"
+GAMEMODE = "Conquest"
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.queries: dict[str, list[int]] = defaultdict(list)
+        self.errors: Counter[str] = Counter()
+        self.matches = Counter()
+        self.socket_counts = Counter()
+
+    def record(self, endpoint: str, seconds: float, status_code: int, queries: int | None) -> None:
+        self.latencies[endpoint].append(seconds)
+        if status_code >= 400:
+            self.errors[endpoint] += 1
+        if queries is not None:
+            self.queries[endpoint].append(queries)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(stats: Stats, elapsed: float) -> dict:
+    endpoints = {}
+    for endpoint in sorted(stats.latencies):
+        latencies = stats.latencies[endpoint]
+        queries = stats.queries.get(endpoint) or []
+        endpoints[endpoint] = {
+            "count": len(latencies),
+            "errors": stats.errors[endpoint],
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "queries_per_request": sum(queries) / len(queries) if queries else None,
+        }
+    completed = stats.matches["completed"]
+    return {
+        "elapsed_seconds": elapsed,
+        "endpoints": endpoints,
+        "matches": dict(stats.matches),
+        "matches_per_minute": completed / (elapsed / 60) if elapsed > 0 else 0.0,
+        "websockets": dict(stats.socket_counts),
+    }
+
+
+def format_report(summary: dict) -> str:
+    lines = [
+        f"{'endpoint':<40} {'count':>7} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}"
+    ]
+    for endpoint, row in summary["endpoints"].items():
+        queries = row["queries_per_request"]
+        lines.append(
+            f"{endpoint:<40} {row['count']:>7} {row['errors']:>7} {row['p50_ms']:>9.1f} "
+            f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {'-' if queries is None else f'{queries:.1f}':>8}"
+        )
+    matches = summary["matches"]
+    lines.append("")
+    lines.append(
+        f"matches: {matches.get('completed', 0)} completed, {matches.get('turn_cap', 0)} hit the turn cap, "
+        f"{matches.get('failed', 0)} failed in {summary['elapsed_seconds']:.1f}s "
+        f"({summary['matches_per_minute']:.2f} completed/min)"
+    )
+    sockets = summary["websockets"]
+    lines.append(
+        f"websockets: {sockets.get('connected', 0)} connected, {sockets.get('messages', 0)} messages, "
+        f"{sockets.get('errors', 0)} errors"
+    )
+    return "\n".join(lines)
+
+
+def session_cookie(response: httpx.Response) -> str | None:
+    # The cookie is Secure, so an http:// client jar would never send it back.
+    for header in response.headers.get_list("set-cookie"):
+        name, _, rest = header.partition("=")
+        if name.strip() == SESSION_COOKIE:
+            return rest.split(";", 1)[0]
+    return None
+
+
+class Player:
+    def __init__(self, client: httpx.AsyncClient, stats: Stats, username: str):
+        self.client = client
+        self.stats = stats
+        self.username = username
+        self.user_id: int | None = None
+        self.cookie: str | None = None
+
+    async def call(self, endpoint: str, method: str, path: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self.client.request(method, path, **kwargs)
+        elapsed = time.perf_counter() - started
+        raw_queries = response.headers.get("x-query-count")
+        self.stats.record(endpoint, elapsed, response.status_code, int(raw_queries) if raw_queries else None)
+        return response
+
+    async def register(self) -> None:
+        response = await self.call(
+            "POST /register",
+            "POST",
+            "/register",
+            json={"username": self.username, "email": f"{self.username}@example.com", "password": "loadtest"},
+        )
+        response.raise_for_status()
+        self.user_id = response.json()["id"]
+        self.cookie = session_cookie(response)
+        self.client.headers["Cookie"] = f"{SESSION_COOKIE}={self.cookie}"
+
+
+def manhattan(a: tuple[int, int], b: tuple[int, int]) -> int:
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def spawn_tiles(map_data: dict, player_number: int) -> list[tuple[int, int]]:
+    spawn_points = (map_data.get("tile_data") or {}).get("spawn_points") or []
+    return [
+        (x, y)
+        for y, row in enumerate(spawn_points)
+        for x, owner in enumerate(row or [])
+        if owner is not None and int(owner) == player_number
+    ]
+
+
+def choose_tile(unit: dict, tiles: list, occupied: set, enemies: list[dict], policy: str, rng: random.Random):
+    here = (unit["current_x"], unit["current_y"])
+    options = [tuple(tile) for tile in tiles if tuple(tile) == here or tuple(tile) not in occupied]
+    if not options:
+        return here
+    if policy == "random" or not enemies:
+        return rng.choice(options)
+    enemy_tiles = [(enemy["current_x"], enemy["current_y"]) for enemy in enemies]
+    return min(options, key=lambda tile: (min(manhattan(tile, enemy) for enemy in enemy_tiles), rng.random()))
+
+
+def choose_attack(unit: dict, enemies: list[dict], moves: dict[int, dict], policy: str, rng: random.Random):
+    """An adjacent enemy-targeting move with PP left and a target for it, or None."""
+    here = (unit["current_x"], unit["current_y"])
+    targets = [enemy for enemy in enemies if manhattan(here, (enemy["current_x"], enemy["current_y"])) == 1]
+    if not targets:
+        return None
+    pp = unit.get("move_pp") or []
+    usable = []
+    for index, move_id in enumerate(unit.get("equipped_move_ids") or []):
+        move = moves.get(move_id)
+        if not move or (index < len(pp) and pp[index] <= 0):
+            continue
+        if str(move.get("range") or "").split(":")[0] != "adjacent" or move.get("targeting") != "enemy":
+            continue
+        usable.append(move)
+    if not usable:
+        return None
+    if policy == "random":
+        return rng.choice(usable), rng.choice(targets)
+    strongest = max(usable, key=lambda move: (move.get("power") or 0, rng.random()))
+    weakest = min(targets, key=lambda enemy: enemy["current_hp"])
+    return strongest, weakest
+
+
+def turn_over(response: httpx.Response) -> bool:
+    # The last unit to act ends the turn (or the game) on the server.
+    if response.status_code != 200:
+        return False
+    body = response.json()
+    return isinstance(body, dict) and bool(body.get("turn_advanced") or body.get("game_completed"))
+
+
+class Match:
+    def __init__(self, index: int, args, stats: Stats, catalog: dict, run_id: str):
+        self.index = index
+        self.args = args
+        self.stats = stats
+        self.catalog = catalog
+        self.rng = random.Random(f"{args.seed}:{index}")
+        self.players = [
+            Player(
+                httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout),
+                stats,
+                f"lt{run_id}m{index}p{number}",
+            )
+            for number in (1, 2)
+        ]
+        self.link: str | None = None
+
+    async def play(self) -> str:
+        try:
+            for player in self.players:
+                await player.register()
+            host, guest = self.players
+            map_data = self.rng.choice(self.catalog["maps"])
+            created = await host.call(
+                "POST /games/create",
+                "POST",
+                "/games/create",
+                json={
+                    "game_name": f"Load test {self.index}",
+                    "map_name": map_data["name"],
+                    "max_players": 2,
+                    "is_private": True,
+                    "gamemode": GAMEMODE,
+                    "starting_cash": self.args.starting_cash,
+                    "unit_limit": self.args.units,
+                    "turn_seconds": 86400,
+                },
+            )
+            created.raise_for_status()
+            game = created.json()
+            self.link = game["link"]
+            (await guest.call("POST /games/join/{id}", "POST", f"/games/join/{game['id']}")).raise_for_status()
+            (await host.call("POST /games/start/{id}", "POST", f"/games/start/{game['id']}")).raise_for_status()
+
+            stop = asyncio.Event()
+            sockets = [
+                asyncio.create_task(self.subscribe(player, stop))
+                for player in self.players
+                for _ in range(self.args.sockets)
+            ]
+            try:
+                for number, player in enumerate(self.players, start=1):
+                    await self.place_roster(player, map_data, number)
+                for player in self.players:
+                    await player.call("POST /games/{link}/player/ready", "POST", f"/games/{self.link}/player/ready")
+                (await host.call("POST /games/start/{id}", "POST", f"/games/start/{game['id']}")).raise_for_status()
+                return await self.play_turns()
+            finally:
+                stop.set()
+                await asyncio.gather(*sockets, return_exceptions=True)
+        finally:
+            for player in self.players:
+                await player.client.aclose()
+
+    async def place_roster(self, player: Player, map_data: dict, number: int) -> None:
+        tiles = spawn_tiles(map_data, number)
+        self.rng.shuffle(tiles)
+        species = list(self.catalog["units"])
+        self.rng.shuffle(species)
+        cash = self.args.starting_cash
+        placed = 0
+        for unit in species:
+            if placed >= self.args.units or not tiles:
+                return
+            if unit["cost"] > cash:
+                continue
+            x, y = tiles[-1]
+            hp = int((2 * int((unit.get("base_stats") or {}).get("hp", 50)) * 50) / 100) + 60
+            response = await player.call(
+                "POST /games/{link}/units/place",
+                "POST",
+                f"/games/{self.link}/units/place",
+                json={"unit_id": unit["id"], "x": x, "y": y, "current_hp": hp, "is_fainted": False},
+            )
+            # A rejected placement (terrain this species cannot stand on) gives up the tile too.
+            tiles.pop()
+            if response.status_code == 200:
+                cash -= unit["cost"]
+                placed += 1
+
+    async def play_turns(self) -> str:
+        by_id = {player.user_id: player for player in self.players}
+        observer = self.players[0]
+        for _ in range(self.args.max_turns):
+            response = await observer.call("GET /games/{link}", "GET", f"/games/{self.link}")
+            response.raise_for_status()
+            game = response.json()
+            if game["status"] == "completed":
+                return "completed"
+            order = game["player_order"]
+            player = by_id[order[(game["current_turn"] or 0) % len(order)]]
+            if await self.take_turn(player):
+                continue
+            # execute_move does not report whether its unit was the last one to act.
+            response = await player.call("GET /games/{link}", "GET", f"/games/{self.link}")
+            after = response.json()
+            if after["status"] != "completed" and after["current_turn"] == game["current_turn"]:
+                await player.call("POST /games/{link}/end_turn", "POST", f"/games/{self.link}/end_turn")
+        return "turn_cap"
+
+    async def take_turn(self, player: Player) -> bool:
+        """Act with every unit that can still move. Returns True once the server has ended the turn."""
+        units = (await player.call("GET /games/{link}/units", "GET", f"/games/{self.link}/units")).json()
+        locks = (await player.call("GET /games/{link}/turnlock", "GET", f"/games/{self.link}/turnlock")).json()
+        occupied = {(unit["current_x"], unit["current_y"]) for unit in units}
+        mine = [unit for unit in units if unit["user_id"] == player.user_id and unit["can_move"]]
+        for unit in mine:
+            enemies = [other for other in units if other["user_id"] != player.user_id and other["current_hp"] > 0]
+            lock = locks.get(str(unit["id"])) or {}
+            here = (unit["current_x"], unit["current_y"])
+            destination = choose_tile(unit, lock.get("tiles") or [], occupied, enemies, self.args.policy, self.rng)
+            if destination != here:
+                response = await player.call(
+                    "POST /games/{link}/move",
+                    "POST",
+                    f"/games/{self.link}/move",
+                    json={"unit_id": unit["id"], "x": destination[0], "y": destination[1]},
+                )
+                if response.status_code == 200:
+                    occupied.discard(here)
+                    occupied.add(destination)
+                    unit["current_x"], unit["current_y"] = destination
+
+            attack = choose_attack(unit, enemies, self.catalog["moves"], self.args.policy, self.rng)
+            if attack is not None:
+                move, target = attack
+                response = await player.call(
+                    "POST /games/{link}/execute_move",
+                    "POST",
+                    f"/games/{self.link}/execute_move",
+                    json={
+                        "unit_id": unit["id"],
+                        "move_id": move["id"],
+                        "target_ids": [target["id"]],
+                        "effect_tiles": [[target["current_x"], target["current_y"]]],
+                    },
+                )
+                if response.status_code == 200:
+                    if turn_over(response):
+                        return True
+                    continue
+            response = await player.call(
+                "POST /games/{link}/wait", "POST", f"/games/{self.link}/wait", json={"unit_id": unit["id"]}
+            )
+            if turn_over(response):
+                return True
+        return False
+
+    async def subscribe(self, player: Player, stop: asyncio.Event) -> None:
+        from websockets.asyncio.client import connect
+
+        url = re.sub(r"^http", "ws", self.args.base_url.rstrip("/")) + f"/api/ws/game/{self.link}"
+        try:
+            async with connect(url, additional_headers={"Cookie": f"{SESSION_COOKIE}={player.cookie}"}) as socket_:
+                self.stats.socket_counts["connected"] += 1
+                while not stop.is_set():
+                    try:
+                        await asyncio.wait_for(socket_.recv(), timeout=0.5)
+                    except asyncio.TimeoutError:
+                        continue
+                    self.stats.socket_counts["messages"] += 1
+        except Exception:
+            self.stats.socket_counts["errors"] += 1
+
+
+async def load_catalog(args, stats: Stats) -> dict:
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+        reader = Player(client, stats, "catalog")
+        maps = (await reader.call("GET /maps/official", "GET", "/maps/official")).json()
+        units = (await reader.call("GET /units/summary", "GET", "/units/summary")).json()
+        moves = (await reader.call("GET /moves/all", "GET", "/moves/all")).json()
+    maps = [
+        map_data
+        for map_data in maps
+        if GAMEMODE in (map_data.get("allowed_modes") or [])
+        and 2 in (map_data.get("allowed_player_counts") or [])
+        and (not args.map or map_data["name"] in args.map)
+        and spawn_tiles(map_data, 1)
+        and spawn_tiles(map_data, 2)
+    ]
+    if not maps:
+        raise SystemExit("No official Conquest map with spawn points for two players; seed the maps first")
+    return {
+        "maps": maps,
+        "units": [unit for unit in units if unit.get("cost") is not None],
+        "moves": {move["id"]: move for move in moves},
+    }
+
+
+async def run(args) -> dict:
+    stats = Stats()
+    catalog = await load_catalog(args, stats)
+    run_id = uuid.uuid4().hex[:8]
+    limit = asyncio.Semaphore(args.concurrency)
+
+    async def one(index: int) -> None:
+        async with limit:
+            try:
+                outcome = await Match(index, args, stats, catalog, run_id).play()
+            except Exception as exc:
+                print(f"match {index} failed: {exc!r}", file=sys.stderr)
+                outcome = "failed"
+            stats.matches[outcome] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(args.matches)))
+    return summarize(stats, time.perf_counter() - started)
+
+
+# ---------------------------------------------------------------------------
+# --serve: run the app in this process
+# ---------------------------------------------------------------------------
+
+
+def redis_factories(url: str):
+    """Sync and asyncio client factories for ``url``; ``fake://`` uses fakeredis on one shared server."""
+    if url.startswith("fake://"):
+        try:
+            import fakeredis
+        except ImportError:
+            raise SystemExit('--redis-url fake:// needs fakeredis: pip install "fakeredis[lua]"')
+        server = fakeredis.FakeServer()
+        return (
+            lambda: fakeredis.FakeRedis(server=server, decode_responses=True),
+            lambda: fakeredis.FakeAsyncRedis(server=server, decode_responses=True),
+        )
+
+    import redis
+    import redis.asyncio as aioredis
+
+    return (
+        lambda: redis.Redis.from_url(url, decode_responses=True),
+        lambda: aioredis.Redis.from_url(url, decode_responses=True),
+    )
+
+
+def bind_redis(url: str) -> None:
+    """Point every app module's ``redis_client`` and the WebSocket hub at ``url``."""
+    import redis
+
+    from app.ws_hub import game_update_hub
+
+    sync_factory, async_factory = redis_factories(url)
+    for name, module in list(sys.modules.items()):
+        if name.startswith("app.") and isinstance(getattr(module, "redis_client", None), redis.Redis):
+            module.redis_client = sync_factory()
+    game_update_hub._client_factory = async_factory
+
+
+def seed_if_empty(engine) -> None:
+    import app.db.models as models
+    from app.db.database import get_sessionmaker
+    from scripts.seed_catalog import CATALOGS, refresh_catalogs
+
+    models.Base.metadata.create_all(bind=engine)
+    db = get_sessionmaker()()
+    try:
+        missing = db.query(models.Map).filter(models.Map.is_official.is_(True)).first() is None
+        missing = missing or db.query(models.Unit).first() is None
+    finally:
+        db.close()
+    if missing:
+        print("Seeding catalogs and official maps...", file=sys.stderr)
+        with contextlib.redirect_stdout(io.StringIO()):
+            refresh_catalogs(list(CATALOGS), refresh=False)
+
+
+def serve(database_url: str, redis_url: str) -> str:
+    """Start the app with uvicorn on a free local port and return its base URL."""
+    os.environ.setdefault("SESSION_SECRET", secrets.token_urlsafe(32))
+    os.environ["SKIP_STARTUP_TASKS"] = "1"
+    os.environ.setdefault("REQUEST_METRICS_HEADERS", "1")
+
+    import uvicorn
+
+    from app.db import database
+    from app.main import app
+
+    connect_args = {"check_same_thread": False, "timeout": 30} if database_url.startswith("sqlite") else {}
+    engine = database.configure_engine(database_url, connect_args=connect_args)
+    bind_redis(redis_url)
+    seed_if_empty(engine)
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.monotonic() + 30
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise SystemExit("Server did not start")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--serve", action="store_true", help="run the app in this process instead")
+    parser.add_argument("--database-url", default="sqlite:///./loadtest.db", help="with --serve")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/0", help="with --serve; fake:// for fakeredis")
+    parser.add_argument("--matches", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=5, help="matches played at once")
+    parser.add_argument("--sockets", type=int, default=1, help="game WebSockets per player")
+    parser.add_argument("--policy", choices=("scripted", "random"), default="scripted")
+    parser.add_argument("--max-turns", type=int, default=60)
+    parser.add_argument("--units", type=int, default=3, help="roster size per player")
+    parser.add_argument("--starting-cash", type=int, default=5000)
+    parser.add_argument("--map", action="append", help="restrict to this official map (repeatable)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report as JSON to this path")
+    args = parser.parse_args()
+
+    if args.serve:
+        args.base_url = serve(args.database_url, args.redis_url)
+
+    summary = asyncio.run(run(args))
+    print(format_report(summary))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
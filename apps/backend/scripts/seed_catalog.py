@@ -7,7 +7,9 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 
+from app.catalog import bump_catalog_version
 from scripts import seed_moves, seed_official_maps, seed_units, seed_items, seed_abilities
+from scripts.seed_engine import SeedReport
 
 CATALOGS = {
     "maps": ("Official maps", seed_official_maps.load_maps),
@@ -39,11 +41,24 @@ def parse_catalogs(raw: str) -> list[str]:
     return ordered
 
 
-def refresh_catalogs(catalogs: list[str], *, refresh: bool = True) -> None:
+def refresh_catalogs(catalogs: list[str], *, refresh: bool = True) -> list[SeedReport]:
+    reports: list[SeedReport] = []
     for name in catalogs:
         label, loader = CATALOGS[name]
         print(f"\n=== Seeding {label} ===")
-        loader(refresh=refresh)
+        report = loader(refresh=refresh)
+        if report is not None:
+            reports.append(report)
+
+    if reports:
+        print("\n=== Seed summary ===")
+        for report in reports:
+            print(report.summary())
+
+    version = bump_catalog_version()
+    if version is not None:
+        print(f"\n=== Catalog cache version is now {version} ===")
+    return reports
 
 
 def ensure_bootstrap_admin_account() -> None:
@@ -0,0 +1,197 @@
+"""Bulk upsert engine behind the ``seed_*`` catalog loaders.
+
+A refresh used to parse every seed file, run one or two SELECTs per record to
+find the existing row and rewrite all of its columns, even when nothing had
+changed. ``seed_catalog_files`` instead:
+
+* parses the files (and builds each record's fields) in worker processes once
+  there are enough of them to be worth it;
+* reads the seeded columns of the whole table in one SELECT and compares a
+  content hash of each record with the hash of its current row, so unchanged
+  rows are not written at all;
+* writes new and changed rows with one bulk ``INSERT ... ON CONFLICT (id) DO
+  UPDATE`` per catalog, in a single transaction.
+
+Records are matched to rows by id first and then by the catalog's natural key
+(name or slug), as the per-record loaders did; a row found by natural key
+keeps its id. Rows that exist but differ are only rewritten with
+``refresh=True``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+from sqlalchemy import insert as core_insert
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app.db.database import get_sessionmaker
+
+# Below this many files, process start-up costs more than parsing serially.
+PARALLEL_PARSE_MIN_FILES = 64
+PARSE_WORKERS = min(8, os.cpu_count() or 1)
+
+FieldsFromData = Callable[[dict], dict]
+
+
+@dataclass
+class SeedReport:
+    catalog: str
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    def summary(self) -> str:
+        return f"{self.catalog}: {self.inserted} inserted, {self.updated} updated, {self.unchanged} unchanged"
+
+
+def iter_seed_files(directory: str, *, recursive: bool = False) -> list[str]:
+    """JSON seed files under ``directory`` in a stable order."""
+    if not recursive:
+        return sorted(
+            os.path.join(directory, filename) for filename in os.listdir(directory) if filename.endswith(".json")
+        )
+    return sorted(
+        os.path.join(root, filename)
+        for root, _, filenames in os.walk(directory)
+        for filename in filenames
+        if filename.endswith(".json")
+    )
+
+
+def _canonical(value):
+    # Float columns hand back 1.0 for a seed's 1; hash both the same way.
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    return value
+
+
+def record_digest(fields: dict) -> str:
+    """Content hash of a record's seeded fields, ignoring its id."""
+    payload = {key: value for key, value in fields.items() if key != "id"}
+    encoded = json.dumps(_canonical(payload), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _parse_seed_file(path: str, fields_from_data: FieldsFromData) -> tuple[dict, str]:
+    with open(path, "r", encoding="utf-8") as handle:
+        data = json.load(handle)
+    fields = fields_from_data(data)
+    return fields, record_digest(fields)
+
+
+def parse_seed_files(
+    paths: list[str], fields_from_data: FieldsFromData, *, workers: int | None = None
+) -> list[tuple[dict, str]]:
+    """``(fields, digest)`` for every seed file, in ``paths`` order."""
+    workers = PARSE_WORKERS if workers is None else workers
+    if workers <= 1 or len(paths) < PARALLEL_PARSE_MIN_FILES:
+        return [_parse_seed_file(path, fields_from_data) for path in paths]
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_parse_seed_file, paths, [fields_from_data] * len(paths), chunksize=chunksize))
+
+
+def _dialect_insert(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+
+def _upsert(db, model, rows: list[dict], update_columns: Iterable[str], on_update: dict) -> None:
+    table = model.__table__
+    insert = _dialect_insert(db.get_bind().dialect.name)
+    if insert is None:
+        for row in rows:
+            db.merge(model(**row))
+        db.flush()
+        return
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={**{column: statement.excluded[column] for column in update_columns}, **on_update},
+    )
+    db.execute(statement, rows)
+
+
+def seed_catalog_files(
+    model,
+    paths: list[str],
+    fields_from_data: FieldsFromData,
+    *,
+    label: str,
+    natural_key: str,
+    refresh: bool,
+    on_update: dict | None = None,
+    workers: int | None = None,
+) -> SeedReport:
+    """Insert new records and (with ``refresh``) rewrite changed ones in one transaction.
+
+    ``fields_from_data`` must be a module-level function so worker processes
+    can use it. Records without an ``id`` field (maps) are matched by natural
+    key only and inserted with a generated id. ``on_update`` holds extra
+    column values for updated rows, such as ``updated_at``.
+    """
+    report = SeedReport(catalog=label)
+    records = parse_seed_files(paths, fields_from_data, workers=workers)
+    if not records:
+        return report
+
+    seeded_columns = [key for key in records[0][0] if key != "id"]
+    db = get_sessionmaker()()
+    try:
+        by_id: dict = {}
+        by_natural_key: dict = {}
+        columns = [model.__table__.c[name] for name in seeded_columns]
+        for row in db.execute(select(model.__table__.c.id, *columns).order_by(model.__table__.c.id)).mappings():
+            entry = (row["id"], record_digest(dict(row)))
+            by_id[row["id"]] = entry
+            by_natural_key.setdefault(row[natural_key], entry)
+
+        upserts: dict = {}
+        inserts: dict = {}
+        for fields, digest in records:
+            existing = by_id.get(fields.get("id")) or by_natural_key.get(fields[natural_key])
+            name = fields.get("name", fields[natural_key])
+            if existing is None:
+                if "id" in fields:
+                    upserts[fields["id"]] = fields
+                else:
+                    inserts[fields[natural_key]] = fields
+                report.inserted += 1
+                print(f"[+] Inserted {label}: {name}")
+            elif not refresh or existing[1] == digest:
+                report.unchanged += 1
+            else:
+                upserts[existing[0]] = {**fields, "id": existing[0]}
+                report.updated += 1
+                print(f"[~] Updated existing {label}: {name}")
+
+        if upserts:
+            _upsert(db, model, list(upserts.values()), seeded_columns, on_update or {})
+        if inserts:
+            db.execute(core_insert(model.__table__), list(inserts.values()))
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        print(f"❌ Error committing to DB: {e}")
+        return SeedReport(catalog=label, unchanged=report.unchanged)
+    finally:
+        db.close()
+
+    print(f"✅ {report.summary()}")
+    return report
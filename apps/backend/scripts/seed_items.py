@@ -1,8 +1,6 @@
 import os
-import json
 from app.db.models import Item
-from app.db.database import get_sessionmaker
-from sqlalchemy.exc import IntegrityError
+from scripts.seed_engine import SeedReport, iter_seed_files, seed_catalog_files
 
 ITEMS_DIR = os.path.join(os.path.dirname(__file__), "../seed/items")
 
@@ -24,48 +22,15 @@ def item_fields_from_data(data: dict) -> dict:
     }
 
 
-def _iter_item_seed_files():
-    for root, _, filenames in os.walk(ITEMS_DIR):
-        for filename in filenames:
-            if filename.endswith(".json"):
-                yield os.path.join(root, filename)
-
-
-def load_items(refresh: bool = False):
-    SessionLocal = get_sessionmaker()
-    db = SessionLocal()
-
-    for filepath in sorted(_iter_item_seed_files()):
-        with open(filepath, "r") as f:
-            data = json.load(f)
-
-        fields = item_fields_from_data(data)
-        existing = db.query(Item).filter(Item.id == data["id"]).first()
-        if existing is None:
-            existing = db.query(Item).filter(Item.slug == data["slug"]).first()
-
-        if existing:
-            if refresh:
-                for key, value in fields.items():
-                    if key == "id":
-                        continue
-                    setattr(existing, key, value)
-                print(f"[~] Updated existing item: {data['name']}")
-            else:
-                print(f"[!] Skipping existing item: {data['name']}")
-            continue
-
-        db.add(Item(**fields))
-        print(f"[+] Inserted item: {data['name']}")
-
-    try:
-        db.commit()
-        print("✅ Items seeded successfully.")
-    except IntegrityError as e:
-        db.rollback()
-        print(f"❌ Error committing to DB: {e}")
-    finally:
-        db.close()
+def load_items(refresh: bool = False) -> SeedReport:
+    return seed_catalog_files(
+        Item,
+        iter_seed_files(ITEMS_DIR, recursive=True),
+        item_fields_from_data,
+        label="item",
+        natural_key="slug",
+        refresh=refresh,
+    )
 
 
 if __name__ == "__main__":
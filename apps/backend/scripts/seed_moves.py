@@ -1,8 +1,6 @@
 import os
-import json
 from app.db.models import Move
-from app.db.database import get_sessionmaker
-from sqlalchemy.exc import IntegrityError
+from scripts.seed_engine import SeedReport, iter_seed_files, seed_catalog_files
 
 MOVES_DIR = os.path.join(os.path.dirname(__file__), "../seed/moves")
 
@@ -29,44 +27,15 @@ def move_fields_from_data(data: dict) -> dict:
     }
 
 
-def load_moves(refresh: bool = False):
-    SessionLocal = get_sessionmaker()
-    db = SessionLocal()
-
-    for filename in os.listdir(MOVES_DIR):
-        if not filename.endswith(".json"):
-            continue
-
-        with open(os.path.join(MOVES_DIR, filename), "r") as f:
-            data = json.load(f)
-
-        fields = move_fields_from_data(data)
-        existing = db.query(Move).filter(Move.id == data["id"]).first()
-        if existing is None:
-            existing = db.query(Move).filter(Move.name == data["name"]).first()
-
-        if existing:
-            if refresh:
-                for key, value in fields.items():
-                    if key == "id":
-                        continue
-                    setattr(existing, key, value)
-                print(f"[~] Updated existing move: {data['name']}")
-            else:
-                print(f"[!] Skipping existing move: {data['name']}")
-            continue
-
-        db.add(Move(**fields))
-        print(f"[+] Inserted move: {data['name']}")
-
-    try:
-        db.commit()
-        print("✅ Moves seeded successfully.")
-    except IntegrityError as e:
-        db.rollback()
-        print(f"❌ Error committing to DB: {e}")
-    finally:
-        db.close()
+def load_moves(refresh: bool = False) -> SeedReport:
+    return seed_catalog_files(
+        Move,
+        iter_seed_files(MOVES_DIR),
+        move_fields_from_data,
+        label="move",
+        natural_key="name",
+        refresh=refresh,
+    )
 
 
 if __name__ == "__main__":
@@ -1,8 +1,6 @@
 import os
-import json
 from app.db.models import Unit
-from app.db.database import get_sessionmaker
-from sqlalchemy.exc import IntegrityError
+from scripts.seed_engine import SeedReport, iter_seed_files, seed_catalog_files
 
 UNITS_DIR = os.path.join(os.path.dirname(__file__), "../seed/units")
 
@@ -43,45 +41,15 @@ def unit_fields_from_data(data: dict) -> dict:
     }
 
 
-def load_units(refresh: bool = False):
-    SessionLocal = get_sessionmaker()
-    db = SessionLocal()
-
-    for filename in os.listdir(UNITS_DIR):
-        if not filename.endswith(".json"):
-            continue
-
-        path = os.path.join(UNITS_DIR, filename)
-        with open(path, "r") as f:
-            data = json.load(f)
-
-        fields = unit_fields_from_data(data)
-        existing = db.query(Unit).filter(Unit.id == data["id"]).first()
-        if existing is None:
-            existing = db.query(Unit).filter(Unit.name == data["name"]).first()
-
-        if existing:
-            if refresh:
-                for key, value in fields.items():
-                    if key == "id":
-                        continue
-                    setattr(existing, key, value)
-                print(f"[~] Updated existing unit: {data['name']}")
-            else:
-                print(f"[!] Skipping existing unit: {data['name']}")
-            continue
-
-        db.add(Unit(**fields))
-        print(f"[+] Inserted unit: {data['name']}")
-
-    try:
-        db.commit()
-        print("✅ Units seeded successfully.")
-    except IntegrityError as e:
-        db.rollback()
-        print(f"❌ Error committing to DB: {e}")
-    finally:
-        db.close()
+def load_units(refresh: bool = False) -> SeedReport:
+    return seed_catalog_files(
+        Unit,
+        iter_seed_files(UNITS_DIR),
+        unit_fields_from_data,
+        label="unit",
+        natural_key="name",
+        refresh=refresh,
+    )
 
 
 if __name__ == "__main__":
@@ -23,6 +23,7 @@ import { setupPixelCanvas } from "@/utils/pixelCanvas";
 import { MAP_DISPLAY_LAYOUT, pointerToTileCoords } from "@/utils/mapPointer";
 import { useMapDisplayScale } from "@/hooks/useMapDisplayScale";
 import { RANDOM_TM_ITEM_ID } from "@/types/mapData";
+import { COMPACT_GRIDS_QUERY, decodeMapStateGrids } from "@/utils/mapGrids";
 import {
   buildMovementCostGrid,
   filterMovementTilesForUnit,
@@ -522,7 +523,7 @@ export default function GamePage() {
   function normalizeGameMapState(game: any) {
     const mapWidth = Number(game?.map?.width ?? 0);
     const mapHeight = Number(game?.map?.height ?? 0);
-    const raw = game?.map_state ?? {};
+    const raw = decodeMapStateGrids(game?.map_state ?? {});
 
     const parseTimedEffectCell = (cell: any): [number, number] => {
       if (Array.isArray(cell) && cell.length >= 2) {
@@ -1988,7 +1989,7 @@ export default function GamePage() {
         applyUnitTile(unitId, fromTile);
       }
       movementLockedUnitIdsRef.current.delete(unitId);
-      const r = await secureFetch(`/api/games/${gameData.link}`);
+      const r = await secureFetch(`/api/games/${gameData.link}?${COMPACT_GRIDS_QUERY}`);
       if (r.ok) setGameData(normalizeGameData(await r.json()));
     }
   }
@@ -2125,7 +2126,7 @@ export default function GamePage() {
   const handleStartGame = async () => {
     const res = await secureFetch(`/api/games/start/${gameData.id}`, { method: "POST" });
     if (res.ok) {
-      const updated = await secureFetch(`/api/games/${gameData.link}`);
+      const updated = await secureFetch(`/api/games/${gameData.link}?${COMPACT_GRIDS_QUERY}`);
       setGameData(normalizeGameData(await updated.json()));
     } else {
       alert("Unable to start game.");
@@ -2336,7 +2337,7 @@ export default function GamePage() {
       setGameData(null);
 
       try {
-        const res = await secureFetch(`/api/games/${encodeURIComponent(gameId)}`);
+        const res = await secureFetch(`/api/games/${encodeURIComponent(gameId)}?${COMPACT_GRIDS_QUERY}`);
         if (!res.ok) {
           if (!cancelled) redirectWithToast();
           return;
@@ -3211,7 +3212,7 @@ export default function GamePage() {
           setSelectedTile(null);
         }
         (async () => {
-          const res = await secureFetch(`/api/games/${gameData.link}`);
+          const res = await secureFetch(`/api/games/${gameData.link}?${COMPACT_GRIDS_QUERY}`);
           if (!res.ok) return;
           const updatedGame = normalizeGameData(await res.json());
           setGameData(updatedGame);
@@ -3620,7 +3621,7 @@ export default function GamePage() {
     setCash((prev) => prev - unit.cost);
     setSelectedTile(null);
 
-    const gameRes = await secureFetch(`/api/games/${gameData.link}`);
+    const gameRes = await secureFetch(`/api/games/${gameData.link}?${COMPACT_GRIDS_QUERY}`);
     if (gameRes.ok) {
       setGameData(normalizeGameData(await gameRes.json()));
     }
@@ -3664,7 +3665,7 @@ export default function GamePage() {
         })
       );
     } else {
-      const gameRes = await secureFetch(`/api/games/${gameData.link}`);
+      const gameRes = await secureFetch(`/api/games/${gameData.link}?${COMPACT_GRIDS_QUERY}`);
       if (gameRes.ok) {
         setGameData(normalizeGameData(await gameRes.json()));
       }
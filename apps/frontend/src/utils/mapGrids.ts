@@ -0,0 +1,93 @@
+// Decoder for the compact map-state grids (`GET /games/{link}?grids=compact`,
+// see app/map_grids.py on the backend). Grids that were not encoded arrive as
+// plain 2D arrays and are returned unchanged.
+
+export const COMPACT_GRIDS_QUERY = "grids=compact";
+
+const GRID_FIELDS = [
+  "weather_tiles",
+  "hazard_tiles",
+  "room_effect_tiles",
+  "terrain_effect_tiles",
+  "field_effect_tiles",
+  "item_id_tiles",
+  "objective_tiles",
+] as const;
+
+type EncodedGrid =
+  | { enc: "sparse"; w: number; h: number; empty: unknown; cells: [number, number, unknown][] }
+  | { enc: "rle"; w: number; h: number; runs: unknown[] }
+  | { enc: "packed"; w: number; h: number; t: "b" | "h" | "i"; stride?: number; nulls?: boolean; data: string };
+
+const PACKED_TYPES = {
+  b: { size: 1, min: -(2 ** 7), read: (view: DataView, offset: number) => view.getInt8(offset) },
+  h: { size: 2, min: -(2 ** 15), read: (view: DataView, offset: number) => view.getInt16(offset, true) },
+  i: { size: 4, min: -(2 ** 31), read: (view: DataView, offset: number) => view.getInt32(offset, true) },
+};
+
+// Cells that are arrays or objects are edited in place, so each tile gets its own copy.
+function freshCell<T>(cell: T): T {
+  return cell !== null && typeof cell === "object" ? structuredClone(cell) : cell;
+}
+
+function toRows(flat: unknown[], width: number, height: number): unknown[][] {
+  return Array.from({ length: height }, (_, y) => flat.slice(y * width, (y + 1) * width));
+}
+
+export function decodeGrid(value: unknown): unknown {
+  if (!value || typeof value !== "object" || Array.isArray(value) || !("enc" in value)) return value;
+  const grid = value as EncodedGrid;
+  const width = Number(grid.w) || 0;
+  const height = Number(grid.h) || 0;
+
+  if (grid.enc === "sparse") {
+    const rows = Array.from({ length: height }, () =>
+      Array.from({ length: width }, () => freshCell(grid.empty))
+    );
+    for (const [x, y, cell] of grid.cells ?? []) {
+      if (y >= 0 && y < height && x >= 0 && x < width) rows[y][x] = cell;
+    }
+    return rows;
+  }
+
+  if (grid.enc === "rle") {
+    const flat: unknown[] = [];
+    for (let i = 0; i + 1 < grid.runs.length; i += 2) {
+      const cell = grid.runs[i];
+      const count = Number(grid.runs[i + 1]) || 0;
+      for (let n = 0; n < count; n += 1) flat.push(freshCell(cell));
+    }
+    return toRows(flat, width, height);
+  }
+
+  if (grid.enc === "packed") {
+    const type = PACKED_TYPES[grid.t];
+    if (!type) return [];
+    const binary = atob(grid.data);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i += 1) bytes[i] = binary.charCodeAt(i);
+    const view = new DataView(bytes.buffer);
+    const values: (number | null)[] = [];
+    for (let offset = 0; offset + type.size <= bytes.length; offset += type.size) {
+      const value = type.read(view, offset);
+      values.push(grid.nulls && value === type.min ? null : value);
+    }
+    const stride = Number(grid.stride) || 1;
+    const flat =
+      stride === 1
+        ? values
+        : Array.from({ length: Math.floor(values.length / stride) }, (_, i) => values.slice(i * stride, (i + 1) * stride));
+    return toRows(flat, width, height);
+  }
+
+  return [];
+}
+
+export function decodeMapStateGrids<T extends Record<string, any>>(mapState: T): T {
+  if (mapState?.grid_encoding !== "compact") return mapState;
+  const decoded: Record<string, any> = { ...mapState };
+  for (const field of GRID_FIELDS) {
+    decoded[field] = decodeGrid(mapState[field]);
+  }
+  return decoded as T;
+}
@@ -40,3 +40,19 @@ def test_filter_leaves_clean_message_unchanged():
     finally:
         os.unlink(path)
         reload_wordlist()
+
+
+def test_filter_catches_spaced_and_embedded_terms_in_wordlist_order():
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as handle:
+        json.dump({"blocked_terms": ["word", "badword", "fag"]}, handle)
+        path = handle.name
+
+    try:
+        reload_wordlist()
+        result = filter_message("so xb4dwordx and f.a.g ok", wordlist_path=path)
+        assert result.censored_message == "so ********* and ***** ok"
+        assert result.matched_terms == ["fag", "word"]
+        assert filter_message("xf ag", wordlist_path=path).censored_message == "*****"
+    finally:
+        os.unlink(path)
+        reload_wordlist()
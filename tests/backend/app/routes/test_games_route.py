@@ -1,4 +1,5 @@
 # tests/apps/backend/app/routes/test_games_route.py
+import json
 import pytest
 import app.db.models as models
 from fastapi.testclient import TestClient
@@ -34,6 +35,8 @@ from app.routes.games import (
     move_has_high_crit_ratio,
 )
 
+from app.game_events import event_tail
+from app.map_grids import GRID_FIELDS, decode_grid
 from app.main import app
 from app.dependencies import get_db, get_current_user
 
@@ -201,10 +204,9 @@ def test_start_game_resolves_random_tm_tiles(client, db, user):
     assert map_state.item_id_tiles[0][0] in {257, 258}
     assert map_state.item_id_tiles[0][1] is None
 
-    game_state = db.query(models.GameState).filter_by(game_id=game.id).first()
     system_messages = [
         entry["message"]
-        for entry in (game_state.replay_log or [])
+        for entry in event_tail(db, game.id)
         if entry.get("event") == "system_log"
     ]
     assert "The game has begun! All players may now select their units" in system_messages
@@ -271,6 +273,89 @@ def test_get_open_games(client, db, user):
     assert len(data) == 1
     assert data[0]["game_name"] == "Game A"
 
+def test_lobby_games_paginate_with_one_query_per_page(client, db, user):
+    from datetime import datetime, timedelta
+    from sqlalchemy import event
+
+    other = models.User(username="rival", email="rival@example.com", hashed_password="x")
+    map_obj = models.Map(
+        name="Lobby Map",
+        is_official=True,
+        width=10,
+        height=10,
+        tileset_names=["grass"],
+        tile_data={"movement_cost": [[1] * 10 for _ in range(10)]},
+        allowed_modes=["Conquest"],
+        allowed_player_counts=[2],
+    )
+    db.add_all([other, map_obj])
+    db.flush()
+    started = datetime(2024, 1, 1, 12, 0, 0)
+    for index in range(5):
+        game = models.Game(
+            game_name=f"Finished {index}",
+            map_id=map_obj.id,
+            map_name=map_obj.name,
+            is_private=index == 4,
+            host_id=user.id,
+            link=f"done{index}",
+            # Two games share a timestamp so the id tiebreak is exercised.
+            timestamp=started + timedelta(minutes=min(index, 2)),
+        )
+        db.add(game)
+        db.flush()
+        db.add(models.GameState(
+            game_id=game.id,
+            current_turn=10,
+            status=models.GameStatus.completed,
+            players=[user.id, other.id],
+            winner_id=user.id,
+            replay_log=[{"log": "x"}] * 50,
+        ))
+        db.add_all([
+            models.GamePlayer(game_id=game.id, player_id=user.id, game_units=[1, 2], is_ready=True),
+            models.GamePlayer(game_id=game.id, player_id=other.id, game_units=[], is_ready=True),
+        ])
+    db.commit()
+
+    selects = []
+    engine = db.get_bind()
+
+    def count_select(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+
+    pages = []
+    cursor = None
+    event.listen(engine, "before_cursor_execute", count_select)
+    try:
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            resp = client.get("/games/lobby/completed", params=params)
+            assert resp.status_code == 200
+            pages.append(resp.json())
+            cursor = pages[-1]["next_cursor"]
+            if not cursor:
+                break
+    finally:
+        event.remove(engine, "before_cursor_execute", count_select)
+
+    names = [item["game_name"] for page in pages for item in page["items"]]
+    assert names == ["Finished 3", "Finished 2", "Finished 1", "Finished 0"]
+    assert [len(page["items"]) for page in pages] == [2, 2]
+    assert len(selects) == len(pages)
+    first = pages[0]["items"][0]
+    assert first["map_id"] == map_obj.id
+    assert "map" not in first and "replay_log" not in first
+    assert [(p["username"], p["unit_count"]) for p in first["players"]] == [("player1", 2), ("rival", 0)]
+
+    assert client.get("/games/lobby/open").json() == {"items": [], "next_cursor": None}
+    assert client.get("/games/lobby/completed", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get(f"/maps/{map_obj.id}").json()["name"] == "Lobby Map"
+    assert client.get("/maps/999").status_code == 404
+
 def test_get_game_by_link(client, db, user):
     # Create everything needed
     map = models.Map(
@@ -322,6 +407,16 @@ def test_get_game_by_link(client, db, user):
     resp = client.get("/games/forest123")
     assert resp.status_code == 200
     assert resp.json()["game_name"] == "Forest Battle"
+    full_state = resp.json()["map_state"]
+
+    compact = client.get("/games/forest123", params={"grids": "compact"})
+    assert compact.status_code == 200
+    compact_state = compact.json()["map_state"]
+    assert compact_state["grid_encoding"] == "compact"
+    assert compact_state["weather_tiles"] == {"enc": "rle", "w": 10, "h": 10, "runs": [0, 100]}
+    for field in GRID_FIELDS:
+        assert decode_grid(compact_state[field]) == full_state[field]
+    assert len(compact.content) < len(resp.content)
 
 
 def test_process_move_effects_applies_status_to_target(db):
@@ -1501,6 +1596,26 @@ def test_movement_range_backend_enemy_tile_blocks_path():
     assert [3, 0] not in tiles
 
 
+def test_movement_range_backend_settles_tile_at_cheapest_cost():
+    # (2, 0) is first found through the cost-5 tile; the cheaper detour below
+    # is what brings (3, 0) and (2, 1) into range.
+    movement_costs = [
+        [1, 5, 1, 1],
+        [1, 1, 1, 10**9],
+    ]
+
+    tiles = movement_range_backend(
+        start=(0, 0),
+        rng=6,
+        movement_costs=movement_costs,
+        width=4,
+        height=2,
+    )
+
+    assert [3, 0] in tiles
+    assert [2, 1] in tiles
+
+
 def test_movement_range_backend_allies_are_pass_through_when_not_blocked():
     movement_costs = [
         [1, 1, 1],
@@ -2254,3 +2369,439 @@ def test_pick_up_map_item_rejects_when_no_item_on_tile(client, db, user):
     )
     assert resp.status_code == 400
     assert resp.json()["detail"] == "No item on this tile"
+
+
+class RecordingPipeline:
+    def __init__(self, calls, hashes=None):
+        self.calls = calls
+        self.hashes = hashes if hashes is not None else {}
+        self.pending = []
+
+    def delete(self, *keys):
+        self.pending.append(("delete", keys))
+
+    def hset(self, key, mapping):
+        self.pending.append(("hset", key, mapping))
+
+    def hdel(self, key, *fields):
+        self.pending.append(("hdel", key, fields))
+
+    def expire(self, key, seconds):
+        self.pending.append(("expire", key, seconds))
+
+    def publish(self, channel, message):
+        self.pending.append(("publish", channel, message))
+
+    def execute(self):
+        self.calls.append(self.pending)
+        for command, key, *args in self.pending:
+            if command == "delete":
+                for deleted in key:
+                    self.hashes.pop(deleted, None)
+            elif command == "hset":
+                self.hashes.setdefault(key, {}).update(args[0])
+            elif command == "hdel":
+                for field in args[0]:
+                    self.hashes.get(key, {}).pop(field, None)
+        return []
+
+
+class RecordingRedis:
+    def __init__(self):
+        self.executed = []
+        self.published = []
+        self.evaluated = []
+        self.values = {}
+        self.hashes = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    def exists(self, key):
+        return int(key in self.values or key in self.hashes)
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def pipeline(self, transaction=True):
+        return RecordingPipeline(self.executed, self.hashes)
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    def eval(self, script, numkeys, *keys_and_args):
+        self.evaluated.append(keys_and_args)
+        return len(self.evaluated)
+
+
+def _make_turn_lock_game(db, user, unit_count):
+    from app.routes.games import TURN_LOCK_TTL_PADDING_SECONDS
+
+    enemy = models.User(username=f"enemy{unit_count}", email=f"enemy{unit_count}@example.com", hashed_password="x")
+    ability = models.Ability(name="Levitate", slug=f"levitate-{unit_count}", generation=3)
+    map_obj = models.Map(
+        name="Field",
+        width=8,
+        height=8,
+        tile_data={"movement_cost": [[1] * 8 for _ in range(8)]},
+        allowed_modes=["Conquest"],
+    )
+    unit_info = make_unit_definition(["Normal"])
+    db.add_all([enemy, ability, map_obj, unit_info])
+    db.flush()
+    game = models.Game(
+        game_name="Locks",
+        map_id=map_obj.id,
+        map_name=map_obj.name,
+        host_id=user.id,
+        link=f"locks-{unit_count}",
+        turn_seconds=120,
+    )
+    db.add(game)
+    db.flush()
+    state = models.GameState(game_id=game.id, current_turn=0, status=models.GameStatus.preparation, players=[user.id, enemy.id])
+    db.add(state)
+
+    def add_unit(owner, x, y, hp, flags=None):
+        unit = models.GameUnit(
+            game_id=game.id,
+            unit_id=unit_info.id,
+            user_id=owner.id,
+            starting_x=x,
+            starting_y=y,
+            current_x=x,
+            current_y=y,
+            current_hp=hp,
+            current_stats={"range": 1},
+            flags=flags or {},
+        )
+        db.add(unit)
+        return unit
+
+    units = [add_unit(user, index, 0, 10, {"ability_id": ability.id}) for index in range(unit_count)]
+    fainted = add_unit(user, 0, 7, 0)
+    add_unit(enemy, 0, 1, 10)
+    db.commit()
+    return game, state, units, fainted, 120 + TURN_LOCK_TTL_PADDING_SECONDS
+
+
+@pytest.mark.parametrize("unit_count", [1, 6])
+def test_compute_turn_locks_writes_one_pipeline_with_constant_queries(db, user, monkeypatch, unit_count):
+    from sqlalchemy import event
+
+    import app.routes.games as games_module
+    from app.catalog import get_catalog
+    from app.routes.games import compute_turn_locks, movement_locked_key
+
+    fake_redis = RecordingRedis()
+    monkeypatch.setattr(games_module, "redis_client", fake_redis)
+    game, state, units, fainted, ttl = _make_turn_lock_game(db, user, unit_count)
+    db.refresh(game)
+    db.refresh(state)
+    get_catalog(db)
+
+    statements = []
+    engine = db.get_bind()
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count_statement)
+    try:
+        timings = compute_turn_locks(game, state, db)
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+
+    # Map, the player's units and enemy positions, whatever the army size; abilities
+    # come from the warm catalog.
+    assert len(statements) == 3
+    assert set(timings) == {"load_ms", "ranges_ms", "redis_ms"}
+
+    assert len(fake_redis.executed) == 1
+    (delete, hset, expire) = fake_redis.executed[0]
+    key = f"turnlock:{game.link}:{user.id}"
+    assert delete == (
+        "delete",
+        (key, *(movement_locked_key(game.link, unit.id) for unit in units + [fainted])),
+    )
+    assert hset[0:2] == ("hset", key)
+    assert set(hset[2]) == {str(unit.id) for unit in units}
+    assert expire == ("expire", key, ttl)
+    # The enemy at (0, 1) blocks the first unit from stepping down.
+    first_lock = json.loads(hset[2][str(units[0].id)])
+    assert first_lock["origin"] == [0, 0]
+    assert [0, 1] not in first_lock["tiles"]
+
+
+def test_end_of_turn_effects_flush_once_and_publish_logs_together(db, user, monkeypatch):
+    import app.routes.games as games_module
+    from app.routes.games import apply_end_of_turn_effects, remove_fainted_units_from_play
+
+    fake_redis = RecordingRedis()
+    monkeypatch.setattr(games_module, "redis_client", fake_redis)
+    game, state, units, fainted, _ = _make_turn_lock_game(db, user, 3)
+    for unit, hp in zip(units, (16, 16, 2)):
+        unit.current_hp = hp
+        unit.current_stats = {"hp": 16, "range": 1}
+        unit.status_effects = ["burn", 3]
+    db.commit()
+
+    modified = apply_end_of_turn_effects(game, state, user.id, db)
+
+    assert modified == {unit.id for unit in units}
+    assert [unit.current_hp for unit in units] == [14, 14, 0]
+    assert fake_redis.published == []
+    assert len(fake_redis.executed) == 1
+    messages = [json.loads(call[2])["message"] for call in fake_redis.executed[0]]
+    assert messages == [f"{user.username}'s Testmon took 2 damage from burn"] * 3
+    assert [entry["message"] for entry in event_tail(db, game.id)] == messages
+    # The HP changes are flushed, so the fainted unit is found in the same request.
+    assert units[2].id in remove_fainted_units_from_play(game.id, db)
+
+
+def _make_battle(db, units_per_side):
+    attacker_owner = models.User(username="ash", email="ash@example.com", hashed_password="x")
+    defender_owner = models.User(username="gary", email="gary@example.com", hashed_password="x")
+    ability = models.Ability(name="Overgrow", slug="overgrow", generation=3)
+    move = models.Move(name="Tackle", type="normal", category="Physical", power=40, accuracy=100, pp=35, targeting="enemy", effects=[])
+    map_obj = models.Map(name="Field", width=8, height=8, tile_data={}, allowed_modes=["Conquest"])
+    species = make_unit_definition(["grass"])
+    db.add_all([attacker_owner, defender_owner, ability, move, map_obj, species])
+    db.flush()
+    game = models.Game(game_name="Battle", map_id=map_obj.id, map_name=map_obj.name, host_id=attacker_owner.id, link="battle")
+    db.add(game)
+    db.flush()
+    db.add(models.GameState(
+        game_id=game.id,
+        current_turn=0,
+        status=models.GameStatus.in_progress,
+        players=[attacker_owner.id, defender_owner.id],
+        replay_log=[],
+    ))
+    db.add(models.GameMapState(game_id=game.id, map_id=map_obj.id))
+    stats = {"hp": 100, "attack": 50, "defense": 50, "sp_attack": 50, "sp_defense": 50, "speed": 50, "range": 3}
+
+    def add_side(owner, y):
+        units = [
+            models.GameUnit(
+                game_id=game.id, unit_id=species.id, user_id=owner.id,
+                starting_x=x, starting_y=y, current_x=x, current_y=y,
+                current_hp=100, current_stats=dict(stats), move_pp=[35],
+                flags={"ability_id": ability.id, "move_ids": [move.id]},
+            )
+            for x in range(units_per_side)
+        ]
+        db.add_all(units)
+        db.flush()
+        db.add(models.GamePlayer(game_id=game.id, player_id=owner.id, game_units=[unit.id for unit in units]))
+        return units
+
+    attackers = add_side(attacker_owner, 0)
+    defenders = add_side(defender_owner, 1)
+    db.commit()
+    return attacker_owner, move, attackers, defenders
+
+
+@pytest.mark.parametrize("units_per_side", [2, 6])
+def test_execute_move_reads_game_through_one_snapshot(db, monkeypatch, units_per_side):
+    from sqlalchemy import event
+
+    import app.routes.games as games_module
+    from app.catalog import get_catalog
+    from app.game_context import CONTEXT_INFO_KEY
+    from app.routes.games import execute_move
+
+    fake_redis = RecordingRedis()
+    monkeypatch.setattr(games_module, "redis_client", fake_redis)
+    monkeypatch.setattr(games_module.random, "randint", lambda low, high: high)
+    user, move, attackers, defenders = _make_battle(db, units_per_side)
+    payload = {"unit_id": attackers[0].id, "move_id": move.id, "target_ids": [defenders[0].id]}
+    db.refresh(user)
+    get_catalog(db)
+
+    selects = []
+    engine = db.get_bind()
+
+    def count_select(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count_select)
+    try:
+        result = execute_move("battle", payload, db, user)
+    finally:
+        event.remove(engine, "before_cursor_execute", count_select)
+
+    assert result["targets"][0]["id"] == defenders[0].id
+    assert result["targets"][0]["damage"] > 0
+    assert result["move_pp"] == [34]
+    # The same attack issued 19 SELECTs before game rows were shared through GameContext
+    # and catalog rows were served from the in-process catalog.
+    assert len(selects) == 9
+    assert CONTEXT_INFO_KEY not in db.info
+
+    # One sequenced patch carries the attacker and the damaged target.
+    (patch_call,) = fake_redis.evaluated
+    patch = json.loads(patch_call[2])
+    patched = {unit["id"]: unit for unit in patch["units"]}
+    assert set(patched) == {attackers[0].id, defenders[0].id}
+    assert patched[attackers[0].id]["move_pp"] == [34]
+    assert patched[defenders[0].id]["current_hp"] == result["targets"][0]["current_hp"]
+
+
+def test_forecast_is_computed_once_per_state_version(db, monkeypatch):
+    from sqlalchemy.orm.attributes import flag_modified
+
+    import app.routes.games as games_module
+    from app.catalog import get_catalog
+    from app.routes.games import forecast_key, game_state_for, get_forecast
+
+    fake_redis = RecordingRedis()
+    monkeypatch.setattr(games_module, "redis_client", fake_redis)
+    computed = []
+    forecast_attacks = games_module.forecast_attacks
+
+    def counting_forecast_attacks(battle, user_id, moves_by_unit):
+        computed.append(user_id)
+        return forecast_attacks(battle, user_id, moves_by_unit)
+
+    monkeypatch.setattr(games_module, "forecast_attacks", counting_forecast_attacks)
+    user, move, attackers, defenders = _make_battle(db, 2)
+    move.range = "adjacent"
+    defenders[1].current_hp = 5
+    db.get(models.Map, attackers[0].game.map_id).tile_data = {"movement_cost": [[1] * 8 for _ in range(8)]}
+    db.commit()
+    db.refresh(user)
+    get_catalog(db)
+
+    forecast = get_forecast("battle", db, user)
+
+    # From where they stand, each attacker is adjacent to the defender in front of it.
+    standing = {unit.id: (unit.current_x, unit.current_y) for unit in attackers}
+    attacks = {
+        (attack["unit_id"], attack["target_id"]): attack
+        for attack in forecast["attacks"]
+        if (attack["origin_x"], attack["origin_y"]) == standing[attack["unit_id"]]
+    }
+    assert set(attacks) == {(attackers[0].id, defenders[0].id), (attackers[1].id, defenders[1].id)}
+    # Stepping around its ally puts the first attacker next to the other defender too.
+    assert any(
+        (attack["unit_id"], attack["target_id"]) == (attackers[0].id, defenders[1].id) for attack in forecast["attacks"]
+    )
+    assert all(attack["move_id"] == move.id and attack["hit_chance"] == 1.0 for attack in attacks.values())
+    assert attacks[(attackers[0].id, defenders[0].id)]["ko_chance"] == 0.0
+    assert attacks[(attackers[1].id, defenders[1].id)]["ko_chance"] == 1.0
+    assert json.loads(fake_redis.values[forecast_key("battle")]) == forecast
+
+    assert get_forecast("battle", db, user) == forecast
+    assert computed == [user.id]
+
+    # A committed mutation moves the state version on, which retires the cached forecast.
+    state = game_state_for(db, attackers[0].game_id)
+    defenders[0].current_hp = 1
+    flag_modified(state, "status")
+    db.commit()
+    refreshed = get_forecast("battle", db, user)
+
+    assert computed == [user.id, user.id]
+    assert refreshed["version"] == forecast["version"] + 1
+    ko_chances = {
+        attack["target_id"]: attack["ko_chance"]
+        for attack in refreshed["attacks"]
+        if (attack["origin_x"], attack["origin_y"]) == standing[attack["unit_id"]]
+    }
+    assert ko_chances[defenders[0].id] == 1.0
+
+
+def test_forecast_is_only_for_the_current_player(db, monkeypatch):
+    from fastapi import HTTPException
+
+    import app.routes.games as games_module
+    from app.routes.games import get_forecast
+
+    monkeypatch.setattr(games_module, "redis_client", RecordingRedis())
+    _, _, _, defenders = _make_battle(db, 1)
+    defender_owner = db.get(models.User, defenders[0].user_id)
+
+    with pytest.raises(HTTPException) as error:
+        get_forecast("battle", db, defender_owner)
+    assert error.value.status_code == 403
+
+
+def test_threat_map_is_computed_once_and_updated_for_stale_units_only(db, monkeypatch):
+    from app.engine.threats import bits_to_tiles, decode_bits
+
+    import app.routes.games as games_module
+    from app.catalog import get_catalog
+    from app.routes.games import get_threats, threat_key, update_threat_map
+
+    fake_redis = RecordingRedis()
+    monkeypatch.setattr(games_module, "redis_client", fake_redis)
+    recomputed = []
+    threat_bits = games_module.threat_bits
+
+    def counting_threat_bits(battle, unit, moves):
+        recomputed.append(unit.id)
+        return threat_bits(battle, unit, moves)
+
+    monkeypatch.setattr(games_module, "threat_bits", counting_threat_bits)
+    user, move, attackers, defenders = _make_battle(db, 3)
+    move.range = "adjacent"
+    db.get(models.Map, attackers[0].game.map_id).tile_data = {"movement_cost": [[1] * 8 for _ in range(8)]}
+    db.commit()
+    db.refresh(user)
+    get_catalog(db)
+
+    # Nothing is stored yet, so the first read computes every unit's threat.
+    threats = get_threats("battle", db, user)
+    stored = fake_redis.hashes[threat_key("battle")]
+    assert stored["size"] == "8,8"
+    assert set(recomputed) == {unit.id for unit in attackers + defenders}
+    assert set(threats["units"]) == {unit.id for unit in defenders}
+    tiles = set(bits_to_tiles(decode_bits(threats["threats"]), 8))
+    assert {(0, 0), (1, 0), (2, 0)} <= tiles
+    assert (7, 7) not in tiles
+
+    # Moving a defender only recomputes it and the attackers whose paths it could block.
+    recomputed.clear()
+    defenders[0].current_x, defenders[0].current_y = 5, 5
+    db.commit()
+    update_threat_map(attackers[0].game, db, {defenders[0].id: (0, 1)})
+
+    assert set(recomputed) == {defenders[0].id, *(unit.id for unit in attackers)}
+    moved = get_threats("battle", db, user)
+    assert (7, 7) in set(bits_to_tiles(decode_bits(moved["threats"]), 8))
+    assert moved["units"][defenders[1].id] == threats["units"][defenders[1].id]
+
+
+def test_reading_a_game_only_takes_the_command_lease_for_upkeep(db, monkeypatch):
+    from contextlib import contextmanager
+
+    import app.routes.games as games_module
+    from app.routes.games import get_game_by_link
+
+    monkeypatch.setattr(games_module, "redis_client", RecordingRedis())
+    leases = []
+
+    @contextmanager
+    def recording_game_command(link, db=None, *, wait=True):
+        leases.append((link, wait))
+        yield False
+
+    monkeypatch.setattr(games_module, "game_command", recording_game_command)
+    _, _, _, defenders = _make_battle(db, 1)
+
+    get_game_by_link("battle", db=db)
+    assert leases == []
+
+    # A fainted unit still in play needs removing, so the read tries the lease without waiting.
+    defenders[0].current_hp = 0
+    db.commit()
+    response = get_game_by_link("battle", db=db)
+    assert leases == [("battle", False)]
+    # The lease was busy, so the read left the unit for the command holding it.
+    assert db.get(models.GameUnit, defenders[0].id).is_fainted is False
+    assert response.status == models.GameStatus.in_progress
@@ -0,0 +1,130 @@
+import copy
+
+import pytest
+
+import app.catalog as catalog_module
+import app.db.models as models
+from app.catalog import (
+    CATALOG_VERSION_KEY,
+    ItemRecord,
+    MoveRecord,
+    bump_catalog_version,
+    get_catalog,
+    item_record,
+    move_record,
+    move_record_by_name,
+    unit_record,
+)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def incr(self, key):
+        self.values[key] = str(int(self.values.get(key) or 0) + 1)
+        return int(self.values[key])
+
+
+class DownRedis:
+    def get(self, key):
+        raise ConnectionError("redis is down")
+
+    def incr(self, key):
+        raise ConnectionError("redis is down")
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(catalog_module, "redis_client", redis)
+    return redis
+
+
+def _seed(db):
+    db.add_all([
+        models.Move(id=1, name="Tackle", type="normal", category="Physical", power=40, effects=["target:flinch:10"]),
+        models.Item(id=10, name="Leftovers", slug="leftovers", category="held", cost=100, effects=[]),
+        models.Item(id=11, name="leftovers", slug="fake-leftovers", category="held", cost=100, effects=[]),
+        models.Ability(id=5, name="Overgrow", slug="overgrow", generation=3),
+    ])
+    db.commit()
+
+
+def _expire_version_check(monkeypatch):
+    monkeypatch.setattr(catalog_module, "_checked_at", -catalog_module.VERSION_CHECK_SECONDS * 2)
+
+
+def test_records_are_frozen_and_copy_to_plain_containers(db, fake_redis):
+    _seed(db)
+
+    move = move_record(db, 1)
+
+    assert isinstance(move, MoveRecord)
+    assert isinstance(move.effects, list)
+    with pytest.raises(AttributeError):
+        move.power = 90
+    with pytest.raises(TypeError):
+        move.effects.append("self:heal:50")
+    copied = copy.deepcopy(move.effects)
+    copied.append("self:heal:50")
+    assert type(copied) is list
+    assert move.effects == ["target:flinch:10"]
+
+
+def test_lookups_share_indexes_and_prefer_slugs(db, fake_redis):
+    _seed(db)
+
+    assert move_record_by_name(db, "Tackle") is move_record(db, 1)
+    leftovers = item_record(db, "leftovers")
+    assert isinstance(leftovers, ItemRecord)
+    assert leftovers.id == 10
+    assert get_catalog(db).abilities_by_slug["overgrow"].id == 5
+
+
+def test_rows_added_after_build_fall_back_to_the_database(db, fake_redis):
+    _seed(db)
+    get_catalog(db)
+    db.add(models.Move(id=2, name="Ember", type="fire", category="Special", power=40, effects=[]))
+    db.commit()
+
+    assert isinstance(move_record(db, 2), models.Move)
+    assert move_record(db, None) is None
+    assert unit_record(db, 999) is None
+
+
+def test_version_bump_rebuilds_on_next_check(db, fake_redis, monkeypatch):
+    _seed(db)
+    # Cold starts skip Redis; an unset version key matches and keeps the build.
+    checked = get_catalog(db)
+    _expire_version_check(monkeypatch)
+    assert get_catalog(db) is checked
+
+    fake_redis.values[CATALOG_VERSION_KEY] = "7"
+    assert get_catalog(db) is checked  # still inside the check interval
+    _expire_version_check(monkeypatch)
+    rebuilt = get_catalog(db)
+    assert rebuilt is not checked
+    assert rebuilt.version == "7"
+
+
+def test_bump_clears_local_cache_and_increments(db, fake_redis):
+    _seed(db)
+    before = get_catalog(db)
+
+    assert bump_catalog_version() == 1
+    assert fake_redis.values[CATALOG_VERSION_KEY] == "1"
+    assert get_catalog(db) is not before
+
+
+def test_redis_outage_keeps_cached_catalog(db, monkeypatch):
+    monkeypatch.setattr(catalog_module, "redis_client", DownRedis())
+    _seed(db)
+    cached = get_catalog(db)
+
+    _expire_version_check(monkeypatch)
+    assert get_catalog(db) is cached
+    assert bump_catalog_version() is None
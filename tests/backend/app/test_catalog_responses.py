@@ -0,0 +1,152 @@
+import gzip
+
+from sqlalchemy import event
+
+import app.catalog_responses as responses_module
+import app.db.models as models
+from app.catalog import bump_catalog_version
+from app.catalog_responses import accepted_encodings, etag_matches
+
+
+def _seed_moves(db):
+    db.add_all([
+        models.Move(id=1, name="Tackle", type="normal", category="Physical", power=40, effects=[]),
+        models.Move(id=2, name="Ember", type="fire", category="Special", power=40, effects=["target:status:burn:10"]),
+    ])
+    db.commit()
+
+
+def _count_statements(db):
+    statements = []
+    engine = db.get_bind()
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    return statements, lambda: event.remove(engine, "before_cursor_execute", record)
+
+
+def test_catalog_endpoint_serves_gzip_with_strong_etag(client, db):
+    _seed_moves(db)
+
+    resp = client.get("/moves/all", headers={"Accept-Encoding": "gzip"})
+
+    assert resp.status_code == 200
+    assert resp.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["vary"]
+    assert resp.headers["etag"].startswith('"') and resp.headers["etag"].endswith('-gzip"')
+    assert [move["name"] for move in resp.json()] == ["Tackle", "Ember"]
+
+    plain = client.get("/moves/all", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.content == gzip.decompress(gzip.compress(plain.content))
+    assert plain.json() == resp.json()
+    assert plain.headers["etag"] != resp.headers["etag"]
+
+    compressed = client.get("/moves/all", headers={"Accept-Encoding": "gzip, br"})
+    assert compressed.headers["content-encoding"] == "br"
+    assert compressed.headers["etag"].endswith('-br"')
+    assert compressed.json() == plain.json()
+
+
+def test_matching_if_none_match_returns_304_without_queries(client, db):
+    _seed_moves(db)
+    etag = client.get("/moves/all", headers={"Accept-Encoding": "gzip"}).headers["etag"]
+
+    statements, stop = _count_statements(db)
+    try:
+        resp = client.get("/moves/all", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        again = client.get("/moves/all", headers={"Accept-Encoding": "gzip"})
+    finally:
+        stop()
+
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["etag"] == etag
+    assert again.status_code == 200
+    assert statements == []
+
+
+def test_catalog_version_bump_changes_etag(client, db, monkeypatch):
+    import app.catalog as catalog_module
+
+    class FakeRedis:
+        def incr(self, key):
+            return 1
+
+    monkeypatch.setattr(catalog_module, "redis_client", FakeRedis())
+    _seed_moves(db)
+    etag = client.get("/moves/all").headers["etag"]
+
+    db.add(models.Move(id=3, name="Growl", type="normal", category="Status", effects=[]))
+    db.commit()
+    assert client.get("/moves/all", headers={"If-None-Match": etag}).status_code == 304
+
+    bump_catalog_version()
+    resp = client.get("/moves/all", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert len(resp.json()) == 3
+
+
+def test_items_are_cached_per_category(client, db):
+    db.add_all([
+        models.Item(id=1, name="Leftovers", slug="leftovers", category="held", cost=100),
+        models.Item(id=2, name="TM001", slug="tm001", category="tm", cost=500),
+    ])
+    db.commit()
+
+    assert [item["slug"] for item in client.get("/items/all").json()] == ["leftovers", "tm001"]
+    assert [item["slug"] for item in client.get("/items/all?category=tm").json()] == ["tm001"]
+
+
+def test_accept_encoding_and_if_none_match_parsing():
+    assert accepted_encodings("gzip;q=0, br, identity;q=0.5") == {"br", "identity"}
+
+    entry = responses_module.compile_body(object(), b"[]")
+    assert etag_matches(entry, f'W/{entry.etags["gzip"]}, "other"')
+    assert etag_matches(entry, "*")
+    assert not etag_matches(entry, '"other"')
+    assert not etag_matches(entry, None)
+
+
+def test_unknown_item_categories_are_not_cached(client, db):
+    responses_module.clear_catalog_responses()
+    db.add(models.Item(id=1, name="Leftovers", slug="leftovers", category="held", cost=100))
+    db.commit()
+
+    assert client.get("/items/all?category=held").json()[0]["slug"] == "leftovers"
+    assert client.get("/items/all?category=no-such-category").json() == []
+    assert ("items", "held") in responses_module._cache
+    assert ("items", "no-such-category") not in responses_module._cache
+
+
+def test_each_key_is_built_once_and_the_cache_is_bounded(monkeypatch):
+    import threading
+
+    monkeypatch.setattr(responses_module, "MAX_CACHED_RESPONSES", 2)
+    responses_module.clear_catalog_responses()
+    catalog = object()
+    release = threading.Event()
+    builds = []
+
+    def slow_build():
+        builds.append(1)
+        release.wait(timeout=5)
+        return b"[]"
+
+    threads = [
+        threading.Thread(target=responses_module._build_entry, args=(catalog, "moves", slow_build))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1
+
+    for key in ("items", "abilities"):
+        responses_module._build_entry(catalog, key, lambda: b"[]")
+    assert list(responses_module._cache) == ["items", "abilities"]
+    assert set(responses_module._build_locks) <= {"items", "abilities"}
@@ -0,0 +1,230 @@
+import itertools
+import random
+
+from app.damage import (
+    EFFECTIVENESS,
+    TYPE_EFFECTIVENESS,
+    TYPE_NAMES,
+    DamageRow,
+    damage_batch,
+    hit_damage,
+    raw_damage_batch,
+    type_id,
+    type_ids,
+)
+from app.catalog_records import MoveRecord, freeze
+from app.engine.combat import damage_row
+from app.engine.state import Battle, BattleMap, EngineUnit
+from app.routes.games import get_type_multiplier
+
+
+def legacy_type_multiplier(move_type, defender_types):
+    chart = TYPE_EFFECTIVENESS.get(str(move_type).lower())
+    if not chart:
+        return 1
+    multiplier = 1.0
+    for dtype in defender_types:
+        key = str(dtype).lower()
+        if key in chart["immune"]:
+            return 0
+        if key in chart["weak"]:
+            multiplier *= 2
+        elif key in chart["resist"]:
+            multiplier *= 0.5
+    return multiplier
+
+
+def legacy_type_multiplier_with_states(move_type, defender_types, defender_state, ignore_fairy_immunity):
+    """get_type_multiplier as execute_move called it, with the defender's states."""
+    chart = TYPE_EFFECTIVENESS.get(str(move_type).lower())
+    if not chart:
+        return 1
+    multiplier = 1.0
+    for dtype in defender_types:
+        key = str(dtype).lower()
+        if key in chart["immune"]:
+            if ignore_fairy_immunity and key == "fairy" and str(move_type).lower() == "dragon":
+                pass
+            elif defender_state == "foresight" and str(move_type).lower() in {"normal", "fighting"}:
+                pass
+            elif defender_state == "mind_reader" and str(move_type).lower() == "psychic":
+                pass
+            else:
+                return 0
+        if key in chart["weak"]:
+            multiplier *= 2
+        elif key in chart["resist"]:
+            multiplier *= 0.5
+    return multiplier
+
+
+def legacy_weather_move_multiplier(move_type, weather_id, override):
+    if override is not None and weather_id == 1:
+        return override
+    move_type = str(move_type).lower()
+    if weather_id == 2:
+        return {"water": 1.5, "fire": 0.5}.get(move_type, 1.0)
+    if weather_id == 1:
+        return {"fire": 1.5, "water": 0.5}.get(move_type, 1.0)
+    return 1.0
+
+
+def legacy_hit(hit):
+    """One hit of the per-hit loop execute_move ran before the damage kernel."""
+    is_special = hit["category"] == "special"
+    attack = hit["attacker_stats"]["sp_attack" if is_special else "attack"]
+    defense = hit["target_stats"]["sp_defense" if is_special else "defense"]
+    safe_defense = defense if defense > 0 else 1
+    type_multiplier = legacy_type_multiplier_with_states(
+        hit["move_type"], hit["target_types"], hit["target_state"], hit["ignore_fairy_immunity"]
+    )
+    if hit["target_state"] == "tar_shot" and hit["move_type"].lower() == "fire":
+        type_multiplier = type_multiplier * 2
+    stab = 1.5 if hit["move_type"].lower() in [name.lower() for name in hit["attacker_types"]] else 1
+    critical = 1.5 if hit["critical"] else 1
+    weather_move_multiplier = legacy_weather_move_multiplier(hit["move_type"], hit["weather_id"], hit["weather_override"])
+    base = (((2 * hit["level"]) / 5 + 2) * hit["power"] * (attack / safe_defense)) / 50 + 2
+    raw = base * hit["targets_multiplier"] * hit["random_factor"] * stab * critical * type_multiplier * weather_move_multiplier
+    damage = int(raw)
+    if hit["target_state"] == "glaive_rush":
+        damage *= 2
+    screens = hit["screens"]
+    if "aurora_veil" in screens:
+        damage = max(0, int(damage // 2))
+    else:
+        if "reflect" in screens and not is_special:
+            damage = max(0, int(damage // 2))
+        if "light_screen" in screens and is_special:
+            damage = max(0, int(damage // 2))
+    return raw, damage
+
+
+def random_hits(count, seed=11):
+    rng = random.Random(seed)
+
+    def types(count, *extra):
+        # Catalog types are capitalized; the engine and move types may be either.
+        return [rng.choice([name, name.capitalize()]) for name in rng.sample(list(TYPE_NAMES) + list(extra), count)]
+
+    def stats():
+        return {
+            "hp": 100,
+            "attack": rng.choice([rng.randint(1, 400), rng.uniform(1, 600)]),
+            "defense": rng.choice([rng.randint(1, 400), rng.uniform(0.5, 600)]),
+            "sp_attack": rng.randint(1, 400),
+            "sp_defense": rng.randint(1, 400),
+        }
+
+    return [
+        {
+            "level": rng.randint(1, 100),
+            "power": rng.randint(1, 250),
+            "category": rng.choice(["physical", "special"]),
+            "move_type": types(1, "shadow")[0],
+            "attacker_types": types(rng.randint(1, 2)),
+            "target_types": types(rng.randint(0, 2), "???"),
+            "attacker_stats": stats(),
+            "target_stats": stats(),
+            "target_state": rng.choice([None, None, "foresight", "mind_reader", "tar_shot", "glaive_rush"]),
+            "screens": rng.sample(["reflect", "light_screen", "aurora_veil"], rng.choice([0, 0, 1, 2])),
+            "ignore_fairy_immunity": rng.random() < 0.2,
+            "weather_id": rng.randint(0, 4),
+            "weather_override": rng.choice([None, None, 2.0]),
+            "targets_multiplier": rng.choice([1, 0.75]),
+            "random_factor": rng.randint(85, 100) / 100,
+            "critical": rng.random() < 0.3,
+        }
+        for _ in range(count)
+    ]
+
+
+def engine_row(hit):
+    effects = []
+    if hit["ignore_fairy_immunity"]:
+        effects.append("self:ignore_fairy_immunity")
+    if hit["weather_override"] is not None:
+        effects.append(f"weather_override:sun:{hit['weather_override']}:self")
+    move_fields = {field: None for field in MoveRecord.__dataclass_fields__}
+    move_fields.update(
+        id=1, name="Move", type=hit["move_type"], category=hit["category"], power=hit["power"], effects=freeze(effects)
+    )
+    attacker = EngineUnit(
+        id=1,
+        user_id=1,
+        name="Attacker",
+        current_x=0,
+        current_y=0,
+        current_hp=100,
+        current_stats=hit["attacker_stats"],
+        level=hit["level"],
+        types=frozenset(name.lower() for name in hit["attacker_types"]),
+    )
+    target = EngineUnit(
+        id=2,
+        user_id=2,
+        name="Target",
+        current_x=1,
+        current_y=0,
+        current_hp=100,
+        current_stats=hit["target_stats"],
+        types=frozenset(name.lower() for name in hit["target_types"]),
+        states=[hit["target_state"], 2] if hit["target_state"] else [],
+    )
+    screen_holders = [
+        EngineUnit(id=3 + index, user_id=2, name="Ally", current_x=index, current_y=1, current_hp=100, current_stats={}, states=[screen, 3])
+        for index, screen in enumerate(hit["screens"])
+    ]
+    weather = [[0, 0, 0] for _ in range(3)]
+    weather[0][0] = hit["weather_id"]
+    battle = Battle([attacker, target, *screen_holders], BattleMap(3, 3, weather_tiles=weather))
+    return damage_row(
+        battle,
+        MoveRecord(**move_fields),
+        attacker,
+        target,
+        power=hit["power"],
+        targets_multiplier=hit["targets_multiplier"],
+        random_factor=hit["random_factor"],
+        critical=hit["critical"],
+    )
+
+
+def test_matrix_matches_the_type_chart_for_every_pairing():
+    names = list(TYPE_NAMES) + [name.capitalize() for name in TYPE_NAMES] + ["???"]
+    defenders = [[]] + [[name] for name in names] + [list(pair) for pair in itertools.combinations(TYPE_NAMES, 2)]
+
+    for move_type in names:
+        for defender_types in defenders:
+            expected = legacy_type_multiplier(move_type, defender_types)
+            assert get_type_multiplier(move_type, defender_types) == expected, (move_type, defender_types)
+
+
+def test_type_ids_accept_any_case():
+    assert len(EFFECTIVENESS) == len(TYPE_NAMES) == 18
+    assert type_id("Fire") == type_id("fire") == type_id("FIRE") == TYPE_NAMES.index("fire")
+    assert type_id("Shadow") is None
+    assert type_id(None) is None
+    assert EFFECTIVENESS[type_id("Ground")][type_id("Flying")] == 0.0
+
+
+def test_batched_damage_matches_the_legacy_per_hit_path():
+    hits = random_hits(2000)
+    rows = [engine_row(hit) for hit in hits]
+    expected = [legacy_hit(hit) for hit in hits]
+
+    assert raw_damage_batch(rows) == [raw for raw, _ in expected]
+    assert damage_batch(rows) == [damage for _, damage in expected]
+    assert [hit_damage(row) for row in rows[:50]] == [damage for _, damage in expected[:50]]
+
+
+def test_precomputed_multipliers_skip_the_id_columns():
+    row = DamageRow(level=50, power=80, attack=100, defense=100, stab=1.5, type_multiplier=2.0, weather_multiplier=0.5)
+
+    base = ((2 * 50) / 5 + 2) * 80 / 50 + 2
+    assert raw_damage_batch([row]) == [base * 1 * 1 * 1.5 * 1 * 2.0 * 0.5]
+    assert type_ids(["Fire", "???", "water"]) == (type_id("fire"), type_id("water"))
+
+
+def test_empty_batches():
+    assert damage_batch([]) == []
+    assert raw_damage_batch([]) == []
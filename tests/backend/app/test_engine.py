@@ -0,0 +1,496 @@
+import random
+import subprocess
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+import app.engine.combat as combat_module
+from app.catalog_records import MoveRecord, freeze
+from app.damage import NO_TYPE, damage_batch, hit_damage, raw_damage, type_id
+from app.engine.combat import damage_row, hit_threshold, resolve_attack
+from app.engine.effects import effect_units, run_move_effects
+from app.engine.end_of_round import run_end_of_turn
+from app.engine.forecast import forecast_attacks
+from app.engine.moves import hit_count_odds
+from app.engine.movement import MovementError, move_unit, unit_reachable_tiles
+from app.engine.rules import WEATHER_TO_ID, get_stat_stage
+from app.engine.state import Battle, BattleMap, EngineUnit
+from app.engine.targeting import move_range_tiles
+from app.engine.threats import bits_to_tiles, decode_bits, encode_bits, stale_threat_unit_ids, threat_bits, threat_tiles
+from app.terrain_cache import CompiledTerrain
+
+STATS = {"hp": 160, "attack": 100, "defense": 100, "sp_attack": 100, "sp_defense": 100, "speed": 100, "range": 3}
+
+
+def make_unit(unit_id, user_id, x, y, types=("normal",), **fields):
+    fields.setdefault("current_stats", dict(STATS))
+    return EngineUnit(
+        id=unit_id,
+        user_id=user_id,
+        name=f"Unit {unit_id}",
+        current_x=x,
+        current_y=y,
+        current_hp=fields.pop("current_hp", 160),
+        types=frozenset(types),
+        **fields,
+    )
+
+
+def make_map(width=6, height=6, special_tiles=None, **grids):
+    terrain = CompiledTerrain(width, height, [[1] * width for _ in range(height)], special_tiles)
+    return BattleMap(width, height, special_tiles=special_tiles, terrain=terrain, **grids)
+
+
+def make_move(
+    move_id,
+    *,
+    power=80,
+    accuracy=100,
+    move_type="Normal",
+    category="physical",
+    effects=(),
+    range="adjacent",
+    targeting="enemy",
+):
+    fields = {field: None for field in MoveRecord.__dataclass_fields__}
+    fields.update(
+        id=move_id,
+        name=f"Move {move_id}",
+        type=move_type,
+        category=category,
+        power=power,
+        accuracy=accuracy,
+        range=range,
+        targeting=targeting,
+        effects=freeze(list(effects)),
+    )
+    return MoveRecord(**fields)
+
+
+def test_end_of_round_runs_every_pass_in_order():
+    weather = [[0] * 6 for _ in range(6)]
+    weather[0][0] = 3  # sandstorm on the corner tile
+    hazards = [[[] for _ in range(6)] for _ in range(6)]
+    hazards[0][1] = [[1, 2], [4, 1]]  # spikes and sticky web
+    hazards[0][2] = [[2, 3]]  # toxic spikes
+    special_tiles = [[None] * 6 for _ in range(6)]
+    special_tiles[0][3] = "stump"
+    corner = make_unit(1, 1, 0, 0, status_effects=["burn", 3])
+    spiked = make_unit(2, 1, 1, 0)
+    steel = make_unit(3, 2, 2, 0, types=("steel",))
+    grass = make_unit(4, 2, 3, 0, types=("grass",), current_hp=100, states=["aqua_ring", 2])
+    battle = Battle([corner, spiked, steel, grass], make_map(special_tiles=special_tiles, weather_tiles=weather, hazard_tiles=hazards))
+
+    modified = run_end_of_turn(battle, 1, round_complete=True)
+
+    assert modified == {1, 2, 4}
+    assert corner.current_hp == 160 - 20 - 10
+    assert spiked.current_hp == 160 - 20
+    assert spiked.stat_boosts["speed"] == [{"magnitude": -1, "expires_turn": 4}]
+    assert grass.current_hp == 100 + 10 + 20
+    assert steel.status_effects == []
+    assert battle.logs == [
+        "Unit 1 took 20 damage from burn",
+        "Unit 1 took 10 damage from the sandstorm",
+        "Unit 4 healed 10 HP from Aqua Ring",
+        "Unit 4 healed 20 HP from the stump",
+        "Unit 2 took 20 damage from spikes",
+        "Unit 3 wasn't poisoned",
+    ]
+    assert battle.map.hazard_tiles[0][1] == [[1, 1]]
+    assert battle.map.hazard_tiles[0][2] == [[2, 2]]
+    # The grid is replaced, not edited, so the original rows are untouched.
+    assert hazards[0][1] == [[1, 2], [4, 1]]
+
+
+def test_end_of_turn_only_hurts_the_current_player_between_rounds():
+    ally = make_unit(1, 1, 0, 0, status_effects=["badly_poisoned", 3, 2])
+    enemy = make_unit(2, 2, 1, 0, status_effects=["poison", 3])
+    battle = Battle([ally, enemy], make_map())
+
+    assert run_end_of_turn(battle, 1, round_complete=False) == {1}
+    assert ally.current_hp == 160 - 20
+    assert ally.status_effects == ["badly_poisoned", 3, 3]
+    assert enemy.current_hp == 160
+
+
+def test_stab_matches_move_types_in_any_case():
+    attacker = make_unit(1, 1, 0, 0, types=("fire",))
+    target = make_unit(2, 2, 1, 0)
+    battle = Battle([attacker, target], make_map())
+
+    def row(move_type):
+        return damage_row(battle, make_move(9300, move_type=move_type), attacker, target, power=80)
+
+    with_stab = raw_damage(replace(row("Fire"), move_type_id=NO_TYPE, stab=1.5))
+    for move_type in ("Fire", "FIRE", "fire"):
+        assert raw_damage(row(move_type)) == with_stab
+    assert raw_damage(row("Water")) == raw_damage(replace(row("Water"), move_type_id=NO_TYPE))
+
+
+def test_attacks_are_deterministic_for_a_seed():
+    def play(seed):
+        attacker = make_unit(1, 1, 0, 0, level=50)
+        targets = [make_unit(2, 2, 1, 0), make_unit(3, 2, 2, 0)]
+        battle = Battle([attacker, *targets], make_map(), rng=random.Random(seed))
+        outcome = resolve_attack(battle, attacker, make_move(9301, accuracy=70), targets)
+        return outcome, [target.current_hp for target in targets], battle.logs
+
+    assert play(7) == play(7)
+    outcomes = {repr(play(seed)) for seed in range(20)}
+    assert len(outcomes) > 1
+
+
+def test_attack_damage_matches_the_damage_formula():
+    attacker = make_unit(1, 1, 0, 0, types=("fire",), level=50)
+    target = make_unit(2, 2, 1, 0, types=("grass",))
+    screen_holder = make_unit(3, 2, 5, 5, states=["reflect", 3])
+    battle = Battle([attacker, target, screen_holder], make_map(), rng=random.Random(1))
+    move = make_move(9302, move_type="Fire", effects=["guaranteed_crit"])
+
+    row = damage_row(battle, move, attacker, target, power=80, random_factor=1, critical=True)
+    assert (row.move_type_id, row.attacker_type_ids, row.defender_type_ids) == (
+        type_id("fire"),
+        (type_id("fire"),),
+        (type_id("grass"),),
+    )
+    assert (row.critical, row.reflect, row.is_special) == (1.5, True, False)
+
+    rolls = random.Random(1)
+    expected = hit_damage(
+        damage_row(battle, move, attacker, target, power=80, random_factor=rolls.randint(85, 100) / 100, critical=True)
+    )
+    outcome = resolve_attack(battle, attacker, move, [target])
+
+    assert outcome.targets[0].damage == expected
+    assert outcome.targets[0].critical
+    assert target.current_hp == 160 - expected
+    assert battle.logs == [f"Unit 2 took {expected} damage (Critical Hit!)"]
+
+
+def test_attack_hooks_and_destiny_bond():
+    attacker = make_unit(1, 1, 0, 0, level=50)
+    doomed = make_unit(2, 2, 1, 0, current_hp=5, states=["destiny_bond", 1])
+    battle = Battle([attacker, doomed], make_map(), rng=random.Random(2))
+    move = make_move(9306, category="special")
+    seen = []
+
+    outcome = resolve_attack(
+        battle,
+        attacker,
+        move,
+        [doomed],
+        power_bonus=20,
+        power_multiplier=lambda target: seen.append(("power", target.id)) or 2.0,
+        special_against=lambda target, spread: seen.append(("special", target.id, spread)) or False,
+    )
+
+    assert seen == [("special", 2, 1), ("power", 2)]
+    [damage] = outcome.targets[0].hit_damages
+    assert outcome.fainted_ids == [2]
+    assert attacker.current_hp == 0
+    assert battle.logs == ["Unit 1 was taken down by Destiny Bond!", f"Unit 2 took {damage} damage", "Unit 2 fainted!"]
+
+
+def test_shell_side_arm_choice_sees_the_spread_multiplier():
+    attacker = make_unit(1, 1, 0, 0, level=50)
+    targets = [make_unit(2, 2, 1, 0), make_unit(3, 2, 2, 0)]
+    battle = Battle([attacker, *targets], make_map(), rng=random.Random(3))
+    spreads = []
+
+    resolve_attack(
+        battle,
+        attacker,
+        make_move(9308),
+        targets,
+        special_against=lambda target, spread: spreads.append(spread) or True,
+    )
+
+    assert spreads == [0.75, 0.75]
+
+
+def test_attack_computes_every_hit_in_one_batch(monkeypatch):
+    attacker = make_unit(1, 1, 0, 0, level=50)
+    targets = [make_unit(2, 2, 1, 0), make_unit(3, 2, 2, 0)]
+    battle = Battle([attacker, *targets], make_map(), rng=random.Random(4))
+    batches = []
+    monkeypatch.setattr(combat_module, "damage_batch", lambda rows: batches.append(rows) or damage_batch(rows))
+
+    outcome = resolve_attack(battle, attacker, make_move(9307, power=20, effects=["multi_hit:3"]), targets)
+
+    assert len(batches) == 1
+    assert len(batches[0]) == 6
+    assert [result.hits for result in outcome.targets] == [3, 3]
+
+
+def test_attack_stops_rolling_hits_at_a_knockout(monkeypatch):
+    class CountingRandom(random.Random):
+        damage_rolls = 0
+
+        def randint(self, a, b):
+            if (a, b) == (85, 100):
+                self.damage_rolls += 1
+            return super().randint(a, b)
+
+    attacker = make_unit(1, 1, 0, 0, level=50)
+    frail = make_unit(2, 2, 1, 0, current_hp=1)
+    sturdy = make_unit(3, 2, 2, 0)
+    battle = Battle([attacker, frail, sturdy], make_map(), rng=CountingRandom(5))
+    batches = []
+    monkeypatch.setattr(combat_module, "damage_batch", lambda rows: batches.append(rows) or damage_batch(rows))
+
+    outcome = resolve_attack(battle, attacker, make_move(9309, power=20, effects=["multi_hit:3"]), [frail, sturdy])
+
+    assert [result.hits for result in outcome.targets] == [1, 3]
+    assert battle.rng.damage_rolls == 4
+    # The knockout settles the frail target's hit; the sturdy target's hits share the last batch.
+    assert [len(rows) for rows in batches] == [1, 3]
+    assert outcome.fainted_ids == [2]
+
+
+def test_accuracy_uses_stages_grass_cover_and_telekinesis():
+    special_tiles = [[None] * 6 for _ in range(6)]
+    special_tiles[0][1] = "grass"
+    attacker = make_unit(1, 1, 0, 0, stat_boosts={"accuracy": [{"magnitude": 1, "expires_turn": 4}]})
+    in_grass = make_unit(2, 2, 1, 0)
+    floating = make_unit(3, 2, 2, 0, states=["telekinesis", 2])
+    battle = Battle([attacker, in_grass, floating], make_map(special_tiles=special_tiles))
+
+    plain = hit_threshold(battle, make_move(9303, accuracy=80), attacker, floating)
+    covered = hit_threshold(battle, make_move(9303, accuracy=80), attacker, in_grass)
+    assert plain > 80
+    assert covered < plain
+    assert hit_threshold(battle, make_move(9304, accuracy=None), attacker, in_grass) is None
+
+    outcome = resolve_attack(battle, attacker, make_move(9305, move_type="Ground"), [floating])
+    assert outcome.missed_target_ids == [3]
+    assert battle.logs == ["Unit 3 dodged the attack"]
+
+
+def test_move_effects_run_in_order_on_the_battle():
+    attacker = make_unit(1, 1, 0, 0)
+    target = make_unit(2, 2, 1, 0)
+    fire = make_unit(3, 2, 2, 0, types=("fire",))
+    screened = make_unit(4, 2, 5, 5, states=["reflect", 3])
+    battle = Battle([attacker, target, fire, screened], make_map(), rng=random.Random(1))
+    move = make_move(9401, effects=["self:raise_stat:attack:2", "target:status:burn", "break_screens"])
+
+    assert screened in effect_units(battle, move, attacker, [target, fire])
+    run_move_effects(battle, move, attacker, [target, fire])
+
+    assert get_stat_stage(attacker.stat_boosts, "attack") == 2
+    assert target.status_effects[0] == "burn"
+    assert fire.status_effects == []
+    assert screened.states == []
+    assert battle.logs == [
+        "Unit 1's attack rose sharply.",
+        "Unit 2 was burned",
+        "Unit 3 wasn't burned",
+        "Unit 4 lost reflect",
+    ]
+
+
+def test_field_effects_replace_the_map_grids():
+    weather = [[0] * 6 for _ in range(6)]
+    hazards = [[[] for _ in range(6)] for _ in range(6)]
+    hazards[0][0] = [[1, 2]]
+    battle_map = make_map(weather_tiles=weather, hazard_tiles=hazards)
+    attacker = make_unit(1, 1, 0, 0)
+    decoy = make_unit(2, 2, 1, 1, states=["substitute", 9999])
+    battle = Battle([attacker, decoy], battle_map)
+    move = make_move(9402, effects=["weather:rain", "field:clear_hazards", "field:clear_substitutes"])
+
+    run_move_effects(battle, move, attacker, [], affected_tiles=[(0, 0), (1, 1), (1, 1), (9, 9)])
+
+    rain = WEATHER_TO_ID["rain"]
+    assert battle_map.weather_tiles[0][:2] == [rain, 0]
+    assert battle_map.weather_tiles[1][:2] == [0, rain]
+    assert battle_map.hazard_tiles[0][0] == []
+    assert weather[0][0] == 0 and hazards[0][0] == [[1, 2]]
+    assert decoy.states == []
+    assert battle.logs == ["Hazards were cleared from the area", "Unit 2's substitute was removed"]
+
+
+def test_move_effects_leave_route_only_ops_to_extra_handlers():
+    attacker = make_unit(1, 1, 0, 0)
+    target = make_unit(2, 2, 1, 0)
+    battle = Battle([attacker, target], make_map(), rng=random.Random(4))
+    move = make_move(9403, effects=["target:state:encore", "self:consume_berry"])
+    seen = []
+
+    run_move_effects(battle, move, attacker, [target], last_used_move=lambda unit: (33, "Tackle"))
+    assert seen == []
+    target.states = []
+    run_move_effects(
+        battle,
+        move,
+        attacker,
+        [target],
+        last_used_move=lambda unit: (33, "Tackle"),
+        extra_handlers={"consume_berry": lambda ctx, parts: seen.append((ctx.attacker.id, parts))},
+    )
+
+    name, turns, move_id = target.states
+    assert (name, move_id) == ("encore", 33) and 2 <= turns <= 6
+    assert seen == [(1, ("self", "consume_berry"))]
+    assert battle.logs[-1] == f"Unit 2 is locked into Tackle for {turns} turns"
+
+
+def test_movement_is_blocked_by_enemies_and_occupied_tiles():
+    mover = make_unit(1, 1, 0, 0, starting_x=0, starting_y=0)
+    enemy = make_unit(2, 2, 0, 1)
+    ally = make_unit(3, 1, 2, 0)
+    battle = Battle([mover, enemy, ally], make_map())
+
+    tiles = unit_reachable_tiles(battle, mover)
+    assert [0, 1] not in tiles
+    assert [1, 0] in tiles
+
+    with pytest.raises(MovementError, match="Tile occupied"):
+        move_unit(battle, mover, 2, 0)
+    assert move_unit(battle, mover, 1, 0) is False
+    assert mover.position == (1, 0)
+
+
+def test_move_range_tiles_mirror_the_client_overlay():
+    cone = make_move(9306, range="cone:3")
+    x_attack = make_move(9307, range="x_attack:2")
+
+    # cone:3 facing up from (4, 4): a 5-wide row, the ends of a 3-wide row, then the tip.
+    tiles = move_range_tiles(cone, (4, 4), 9, 9)
+    assert {(2, 3), (3, 3), (4, 3), (5, 3), (6, 3), (3, 2), (5, 2), (4, 1)} <= tiles
+    assert (4, 2) not in tiles
+    # An x_attack cluster only counts when its center tile is on the map.
+    assert move_range_tiles(x_attack, (0, 0), 6, 6) == {(0, 2), (1, 1), (1, 3), (2, 0), (3, 1)}
+
+
+def test_hit_count_odds_cover_every_roll():
+    assert hit_count_odds(make_move(9310)) == [(1, 1.0)]
+    assert hit_count_odds(make_move(9311, effects=["multi_hit:2:5"])) == [(2, 0.25), (3, 0.25), (4, 0.25), (5, 0.25)]
+    assert hit_count_odds(make_move(9312, effects=["multi_hit:variable"])) == [(2, 0.35), (3, 0.35), (4, 0.15), (5, 0.15)]
+
+
+def test_forecast_covers_every_target_in_range_in_one_pass():
+    move = make_move(9320)
+    attacker = make_unit(1, 1, 2, 2)
+    ally = make_unit(2, 1, 2, 1)
+    frail = make_unit(3, 2, 3, 2, current_hp=5)
+    sturdy = make_unit(4, 2, 2, 3)
+    far = make_unit(5, 2, 5, 5)
+    battle = Battle([attacker, ally, frail, sturdy, far], make_map(), rng=random.Random(0))
+
+    forecasts = {
+        forecast.target_id: forecast
+        for forecast in forecast_attacks(battle, 1, {1: [move]})
+        if (forecast.origin_x, forecast.origin_y) == (2, 2)
+    }
+
+    assert set(forecasts) == {3, 4}
+    lowest = hit_damage(damage_row(battle, move, attacker, sturdy, power=80, random_factor=0.85))
+    highest = hit_damage(damage_row(battle, move, attacker, sturdy, power=80, random_factor=1, critical=True))
+    assert (forecasts[4].damage_min, forecasts[4].damage_max) == (lowest, highest)
+    assert forecasts[4].hit_chance == 1.0
+    assert forecasts[4].ko_chance == 0.0
+    assert forecasts[3].ko_chance == 1.0
+    # Forecasting never rolls or changes the battle.
+    assert battle.rng.getstate() == random.Random(0).getstate()
+    assert [unit.current_hp for unit in battle.units] == [160, 160, 5, 160, 160]
+
+
+def test_forecast_ko_chance_follows_the_damage_rolls():
+    move = make_move(9321, accuracy=50)
+    attacker = make_unit(1, 1, 0, 0)
+    target = make_unit(2, 2, 1, 0)
+    battle = Battle([attacker, target], make_map())
+    rolls = [hit_damage(damage_row(battle, move, attacker, target, power=80, random_factor=roll / 100)) for roll in range(85, 101)]
+    target.current_hp = sorted(rolls)[8]
+
+    forecast = next(forecast for forecast in forecast_attacks(battle, 1, {1: [move]}) if forecast.origin_x == 0)
+
+    crit_chance = forecast.crit_chance
+    non_crit_ko = sum(damage >= target.current_hp for damage in rolls) / 16
+    assert forecast.hit_chance == 0.5
+    assert forecast.ko_chance == round(0.5 * ((1 - crit_chance) * non_crit_ko + crit_chance), 4)
+
+
+def test_forecast_includes_targets_reachable_after_moving():
+    attacker = make_unit(1, 1, 0, 0, types=("water",), current_stats=dict(STATS, range=1))
+    target = make_unit(2, 2, 2, 0)
+    ally = make_unit(3, 1, 0, 1)
+    weather = [[0] * 6 for _ in range(6)]
+    weather[0][1] = 2  # rain on the tile next to the target
+    battle = Battle([attacker, target, ally], make_map(weather_tiles=weather))
+    move = make_move(9326, move_type="Water")
+
+    forecasts = forecast_attacks(battle, 1, {1: [move]})
+
+    # The target is two tiles away and the ally stands on (0, 1), so only (1, 0) is a way in.
+    assert [(forecast.origin_x, forecast.origin_y, forecast.target_id) for forecast in forecasts] == [(1, 0, 2)]
+    stepped = make_unit(1, 1, 1, 0, types=("water",))
+    highest = hit_damage(damage_row(battle, move, stepped, target, power=80, random_factor=1, critical=True))
+    assert forecasts[0].damage_max == highest
+    assert highest > hit_damage(damage_row(battle, move, attacker, target, power=80, random_factor=1, critical=True))
+    assert attacker.position == (0, 0)
+
+
+def test_forecast_marks_moves_it_cannot_predict():
+    attacker = make_unit(1, 1, 0, 0)
+    target = make_unit(2, 2, 1, 0)
+    battle = Battle([attacker, target], make_map())
+    moves = [
+        make_move(9322),
+        make_move(9323, effects=["target:fixed_damage:level"]),
+        make_move(9324, effects=["conditional_power:target_status:poison:2"]),
+        make_move(9325, power=None, category="status"),
+    ]
+
+    forecasts = [forecast for forecast in forecast_attacks(battle, 1, {1: moves}) if forecast.origin_x == 0]
+
+    assert [(forecast.move_id, forecast.forecastable) for forecast in forecasts] == [
+        (9322, True),
+        (9323, False),
+        (9324, False),
+    ]
+    assert forecasts[1].damage_min is None and forecasts[2].ko_chance is None
+
+
+def test_threat_tiles_cover_every_reachable_tile_around_enemies():
+    slow_stats = dict(STATS, range=1)
+    unit = make_unit(1, 1, 0, 0, current_stats=slow_stats)
+    enemy = make_unit(2, 2, 1, 0)
+    battle = Battle([unit, enemy], make_map())
+    moves = [make_move(9330), make_move(9331, power=None, category="status")]
+
+    # The enemy blocks (1, 0), so the unit can only step down to (0, 1) before striking.
+    assert threat_tiles(battle, unit, moves) == {(0, 0), (1, 0), (0, 1), (1, 1), (0, 2)}
+    assert threat_tiles(battle, unit, moves[1:]) == set()
+
+    bits = threat_bits(battle, unit, moves)
+    assert sorted(bits_to_tiles(decode_bits(encode_bits(bits, 6, 6)), 6)) == sorted(threat_tiles(battle, unit, moves))
+
+
+def test_only_enemies_in_movement_range_of_a_change_go_stale():
+    mover = make_unit(1, 1, 3, 3)
+    far_enemy = make_unit(2, 2, 5, 5, current_stats=dict(STATS, range=3))
+    near_enemy = make_unit(3, 2, 1, 1)
+    ally = make_unit(4, 1, 0, 1)
+    battle = Battle([mover, far_enemy, near_enemy, ally], make_map(8, 8))
+
+    assert stale_threat_unit_ids(battle, {1: (0, 0)}) == {1, 3}
+    mover.current_hp = 0
+    assert stale_threat_unit_ids(battle, {1: (6, 6)}) == {1, 2}
+
+
+def test_engine_imports_without_db_or_redis_layers():
+    backend = Path(__file__).parents[3] / "apps" / "backend"
+    modules = sorted(f"app.engine.{path.stem}" for path in (backend / "app" / "engine").glob("*.py"))
+    script = (
+        "import importlib, sys\n"
+        f"for name in {modules!r}: importlib.import_module(name)\n"
+        "print(sorted(m for m in ('app.catalog', 'app.db.models', 'redis', 'sqlalchemy') if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=backend, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,198 @@
+import threading
+
+import pytest
+import redis
+from fastapi.testclient import TestClient
+from sqlalchemy.orm.exc import StaleDataError
+
+import app.db.models as models
+from app import game_commands
+from app.db import database
+from app.dependencies import get_current_user, get_db
+from app.game_commands import LEASE_KEY_PREFIX, GameBusyError, game_command
+from app.main import app
+
+
+class FakeRedis:
+    """SET NX / owner-checked delete, the part of the Redis API the lease uses."""
+
+    def __init__(self):
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def set(self, key, value, nx=False, px=None):
+        with self.lock:
+            if nx and key in self.values:
+                return None
+            self.values[key] = value
+            return True
+
+    def eval(self, script, numkeys, key, owner, *args):
+        with self.lock:
+            if self.values.get(key) != owner:
+                return 0
+            del self.values[key]
+            return 1
+
+
+class DownRedis:
+    def set(self, *args, **kwargs):
+        raise redis.ConnectionError("redis is down")
+
+    def eval(self, *args, **kwargs):
+        raise redis.ConnectionError("redis is down")
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(game_commands, "redis_client", client)
+    monkeypatch.setattr(game_commands, "_redis_down_until", 0.0)
+    monkeypatch.setattr(game_commands, "LEASE_WAIT_SECONDS", 0.2)
+    return client
+
+
+def make_game(db):
+    user = models.User(username="red", email="red@example.com", hashed_password="pw")
+    db.add(user)
+    db.flush()
+    map_obj = models.Map(name="m", width=2, height=2, tile_data={}, allowed_modes=["Conquest"])
+    db.add(map_obj)
+    db.flush()
+    game = models.Game(game_name="g", map_id=map_obj.id, map_name="m", host_id=user.id, link="commands")
+    db.add(game)
+    db.flush()
+    state = models.GameState(
+        game_id=game.id, current_turn=0, status=models.GameStatus.in_progress, players=[user.id]
+    )
+    player = models.GamePlayer(game_id=game.id, player_id=user.id, cash_remaining=100)
+    db.add_all([state, player])
+    db.commit()
+    return user, game, state, player
+
+
+def test_commands_for_one_game_run_one_at_a_time(fake_redis):
+    with game_command("a") as acquired:
+        assert acquired
+        assert fake_redis.values[f"{LEASE_KEY_PREFIX}a"]
+        with game_command("a", wait=False) as second:
+            assert not second
+        with game_command("b", wait=False) as other_game:
+            assert other_game
+        with pytest.raises(GameBusyError):
+            with game_command("a"):
+                pass
+
+    assert fake_redis.values == {}
+    with game_command("a", wait=False) as acquired:
+        assert acquired
+
+
+def test_waiting_command_runs_after_the_holder_finishes(fake_redis, monkeypatch):
+    monkeypatch.setattr(game_commands, "LEASE_WAIT_SECONDS", 5.0)
+    order = []
+    holding = threading.Event()
+    release = threading.Event()
+
+    def holder():
+        with game_command("a"):
+            holding.set()
+            release.wait(5)
+            order.append("holder")
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    holding.wait(5)
+    threading.Timer(0.05, release.set).start()
+    with game_command("a"):
+        order.append("waiter")
+    thread.join()
+
+    assert order == ["holder", "waiter"]
+
+
+def test_lease_held_by_another_worker_blocks_commands(fake_redis):
+    fake_redis.set(f"{LEASE_KEY_PREFIX}a", "other-worker")
+
+    with game_command("a", wait=False) as acquired:
+        assert not acquired
+    with pytest.raises(GameBusyError):
+        with game_command("a"):
+            pass
+    # Only the owner may release the lease.
+    assert fake_redis.values[f"{LEASE_KEY_PREFIX}a"] == "other-worker"
+
+
+def test_commands_fall_back_to_the_local_lock_when_redis_is_down(monkeypatch):
+    monkeypatch.setattr(game_commands, "redis_client", DownRedis())
+    monkeypatch.setattr(game_commands, "_redis_down_until", 0.0)
+
+    with game_command("a") as acquired:
+        assert acquired
+        with game_command("a", wait=False) as second:
+            assert not second
+    assert game_commands._redis_down_until > 0
+
+
+def test_stale_commit_fails_instead_of_overwriting(db, fake_redis):
+    _, game, state, player = make_game(db)
+    assert state.version == 1
+
+    other = database.get_sessionmaker()()
+    try:
+        other_player = other.get(models.GamePlayer, player.id)
+        other_state = other.get(models.GameState, state.id)
+
+        # A command in this session commits first; only a player row changes.
+        with game_command(game.link, db):
+            player.cash_remaining = 50
+            db.commit()
+        assert state.version == 2
+
+        # The other writer read version 1.
+        with pytest.raises(StaleDataError):
+            with game_command(game.link, other):
+                other_player.cash_remaining = 0
+                other.commit()
+        other.rollback()
+        assert other_state.version == 2
+    finally:
+        other.close()
+
+    db.refresh(player)
+    assert player.cash_remaining == 50
+
+
+def test_version_bump_keeps_pending_changes_on_an_expired_state(db, fake_redis):
+    _, game, state, player = make_game(db)
+
+    with game_command(game.link, db):
+        player.cash_remaining = 50
+        db.commit()
+        # Both rows are expired by the commit; write to the state without loading it.
+        state.current_turn = 3
+        player.cash_remaining = 40
+        db.commit()
+
+    db.expire_all()
+    assert state.current_turn == 3
+    assert state.version == 3
+    assert player.cash_remaining == 40
+
+
+def test_busy_game_returns_conflict(db, fake_redis):
+    user, game, _, _ = make_game(db)
+    fake_redis.set(f"{LEASE_KEY_PREFIX}{game.link}", "other-worker")
+
+    def override_get_db():
+        yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: user
+    try:
+        with TestClient(app) as client:
+            response = client.post(f"/games/{game.link}/end_turn")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 409
@@ -0,0 +1,96 @@
+import pytest
+
+import app.db.models as models
+from app.game_events import append_events, event_tail, read_events
+
+
+@pytest.fixture
+def user(db):
+    user = models.User(username="red", email="red@example.com", hashed_password="pw")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def make_game(db, owner, link="events"):
+    map_obj = models.Map(name="Field", width=4, height=4, tile_data={}, allowed_modes=["conquest"])
+    db.add(map_obj)
+    db.flush()
+    game = models.Game(game_name="Events", map_id=map_obj.id, map_name=map_obj.name, host_id=owner.id, link=link)
+    db.add(game)
+    db.flush()
+    state = models.GameState(game_id=game.id, current_turn=0, players=[owner.id])
+    db.add(state)
+    db.commit()
+    return game, state
+
+
+def log(index):
+    return {"event": "system_log", "message": f"line {index}"}
+
+
+def test_appends_number_events_per_game(db, user):
+    game, state = make_game(db, user)
+    other_game, other_state = make_game(db, user, link="other")
+
+    append_events(db, state, [log(1), log(2)])
+    append_events(db, other_state, [log(1)])
+    db.commit()
+    append_events(db, state, [log(3)])
+    db.commit()
+
+    rows = db.query(models.GameEvent).filter_by(game_id=game.id).order_by(models.GameEvent.seq).all()
+    assert [(row.seq, row.event, row.payload["message"]) for row in rows] == [
+        (1, "system_log", "line 1"),
+        (2, "system_log", "line 2"),
+        (3, "system_log", "line 3"),
+    ]
+    assert state.event_seq == 3
+    assert other_state.event_seq == 1
+    # The legacy column is no longer rewritten.
+    assert not state.replay_log
+
+
+def test_tail_is_bounded_and_includes_unflushed_events(db, user):
+    game, state = make_game(db, user)
+    append_events(db, state, [log(index) for index in range(1, 9)])
+    db.commit()
+    append_events(db, state, [log(9), log(10)])
+
+    assert [entry["message"] for entry in event_tail(db, game.id, limit=4)] == [
+        "line 7",
+        "line 8",
+        "line 9",
+        "line 10",
+    ]
+    assert len(event_tail(db, game.id)) == 10
+
+
+def test_range_reads_page_through_full_history(db, user):
+    game, state = make_game(db, user)
+    append_events(db, state, [log(index) for index in range(1, 6)])
+    db.commit()
+    append_events(db, state, [log(6)])
+
+    first = read_events(db, game.id, after=0, limit=4)
+    rest = read_events(db, game.id, after=first[-1].seq, limit=4)
+
+    assert [event.seq for event in first] == [1, 2, 3, 4]
+    assert [event.seq for event in rest] == [5, 6]
+    assert read_events(db, game.id, after=6) == []
+
+
+def test_events_endpoint_pages_by_seq(client, db, user):
+    game, state = make_game(db, user)
+    append_events(db, state, [log(index) for index in range(1, 4)])
+    db.commit()
+
+    page = client.get(f"/games/{game.link}/events", params={"limit": 2}).json()
+    assert [event["seq"] for event in page["events"]] == [1, 2]
+    assert page["last_seq"] == 2
+
+    page = client.get(f"/games/{game.link}/events", params={"after": page["last_seq"]}).json()
+    assert [(event["seq"], event["payload"]["message"]) for event in page["events"]] == [(3, "line 3")]
+    assert page["last_seq"] == 3
+
+    assert client.get("/games/missing/events").status_code == 404
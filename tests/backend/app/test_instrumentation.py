@@ -0,0 +1,103 @@
+import logging
+
+import pytest
+import redis
+from redis.client import Pipeline
+
+import app.db.models as models
+from app import instrumentation
+from app.instrumentation import InstrumentedRedis, RequestMetrics, _current
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics(monkeypatch):
+    for name in ("REQUEST_BUDGET_LOG", "REQUEST_METRICS_HEADERS", "METRICS_TOKEN"):
+        monkeypatch.delenv(name, raising=False)
+    instrumentation.reset_metrics()
+    yield
+    instrumentation.reset_metrics()
+
+
+def add_official_maps(db, count):
+    for index in range(count):
+        db.add(
+            models.Map(
+                name=f"map-{index}",
+                width=2,
+                height=2,
+                tile_data={},
+                allowed_modes=["Conquest"],
+                is_official=True,
+            )
+        )
+    db.commit()
+
+
+def test_requests_are_recorded_per_route(client, db):
+    add_official_maps(db, 2)
+
+    assert client.get("/maps/official").status_code == 200
+    assert client.get("/maps/official").status_code == 200
+
+    body = client.get("/metrics").text
+    assert 'http_requests_total{method="GET",route="/maps/official",status="200"} 2' in body
+    assert "# TYPE http_request_db_queries histogram" in body
+    assert 'http_request_db_queries_count{method="GET",route="/maps/official"} 2' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/maps/official",le="+Inf"} 2' in body
+    # Requests that match no route share one label instead of one per path.
+    client.get("/no/such/path")
+    assert 'route="<unmatched>",status="404"' in client.get("/metrics").text
+
+
+def test_query_count_header_is_opt_in(client, db, monkeypatch):
+    add_official_maps(db, 1)
+    monkeypatch.setenv("REQUEST_METRICS_HEADERS", "1")
+    # The first request renders the catalog; later ones are served from cache.
+    assert int(client.get("/maps/official").headers["x-query-count"]) >= 1
+    assert client.get("/maps/official").headers["x-query-count"] == "0"
+
+    monkeypatch.delenv("REQUEST_METRICS_HEADERS")
+    assert "x-query-count" not in client.get("/maps/official").headers
+
+
+def test_over_budget_requests_are_logged_by_call_site(client, db, monkeypatch, caplog):
+    add_official_maps(db, 1)
+    monkeypatch.setenv("REQUEST_BUDGET_LOG", "1")
+    monkeypatch.setenv("REQUEST_QUERY_BUDGET", "0")
+
+    with caplog.at_level(logging.WARNING, logger="instrumentation"):
+        response = client.get("/maps/official")
+
+    assert response.headers["x-query-count"]
+    [record] = [r for r in caplog.records if r.name == "instrumentation"]
+    assert "GET /maps/official over budget" in record.message
+    assert "app/routes/maps.py:" in record.message
+    assert "SELECT" in record.message
+
+
+def test_redis_commands_and_pipelines_are_counted(monkeypatch):
+    # Stand in for the server round trips underneath the instrumented methods.
+    monkeypatch.setattr(redis.Redis, "execute_command", lambda self, *args, **options: "OK")
+    monkeypatch.setattr(Pipeline, "execute", lambda self, raise_on_error=True: ["OK"] * len(self.command_stack))
+    client = InstrumentedRedis()
+
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        client.get("a")
+        pipe = client.pipeline(transaction=False)
+        pipe.set("a", 1)
+        pipe.set("b", 2)
+        assert pipe.execute() == ["OK", "OK"]
+    finally:
+        _current.reset(token)
+
+    # One command and one pipeline round trip.
+    assert metrics.redis_calls == 2
+
+
+def test_metrics_token_is_required_when_configured(client, monkeypatch):
+    monkeypatch.setenv("METRICS_TOKEN", "scrape")
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape"}).status_code == 200
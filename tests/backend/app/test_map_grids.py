@@ -0,0 +1,135 @@
+import json
+import random
+
+from sqlalchemy import text
+
+import app.db.models as models
+from app.map_grids import (
+    decode_grid,
+    encode_grid,
+    hazard_entries_at,
+    item_id_at,
+    timed_effect_id_at,
+    weather_id_at,
+)
+
+
+def test_mostly_empty_grids_are_run_length_encoded():
+    grid = [[0] * 32 for _ in range(32)]
+    grid[4][7] = 2
+
+    encoded = encode_grid(grid)
+
+    assert encoded == {"enc": "rle", "w": 32, "h": 32, "runs": [0, 135, 2, 1, 0, 888]}
+    assert decode_grid(encoded) == grid
+    assert len(json.dumps(encoded)) < len(json.dumps(grid)) / 40
+
+
+def test_busy_integer_grids_are_packed():
+    rng = random.Random(3)
+    ids = [[rng.choice((None, 0, 1, 2, 3)) for _ in range(12)] for _ in range(9)]
+    timed = [[[rng.randint(0, 4), rng.randint(0, 5)] for _ in range(12)] for _ in range(9)]
+    wide = [[rng.randint(0, 40000) for _ in range(12)] for _ in range(9)]
+
+    encoded_ids = encode_grid(ids)
+    assert (encoded_ids["enc"], encoded_ids["t"], encoded_ids["nulls"]) == ("packed", "b", True)
+    assert decode_grid(encoded_ids) == ids
+    encoded_timed = encode_grid(timed)
+    assert (encoded_timed["enc"], encoded_timed["stride"]) == ("packed", 2)
+    assert decode_grid(encoded_timed) == timed
+    assert encode_grid(wide)["t"] == "i"
+    assert decode_grid(encode_grid(wide)) == wide
+
+
+def test_sparse_grids_keep_only_occupied_cells():
+    hazards = [[[] for _ in range(5)] for _ in range(4)]
+    hazards[1][3] = [[1, 3], [1, 2]]
+    objectives = [[None] * 5 for _ in range(4)]
+    objectives[2][0] = {"kind": "pokeball", "owner": 1, "hp": 3}
+
+    encoded = encode_grid(hazards, sparse=True)
+    assert encoded["cells"] == [[3, 1, [[1, 3], [1, 2]]]]
+    decoded = decode_grid(encoded)
+    assert decoded == hazards
+    # Empty cells must not share one list; game code appends to them in place.
+    decoded[0][0].append([2, 1])
+    assert decoded[0][1] == []
+    assert decode_grid(encode_grid(objectives, sparse=True)) == objectives
+
+
+def test_sparse_grids_keep_mixed_empty_cells():
+    hazards = [[[], None, []], [None, [[1, 3]], []]]
+
+    encoded = encode_grid(hazards, sparse=True)
+    assert encoded["empty"] == []
+    assert encoded["cells"] == [[1, 0, None], [0, 1, None], [1, 1, [[1, 3]]]]
+    assert decode_grid(encoded) == hazards
+
+
+def test_irregular_and_legacy_grids_pass_through():
+    ragged = [[0, 0], [0]]
+    assert encode_grid(ragged) == ragged
+    assert encode_grid([]) == []
+    assert decode_grid([[1, 2], [3, 4]]) == [[1, 2], [3, 4]]
+
+
+def test_cell_accessors():
+    weather = [[0, 2], [[3, 4], "x"]]
+    assert weather_id_at(weather, 1, 0) == 2
+    assert weather_id_at(weather, 1, 1) == 0
+    assert weather_id_at(weather, 5, 0) == 0
+    assert weather_id_at(None, 0, 0) == 0
+    assert timed_effect_id_at(weather, 0, 1) == 3
+    assert timed_effect_id_at([[1]], 0, 0) == 1
+    assert hazard_entries_at([[[[1, 2], [0, 1], "x"]]], 0, 0) == [[1, 2]]
+    assert hazard_entries_at([[[]]], 0, 3) == []
+    assert item_id_at([[None, 0, 7]], 0, 0) is None
+    assert item_id_at([[None, 0, 7]], 1, 0) == 0
+    assert item_id_at([[None, 0, 7]], 2, 0) == 7
+
+
+def test_map_state_grids_are_stored_compactly(db):
+    user = models.User(username="red", email="red@example.com", hashed_password="pw")
+    db.add(user)
+    db.flush()
+    map_obj = models.Map(name="m", width=3, height=2, tile_data={}, allowed_modes=["Conquest"])
+    db.add(map_obj)
+    db.flush()
+    game = models.Game(game_name="g", map_id=map_obj.id, map_name="m", host_id=user.id, link="grids")
+    db.add(game)
+    db.flush()
+    map_state = models.GameMapState(
+        game_id=game.id,
+        map_id=map_obj.id,
+        weather_tiles=[[0, 0, 0], [0, 0, 1]],
+        hazard_tiles=[[[], [], []], [[], [[1, 3]], []]],
+        room_effect_tiles=[[0] * 3 for _ in range(2)],
+        terrain_effect_tiles=[[[0, 0]] * 3 for _ in range(2)],
+        field_effect_tiles=[[0] * 3 for _ in range(2)],
+        item_id_tiles=[[None, 4, None], [None, None, None]],
+        objective_tiles=[],
+    )
+    db.add(map_state)
+    db.commit()
+
+    raw = db.execute(
+        text("SELECT weather_tiles, hazard_tiles, objective_tiles FROM game_map_states WHERE id = :id"),
+        {"id": map_state.id},
+    ).one()
+    assert json.loads(raw.weather_tiles)["enc"] == "packed"
+    assert json.loads(raw.hazard_tiles) == {"enc": "sparse", "w": 3, "h": 2, "empty": [], "cells": [[1, 1, [[1, 3]]]]}
+    assert json.loads(raw.objective_tiles) == []
+
+    # Rows written before the encoding still load.
+    db.execute(
+        text("UPDATE game_map_states SET field_effect_tiles = :grid WHERE id = :id"),
+        {"grid": json.dumps([[0, 1, 0], [0, 0, 0]]), "id": map_state.id},
+    )
+    db.commit()
+    db.expire_all()
+    loaded = db.get(models.GameMapState, map_state.id)
+    assert loaded.weather_tiles == [[0, 0, 0], [0, 0, 1]]
+    assert loaded.hazard_tiles[1][1] == [[1, 3]]
+    assert loaded.terrain_effect_tiles == [[[0, 0]] * 3 for _ in range(2)]
+    assert loaded.item_id_tiles == [[None, 4, None], [None, None, None]]
+    assert loaded.field_effect_tiles == [[0, 1, 0], [0, 0, 0]]
@@ -7,6 +7,7 @@ from app.map_movement import (
     SAND_MOVEMENT_COST,
     STUMP_MOVEMENT_COST,
     build_movement_cost_grid,
+    build_movement_graph,
     can_enter_tile,
     find_shortest_path,
     get_grass_defense_multiplier,
@@ -194,6 +195,17 @@ def test_find_shortest_path_reaches_destination():
     assert path == [(0, 0), (1, 0), (2, 0)]
 
 
+def test_movement_follows_the_cheapest_path_around_ice():
+    # Straight ahead is fewer steps but crosses sand and ice; the plain detour is cheaper.
+    special = [[None, "sand", "ice", "sand", "sand", None], [None] * 6]
+    costs = build_movement_cost_grid([[1] * 6 for _ in range(2)], special, {"normal"})
+
+    assert [5, 0] in movement_range_with_terrain((0, 0), 7, costs, special, 6, 2, {"normal"})
+    path = find_shortest_path((0, 0), (5, 0), costs, special, 6, 2, {"normal"})
+    assert path == [(0, 0), (0, 1), (1, 1), (2, 1), (3, 1), (4, 1), (5, 1), (5, 0)]
+    assert resolve_movement_destination(0, 0, 5, 0, costs, special, 6, 2, {"normal"}) == (5, 0, False)
+
+
 def test_is_ice_tile_reads_special_tiles_grid():
     special = [[None, "ice"], ["Ice", None]]
     assert is_ice_tile(special, 1, 0) is True
@@ -439,3 +451,50 @@ def test_can_enter_tile_and_destination_helpers():
     assert is_valid_movement_destination(special, 0, 0, {"flying"}) is True
     assert unit_can_stand_on_ledge({"flying"}) is True
     assert unit_can_stand_on_ledge({"rock"}) is False
+
+
+def test_movement_range_settles_tile_at_cheapest_cost():
+    # (2, 0) is first discovered in two steps through the cost-5 tile, but the
+    # four-step detour along the bottom row is cheaper. Expanding from the cheap
+    # path is what makes (3, 0) and (2, 1) reachable.
+    costs = [
+        [1, 5, 1, 1],
+        [1, 1, 1, IMPOSSIBLE_MOVEMENT_COST],
+    ]
+    tiles = movement_range_with_terrain(
+        start=(0, 0),
+        rng=6,
+        movement_costs=costs,
+        special_tiles=None,
+        width=4,
+        height=2,
+        unit_types={"normal"},
+    )
+    coords = {(t[0], t[1]) for t in tiles}
+    assert coords == {(0, 0), (1, 0), (2, 0), (3, 0), (0, 1), (1, 1), (2, 1)}
+
+
+def test_movement_range_with_prebuilt_graph_matches_fresh_graph():
+    special = [
+        [None, "ledge_down", None, "water"],
+        [None, None, "sand", None],
+        ["rock", None, "stump", "impassable"],
+    ]
+    base = [[1] * 4 for _ in range(3)]
+    graph = build_movement_graph(special, 4, 3)
+    for types in ({"normal"}, {"flying"}, {"water"}, {"ground"}):
+        costs = build_movement_cost_grid(base, special, types)
+        fresh = movement_range_with_terrain((0, 0), 4, costs, special, 4, 3, types)
+        reused = movement_range_with_terrain((0, 0), 4, costs, special, 4, 3, types, graph=graph)
+        assert sorted(fresh) == sorted(reused)
+
+
+def test_movement_range_respects_ledge_entry_direction():
+    special = [[None], ["ledge_down"], [None]]
+    costs = build_movement_cost_grid([[1], [1], [1]], special, {"normal"})
+
+    down = movement_range_with_terrain((0, 0), 3, costs, special, 1, 3, {"normal"})
+    assert {(t[0], t[1]) for t in down} == {(0, 0), (0, 2)}
+
+    up = movement_range_with_terrain((0, 2), 3, costs, special, 1, 3, {"normal"})
+    assert {(t[0], t[1]) for t in up} == {(0, 2)}
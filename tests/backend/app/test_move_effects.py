@@ -0,0 +1,125 @@
+from types import SimpleNamespace
+
+import app.db.models as models
+from app.catalog import MoveRecord, freeze, get_catalog
+from app.engine.effects import MOVE_EFFECT_HANDLERS
+from app.move_effects import EMPTY_PROGRAM, UNIT_EFFECT_TYPES, compile_move_program, move_program
+from app.routes.games import (
+    ROUTE_EFFECT_HANDLERS,
+    get_move_hit_count,
+    get_scaling_hit_powers,
+    move_has_effect_token,
+    move_has_high_crit_ratio,
+    move_has_revive_effect,
+    move_has_target_fixed_damage_effect,
+    move_is_instant_ko,
+)
+
+
+def make_record(move_id, effects):
+    fields = {field: None for field in MoveRecord.__dataclass_fields__}
+    fields.update(id=move_id, name=f"Move {move_id}", type="Normal", category="physical", effects=freeze(effects))
+    return MoveRecord(**fields)
+
+
+def test_compiled_program_indexes_tokens_and_heads():
+    program = compile_move_program([" Target:Fixed_Damage:Level ", "multi_hit:scaling:10,20,30", "high_crit_ratio"])
+
+    assert program.has("target:fixed_damage:level")
+    assert [op.raw for op in program.fixed_damage] == ["Target:Fixed_Damage:Level"]
+    assert [op.lower_parts for op in program.with_head("multi_hit")] == [("multi_hit", "scaling", "10,20,30")]
+    assert program.high_crit_ratio
+    assert not program.instant_ko
+    assert program.with_head("power_add") == ()
+
+
+def test_on_use_keeps_only_ops_process_move_effects_handles():
+    program = compile_move_program(
+        [
+            "target:lower_stat:defense:1",
+            "weather:rain:5",
+            "break_screens",
+            "power_add:ally:20",
+            "multi_hit:2:5",
+            "guaranteed_crit",
+        ]
+    )
+
+    assert [op.raw for op in program.on_use] == ["target:lower_stat:defense:1", "weather:rain:5", "break_screens"]
+    assert [op.handler for op in program.on_use] == ["lower_stat", "weather", "break_screens"]
+
+
+def test_every_handler_key_has_a_handler():
+    effects = [
+        "break_screens",
+        "weather:rain:5",
+        "terrain:grassy:5",
+        "field_hazard:spikes",
+        "field:clear_hazards",
+        "field:Clear_Substitutes",
+        "field:tailwind:4",
+        "field:gravity:5",
+        "self:clear_hazards",
+        "self:consume_berry",
+        "target:remove_held_item",
+        "target:field_hazard:spikes",
+        *(f"target:{effect_type}" for effect_type in UNIT_EFFECT_TYPES),
+    ]
+
+    program = compile_move_program(effects)
+
+    assert len(program.on_use) == len(effects)
+    assert {op.handler for op in program.on_use} == set(MOVE_EFFECT_HANDLERS) | set(ROUTE_EFFECT_HANDLERS)
+    assert not set(MOVE_EFFECT_HANDLERS) & set(ROUTE_EFFECT_HANDLERS)
+
+
+def test_non_list_effects_compile_to_the_empty_program():
+    assert move_program(None) is EMPTY_PROGRAM
+    assert compile_move_program(None) is EMPTY_PROGRAM
+    assert compile_move_program({"effect": "burn"}) is EMPTY_PROGRAM
+    assert not move_has_effect_token(SimpleNamespace(effects="guaranteed_crit"), "guaranteed_crit")
+
+
+def test_catalog_records_share_a_program_until_the_record_is_replaced():
+    record = make_record(1, ["self:raise_stat:attack:1"])
+
+    assert move_program(record) is move_program(record)
+
+    replacement = make_record(1, ["target:instant_ko"])
+    assert move_program(replacement) is not move_program(record)
+    assert move_is_instant_ko(replacement)
+    assert not move_is_instant_ko(record)
+
+
+def test_orm_moves_are_compiled_from_their_current_effects(db):
+    move = models.Move(id=1, name="Tackle", type="Normal", category="physical", power=40, accuracy=100, pp=35)
+    move.effects = ["guaranteed_crit"]
+
+    assert move_has_effect_token(move, "GUARANTEED_CRIT ")
+
+    move.effects = ["target:revive"]
+    assert not move_has_effect_token(move, "guaranteed_crit")
+    assert move_has_revive_effect(move)
+
+
+def test_helpers_answer_from_the_program(db):
+    db.add(
+        models.Move(
+            id=7,
+            name="Triple Axel",
+            type="Ice",
+            category="physical",
+            power=20,
+            accuracy=90,
+            pp=10,
+            effects=["multi_hit:scaling:20,40,60", "target:high_crit_ratio", "target:fixed_damage:level"],
+        )
+    )
+    db.commit()
+    move = get_catalog(db).moves[7]
+
+    assert get_scaling_hit_powers(move) == [20, 40, 60]
+    assert get_move_hit_count(move) == 3
+    assert move_has_high_crit_ratio(move)
+    assert move_has_target_fixed_damage_effect(move)
+    assert not move_is_instant_ko(move)
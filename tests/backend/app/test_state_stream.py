@@ -0,0 +1,201 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.db.models as models
+import app.routes.games as games_module
+from app.dependencies import get_current_user, get_db
+from app.main import app
+from app.state_stream import (
+    PATCH_INFO_KEY,
+    patch_log_key,
+    read_patches,
+    stage_patch,
+    state_seq_key,
+)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.results = []
+
+    def get(self, key):
+        self.results.append(self.redis.values.get(key))
+
+    def lrange(self, key, start, end):
+        self.results.append(list(self.redis.lists.get(key, [])))
+
+    def execute(self):
+        return self.results
+
+
+class StreamRedis:
+    """Applies APPEND_PATCH_SCRIPT's steps in Python."""
+
+    def __init__(self):
+        self.values = {}
+        self.lists = {}
+        self.published = []
+
+    def eval(self, script, numkeys, seq_key, log_key, body, log_size, ttl, channel):
+        seq = int(self.values.get(seq_key) or 0) + 1
+        self.values[seq_key] = str(seq)
+        message = '{"seq":' + str(seq) + "," + body[1:]
+        self.lists[log_key] = (self.lists.get(log_key, []) + [message])[-int(log_size):]
+        self.published.append((channel, message))
+        return seq
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+@pytest.fixture
+def stream_redis(monkeypatch):
+    redis = StreamRedis()
+    monkeypatch.setattr(games_module, "redis_client", redis)
+    return redis
+
+
+def _make_game(db):
+    owner = models.User(username="ash", email="ash@example.com", hashed_password="x")
+    map_obj = models.Map(name="Field", width=4, height=4, tile_data={}, allowed_modes=["Conquest"])
+    species = models.Unit(
+        species_id=1, name="Testmon", species="Testmon", asset_folder="testmon", types=["Normal"],
+        base_stats={"hp": 50}, level_up_moves=[], tm_moves=[], egg_moves=[], equipped_moves=[],
+        ability_ids=[], cost=100,
+    )
+    db.add_all([owner, map_obj, species])
+    db.flush()
+    game = models.Game(game_name="Stream", map_id=map_obj.id, map_name=map_obj.name, host_id=owner.id, link="stream")
+    db.add(game)
+    db.flush()
+    player = models.GamePlayer(game_id=game.id, player_id=owner.id, cash_remaining=500, game_units=[])
+    unit = models.GameUnit(
+        game_id=game.id, unit_id=species.id, user_id=owner.id, starting_x=0, starting_y=0,
+        current_x=0, current_y=0, current_hp=50, current_stats={"hp": 50}, move_pp=[10],
+    )
+    db.add_all([player, unit])
+    db.commit()
+    return owner, game, player, unit
+
+
+def _patches(redis):
+    return [json.loads(message) for _, message in redis.published if message.startswith("{")]
+
+
+def test_staged_patch_is_published_with_committed_values(db, stream_redis):
+    _, game, player, unit = _make_game(db)
+
+    games_module.stage_state_patch(db, game.id, units=[unit], players=[player])
+    unit.current_x = 2
+    player.cash_remaining = 300
+    assert stream_redis.published == []
+    db.commit()
+
+    (patch,) = _patches(stream_redis)
+    assert stream_redis.published[0][0] == "game_updates:stream"
+    assert patch["seq"] == 1
+    assert patch["units"][0]["id"] == unit.id
+    assert patch["units"][0]["current_x"] == 2
+    assert patch["players"] == [{"player_id": player.player_id, "cash_remaining": 300}]
+    assert PATCH_INFO_KEY not in db.info
+
+
+def test_rolled_back_changes_are_not_published(db, stream_redis):
+    _, game, _, unit = _make_game(db)
+
+    games_module.stage_state_patch(db, game.id, units=[unit])
+    db.rollback()
+    db.commit()
+
+    assert stream_redis.published == []
+
+
+def test_removed_units_are_not_sent_as_updates(db, stream_redis):
+    _, game, _, unit = _make_game(db)
+
+    stage_patch(db, stream_redis, game.id, units=[unit], removed_unit_ids=[unit.id])
+    stage_patch(db, stream_redis, game.id, tiles=[(1, 2, {"hp": 10, "owner": 1, "kind": "pokeball"})])
+    db.commit()
+
+    (patch,) = _patches(stream_redis)
+    assert patch["units"] == []
+    assert patch["removed_unit_ids"] == [unit.id]
+    assert patch["tiles"] == [{"x": 1, "y": 2, "objective": {"hp": 10, "owner": 1, "kind": "pokeball"}}]
+
+
+def test_staged_map_state_publishes_every_changed_cell(db, stream_redis):
+    _, game, _, _ = _make_game(db)
+    map_state = models.GameMapState(
+        game_id=game.id,
+        map_id=game.map_id,
+        weather_tiles=[[0] * 4 for _ in range(4)],
+        hazard_tiles=[[[] for _ in range(4)] for _ in range(4)],
+        terrain_effect_tiles=[[[0, 0]] * 4 for _ in range(4)],
+        item_id_tiles=[[None] * 4 for _ in range(4)],
+    )
+    db.add(map_state)
+    db.commit()
+
+    # Nothing changed, so nothing is published.
+    games_module.stage_state_patch(db, game.id, map_state=map_state)
+    db.commit()
+    assert stream_redis.published == []
+
+    games_module.stage_state_patch(db, game.id, map_state=map_state)
+    map_state.weather_tiles[1][2] = 3
+    map_state.hazard_tiles[1][2] = [[1, 2]]
+    map_state.terrain_effect_tiles[0][3] = [2, 5]
+    stage_patch(db, stream_redis, game.id, tiles=[(3, 0, {"hp": 10, "owner": 1, "kind": "pokeball"})])
+    db.commit()
+
+    (patch,) = _patches(stream_redis)
+    assert sorted(patch["tiles"], key=lambda tile: (tile["y"], tile["x"])) == [
+        {"x": 3, "y": 0, "objective": {"hp": 10, "owner": 1, "kind": "pokeball"}, "terrain_effect": [2, 5]},
+        {"x": 2, "y": 1, "weather": 3, "hazards": [[1, 2]]},
+    ]
+
+
+def test_read_patches_reports_gaps():
+    redis = StreamRedis()
+    for seq in range(1, 4):
+        redis.eval("", 2, state_seq_key("g"), patch_log_key("g"), json.dumps({"n": seq}), 2, 60, "c")
+
+    assert read_patches(redis, "g", None) == {"seq": 3, "complete": True, "patches": []}
+    assert [p["seq"] for p in read_patches(redis, "g", 1)["patches"]] == [2, 3]
+    assert read_patches(redis, "g", 3)["complete"] is True
+    # Patch 1 fell out of the two-entry log.
+    assert read_patches(redis, "g", 0) == {"seq": 3, "complete": False, "patches": []}
+    assert read_patches(redis, "g", 7)["complete"] is False
+
+
+def test_patches_endpoint_replays_after_move(db, stream_redis):
+    owner, game, _, unit = _make_game(db)
+    db.add(models.GameState(game_id=game.id, current_turn=0, status=models.GameStatus.in_progress,
+                            players=[owner.id], replay_log=[]))
+    db.commit()
+    unit_id = unit.id
+
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: owner
+    try:
+        with TestClient(app) as client:
+            games_module.stage_state_patch(db, game.id, unit_ids=[unit_id])
+            db.get(models.GameUnit, unit_id).current_hp = 20
+            db.commit()
+
+            resp = client.get("/games/stream/patches", params={"since": 0})
+            current = client.get("/games/stream/patches")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["complete"] is True
+    assert [patch["units"][0]["current_hp"] for patch in body["patches"]] == [20]
+    assert current.json() == {"seq": 1, "complete": True, "patches": []}
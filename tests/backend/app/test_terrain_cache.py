@@ -0,0 +1,92 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.map_movement import build_movement_cost_grid
+from app.terrain_cache import (
+    OTHER_TILE_CODE,
+    TILE_KIND_CODES,
+    clear_terrain_cache,
+    get_compiled_terrain,
+)
+
+
+class DummyMap:
+    def __init__(self, map_id, tile_data, width, height, updated_at=None):
+        self.id = map_id
+        self.tile_data = tile_data
+        self.width = width
+        self.height = height
+        self.created_at = None
+        self.updated_at = updated_at
+
+
+SPECIAL = [
+    [None, "Water", "rock", "ledge_down"],
+    ["sand", "stump", "impassable", "pokeball_p1"],
+    ["grass", "ice", None, "ledge_left"],
+]
+BASE = [[1, 1, 1, 1], [1, 2, 1, 1], [1, 1, 3, 1]]
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    clear_terrain_cache()
+    yield
+    clear_terrain_cache()
+
+
+def _map(map_id=1, updated_at=None):
+    return DummyMap(map_id, {"movement_cost": BASE, "special_tiles": SPECIAL}, 4, 3, updated_at)
+
+
+@pytest.mark.parametrize(
+    "unit_types, ability_names",
+    [
+        ({"normal"}, None),
+        ({"water"}, None),
+        ({"rock"}, None),
+        ({"flying"}, None),
+        ({"ground"}, None),
+        ({"grass"}, {"levitate"}),
+    ],
+)
+def test_cost_grid_matches_build_movement_cost_grid(unit_types, ability_names):
+    terrain = get_compiled_terrain(_map())
+    assert terrain.cost_grid(unit_types, ability_names) == build_movement_cost_grid(
+        BASE, SPECIAL, unit_types, ability_names
+    )
+
+
+def test_tile_codes_are_compact_and_decode_back():
+    terrain = get_compiled_terrain(_map())
+    assert terrain.tile_codes.itemsize == 1
+    assert terrain.tile_codes[1] == TILE_KIND_CODES["water"]
+    assert terrain.tile_codes[7] == OTHER_TILE_CODE
+    assert terrain.tile_kind(1, 0) == "water"
+    assert terrain.tile_kind(3, 1) == "pokeball_p1"
+    assert terrain.tile_kind(9, 9) is None
+
+
+def test_compiled_terrain_is_shared_per_map_and_capability_signature():
+    first = get_compiled_terrain(_map())
+    second = get_compiled_terrain(_map())
+    assert first is second
+    # Fire and normal types move identically, so they share one grid object.
+    assert first.cost_grid({"fire"}) is first.cost_grid({"normal"})
+    assert first.cost_grid({"water"}) is not first.cost_grid({"normal"})
+
+
+def test_updated_map_is_recompiled():
+    original = get_compiled_terrain(_map())
+    refreshed_map = _map(updated_at=datetime(2030, 1, 1, tzinfo=timezone.utc))
+    refreshed_map.tile_data = {"movement_cost": BASE, "special_tiles": [[None] * 4 for _ in range(3)]}
+
+    refreshed = get_compiled_terrain(refreshed_map)
+    assert refreshed is not original
+    assert refreshed.cost_grid({"normal"}) == BASE
+
+
+def test_map_without_special_tiles_uses_base_costs():
+    plain = DummyMap(2, {"movement_cost": BASE}, 4, 3)
+    assert get_compiled_terrain(plain).cost_grid({"normal"}) is BASE
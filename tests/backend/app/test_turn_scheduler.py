@@ -0,0 +1,226 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import app.db.models as models
+from app import game_commands, turn_scheduler
+from app.turn_scheduler import (
+    RETRY_DELAY_SECONDS,
+    TURN_DEADLINES_KEY,
+    next_wake_at,
+    reconcile_turn_deadlines,
+    run_due_turns,
+    schedule_turn_deadline,
+    turn_warning_seconds,
+)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def record(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+
+        return record
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class FakeRedis:
+    """Minimal sorted-set / lease subset of the Redis API used by the scheduler."""
+
+    def __init__(self):
+        self.zsets = {}
+        self.values = {}
+        self.evals = 0
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zrem(self, key, *members):
+        for member in members:
+            self.zsets.get(key, {}).pop(member, None)
+
+    def zrangebyscore(self, key, low, high, start=0, num=None):
+        members = sorted(self.zsets.get(key, {}).items(), key=lambda item: item[1])
+        due = [member for member, score in members if score <= high]
+        return due[start:start + num] if num is not None else due[start:]
+
+    def delete(self, key):
+        self.zsets.pop(key, None)
+        self.values.pop(key, None)
+
+    def set(self, key, value, nx=False, px=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def eval(self, script, numkeys, key, owner, *args):
+        self.evals += 1
+        if self.values.get(key) != owner:
+            return 0
+        if "'del'" in script:
+            del self.values[key]
+        return 1
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(turn_scheduler, "redis_client", client)
+    monkeypatch.setattr(game_commands, "redis_client", client)
+    monkeypatch.setattr(turn_scheduler, "_last_reconcile_at", None)
+    monkeypatch.setattr(turn_scheduler, "_next_lease_attempt_at", 0.0)
+    return client
+
+
+def _make_game(db, *, status, deadline, turn_seconds=300):
+    index = db.query(models.User).count()
+    user = models.User(username=f"host{index}", email=f"host{index}@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    map_obj = models.Map(name="m", width=2, height=2, tile_data={}, allowed_modes=["Conquest"])
+    db.add(map_obj)
+    db.flush()
+    game = models.Game(
+        game_name="g",
+        map_id=map_obj.id,
+        map_name="m",
+        host_id=user.id,
+        link=f"link-{user.id}",
+        turn_seconds=turn_seconds,
+    )
+    db.add(game)
+    db.flush()
+    state = models.GameState(game_id=game.id, current_turn=0, status=status, players=[user.id], turn_deadline=deadline)
+    db.add(state)
+    db.commit()
+    return game, state
+
+
+def test_turn_warning_seconds_matches_turn_length():
+    assert turn_warning_seconds(60) == 30
+    assert turn_warning_seconds(30) == 30
+    assert turn_warning_seconds(300) == 60
+    assert turn_warning_seconds(None) == 30
+
+
+def test_next_wake_at_walks_warning_then_deadline():
+    deadline = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    deadline_ts = deadline.timestamp()
+
+    assert next_wake_at(300, deadline, deadline_ts - 120) == deadline_ts - 60
+    assert next_wake_at(300, deadline, deadline_ts - 30) == deadline_ts
+    assert next_wake_at(300, deadline, deadline_ts + 1) == deadline_ts + 1
+    assert (
+        next_wake_at(300, deadline, deadline_ts + 1, overdue_delay=RETRY_DELAY_SECONDS)
+        == deadline_ts + 1 + RETRY_DELAY_SECONDS
+    )
+
+
+def test_next_wake_at_treats_naive_deadlines_as_utc():
+    aware = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    naive = aware.replace(tzinfo=None)
+    assert next_wake_at(300, naive, 0) == next_wake_at(300, aware, 0)
+
+
+def test_schedule_turn_deadline_indexes_only_in_progress_games(db, fake_redis):
+    deadline = datetime.now(timezone.utc) + timedelta(minutes=5)
+    game, state = _make_game(db, status=models.GameStatus.in_progress, deadline=deadline)
+
+    schedule_turn_deadline(game, state)
+    assert str(game.id) in fake_redis.zsets[TURN_DEADLINES_KEY]
+
+    state.status = models.GameStatus.completed
+    schedule_turn_deadline(game, state)
+    assert str(game.id) not in fake_redis.zsets[TURN_DEADLINES_KEY]
+
+
+def test_reconcile_turn_deadlines_rebuilds_index(db, fake_redis):
+    deadline = datetime.now(timezone.utc) + timedelta(minutes=5)
+    active, _ = _make_game(db, status=models.GameStatus.in_progress, deadline=deadline)
+    _make_game(db, status=models.GameStatus.completed, deadline=deadline)
+    fake_redis.zadd(TURN_DEADLINES_KEY, {"999": 0})
+
+    assert reconcile_turn_deadlines(db) == 1
+    assert set(fake_redis.zsets[TURN_DEADLINES_KEY]) == {str(active.id)}
+
+
+def test_run_due_turns_only_visits_due_games(db, fake_redis, monkeypatch):
+    now = datetime.now(timezone.utc)
+    due, _ = _make_game(db, status=models.GameStatus.in_progress, deadline=now - timedelta(seconds=1))
+    later, _ = _make_game(db, status=models.GameStatus.in_progress, deadline=now + timedelta(minutes=10))
+
+    visited = []
+    monkeypatch.setattr(
+        "app.routes.games.advance_if_expired",
+        lambda game, state, db: visited.append(game.id) or False,
+    )
+
+    assert run_due_turns(now.timestamp()) == 1
+    assert visited == [due.id]
+    # The unadvanced game is retried shortly instead of every tick.
+    assert fake_redis.zsets[TURN_DEADLINES_KEY][str(due.id)] > now.timestamp()
+    assert fake_redis.zsets[TURN_DEADLINES_KEY][str(later.id)] > now.timestamp()
+
+
+def test_run_due_turns_retries_games_busy_with_a_command(db, fake_redis, monkeypatch):
+    now = datetime.now(timezone.utc)
+    busy, _ = _make_game(db, status=models.GameStatus.in_progress, deadline=now - timedelta(seconds=1))
+    fake_redis.set(f"{game_commands.LEASE_KEY_PREFIX}{busy.link}", "other-worker")
+
+    monkeypatch.setattr(
+        "app.routes.games.advance_if_expired",
+        lambda game, state, db: pytest.fail("a game busy with a command must not be advanced"),
+    )
+
+    assert run_due_turns(now.timestamp()) == 1
+    assert fake_redis.zsets[TURN_DEADLINES_KEY][str(busy.id)] >= now.timestamp() + RETRY_DELAY_SECONDS
+
+
+def test_run_due_turns_skips_when_another_worker_leads(db, fake_redis, monkeypatch):
+    now = datetime.now(timezone.utc)
+    _make_game(db, status=models.GameStatus.in_progress, deadline=now - timedelta(seconds=1))
+    fake_redis.set(turn_scheduler.LEADER_KEY, "other-worker")
+
+    monkeypatch.setattr(
+        "app.routes.games.advance_if_expired",
+        lambda game, state, db: pytest.fail("non-leader must not advance turns"),
+    )
+
+    assert run_due_turns(now.timestamp()) == 0
+    # Followers retry the lease at a slower pace than the leader's tick.
+    evals = fake_redis.evals
+    assert run_due_turns(now.timestamp()) == 0
+    assert fake_redis.evals == evals
+
+
+def test_release_leadership_keeps_another_workers_lease(fake_redis):
+    fake_redis.set(turn_scheduler.LEADER_KEY, turn_scheduler.WORKER_ID)
+    turn_scheduler.release_leadership()
+    assert turn_scheduler.LEADER_KEY not in fake_redis.values
+
+    fake_redis.set(turn_scheduler.LEADER_KEY, "other-worker")
+    turn_scheduler.release_leadership()
+    assert fake_redis.values[turn_scheduler.LEADER_KEY] == "other-worker"
+
+
+def test_run_due_turns_drops_missing_games(db, fake_redis):
+    fake_redis.set(turn_scheduler.LEADER_KEY, turn_scheduler.WORKER_ID)
+    turn_scheduler._last_reconcile_at = 10**12
+    fake_redis.zadd(TURN_DEADLINES_KEY, {"12345": 0})
+
+    assert run_due_turns(100.0) == 0
+    assert "12345" not in fake_redis.zsets[TURN_DEADLINES_KEY]
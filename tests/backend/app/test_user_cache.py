@@ -0,0 +1,149 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event
+
+import app.db.models as models
+from app import user_cache
+from app.db import database
+from app.routes import ws
+from app.user_cache import load_user, user_is_game_participant
+from app.utils.session import create_session_token
+
+
+@pytest.fixture
+def queries(test_engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(test_engine, "before_cursor_execute", record)
+
+
+def make_user(db, username="red"):
+    user = models.User(username=username, email=f"{username}@example.com", hashed_password="pw")
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+def test_cached_user_is_merged_into_the_session_without_a_query(db, queries):
+    user_id = make_user(db)
+    Session = database.get_sessionmaker()
+
+    first = Session()
+    try:
+        assert load_user(first, user_id).username == "red"
+    finally:
+        first.close()
+
+    queries.clear()
+    second = Session()
+    try:
+        user = load_user(second, user_id)
+        assert user.username == "red"
+        assert user in second
+        assert queries == []
+    finally:
+        second.close()
+
+
+def test_committed_ban_and_role_change_drop_the_cached_user(db):
+    user_id = make_user(db)
+    Session = database.get_sessionmaker()
+    reader = Session()
+    try:
+        assert not load_user(reader, user_id).is_banned
+    finally:
+        reader.close()
+
+    writer = Session()
+    try:
+        target = writer.get(models.User, user_id)
+        target.is_banned = True
+        target.banned_at = datetime.now(timezone.utc)
+        target.role = models.UserRole.moderator
+        writer.commit()
+    finally:
+        writer.close()
+
+    assert user_cache.cached_user(user_id) is None
+    reader = Session()
+    try:
+        user = load_user(reader, user_id)
+        assert user.is_banned
+        assert user.role == models.UserRole.moderator
+    finally:
+        reader.close()
+
+
+def test_membership_is_cached_until_the_player_joins(db, queries):
+    user_id = make_user(db)
+    map_obj = models.Map(name="m", width=2, height=2, tile_data={}, allowed_modes=["Conquest"])
+    db.add(map_obj)
+    db.flush()
+    game = models.Game(game_name="g", map_id=map_obj.id, map_name="m", host_id=user_id, link="members")
+    db.add(game)
+    db.commit()
+
+    assert not user_is_game_participant(db, user_id, "members")
+    queries.clear()
+    assert not user_is_game_participant(db, user_id, "members")
+    assert queries == []
+
+    db.add(models.GamePlayer(game_id=game.id, player_id=user_id))
+    db.commit()
+    assert user_is_game_participant(db, user_id, "members")
+
+
+def test_socket_authorization_only_leaves_the_event_loop_on_a_miss(db, monkeypatch):
+    user_id = make_user(db)
+    token = create_session_token(user_id)
+    threaded = []
+    to_thread = asyncio.to_thread
+
+    async def record_to_thread(func, *args):
+        threaded.append(func)
+        return await to_thread(func, *args)
+
+    monkeypatch.setattr(ws.asyncio, "to_thread", record_to_thread)
+
+    class Socket:
+        cookies = {"session_user": token}
+
+    assert asyncio.run(ws._authorize_socket(Socket())).id == user_id
+    assert len(threaded) == 1
+    assert asyncio.run(ws._authorize_socket(Socket())).id == user_id
+    assert len(threaded) == 1
+
+    db.get(models.User, user_id).is_banned = True
+    db.commit()
+    assert asyncio.run(ws._authorize_socket(Socket())) is None
+
+
+def test_invalidations_are_published_to_and_applied_from_other_workers(db, monkeypatch):
+    published = []
+
+    class PublishingRedis:
+        def publish(self, channel, message):
+            published.append((channel, message))
+
+    monkeypatch.setattr(user_cache, "redis_client", PublishingRedis())
+    monkeypatch.setattr(user_cache, "_redis_down_until", 0.0)
+    user_id = make_user(db)
+    assert published == [(user_cache.INVALIDATION_CHANNEL, str(user_id))]
+
+    # Another worker banned the user: its message drops this worker's copy.
+    Session = database.get_sessionmaker()
+    reader = Session()
+    try:
+        load_user(reader, user_id)
+    finally:
+        reader.close()
+    assert user_cache.cached_user(user_id) is not None
+    user_cache._on_invalidation({"data": str(user_id)})
+    assert user_cache.cached_user(user_id) is None
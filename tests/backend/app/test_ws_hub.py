@@ -0,0 +1,151 @@
+import asyncio
+
+from app import ws_hub
+from app.ws_hub import GameUpdateHub, Subscription, game_updates_channel
+
+
+class FakePubSub:
+    def __init__(self):
+        self.channels = set()
+        self.subscribe_calls = 0
+        self.messages = asyncio.Queue()
+        self.closed = False
+
+    async def subscribe(self, *channels):
+        self.subscribe_calls += 1
+        self.channels.update(channels)
+
+    async def unsubscribe(self, *channels):
+        self.channels.difference_update(channels)
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=None):
+        if self.closed:
+            raise RuntimeError("pubsub is closed")
+        try:
+            return await asyncio.wait_for(self.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        self.closed = True
+
+
+class FakeClient:
+    def __init__(self):
+        self.pubsub_instance = FakePubSub()
+        self.closed = False
+
+    def pubsub(self, ignore_subscribe_messages=True):
+        return self.pubsub_instance
+
+    async def aclose(self):
+        self.closed = True
+
+
+def _make_hub(queue_size=8):
+    client = FakeClient()
+    return GameUpdateHub(client_factory=lambda: client, queue_size=queue_size), client.pubsub_instance
+
+
+def test_hub_shares_one_redis_subscription_per_channel():
+    async def scenario():
+        hub, pubsub = _make_hub()
+        first = await hub.subscribe("abc")
+        second = await hub.subscribe("abc")
+
+        assert pubsub.channels == {game_updates_channel("abc")}
+        assert pubsub.subscribe_calls == 1
+        assert hub.subscriber_count("abc") == 2
+
+        await hub.unsubscribe(first)
+        assert pubsub.channels == {game_updates_channel("abc")}
+        await hub.unsubscribe(second)
+        assert pubsub.channels == set()
+        assert hub.subscriber_count("abc") == 0
+
+    asyncio.run(scenario())
+
+
+def test_hub_fans_out_redis_messages_to_every_local_socket():
+    async def scenario():
+        hub, pubsub = _make_hub()
+        first = await hub.subscribe("abc")
+        second = await hub.subscribe("abc")
+        other = await hub.subscribe("xyz")
+
+        await pubsub.messages.put(
+            {"type": "message", "channel": game_updates_channel("abc"), "data": "turn_started"}
+        )
+
+        assert await asyncio.wait_for(first.get(), 1) == "turn_started"
+        assert await asyncio.wait_for(second.get(), 1) == "turn_started"
+        assert other.queue.empty()
+
+        for subscription in (first, second, other):
+            await hub.unsubscribe(subscription)
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_is_evicted_without_affecting_others():
+    async def scenario():
+        hub, _ = _make_hub(queue_size=2)
+        slow = await hub.subscribe("abc")
+        fast = await hub.subscribe("abc")
+        channel = game_updates_channel("abc")
+
+        for index in range(2):
+            hub.dispatch(channel, f"m{index}")
+            assert await fast.get() == f"m{index}"
+
+        assert hub.dispatch(channel, "m2") == 1
+        assert slow.evicted is True
+        assert await slow.get() is None
+        assert await fast.get() == "m2"
+
+        await hub.unsubscribe(slow)
+        await hub.unsubscribe(fast)
+
+    asyncio.run(scenario())
+
+
+def test_evicted_subscription_ignores_further_messages():
+    async def scenario():
+        subscription = Subscription("game_updates:abc", queue_size=1)
+        subscription.evict()
+        assert subscription.offer("late") is False
+        assert await subscription.get() is None
+
+    asyncio.run(scenario())
+
+
+def test_reconnect_closes_the_dead_connection(monkeypatch):
+    monkeypatch.setattr(ws_hub, "RECONNECT_DELAY_SECONDS", 0)
+
+    async def scenario():
+        clients = []
+
+        def client_factory():
+            clients.append(FakeClient())
+            return clients[-1]
+
+        hub = GameUpdateHub(client_factory=client_factory)
+        subscription = await hub.subscribe("abc")
+        dead = clients[0]
+        # The pending read wakes up empty and the next one fails like a dropped connection.
+        dead.pubsub_instance.closed = True
+        await dead.pubsub_instance.messages.put(None)
+
+        while len(clients) < 2:
+            await asyncio.sleep(0)
+        assert dead.closed is True
+        fresh = clients[1].pubsub_instance
+        assert fresh.channels == {game_updates_channel("abc")}
+
+        await fresh.messages.put(
+            {"type": "message", "channel": game_updates_channel("abc"), "data": "turn_started"}
+        )
+        assert await asyncio.wait_for(subscription.get(), 1) == "turn_started"
+        await hub.unsubscribe(subscription)
+
+    asyncio.run(scenario())
@@ -8,7 +8,11 @@ from sqlalchemy.pool import StaticPool
 import app.db.models as models
 from app.db import database
 from app.dependencies import get_db
+from app.catalog import clear_catalog_cache
+from app import user_cache
 from app.main import app
+from app.terrain_cache import clear_terrain_cache
+from app.user_cache import clear_user_cache
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -17,6 +21,12 @@ def _configure_test_environment():
     os.environ["SKIP_STARTUP_TASKS"] = "1"
 
 
+@pytest.fixture(autouse=True)
+def _local_user_cache_invalidations(monkeypatch):
+    """There is no Redis under test; keep user cache invalidations in-process."""
+    monkeypatch.setattr(user_cache, "_redis_down_until", float("inf"))
+
+
 @pytest.fixture(scope="session")
 def test_engine():
     """Shared in-memory database for backend tests."""
@@ -32,6 +42,10 @@ def test_engine():
 def db(test_engine):
     """Session fixture that rebuilds the schema per test."""
     database.configure_engine(test_engine)
+    # Ids are reused across tests once the schema is rebuilt, so drop per-map caches.
+    clear_terrain_cache()
+    clear_catalog_cache()
+    clear_user_cache()
     models.Base.metadata.drop_all(bind=test_engine)
     models.Base.metadata.create_all(bind=test_engine)
 
@@ -0,0 +1,23 @@
+import json
+import random
+
+from app.moderation.filter import filter_message, reload_wordlist
+from scripts.benchmark_moderation_filter import build_message, build_wordlist, legacy_filter_message
+
+
+def test_precompiled_filter_censors_like_the_per_term_matcher(tmp_path):
+    rng = random.Random(11)
+    terms = build_wordlist(60, rng) + ["ab", "fag", "faggot", "B4D", "ba d", "!!", "assss"]
+    rng.shuffle(terms)
+    path = tmp_path / "wordlist.json"
+    path.write_text(json.dumps({"blocked_terms": terms}), encoding="utf-8")
+    blocked_terms = [term.strip().lower() for term in terms]
+    messages = [build_message(blocked_terms, 25, 0.2, rng) for _ in range(150)]
+    messages += ["", "  ", "f a g g o t", "a_b", "b@d news", "BADDD", "ſtraße ba d", "x" * 500]
+
+    try:
+        reload_wordlist()
+        for message in messages:
+            assert filter_message(message, wordlist_path=str(path)) == legacy_filter_message(message, blocked_terms)
+    finally:
+        reload_wordlist()
@@ -0,0 +1,30 @@
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from app.db.models import Base
+from scripts import explain_hot_queries
+
+
+def test_sequential_scans_are_detected_on_both_dialects():
+    plan = [
+        "SCAN game_units",
+        "SCAN game_players USING INDEX ix_game_players_game_id_player_id",
+        "SEARCH game_status USING INDEX ix_game_status_status_turn_deadline (status=?)",
+        "  ->  Seq Scan on game_players  (cost=0.00..35.50 rows=10 width=4)",
+        "SCAN games",
+    ]
+    assert explain_hot_queries.sequential_scans(plan) == [
+        "SCAN game_units",
+        "Seq Scan on game_players  (cost=0.00..35.50 rows=10 width=4)",
+    ]
+
+
+def test_hot_queries_use_indexes_on_a_large_dataset():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    params = explain_hot_queries.seed(engine, games=1000)
+
+    plans = explain_hot_queries.explain_hot_queries(engine, params)
+
+    scans = {name: explain_hot_queries.sequential_scans(plan) for name, plan in plans.items()}
+    assert {name: lines for name, lines in scans.items() if lines} == {}
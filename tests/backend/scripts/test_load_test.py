@@ -0,0 +1,84 @@
+import random
+
+import httpx
+
+from scripts import load_test
+
+
+def unit(unit_id, user_id, x, y, hp=100, moves=(), pp=()):
+    return {
+        "id": unit_id,
+        "user_id": user_id,
+        "current_x": x,
+        "current_y": y,
+        "current_hp": hp,
+        "equipped_move_ids": list(moves),
+        "move_pp": list(pp),
+    }
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(value) for value in range(1, 101)]
+    assert load_test.percentile(values, 50) == 50
+    assert load_test.percentile(values, 95) == 95
+    assert load_test.percentile(values, 99) == 99
+    assert load_test.percentile([3.0], 99) == 3.0
+    assert load_test.percentile([], 50) == 0.0
+
+
+def test_summary_reports_latency_errors_and_queries_per_endpoint():
+    stats = load_test.Stats()
+    for ms in (10, 20, 30, 40):
+        stats.record("POST /games/{link}/move", ms / 1000, 200, 12)
+    stats.record("POST /games/{link}/move", 0.5, 400, 2)
+    stats.record("GET /maps/official", 0.1, 200, None)
+    stats.matches["completed"] += 3
+
+    summary = load_test.summarize(stats, elapsed=90)
+    move = summary["endpoints"]["POST /games/{link}/move"]
+
+    assert move["count"] == 5
+    assert move["errors"] == 1
+    assert move["p50_ms"] == 30
+    assert move["p99_ms"] == 500
+    assert move["queries_per_request"] == 10
+    assert summary["endpoints"]["GET /maps/official"]["queries_per_request"] is None
+    assert summary["matches_per_minute"] == 2
+    assert "POST /games/{link}/move" in load_test.format_report(summary)
+
+
+def test_session_cookie_is_read_from_the_secure_set_cookie_header():
+    response = httpx.Response(
+        200, headers=[("set-cookie", "session_user=abc.def; HttpOnly; Path=/; SameSite=none; Secure")]
+    )
+    assert load_test.session_cookie(response) == "abc.def"
+    assert load_test.session_cookie(httpx.Response(200)) is None
+
+
+def test_spawn_tiles_belong_to_the_player_number():
+    map_data = {"tile_data": {"spawn_points": [[1, None, 2], [1, 2, None]]}}
+    assert load_test.spawn_tiles(map_data, 1) == [(0, 0), (0, 1)]
+    assert load_test.spawn_tiles(map_data, 2) == [(2, 0), (1, 1)]
+
+
+def test_scripted_policy_walks_toward_the_nearest_enemy_and_attacks():
+    rng = random.Random(0)
+    mover = unit(1, 1, 0, 0, moves=(10, 11, 12), pp=(5, 0, 5))
+    enemies = [unit(2, 2, 4, 0, hp=50), unit(3, 2, 3, 1, hp=20)]
+    tiles = [[0, 0], [1, 0], [2, 0], [3, 0], [2, 1]]
+
+    assert load_test.choose_tile(mover, tiles, {(3, 0)}, enemies, "scripted", rng) == (2, 1)
+
+    moves = {
+        10: {"id": 10, "range": "adjacent", "targeting": "enemy", "power": 40},
+        11: {"id": 11, "range": "adjacent", "targeting": "enemy", "power": 120},
+        12: {"id": 12, "range": "pulse:2", "targeting": "enemy", "power": 90},
+    }
+    mover["current_x"], mover["current_y"] = 3, 0
+    move, target = load_test.choose_attack(mover, enemies, moves, "scripted", rng)
+    # Move 11 has no PP left and move 12 is not an adjacent attack.
+    assert move["id"] == 10
+    assert target["id"] == 3
+
+    mover["current_x"], mover["current_y"] = 0, 0
+    assert load_test.choose_attack(mover, enemies, moves, "scripted", rng) is None
@@ -73,3 +73,14 @@ def test_run_from_args_bootstrap_only(monkeypatch):
     seed_catalog.run_from_args(args)
 
     assert called["bootstrap"] is True
+
+
+def test_refresh_catalogs_bumps_catalog_version(monkeypatch):
+    calls = []
+
+    monkeypatch.setitem(seed_catalog.CATALOGS, "units", ("Units", lambda refresh: calls.append(("units", refresh))))
+    monkeypatch.setattr(seed_catalog, "bump_catalog_version", lambda: calls.append("bump") or 3)
+
+    seed_catalog.refresh_catalogs(["units"], refresh=True)
+
+    assert calls == [("units", True), "bump"]
@@ -0,0 +1,89 @@
+import json
+
+from sqlalchemy import event
+
+import app.db.models as models
+from scripts import seed_abilities, seed_engine, seed_official_maps
+
+
+def write_ability(directory, ability_id, slug, description):
+    data = {"id": ability_id, "name": slug.title(), "slug": slug, "description": description, "generation": 3}
+    (directory / f"{slug}.json").write_text(json.dumps(data))
+
+
+def test_reseeding_only_writes_new_and_changed_rows(db, test_engine, monkeypatch, tmp_path):
+    monkeypatch.setattr(seed_abilities, "ABILITIES_DIR", str(tmp_path))
+    write_ability(tmp_path, 1, "stench", "Smells.")
+    write_ability(tmp_path, 2, "drizzle", "Rain.")
+    assert seed_abilities.load_abilities(refresh=True).summary() == "ability: 2 inserted, 0 updated, 0 unchanged"
+
+    write_ability(tmp_path, 2, "drizzle", "Summons rain.")
+    write_ability(tmp_path, 3, "levitate", "Floats.")
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement.split()[0])
+
+    event.listen(test_engine, "before_cursor_execute", listener)
+    try:
+        report = seed_abilities.load_abilities(refresh=True)
+    finally:
+        event.remove(test_engine, "before_cursor_execute", listener)
+
+    assert (report.inserted, report.updated, report.unchanged) == (1, 1, 1)
+    assert statements.count("SELECT") == 1
+    assert statements.count("INSERT") == 1
+    db.expire_all()
+    assert db.get(models.Ability, 2).description == "Summons rain."
+    assert db.get(models.Ability, 1).description == "Smells."
+
+
+def test_records_match_existing_rows_by_natural_key(db, monkeypatch, tmp_path):
+    db.add(models.Ability(id=40, name="Stench", slug="stench", description="Old.", generation=3))
+    db.commit()
+    monkeypatch.setattr(seed_abilities, "ABILITIES_DIR", str(tmp_path))
+    write_ability(tmp_path, 1, "stench", "New.")
+
+    assert seed_abilities.load_abilities(refresh=False).unchanged == 1
+    assert seed_abilities.load_abilities(refresh=True).updated == 1
+    db.expire_all()
+    assert [(row.id, row.description) for row in db.query(models.Ability)] == [(40, "New.")]
+
+
+def test_maps_are_upserted_by_name(db, monkeypatch, tmp_path):
+    monkeypatch.setattr(seed_official_maps, "MAPS_DIR", str(tmp_path))
+    map_data = {
+        "name": "Route 1",
+        "is_official": True,
+        "width": 10,
+        "height": 10,
+        "tileset_names": ["grass"],
+        "allowed_modes": ["Conquest"],
+        "allowed_player_counts": [2],
+        "tile_data": {"layers": []},
+    }
+    (tmp_path / "route1.json").write_text(json.dumps(map_data))
+    assert seed_official_maps.load_maps().inserted == 1
+    assert seed_official_maps.load_maps().unchanged == 1
+
+    map_data["width"] = 12
+    (tmp_path / "route1.json").write_text(json.dumps(map_data))
+    assert seed_official_maps.load_maps().updated == 1
+    db.expire_all()
+    maps = db.query(models.Map).all()
+    assert [(row.name, row.width) for row in maps] == [("Route 1", 12)]
+    assert maps[0].updated_at is not None
+
+
+def test_parallel_parse_matches_serial_parse(monkeypatch, tmp_path):
+    for index in range(6):
+        write_ability(tmp_path, index, f"ability{index}", "x" * index)
+    paths = seed_engine.iter_seed_files(str(tmp_path))
+    fields = seed_abilities.ability_fields_from_data
+
+    serial = seed_engine.parse_seed_files(paths, fields, workers=1)
+    monkeypatch.setattr(seed_engine, "PARALLEL_PARSE_MIN_FILES", 0)
+    parallel = seed_engine.parse_seed_files(paths, fields, workers=2)
+
+    assert parallel == serial
+    assert seed_engine.record_digest({"id": 1, "height": 1.0}) == seed_engine.record_digest({"id": 2, "height": 1})